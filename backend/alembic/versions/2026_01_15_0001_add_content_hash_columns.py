@@ -0,0 +1,58 @@
+"""Add content_hash columns to books and chapters.
+
+Revision ID: 2026_01_15_0001
+Revises: 2026_01_09_0001
+Create Date: 2026-01-15
+
+Content-hash deduplication:
+- books.content_hash: SHA-256 of the uploaded file. An identical upload
+  reuses the parsed chapters of an existing book instead of re-parsing.
+- chapters.content_hash: SHA-256 of the chapter text. An identical chapter
+  reuses already extracted descriptions instead of calling Gemini again.
+
+Existing chapters are backfilled in SQL (same digest as Python
+hashlib.sha256(content.encode("utf-8"))). Existing books keep NULL -
+their original upload bytes are not hashed retroactively.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_15_0001"
+down_revision = "2026_01_09_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add content_hash columns and indexes."""
+    op.add_column(
+        "books",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.create_index("ix_books_content_hash", "books", ["content_hash"])
+
+    op.add_column(
+        "chapters",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+
+    # Backfill chapter hashes (PostgreSQL 11+ sha256())
+    op.execute("""
+        UPDATE chapters
+        SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+        WHERE content_hash IS NULL
+    """)
+
+    op.create_index("ix_chapters_content_hash", "chapters", ["content_hash"])
+
+
+def downgrade() -> None:
+    """Remove content_hash columns."""
+    op.drop_index("ix_chapters_content_hash", table_name="chapters")
+    op.drop_column("chapters", "content_hash")
+
+    op.drop_index("ix_books_content_hash", table_name="books")
+    op.drop_column("books", "content_hash")
@@ -0,0 +1,63 @@
+"""Add llm_extraction_cache table.
+
+Revision ID: 2026_01_16_0001
+Revises: 2026_01_15_0001
+Create Date: 2026-01-16
+
+Persistent LLM extraction cache:
+- Key: (sha256(chunk_text), prompt_version, model)
+- Value: parsed Gemini response for the chunk (JSONB)
+- last_accessed_at drives TTL / LRU eviction (cleanup_llm_cache task)
+
+Redis holds the hot copy; this table survives Redis restarts and is
+shared by API workers and Celery workers.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_16_0001"
+down_revision = "2026_01_15_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create llm_extraction_cache table."""
+    op.create_table(
+        "llm_extraction_cache",
+        sa.Column("chunk_hash", sa.String(length=64), nullable=False),
+        sa.Column("prompt_version", sa.String(length=16), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("response", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "last_accessed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("chunk_hash", "prompt_version", "model"),
+    )
+    op.create_index(
+        "idx_llm_extraction_cache_last_accessed",
+        "llm_extraction_cache",
+        ["last_accessed_at"],
+    )
+
+
+def downgrade() -> None:
+    """Drop llm_extraction_cache table."""
+    op.drop_index(
+        "idx_llm_extraction_cache_last_accessed", table_name="llm_extraction_cache"
+    )
+    op.drop_table("llm_extraction_cache")
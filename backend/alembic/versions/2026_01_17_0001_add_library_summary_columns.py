@@ -0,0 +1,95 @@
+"""Add library summary columns and keyset pagination indexes.
+
+Revision ID: 2026_01_17_0001
+Revises: 2026_01_16_0001
+Create Date: 2026-01-17
+
+The library list (GET /api/v1/books/) used to eager-load every chapter and
+reading_progress row of the page only to compute a chapter count and one
+progress percentage in Python. Now it is a single narrow query:
+- books.total_chapters: maintained when chapters are inserted
+- reading_progress.progress_percent: maintained by update_reading_progress
+- (user_id, <sort key>, id) indexes back keyset pagination for every
+  sort_by option
+
+Both columns are backfilled in SQL with the same formulas as
+BookProgressService.compute_progress_percent.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_17_0001"
+down_revision = "2026_01_16_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add summary columns, backfill them and create keyset indexes."""
+    op.add_column(
+        "books",
+        sa.Column("total_chapters", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "reading_progress",
+        sa.Column("progress_percent", sa.Float(), server_default="0", nullable=False),
+    )
+
+    op.execute("""
+        UPDATE books
+        SET total_chapters = counts.total
+        FROM (
+            SELECT book_id, count(*) AS total
+            FROM chapters
+            GROUP BY book_id
+        ) AS counts
+        WHERE counts.book_id = books.id
+    """)
+
+    # CFI (epub.js): current_position уже общий процент по книге.
+    # Legacy: глава + процент внутри главы.
+    op.execute("""
+        UPDATE reading_progress AS rp
+        SET progress_percent = CASE
+            WHEN rp.reading_location_cfi IS NOT NULL
+                THEN LEAST(100, GREATEST(0, rp.current_position))
+            WHEN b.total_chapters = 0
+                THEN 0
+            ELSE LEAST(100, GREATEST(0,
+                (LEAST(GREATEST(rp.current_chapter, 1), b.total_chapters) - 1)
+                    * 100.0 / b.total_chapters
+                + LEAST(100, GREATEST(0, rp.current_position)) / b.total_chapters
+            ))
+        END
+        FROM books AS b
+        WHERE b.id = rp.book_id
+    """)
+
+    op.create_index(
+        "idx_books_user_created", "books", ["user_id", "created_at", "id"]
+    )
+    op.create_index("idx_books_user_title", "books", ["user_id", "title", "id"])
+    op.create_index(
+        "idx_books_user_author",
+        "books",
+        ["user_id", sa.text("coalesce(author, '')"), "id"],
+    )
+    op.create_index(
+        "idx_books_user_accessed",
+        "books",
+        ["user_id", sa.text("coalesce(last_accessed, created_at)"), "id"],
+    )
+
+
+def downgrade() -> None:
+    """Remove summary columns and keyset indexes."""
+    op.drop_index("idx_books_user_accessed", table_name="books")
+    op.drop_index("idx_books_user_author", table_name="books")
+    op.drop_index("idx_books_user_title", table_name="books")
+    op.drop_index("idx_books_user_created", table_name="books")
+
+    op.drop_column("reading_progress", "progress_percent")
+    op.drop_column("books", "total_chapters")
@@ -0,0 +1,63 @@
+"""Add prompt_translation_cache table.
+
+Revision ID: 2026_01_19_0001
+Revises: 2026_01_17_0001
+Create Date: 2026-01-19
+
+Shared cache for PromptTranslator (Russian description -> English Imagen prompt):
+- Key: (sha256(source_text), prompt_version, model)
+- Value: translated text
+- last_accessed_at drives TTL / LRU eviction (cleanup_llm_cache task)
+
+Each process keeps a bounded in-memory LRU and Redis holds the hot copy;
+this table survives restarts and is shared by API and Celery workers.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_19_0001"
+down_revision = "2026_01_17_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create prompt_translation_cache table."""
+    op.create_table(
+        "prompt_translation_cache",
+        sa.Column("text_hash", sa.String(length=64), nullable=False),
+        sa.Column("prompt_version", sa.String(length=16), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("translation", sa.Text(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "last_accessed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("text_hash", "prompt_version", "model"),
+    )
+    op.create_index(
+        "idx_prompt_translation_cache_last_accessed",
+        "prompt_translation_cache",
+        ["last_accessed_at"],
+    )
+
+
+def downgrade() -> None:
+    """Drop prompt_translation_cache table."""
+    op.drop_index(
+        "idx_prompt_translation_cache_last_accessed",
+        table_name="prompt_translation_cache",
+    )
+    op.drop_table("prompt_translation_cache")
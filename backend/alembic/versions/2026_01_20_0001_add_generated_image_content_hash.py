@@ -0,0 +1,41 @@
+"""Add content_hash column to generated_images.
+
+Revision ID: 2026_01_20_0001
+Revises: 2026_01_19_0001
+Create Date: 2026-01-20
+
+Content-addressed generated image store:
+- generated_images.content_hash: SHA-256 of the image file. Files live in
+  sharded directories under their hash, rows with identical images share
+  one file, and the count of rows per hash is the file's reference count.
+
+Existing rows keep NULL until scripts/migrate_generated_images.py moves
+their files out of the flat directory and fills the hash.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_20_0001"
+down_revision = "2026_01_19_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add content_hash column and index."""
+    op.add_column(
+        "generated_images",
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+    )
+    op.create_index(
+        "ix_generated_images_content_hash", "generated_images", ["content_hash"]
+    )
+
+
+def downgrade() -> None:
+    """Remove content_hash column."""
+    op.drop_index("ix_generated_images_content_hash", table_name="generated_images")
+    op.drop_column("generated_images", "content_hash")
@@ -0,0 +1,37 @@
+"""Add variants column to generated_images.
+
+Revision ID: 2026_01_21_0001
+Revises: 2026_01_20_0001
+Create Date: 2026-01-21
+
+Image variant pipeline:
+- generated_images.variants: JSONB list of transcoded variants of the image
+  file (WebP/AVIF at several widths) written by the generate_image_variants
+  Celery task. The file endpoint picks a variant by Accept and ?w=.
+
+Existing rows keep NULL and are served as the original PNG.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "2026_01_21_0001"
+down_revision = "2026_01_20_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add variants column."""
+    op.add_column(
+        "generated_images",
+        sa.Column("variants", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Remove variants column."""
+    op.drop_column("generated_images", "variants")
@@ -0,0 +1,188 @@
+"""
+Async runtime процесса Celery воркера.
+
+Раньше каждая задача вызывала asyncio.run(): новый event loop на задачу,
+а модульный engine (core/database.py) держал в пуле asyncpg соединения
+предыдущих loop - переподключения на каждую задачу и периодические
+"attached to a different loop".
+
+WorkerAsyncRuntime живёт столько же, сколько процесс воркера:
+- Один event loop в отдельном потоке (создаётся на worker_process_init)
+- Свой движок БД с пулом этого loop; AsyncSessionLocal перепривязывается
+  к нему, поэтому сервисы и задачи используют его без изменений
+- Закрытие пула БД и HTTP транспортов LLM на worker_process_shutdown
+
+Задачи отправляются в loop через run_coroutine_threadsafe - это работает
+и для prefork (одна задача за раз), и для пула потоков. Вне воркера
+(тесты, скрипты, eager режим) run_async откатывается на asyncio.run().
+
+ИСПОЛЬЗОВАНИЕ:
+    result = run_async(_process_book_async(book_id))
+
+Created: 2026-01-18
+Author: fancai Team
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+from .database import AsyncSessionLocal, create_database_engine
+from .logging import logger
+
+T = TypeVar("T")
+
+
+class WorkerAsyncRuntime:
+    """Event loop и пул БД, общие для всех задач процесса воркера."""
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+    ):
+        """
+        Args:
+            pool_size: Размер пула БД процесса (по умолчанию CELERY_DB_POOL_SIZE)
+            max_overflow: Дополнительные соединения (CELERY_DB_MAX_OVERFLOW)
+        """
+        self.pool_size = pool_size or settings.CELERY_DB_POOL_SIZE
+        self.max_overflow = (
+            max_overflow if max_overflow is not None else settings.CELERY_DB_MAX_OVERFLOW
+        )
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._engine: Optional[AsyncEngine] = None
+        self._previous_bind: Any = None
+        self._pid: Optional[int] = None
+
+        self.stats = {"tasks": 0, "failed": 0, "starts": 0}
+
+    @property
+    def is_running(self) -> bool:
+        """Runtime запущен в текущем процессе (после fork поток не наследуется)."""
+        return (
+            self._loop is not None
+            and self._pid == os.getpid()
+            and self._loop.is_running()
+        )
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop if self.is_running else None
+
+    @property
+    def engine(self) -> Optional[AsyncEngine]:
+        return self._engine if self.is_running else None
+
+    def start(self) -> None:
+        """Запускает loop и движок БД процесса (идемпотентно)."""
+        if self.is_running:
+            return
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run_loop() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(
+            target=_run_loop, name="worker-async-runtime", daemon=True
+        )
+        thread.start()
+        ready.wait()
+
+        self._loop = loop
+        self._thread = thread
+        self._pid = os.getpid()
+
+        # Движок создаётся без соединений - пул наполняется уже внутри loop
+        self._engine = create_database_engine(
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            application_name="bookreader_celery",
+        )
+        self._previous_bind = AsyncSessionLocal.kw.get("bind")
+        AsyncSessionLocal.configure(bind=self._engine)
+
+        self.stats["starts"] += 1
+        logger.info(
+            "Worker async runtime started",
+            pid=self._pid,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+        )
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """
+        Выполняет корутину в loop воркера и ждёт результат.
+
+        Если ожидание прервано (SoftTimeLimitExceeded и т.п.), корутина
+        отменяется, чтобы не продолжать работу после завершения задачи.
+        """
+        if not self.is_running:
+            raise RuntimeError("Worker async runtime is not running")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        self.stats["tasks"] += 1
+        try:
+            return future.result()
+        except BaseException:
+            self.stats["failed"] += 1
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Закрывает пул БД и HTTP транспорты, останавливает loop."""
+        if not self.is_running:
+            return
+
+        async def _close_resources() -> None:
+            from ..services.llm_transport import close_llm_transports
+
+            await close_llm_transports()
+            await self._engine.dispose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close_resources(), self._loop).result(
+                timeout
+            )
+        except Exception as e:
+            logger.warning("Error closing worker async resources", error=str(e))
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+
+        AsyncSessionLocal.configure(bind=self._previous_bind)
+        self._loop = None
+        self._thread = None
+        self._engine = None
+
+        logger.info("Worker async runtime stopped", pid=self._pid, **self.stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика runtime."""
+        return {"running": self.is_running, "pid": self._pid, **self.stats}
+
+
+# Глобальный экземпляр (один на процесс воркера)
+worker_runtime = WorkerAsyncRuntime()
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Выполняет корутину из синхронной Celery задачи.
+
+    В процессе воркера - в общем loop воркера, иначе - через asyncio.run().
+    """
+    if worker_runtime.is_running:
+        return worker_runtime.run(coro)
+    return asyncio.run(coro)
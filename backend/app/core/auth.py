@@ -3,9 +3,10 @@ Middleware и dependencies для аутентификации в fancai.
 
 Содержит функции для проверки JWT токенов и получения текущего пользователя.
 Включает проверку token blacklist для корректной обработки logout.
+Пользователь берётся из principal_cache по jti токена, БД - только при промахе.
 """
 
-from typing import Optional
+from typing import Any, Dict, Optional
 from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -14,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .database import get_database_session
 from ..services.auth_service import auth_service
 from ..services.token_blacklist import token_blacklist
+from ..services.principal_cache import principal_cache
 from ..models.user import User
 
 
@@ -21,6 +23,41 @@ from ..models.user import User
 security = HTTPBearer()
 
 
+async def _get_token_user(
+    db: AsyncSession, token: str, payload: Dict[str, Any]
+) -> Optional[User]:
+    """
+    Пользователь проверенного access токена: кэш по jti, при промахе - БД.
+
+    Args:
+        db: Сессия базы данных
+        token: JWT токен
+        payload: Декодированный payload токена
+
+    Returns:
+        Пользователь или None, если sub некорректен или пользователь не найден
+    """
+    user_id_str = payload.get("sub")
+    if user_id_str is None:
+        return None
+
+    try:
+        user_id = UUID(user_id_str)
+    except ValueError:
+        return None
+
+    token_key = principal_cache.token_key(token, payload)
+    user = await principal_cache.get(user_id, token_key)
+    if user is not None:
+        return user
+
+    # Промах кэша - получаем пользователя из базы данных
+    user = await auth_service.get_user_by_id(db, user_id)
+    if user is not None:
+        await principal_cache.put(user, token_key, payload.get("exp"))
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_database_session),
@@ -53,27 +90,16 @@ async def get_current_user(
     # Проверяем токен
     token = credentials.credentials
 
-    # Check if token is blacklisted (revoked via logout)
-    if await token_blacklist.is_blacklisted(token):
-        raise token_revoked_exception
-
     payload = auth_service.verify_token(token, "access")
 
     if payload is None:
         raise credentials_exception
 
-    # Получаем ID пользователя
-    user_id_str = payload.get("sub")
-    if user_id_str is None:
-        raise credentials_exception
-
-    try:
-        user_id = UUID(user_id_str)
-    except ValueError:
-        raise credentials_exception
+    # Check if token is blacklisted (revoked via logout)
+    if await token_blacklist.is_blacklisted(token, payload):
+        raise token_revoked_exception
 
-    # Получаем пользователя из базы данных
-    user = await auth_service.get_user_by_id(db, user_id)
+    user = await _get_token_user(db, token, payload)
     if user is None or not user.is_active:
         raise credentials_exception
 
@@ -147,24 +173,16 @@ def get_optional_current_user():
             # Проверяем токен
             token = credentials.credentials
 
-            # Check if token is blacklisted (revoked via logout)
-            if await token_blacklist.is_blacklisted(token):
-                return None
-
             payload = auth_service.verify_token(token, "access")
 
             if payload is None:
                 return None
 
-            # Получаем ID пользователя
-            user_id_str = payload.get("sub")
-            if user_id_str is None:
+            # Check if token is blacklisted (revoked via logout)
+            if await token_blacklist.is_blacklisted(token, payload):
                 return None
 
-            user_id = UUID(user_id_str)
-
-            # Получаем пользователя из базы данных
-            user = await auth_service.get_user_by_id(db, user_id)
+            user = await _get_token_user(db, token, payload)
             if user is None or not user.is_active:
                 return None
 
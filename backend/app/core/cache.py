@@ -17,7 +17,7 @@ Performance targets:
 
 import json
 import functools
-from typing import Any, Callable, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 from datetime import timedelta
 from redis.asyncio import Redis, ConnectionPool
 from redis.exceptions import RedisError
@@ -157,6 +157,32 @@ class CacheManager:
             logger.warning(f"Redis SET error for key {key}: {e}")
             return False
 
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several values from cache with a single MGET.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Found values by key (missing keys are omitted)
+        """
+        if not keys or not self._is_available or not self._redis:
+            return {}
+
+        try:
+            values = await self._redis.mget(keys)
+            found = {
+                key: json.loads(value)
+                for key, value in zip(keys, values)
+                if value
+            }
+            logger.debug(f"🎯 Cache MGET: {len(found)}/{len(keys)} hits")
+            return found
+        except (RedisError, ValueError) as e:
+            logger.warning(f"Redis MGET error for {len(keys)} keys: {e}")
+            return {}
+
     async def delete(self, key: str) -> bool:
         """
         Delete key from cache.
@@ -444,6 +470,8 @@ CACHE_KEY_PATTERNS = {
     "description_image": "description:{description_id}:image",
     # User Statistics (December 2025)
     "user_stats": "user_stats:{user_id}",
+    # Authenticated principal by access token jti (TTL: AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+    "auth_principal": "auth_principal:{user_id}:{jti}",
 }
 
 
@@ -3,12 +3,14 @@ Celery configuration for fancai.
 Настройка Celery для фоновых задач.
 """
 
-from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 import os
 from app.core.config import settings
+from app.core.celery_config import ResourceAwareCelery
 
 # Create Celery instance with basic config
-celery_app = Celery(
+# (фоновый мониторинг ресурсов, отложенный запуск тяжёлых задач, GC policy)
+celery_app = ResourceAwareCelery(
     "bookreader",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
@@ -43,6 +45,7 @@ celery_app.conf.update(
     # Rate limiting (basic)
     task_routes={
         "app.core.tasks.process_book_task": {"queue": "heavy"},
+        "parse_uploaded_book": {"queue": "heavy"},
         "generate_image_task": {"queue": "normal"},
         "generate_image_batch_task": {"queue": "normal"},
     },
@@ -58,8 +61,29 @@ celery_app.conf.update(
                 "priority": 2,
             },
         },
+        # Очистка кэша LLM извлечения (очередь по умолчанию - её слушают воркеры)
+        "cleanup-llm-cache": {
+            "task": "cleanup_llm_cache",
+            "schedule": 86400.0,  # Раз в сутки
+        },
     },
 )
 
 # Auto-discover tasks
 celery_app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def start_worker_async_runtime(**kwargs):
+    """Event loop и пул БД на всё время жизни процесса воркера."""
+    from app.core.async_runtime import worker_runtime
+
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_async_runtime(**kwargs):
+    """Закрывает пул БД и HTTP клиенты процесса воркера."""
+    from app.core.async_runtime import worker_runtime
+
+    worker_runtime.shutdown()
@@ -1,15 +1,27 @@
 """
 Optimized Celery Configuration for fancai
 Handles high-load book parsing with resource constraints
+
+This module does not create a Celery app: the single application workers
+run is app.core.celery_app.celery_app (a ResourceAwareCelery). A second
+instance created here at import time would let tasks register on the wrong
+app and bind worker signals twice.
 """
 
 import os
 from kombu import Queue, Exchange
-from celery import Celery
-from celery.signals import worker_shutting_down, task_prerun, task_postrun
-import psutil
+from celery import Celery, Task
+from celery.exceptions import Ignore
+from celery.signals import (
+    worker_shutting_down,
+    worker_process_init,
+    worker_process_shutdown,
+    task_postrun,
+)
 import logging
 
+from app.core.resource_monitor import GCPolicy, resource_sampler
+
 logger = logging.getLogger(__name__)
 
 # Performance settings based on resource analysis
@@ -126,8 +138,24 @@ RESOURCE_LIMITS = {
     "max_memory_percent": 85,  # Stop accepting tasks if memory > 85%
     "max_cpu_percent": 90,  # Pause if CPU > 90%
     "min_free_memory_mb": 500,  # Always keep 500MB free
+    # Heavy tasks are deferred (re-published with countdown) while limits are exceeded
+    "defer_countdown_seconds": 30,  # Grows linearly with each deferral
+    "max_deferrals": 5,  # After that the task runs anyway
+    # Full GC after a task: heavy tasks or RSS growth, at most once per interval
+    "gc_rss_growth_mb": 256,
+    "gc_min_interval_seconds": 60,
 }
 
+# Tasks that parse books or generate images (hundreds of MB, minutes of CPU/IO)
+HEAVY_TASKS = frozenset(
+    {
+        "process_book",
+        "parse_uploaded_book",
+        "generate_image_task",
+        "generate_image_batch_task",
+    }
+)
+
 # Retry configuration with exponential backoff
 RETRY_CONFIG = {
     "max_retries": 3,
@@ -146,76 +174,105 @@ NLP_CACHE_CONFIG = {
 }
 
 
-class ResourceAwareCelery(Celery):
-    """Custom Celery app with resource monitoring"""
+gc_policy = GCPolicy(
+    heavy_tasks=HEAVY_TASKS,
+    rss_growth_mb=RESOURCE_LIMITS["gc_rss_growth_mb"],
+    min_interval_seconds=RESOURCE_LIMITS["gc_min_interval_seconds"],
+)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._setup_resource_monitoring()
 
-    def _setup_resource_monitoring(self):
-        """Setup hooks for resource monitoring"""
+class ResourceAwareTask(Task):
+    """Task that defers heavy work while the worker host is overloaded"""
 
-        @worker_shutting_down.connect
-        def graceful_shutdown(**kwargs):
-            """Gracefully shutdown worker"""
-            logger.info("Worker shutting down gracefully...")
-            # Save current task state
-            # Cleanup resources
-            # Close connections
+    def before_start(self, task_id, args, kwargs):
+        """
+        Admission check right after task_prerun.
 
-        @task_prerun.connect
-        def check_resources_before_task(**kwargs):
-            """Check system resources before starting task"""
-            memory = psutil.virtual_memory()
-            cpu = psutil.cpu_percent(interval=1)
+        Celery swallows exceptions raised by signal handlers, so deferral
+        lives here: Ignore raised from before_start skips the task body.
+        The task is re-published with the same id, so AsyncResult keeps working.
+        """
+        if self.name not in HEAVY_TASKS or self.request.is_eager:
+            return
 
-            if memory.percent > RESOURCE_LIMITS["max_memory_percent"]:
-                logger.warning(f"High memory usage: {memory.percent}%")
-                # Could implement task deferral here
+        exceeded = resource_sampler.snapshot().exceeded_limits(RESOURCE_LIMITS)
+        if not exceeded:
+            return
 
-            if cpu > RESOURCE_LIMITS["max_cpu_percent"]:
-                logger.warning(f"High CPU usage: {cpu}%")
+        deferrals = self.request.get("resource_deferrals") or 0
+        if deferrals >= RESOURCE_LIMITS["max_deferrals"]:
+            logger.warning(
+                f"Running {self.name} despite {', '.join(exceeded)}: "
+                f"deferred {deferrals} times"
+            )
+            return
 
-        @task_postrun.connect
-        def cleanup_after_task(**kwargs):
-            """Cleanup resources after task completion"""
-            # Force garbage collection for heavy tasks
-            import gc
+        countdown = RESOURCE_LIMITS["defer_countdown_seconds"] * (deferrals + 1)
+        logger.warning(
+            f"Deferring {self.name} [{task_id}] for {countdown}s: {', '.join(exceeded)}"
+        )
+        self.apply_async(
+            args=args,
+            kwargs=kwargs,
+            task_id=task_id,
+            countdown=countdown,
+            headers={"resource_deferrals": deferrals + 1},
+        )
+        raise Ignore()
 
-            gc.collect()
 
+def start_resource_sampler(**kwargs):
+    """Start background resource sampling in the worker process"""
+    resource_sampler.start()
 
-def create_celery_app():
-    """Create and configure Celery application"""
-    app = ResourceAwareCelery("bookreader")
-    app.config_from_object(CELERY_CONFIG)
 
-    # Set up task annotations for resource limits
-    app.conf.task_annotations = {
-        "app.core.tasks.process_book_task": {
-            "rate_limit": "5/m",
-            "time_limit": 1800,
-            "soft_time_limit": 1500,
-        },
-        "app.core.tasks.process_chapter_task": {
-            "rate_limit": "30/m",
-            "time_limit": 300,
-            "soft_time_limit": 240,
-        },
-    }
+def stop_resource_sampler(**kwargs):
+    """Stop background resource sampling"""
+    resource_sampler.stop()
+
+
+def cleanup_after_task(sender=None, **kwargs):
+    """Full GC only when the policy says it is worth it"""
+    if sender is not None:
+        gc_policy.after_task(sender.name)
+
+
+def graceful_shutdown(**kwargs):
+    """Gracefully shutdown worker"""
+    logger.info("Worker shutting down gracefully...")
+
 
-    return app
+class ResourceAwareCelery(Celery):
+    """Custom Celery app with resource monitoring"""
 
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("task_cls", ResourceAwareTask)
+        super().__init__(*args, **kwargs)
+        self._setup_resource_monitoring()
+
+    def _setup_resource_monitoring(self):
+        """Setup hooks for resource monitoring (once per process)"""
+        worker_process_init.connect(
+            start_resource_sampler, weak=False, dispatch_uid="resource_sampler_start"
+        )
+        worker_process_shutdown.connect(
+            stop_resource_sampler, weak=False, dispatch_uid="resource_sampler_stop"
+        )
+        task_postrun.connect(
+            cleanup_after_task, weak=False, dispatch_uid="resource_gc_policy"
+        )
+        worker_shutting_down.connect(
+            graceful_shutdown, weak=False, dispatch_uid="resource_graceful_shutdown"
+        )
 
-# Singleton instance
-celery_app = create_celery_app()
 
 # Export for use in other modules
 __all__ = [
-    "celery_app",
     "CELERY_CONFIG",
     "RESOURCE_LIMITS",
+    "HEAVY_TASKS",
+    "ResourceAwareCelery",
+    "ResourceAwareTask",
     "RETRY_CONFIG",
     "NLP_CACHE_CONFIG",
 ]
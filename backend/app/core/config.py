@@ -43,12 +43,54 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days (10080 min) - extended for reading app
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # 30 days - allows month-long sessions
     ALGORITHM: str = "HS256"
+    # Кэш аутентифицированного пользователя по jti токена (LRU в процессе + Redis).
+    # Memory TTL - сколько другой воркер может видеть пользователя после деактивации
+    AUTH_PRINCIPAL_CACHE_ENABLED: bool = Field(default=True, env="AUTH_PRINCIPAL_CACHE_ENABLED")
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=300, ge=5, le=3600, env="AUTH_PRINCIPAL_CACHE_TTL_SECONDS")
+    AUTH_PRINCIPAL_MEMORY_TTL_SECONDS: int = Field(default=15, ge=0, le=300, env="AUTH_PRINCIPAL_MEMORY_TTL_SECONDS")
+    AUTH_PRINCIPAL_MEMORY_ENTRIES: int = Field(default=10000, ge=0, le=1000000, env="AUTH_PRINCIPAL_MEMORY_ENTRIES")
+    # Индекс отзыва токенов: Bloom filter в памяти воркера, обновляется через Redis pub/sub
+    TOKEN_REVOCATION_FILTER_CAPACITY: int = Field(default=100000, ge=1000, le=10000000, env="TOKEN_REVOCATION_FILTER_CAPACITY")
+    TOKEN_REVOCATION_FILTER_ERROR_RATE: float = Field(default=0.001, gt=0.0, lt=0.5, env="TOKEN_REVOCATION_FILTER_ERROR_RATE")
+    TOKEN_REVOCATION_FILTER_REBUILD_SECONDS: int = Field(default=3600, ge=60, le=86400, env="TOKEN_REVOCATION_FILTER_REBUILD_SECONDS")
+    # Хеширование паролей (bcrypt) в ограниченном пуле потоков вне event loop
+    # При заполненной очереди login/register отвечают 503 с Retry-After
+    PASSWORD_HASH_POOL_SIZE: int = Field(default=2, ge=1, le=32, env="PASSWORD_HASH_POOL_SIZE")
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=32, ge=0, le=1000, env="PASSWORD_HASH_MAX_QUEUE")
 
     # Файловые загрузки
     MAX_UPLOAD_SIZE: int = 52428800  # 50MB
     UPLOAD_DIRECTORY: str = "./uploads"
+    BOOK_STORAGE_DIRECTORY: str = "/app/storage/books"
+    UPLOAD_CHUNK_SIZE: int = Field(default=1048576, ge=65536, le=16777216, env="UPLOAD_CHUNK_SIZE")  # 1MB
     ALLOWED_EXTENSIONS: list = [".epub", ".fb2"]
 
+    # Хранилище сгенерированных изображений (content-addressed, шардированные директории)
+    GENERATED_IMAGES_DIRECTORY: str = "/app/storage/generated_images"
+    # Файлы моложе этого срока GC не трогает - строка БД может ещё не быть закоммичена
+    IMAGE_GC_GRACE_SECONDS: int = Field(default=3600, ge=60, le=604800, env="IMAGE_GC_GRACE_SECONDS")
+    # Варианты изображений (WebP/AVIF в нескольких ширинах), строит Celery воркер
+    IMAGE_VARIANTS_ENABLED: bool = Field(default=True, env="IMAGE_VARIANTS_ENABLED")
+    IMAGE_VARIANT_WIDTHS: list = [320, 640, 1024]
+    IMAGE_VARIANT_FORMATS: list = ["webp"]  # ["webp", "avif"] - AVIF при поддержке в Pillow
+    IMAGE_VARIANT_QUALITY: int = Field(default=80, ge=30, le=100, env="IMAGE_VARIANT_QUALITY")
+
+    # Book Parsing Engine (CPU-bound EPUB/FB2 parsing вне event loop)
+    # inline - парсинг в процессе API (legacy), process - пул процессов,
+    # celery - файл сохраняется и парсится воркером, upload отвечает 202
+    BOOK_PARSING_MODE: str = Field(default="process", env="BOOK_PARSING_MODE")
+    BOOK_PARSING_POOL_SIZE: int = Field(default=2, ge=1, le=8, env="BOOK_PARSING_POOL_SIZE")
+    BOOK_PARSING_MAX_QUEUE: int = Field(default=8, ge=0, le=100, env="BOOK_PARSING_MAX_QUEUE")
+    BOOK_PARSING_TIMEOUT_SECONDS: int = Field(default=120, ge=10, le=900, env="BOOK_PARSING_TIMEOUT_SECONDS")
+    BOOK_PARSING_MAX_TASKS_PER_CHILD: int = Field(default=20, ge=1, le=1000, env="BOOK_PARSING_MAX_TASKS_PER_CHILD")
+
+    # Write-behind буфер прогресса чтения (обновления сбрасываются в БД пачками)
+    # redis - буфер общий для всех API воркеров, memory - в памяти процесса
+    PROGRESS_BUFFER_ENABLED: bool = Field(default=True, env="PROGRESS_BUFFER_ENABLED")
+    PROGRESS_BUFFER_BACKEND: str = Field(default="redis", env="PROGRESS_BUFFER_BACKEND")
+    PROGRESS_BUFFER_FLUSH_SECONDS: float = Field(default=5.0, ge=0.5, le=300.0, env="PROGRESS_BUFFER_FLUSH_SECONDS")
+    PROGRESS_BUFFER_BATCH_SIZE: int = Field(default=500, ge=1, le=5000, env="PROGRESS_BUFFER_BATCH_SIZE")
+
     # AI сервисы - Google Gemini & Imagen (December 2025)
     GOOGLE_API_KEY: Optional[str] = None  # Primary key for all Google services
     GEMINI_MODEL: str = "gemini-3-flash-preview"  # Dec 2025: gemini-3-flash-preview (not 3.0)
@@ -57,6 +99,26 @@ class Settings(BaseSettings):
     IMAGEN_ASPECT_RATIO: str = "4:3"  # 1:1, 3:4, 4:3, 9:16, 16:9
     IMAGEN_SAFETY_LEVEL: str = "block_low_and_above"  # Only block_low_and_above is supported
     IMAGEN_TIMEOUT_SECONDS: int = 60
+    IMAGEN_REQUESTS_PER_MINUTE: int = Field(default=20, ge=1, le=1000, env="IMAGEN_REQUESTS_PER_MINUTE")  # Квота модели (общий limiter)
+    IMAGEN_BATCH_CONCURRENCY: int = Field(default=4, ge=1, le=16, env="IMAGEN_BATCH_CONCURRENCY")  # Окно параллельной генерации для главы
+
+    # Общий async транспорт к Google GenAI (Gemini + Imagen)
+    LLM_API_BASE_URL: Optional[str] = Field(default=None, env="LLM_API_BASE_URL")  # Локальный stand-in сервер для тестов
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(default=32, ge=1, le=256, env="LLM_HTTP_MAX_CONNECTIONS")
+    LLM_HTTP_MAX_KEEPALIVE: int = Field(default=16, ge=1, le=256, env="LLM_HTTP_MAX_KEEPALIVE")
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = Field(default=60.0, ge=1.0, le=600.0, env="LLM_HTTP_KEEPALIVE_EXPIRY")
+    LLM_MODEL_MAX_CONCURRENCY: int = Field(default=8, ge=1, le=128, env="LLM_MODEL_MAX_CONCURRENCY")
+
+    # Кэш результатов LLM извлечения по SHA-256 чанка (Redis + PostgreSQL)
+    LLM_CACHE_ENABLED: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_REDIS_TTL_SECONDS: int = Field(default=604800, ge=60, le=2592000, env="LLM_CACHE_REDIS_TTL_SECONDS")  # 7 days
+    LLM_CACHE_TTL_DAYS: int = Field(default=90, ge=1, le=365, env="LLM_CACHE_TTL_DAYS")
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=200000, ge=1000, le=10000000, env="LLM_CACHE_MAX_ENTRIES")
+
+    # Кэш переводов промптов PromptTranslator (LRU в процессе + Redis + PostgreSQL)
+    # TTL / лимит записей в PostgreSQL общие с LLM_CACHE_*
+    TRANSLATION_CACHE_MEMORY_ENTRIES: int = Field(default=4096, ge=0, le=1000000, env="TRANSLATION_CACHE_MEMORY_ENTRIES")
+    TRANSLATION_BATCH_SIZE: int = Field(default=10, ge=1, le=50, env="TRANSLATION_BATCH_SIZE")  # Описаний в одном запросе пакетного перевода
 
     # Legacy AI services (optional)
     OPENAI_API_KEY: Optional[str] = None
@@ -92,6 +154,9 @@ class Settings(BaseSettings):
     CELERY_CONCURRENCY: int = Field(default=1, ge=1, le=4, env="CELERY_CONCURRENCY")
     CELERY_MAX_TASKS_PER_CHILD: int = Field(default=100, ge=10, le=500, env="CELERY_MAX_TASKS_PER_CHILD")
     CELERY_MAX_MEMORY_PER_CHILD: int = Field(default=1572864, ge=524288, le=3145728, env="CELERY_MAX_MEMORY_PER_CHILD")  # KB (default: 1.5GB)
+    # Пул БД процесса воркера (свой движок на event loop воркера, см. core/async_runtime.py)
+    CELERY_DB_POOL_SIZE: int = Field(default=5, ge=1, le=50, env="CELERY_DB_POOL_SIZE")
+    CELERY_DB_MAX_OVERFLOW: int = Field(default=5, ge=0, le=100, env="CELERY_DB_MAX_OVERFLOW")
 
     # Лимиты подписок
     FREE_BOOKS_LIMIT: int = 3
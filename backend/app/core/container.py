@@ -233,6 +233,27 @@ def get_book_parser() -> "BookParser":
     return BookParser()
 
 
+@lru_cache()
+def get_book_parsing_engine() -> "BookParsingEngine":
+    """
+    Фабричная функция для получения BookParsingEngine.
+
+    Использует lru_cache для singleton-поведения - один пул процессов
+    на API воркер. Параметры пула берутся из settings.BOOK_PARSING_*.
+
+    Returns:
+        BookParsingEngine: Движок парсинга книг
+    """
+    from ..services.book_parsing_engine import BookParsingEngine
+    return BookParsingEngine(
+        mode=settings.BOOK_PARSING_MODE,
+        pool_size=settings.BOOK_PARSING_POOL_SIZE,
+        max_queue=settings.BOOK_PARSING_MAX_QUEUE,
+        timeout=settings.BOOK_PARSING_TIMEOUT_SECONDS,
+        max_tasks_per_child=settings.BOOK_PARSING_MAX_TASKS_PER_CHILD,
+    )
+
+
 @lru_cache()
 def get_imagen_service() -> "ImagenService":
     """
@@ -293,6 +314,30 @@ def get_book_service() -> "BookService":
     return BookService()
 
 
+@lru_cache()
+def get_book_storage_service() -> "BookStorageService":
+    """
+    Фабричная функция для получения BookStorageService.
+
+    Returns:
+        BookStorageService: Экземпляр сервиса хранения файлов книг
+    """
+    from ..services.book.book_storage_service import BookStorageService
+    return BookStorageService()
+
+
+@lru_cache()
+def get_book_dedup_service() -> "BookDeduplicationService":
+    """
+    Фабричная функция для получения BookDeduplicationService.
+
+    Returns:
+        BookDeduplicationService: Экземпляр сервиса дедупликации книг
+    """
+    from ..services.book.book_dedup_service import book_dedup_service
+    return book_dedup_service
+
+
 @lru_cache()
 def get_book_progress_service() -> "BookProgressService":
     """
@@ -302,7 +347,10 @@ def get_book_progress_service() -> "BookProgressService":
         BookProgressService: Экземпляр сервиса прогресса чтения
     """
     from ..services.book.book_progress_service import BookProgressService
-    return BookProgressService()
+    from ..services.book.progress_buffer import reading_progress_buffer
+    return BookProgressService(
+        progress_buffer=reading_progress_buffer if settings.PROGRESS_BUFFER_ENABLED else None
+    )
 
 
 @lru_cache()
@@ -328,8 +376,9 @@ def get_token_blacklist() -> "TokenBlacklist":
     Returns:
         TokenBlacklist: Экземпляр сервиса черного списка токенов
     """
-    from ..services.token_blacklist import TokenBlacklist
-    return TokenBlacklist()
+    from ..services.token_blacklist import token_blacklist
+    # Общий экземпляр - индекс отзыва (Bloom filter) один на процесс
+    return token_blacklist
 
 
 @lru_cache()
@@ -365,6 +414,16 @@ def get_book_parser_dep() -> "BookParser":
     return get_book_parser()
 
 
+def get_book_parsing_engine_dep() -> "BookParsingEngine":
+    """
+    FastAPI Dependency для BookParsingEngine.
+
+    Returns:
+        BookParsingEngine: Движок парсинга книг
+    """
+    return get_book_parsing_engine()
+
+
 def get_imagen_service_dep() -> "ImagenService":
     """
     FastAPI Dependency для ImagenService.
@@ -405,6 +464,26 @@ def get_book_service_dep() -> "BookService":
     return get_book_service()
 
 
+def get_book_storage_service_dep() -> "BookStorageService":
+    """
+    FastAPI Dependency для BookStorageService.
+
+    Returns:
+        BookStorageService: Экземпляр сервиса хранения файлов книг
+    """
+    return get_book_storage_service()
+
+
+def get_book_dedup_service_dep() -> "BookDeduplicationService":
+    """
+    FastAPI Dependency для BookDeduplicationService.
+
+    Returns:
+        BookDeduplicationService: Экземпляр сервиса дедупликации книг
+    """
+    return get_book_dedup_service()
+
+
 def get_book_progress_service_dep() -> "BookProgressService":
     """
     FastAPI Dependency для BookProgressService.
@@ -513,10 +592,13 @@ class DependencyContainer:
         Полезно для тестов, когда нужно пересоздать singleton-ы.
         """
         get_book_parser.cache_clear()
+        get_book_parsing_engine.cache_clear()
         get_imagen_service.cache_clear()
         get_gemini_extractor.cache_clear()
         get_auth_service.cache_clear()
         get_book_service.cache_clear()
+        get_book_storage_service.cache_clear()
+        get_book_dedup_service.cache_clear()
         get_book_progress_service.cache_clear()
         get_image_generator_service.cache_clear()
         get_token_blacklist.cache_clear()
@@ -539,10 +621,13 @@ def create_test_overrides() -> Dict[Any, Any]:
     """
     return {
         get_book_parser_dep: lambda: DependencyContainer.get(get_book_parser),
+        get_book_parsing_engine_dep: lambda: DependencyContainer.get(get_book_parsing_engine),
         get_imagen_service_dep: lambda: DependencyContainer.get(get_imagen_service),
         get_gemini_extractor_dep: lambda: DependencyContainer.get(get_gemini_extractor),
         get_auth_service_dep: lambda: DependencyContainer.get(get_auth_service),
         get_book_service_dep: lambda: DependencyContainer.get(get_book_service),
+        get_book_storage_service_dep: lambda: DependencyContainer.get(get_book_storage_service),
+        get_book_dedup_service_dep: lambda: DependencyContainer.get(get_book_dedup_service),
         get_book_progress_service_dep: lambda: DependencyContainer.get(get_book_progress_service),
         get_image_generator_service_dep: lambda: DependencyContainer.get(get_image_generator_service),
         get_token_blacklist_dep: lambda: DependencyContainer.get(get_token_blacklist),
@@ -5,7 +5,12 @@
 """
 
 from sqlalchemy import MetaData
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from typing import AsyncGenerator
 import logging
@@ -49,25 +54,40 @@ logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 # - Connection wait time: <10ms (excellent response time)
 # - Connection errors: <0.1% (highly reliable)
 # ============================================================================
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,  # Вывод SQL запросов в debug режиме
-    pool_size=settings.DB_POOL_SIZE,  # Configurable: default 20 (production) or 10 (staging)
-    max_overflow=settings.DB_MAX_OVERFLOW,  # Configurable: default 40 (production) or 10 (staging)
-    pool_pre_ping=True,  # Health check before using connection
-    pool_recycle=settings.DB_POOL_RECYCLE,  # Configurable: default 3600s
-    pool_timeout=settings.DB_POOL_TIMEOUT,  # Configurable: default 30s
-    pool_use_lifo=True,  # LIFO for better connection reuse
-    # PostgreSQL-specific connection settings
-    connect_args={
-        "server_settings": {
-            "application_name": "bookreader_reading_sessions",  # Для мониторинга в pg_stat_activity
-            "statement_timeout": "30000",  # 30 seconds query timeout
+def create_database_engine(
+    pool_size: int = settings.DB_POOL_SIZE,
+    max_overflow: int = settings.DB_MAX_OVERFLOW,
+    application_name: str = "bookreader_reading_sessions",
+) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок с настройками пула выше.
+
+    Соединения asyncpg привязаны к event loop, в котором созданы, поэтому
+    процесс с собственным долгоживущим loop (Celery воркер, см.
+    core/async_runtime.py) создаёт свой движок, а не делит этот.
+    """
+    return create_async_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG,  # Вывод SQL запросов в debug режиме
+        pool_size=pool_size,  # Configurable: default 20 (production) or 10 (staging)
+        max_overflow=max_overflow,  # Configurable: default 40 (production) or 10 (staging)
+        pool_pre_ping=True,  # Health check before using connection
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Configurable: default 3600s
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # Configurable: default 30s
+        pool_use_lifo=True,  # LIFO for better connection reuse
+        # PostgreSQL-specific connection settings
+        connect_args={
+            "server_settings": {
+                "application_name": application_name,  # Для мониторинга в pg_stat_activity
+                "statement_timeout": "30000",  # 30 seconds query timeout
+            },
+            "timeout": 10,  # Connection timeout (10 seconds)
+            "command_timeout": 30,  # Command execution timeout (30 seconds)
         },
-        "timeout": 10,  # Connection timeout (10 seconds)
-        "command_timeout": 30,  # Command execution timeout (30 seconds)
-    },
-)
+    )
+
+
+engine = create_database_engine()
 
 # Создание фабрики асинхронных сессий
 AsyncSessionLocal = async_sessionmaker(
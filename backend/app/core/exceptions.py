@@ -220,6 +220,16 @@ class ReadingSessionInactiveException(HTTPException):
         )
 
 
+class InvalidPaginationCursorException(HTTPException):
+    """Исключение для некорректного курсора пагинации."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
 class InvalidDescriptionTypeException(HTTPException):
     """Исключение для невалидного типа описания."""
 
@@ -270,6 +280,38 @@ class ParsingServiceUnavailableException(HTTPException):
         )
 
 
+class BookParsingBusyException(HTTPException):
+    """Исключение, когда очередь парсинга книг переполнена."""
+
+    def __init__(self, retry_after: int = 30):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many books are being parsed right now, please retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class BookParsingCrashedException(HTTPException):
+    """Исключение, когда процесс-парсер аварийно завершился на файле книги."""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The book parser crashed while processing this file",
+        )
+
+
+class PasswordHashingBusyException(HTTPException):
+    """Исключение, когда очередь хеширования паролей переполнена."""
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in attempts right now, please retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 # ============================================================================
 # Internal Server Error Exceptions (500)
 # ============================================================================
@@ -0,0 +1,255 @@
+"""
+Мониторинг ресурсов процесса Celery воркера.
+
+Раньше task_prerun вызывал psutil.cpu_percent(interval=1) - секунда сна
+перед каждой задачей, включая health_check, - а task_postrun делал
+gc.collect() после каждой задачи.
+
+ResourceSampler:
+- Фоновый поток (один на процесс) раз в interval секунд снимает CPU,
+  память системы и RSS процесса
+- CPU / память сглаживаются экспоненциально, одиночные пики не
+  откладывают задачи
+- snapshot() не блокирует: возвращает последний замер
+
+GCPolicy:
+- Полная сборка мусора только после тяжёлых задач или при заметном росте
+  RSS с прошлой сборки, и не чаще min_interval_seconds
+
+ИСПОЛЬЗОВАНИЕ:
+    snapshot = resource_sampler.snapshot()
+    if snapshot.exceeded_limits(RESOURCE_LIMITS):
+        ...  # отложить тяжёлую задачу
+
+Created: 2026-01-18
+Author: fancai Team
+"""
+
+import gc
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+import psutil
+
+from .logging import logger
+
+_MB = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ResourceSnapshot:
+    """Сглаженные показатели ресурсов на момент последнего замера."""
+
+    cpu_percent: Optional[float]  # None до второго замера (нужен интервал)
+    memory_percent: float
+    available_mb: float
+    process_rss_mb: float
+    sampled_at: float  # time.monotonic()
+
+    def exceeded_limits(self, limits: Dict[str, Any]) -> List[str]:
+        """Список превышенных лимитов (RESOURCE_LIMITS), пустой - всё в норме."""
+        exceeded = []
+        if self.memory_percent > limits["max_memory_percent"]:
+            exceeded.append(f"memory {self.memory_percent:.0f}%")
+        if self.available_mb < limits["min_free_memory_mb"]:
+            exceeded.append(f"free memory {self.available_mb:.0f}MB")
+        if self.cpu_percent is not None and self.cpu_percent > limits["max_cpu_percent"]:
+            exceeded.append(f"cpu {self.cpu_percent:.0f}%")
+        return exceeded
+
+
+class ResourceSampler:
+    """Фоновый сэмплер CPU / памяти процесса воркера."""
+
+    def __init__(self, interval: float = 2.0, smoothing: float = 0.3):
+        """
+        Args:
+            interval: Период замеров (сек)
+            smoothing: Вес нового замера в экспоненциальном сглаживании (0..1]
+        """
+        self.interval = interval
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._process: Optional[psutil.Process] = None
+        self._snapshot: Optional[ResourceSnapshot] = None
+
+        self.stats = {"samples": 0, "errors": 0}
+
+    @property
+    def is_running(self) -> bool:
+        """Поток сэмплера жив в текущем процессе (после fork не наследуется)."""
+        return (
+            self._thread is not None
+            and self._pid == os.getpid()
+            and self._thread.is_alive()
+        )
+
+    def start(self) -> None:
+        """Первый замер и запуск фонового потока (идемпотентно)."""
+        with self._lock:
+            if self.is_running:
+                return
+
+            self._pid = os.getpid()
+            self._process = psutil.Process(self._pid)
+            self._snapshot = None
+            self._stop.clear()
+
+            # Первый вызов cpu_percent(None) только запоминает точку отсчёта
+            psutil.cpu_percent(interval=None)
+            self._sample(first=True)
+
+            self._thread = threading.Thread(
+                target=self._run, name="resource-sampler", daemon=True
+            )
+            self._thread.start()
+
+        logger.debug("Resource sampler started", pid=self._pid, interval=self.interval)
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток."""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(self.interval + 1)
+        self._thread = None
+
+    def snapshot(self) -> ResourceSnapshot:
+        """
+        Последний замер без ожидания.
+
+        Поток запускается при первом обращении, если worker_process_init
+        не сработал (пулы solo / threads).
+        """
+        if not self.is_running:
+            self.start()
+        return self._snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("Resource sampling failed", error=str(e))
+
+    def _smooth(self, previous: Optional[float], current: float) -> float:
+        if previous is None:
+            return current
+        return previous + self.smoothing * (current - previous)
+
+    def _sample(self, first: bool = False) -> None:
+        memory = psutil.virtual_memory()
+        cpu = None if first else psutil.cpu_percent(interval=None)
+        rss_mb = self._process.memory_info().rss / _MB
+
+        previous = self._snapshot
+        self._snapshot = ResourceSnapshot(
+            cpu_percent=(
+                None
+                if cpu is None
+                else self._smooth(previous.cpu_percent if previous else None, cpu)
+            ),
+            memory_percent=self._smooth(
+                previous.memory_percent if previous else None, memory.percent
+            ),
+            available_mb=self._smooth(
+                previous.available_mb if previous else None, memory.available / _MB
+            ),
+            process_rss_mb=rss_mb,
+            sampled_at=time.monotonic(),
+        )
+        self.stats["samples"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика сэмплера и последний замер."""
+        snapshot = self._snapshot
+        return {
+            "running": self.is_running,
+            "interval": self.interval,
+            **self.stats,
+            "cpu_percent": snapshot.cpu_percent if snapshot else None,
+            "memory_percent": snapshot.memory_percent if snapshot else None,
+            "available_mb": snapshot.available_mb if snapshot else None,
+            "process_rss_mb": snapshot.process_rss_mb if snapshot else None,
+        }
+
+
+class GCPolicy:
+    """
+    Когда запускать полную сборку мусора после задачи.
+
+    Короткие задачи почти не создают циклов - их добирает generational GC.
+    Полная сборка нужна после тяжёлых задач (парсинг книги, генерация
+    изображений) и когда RSS процесса вырос с прошлой сборки.
+    """
+
+    def __init__(
+        self,
+        heavy_tasks: Iterable[str] = (),
+        rss_growth_mb: float = 256,
+        min_interval_seconds: float = 60.0,
+    ):
+        """
+        Args:
+            heavy_tasks: Имена задач, после которых сборка желательна
+            rss_growth_mb: Рост RSS с прошлой сборки, после которого нужна сборка
+            min_interval_seconds: Минимальный интервал между сборками
+        """
+        self.heavy_tasks: FrozenSet[str] = frozenset(heavy_tasks)
+        self.rss_growth_mb = rss_growth_mb
+        self.min_interval_seconds = min_interval_seconds
+
+        self._last_collect_at: Optional[float] = None
+        self._baseline_rss_mb: Optional[float] = None
+
+        self.stats = {"collections": 0, "skipped": 0, "collected_objects": 0}
+
+    def should_collect(self, task_name: str, rss_mb: float, now: float) -> Optional[str]:
+        """Причина для полной сборки или None."""
+        if self._baseline_rss_mb is None:
+            self._baseline_rss_mb = rss_mb
+        if (
+            self._last_collect_at is not None
+            and now - self._last_collect_at < self.min_interval_seconds
+        ):
+            return None
+        if task_name in self.heavy_tasks:
+            return "heavy_task"
+        if rss_mb - self._baseline_rss_mb >= self.rss_growth_mb:
+            return "rss_growth"
+        return None
+
+    def after_task(self, task_name: str) -> Optional[str]:
+        """Запускает gc.collect(), если политика считает это нужным."""
+        process = psutil.Process()
+        now = time.monotonic()
+        reason = self.should_collect(task_name, process.memory_info().rss / _MB, now)
+        if reason is None:
+            self.stats["skipped"] += 1
+            return None
+
+        collected = gc.collect()
+        self._last_collect_at = now
+        self._baseline_rss_mb = process.memory_info().rss / _MB
+        self.stats["collections"] += 1
+        self.stats["collected_objects"] += collected
+
+        logger.debug(
+            "Full GC after task",
+            task=task_name,
+            reason=reason,
+            collected=collected,
+            rss_mb=round(self._baseline_rss_mb),
+        )
+        return reason
+
+
+# Глобальный экземпляр (один поток замеров на процесс)
+resource_sampler = ResourceSampler()
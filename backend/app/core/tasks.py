@@ -9,13 +9,16 @@ NLP REMOVAL (December 2025):
 - Задачи обработки книг упрощены
 """
 
-from app.core.celery_app import celery_app
 import asyncio
-from typing import Dict, Any, List, Optional
+import functools
+
+from app.core.celery_app import celery_app
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from datetime import datetime, timezone
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import select, update
 
+from app.core.async_runtime import run_async
 from app.core.database import AsyncSessionLocal
 from app.core.logging import logger
 from app.models.book import Book
@@ -28,13 +31,11 @@ def _run_async_task(coro):
     """
     Helper function to run async functions in Celery tasks.
 
-    Uses asyncio.run() which is the recommended approach in Python 3.10+.
-    This properly handles event loop creation and cleanup.
-
-    Note: Each call creates a new event loop, which is appropriate for
-    Celery tasks where each task should be isolated.
+    In a worker process coroutines run on the worker's persistent event
+    loop (see app.core.async_runtime), so the DB pool and HTTP clients are
+    reused across tasks. Outside a worker it falls back to asyncio.run().
     """
-    return asyncio.run(coro)
+    return run_async(coro)
 
 
 @celery_app.task(name="process_book", bind=True, max_retries=3, default_retry_delay=60)
@@ -77,16 +78,113 @@ def process_book_task(self, book_id_str: str) -> Dict[str, Any]:
         return {"book_id": book_id_str, "status": "failed", "error": str(e)}
 
 
+@celery_app.task(name="parse_uploaded_book", bind=True, max_retries=0)
+def parse_uploaded_book_task(self, book_id_str: str, file_format: str) -> Dict[str, Any]:
+    """
+    Парсинг загруженного файла книги в воркере (BOOK_PARSING_MODE=celery).
+
+    Роутер сохраняет файл, создаёт книгу-заглушку и сразу отвечает 202.
+    Задача парсит файл, заполняет метаданные и главы, затем выполняет
+    обычную обработку (_process_book_async).
+
+    Args:
+        book_id_str: String ID книги (UUID)
+        file_format: Формат файла (epub, fb2)
+
+    Returns:
+        Результат обработки
+    """
+    try:
+        logger.info("Starting uploaded book parsing", book_id=book_id_str, task="parse_uploaded_book")
+        book_id = UUID(book_id_str)
+
+        result = _run_async_task(_parse_uploaded_book_async(book_id, file_format))
+
+        logger.info(
+            "Uploaded book parsing completed",
+            book_id=book_id_str,
+            status=result.get("status"),
+        )
+        return result
+
+    except Exception as e:
+        logger.error(
+            "Error parsing uploaded book",
+            book_id=book_id_str,
+            error=str(e),
+            exc_info=True,
+        )
+        return {"book_id": book_id_str, "status": "failed", "error": str(e)}
+
+
+async def _parse_uploaded_book_async(book_id: UUID, file_format: str) -> Dict[str, Any]:
+    """
+    Асинхронная часть parse_uploaded_book_task.
+
+    Парсинг выполняется синхронно - воркер не обслуживает другие запросы,
+    поэтому блокировка его event loop допустима.
+    """
+    from app.services.book import book_service
+    from app.services.book_parsing_engine import parse_book_file
+    from app.services.book_parser import FB2Parser, ParserConfig, FB2_BACKEND_ITERPARSE
+
+    async with AsyncSessionLocal() as db:
+        book_result = await db.execute(select(Book).where(Book.id == book_id))
+        book = book_result.scalar_one_or_none()
+
+        if not book:
+            logger.error("Book not found", book_id=str(book_id))
+            raise ValueError(f"Book with id {book_id} not found")
+
+        user_id = book.user_id
+        parser_config = ParserConfig()
+        try:
+            if file_format == "fb2" and parser_config.fb2_backend == FB2_BACKEND_ITERPARSE:
+                # FB2 читается потоково: главы пишутся в БД по мере разбора
+                reader = FB2Parser(parser_config).stream(book.file_path)
+                chapters_count = await book_service.populate_book_from_stream(db, book, reader)
+            else:
+                parsed_book = parse_book_file(book.file_path, file_format, parser_config)
+                await book_service.populate_parsed_book(db, book, parsed_book)
+                chapters_count = len(parsed_book.chapters)
+        except Exception as e:
+            # Помечаем книгу как сломанную, чтобы библиотека не ждала её вечно
+            await db.rollback()
+            await db.execute(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(is_processing=False, parsing_error=str(e)[:1000])
+            )
+            await db.commit()
+
+            try:
+                from app.core.cache import cache_manager
+                await cache_manager.delete_pattern(f"user:{user_id}:books:*")
+            except Exception as cache_error:
+                logger.warning("Failed to invalidate cache", error=str(cache_error))
+            raise
+
+        logger.info(
+            "Uploaded book parsed",
+            book_id=str(book_id),
+            title=book.title,
+            chapters_count=chapters_count,
+        )
+
+    return await _process_book_async(book_id)
+
+
 async def _process_book_async(book_id: UUID) -> Dict[str, Any]:
     """
     Асинхронная функция обработки книги.
 
     После загрузки:
     1. Валидирует книгу и главы
-    2. Парсит первые 2 главы с помощью LLM для предзагрузки
+    2. Парсит первые главы с помощью LLM для предзагрузки (пакетными запросами)
     3. Помечает книгу как готовую
     """
     from app.services.langextract_processor import langextract_processor
+    from app.services.book.book_dedup_service import book_dedup_service
     from app.models.description import Description, DescriptionType
 
     async with AsyncSessionLocal() as db:
@@ -125,7 +223,13 @@ async def _process_book_async(book_id: UUID) -> Dict[str, Any]:
         CHAPTERS_TO_PREPARSE = 5
 
         if llm_available and chapters:
+            chapters_to_extract = []
             for chapter in chapters[:CHAPTERS_TO_PREPARSE]:
+                # Главы, скопированные из дубликата книги, уже обработаны
+                if chapter.is_description_parsed:
+                    chapters_parsed += 1
+                    continue
+
                 try:
                     logger.debug(
                         "Parsing chapter",
@@ -173,8 +277,41 @@ async def _process_book_async(book_id: UUID) -> Dict[str, Any]:
                         chapter.parsed_at = datetime.now(timezone.utc)
                         continue
 
-                    # Извлекаем описания через LLM
-                    result = await langextract_processor.extract_descriptions(chapter.content)
+                    # Такой же текст уже обработан - копируем описания без LLM
+                    reused = await book_dedup_service.reuse_chapter_descriptions(db, chapter)
+                    if reused is not None:
+                        chapter.parsed_at = datetime.now(timezone.utc)
+                        total_descriptions += reused
+                        chapters_parsed += 1
+                        book.parsing_progress = int((chapters_parsed / CHAPTERS_TO_PREPARSE) * 100)
+                        continue
+
+                    chapters_to_extract.append(chapter)
+
+                except Exception as e:
+                    logger.error(
+                        "Error parsing chapter",
+                        chapter_number=chapter.chapter_number,
+                        error=str(e),
+                        exc_info=True,
+                    )
+                    # Продолжаем с следующей главой
+                    continue
+
+            # Извлекаем описания через LLM одним пакетом для всех глав:
+            # короткие главы и хвосты чанков разных глав упаковываются
+            # в общие запросы (меньше запросов - быстрее готовность книги)
+            extraction_results = []
+            if chapters_to_extract:
+                try:
+                    extraction_results = await langextract_processor.extract_descriptions_batch(
+                        [chapter.content for chapter in chapters_to_extract]
+                    )
+                except Exception as e:
+                    logger.error("Batched chapter extraction failed", error=str(e), exc_info=True)
+
+            for chapter, result in zip(chapters_to_extract, extraction_results):
+                try:
                     descriptions_data = result.descriptions if result.descriptions else []
 
                     logger.info(
@@ -412,10 +549,16 @@ def cleanup_old_images_task(days_old: int = 30) -> Dict[str, Any]:
 
 
 async def _cleanup_old_images_async(days_old: int) -> Dict[str, Any]:
-    """Асинхронная функция очистки старых изображений."""
+    """
+    Асинхронная функция очистки старых изображений.
+
+    Удаляет старые строки GeneratedImage, затем файлы без ссылок:
+    старые (плоские) файлы - по подсчёту ссылок, content-addressed
+    шарды - сборщиком мусора хранилища.
+    """
     from datetime import timedelta
-    import os
     from app.models.image import GeneratedImage
+    from app.services.generated_image_store import generated_image_store
 
     async with AsyncSessionLocal() as db:
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_old)
@@ -425,14 +568,13 @@ async def _cleanup_old_images_async(days_old: int) -> Dict[str, Any]:
         )
         old_images = old_images_result.scalars().all()
 
-        deleted_files = 0
         deleted_records = 0
+        legacy_paths = set()
 
         for image in old_images:
             try:
-                if image.local_path and os.path.exists(image.local_path):
-                    os.unlink(image.local_path)
-                    deleted_files += 1
+                if image.local_path and not image.content_hash:
+                    legacy_paths.add(image.local_path)
 
                 await db.delete(image)
                 deleted_records += 1
@@ -443,14 +585,153 @@ async def _cleanup_old_images_async(days_old: int) -> Dict[str, Any]:
 
         await db.commit()
 
+        deleted_files = 0
+        for local_path in legacy_paths:
+            if await generated_image_store.release(db, local_path):
+                deleted_files += 1
+
+        gc_stats = await generated_image_store.collect_garbage(db)
+        deleted_files += gc_stats["deleted_files"]
+
         return {
             "status": "completed",
             "deleted_files": deleted_files,
             "deleted_records": deleted_records,
+            "freed_bytes": gc_stats["freed_bytes"],
             "cutoff_date": cutoff_date.isoformat(),
         }
 
 
+@celery_app.task(name="generate_image_variants")
+def generate_image_variants_task(content_hash: str) -> Dict[str, Any]:
+    """
+    Строит WebP/AVIF варианты сгенерированного изображения.
+
+    Кодирование выполняется синхронно в процессе Celery воркера - вне
+    event loop API и задач генерации. Варианты записываются во все строки
+    GeneratedImage с этим content_hash.
+
+    Args:
+        content_hash: SHA-256 оригинала в хранилище изображений
+
+    Returns:
+        Количество вариантов и обновлённых строк
+    """
+    from app.core.config import settings
+    from app.services.generated_image_store import generated_image_store
+    from app.services.image_variants import build_image_variants
+
+    source_path = generated_image_store.path_for_hash(content_hash)
+    if not source_path.exists():
+        logger.warning("Image variants skipped: source missing", content_hash=content_hash)
+        return {"status": "skipped", "content_hash": content_hash}
+
+    try:
+        built = build_image_variants(
+            str(source_path),
+            content_hash,
+            widths=settings.IMAGE_VARIANT_WIDTHS,
+            formats=settings.IMAGE_VARIANT_FORMATS,
+            quality=settings.IMAGE_VARIANT_QUALITY,
+        )
+        updated_rows = _run_async_task(_record_image_variants_async(content_hash, built))
+
+        logger.info(
+            "Image variants generated",
+            content_hash=content_hash,
+            variants=len(built["variants"]),
+            updated_rows=updated_rows,
+        )
+        return {
+            "status": "completed",
+            "content_hash": content_hash,
+            "variants": len(built["variants"]),
+            "updated_rows": updated_rows,
+        }
+
+    except Exception as e:
+        logger.error("Error generating image variants", content_hash=content_hash, error=str(e))
+        return {"status": "failed", "content_hash": content_hash, "error": str(e)}
+
+
+async def _record_image_variants_async(content_hash: str, built: Dict[str, Any]) -> int:
+    """Записывает варианты и размеры оригинала в строки GeneratedImage."""
+    from app.models.image import GeneratedImage
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(GeneratedImage)
+            .where(GeneratedImage.content_hash == content_hash)
+            .values(
+                variants=built["variants"],
+                image_width=built["width"],
+                image_height=built["height"],
+            )
+        )
+        await db.commit()
+        return result.rowcount or 0
+
+
+def enqueue_image_variants(content_hash: Optional[str]) -> None:
+    """
+    Ставит построение вариантов изображения в очередь Celery.
+
+    Ошибка брокера не ломает генерацию - изображение отдаётся оригиналом.
+    """
+    from app.core.config import settings
+
+    if not content_hash or not settings.IMAGE_VARIANTS_ENABLED:
+        return
+
+    try:
+        generate_image_variants_task.delay(content_hash)
+    except Exception as e:
+        logger.warning("Failed to enqueue image variants", content_hash=content_hash, error=str(e))
+
+
+@celery_app.task(name="cleanup_llm_cache")
+def cleanup_llm_cache_task() -> Dict[str, Any]:
+    """
+    Вытеснение записей кэша LLM извлечения и кэша переводов промптов.
+
+    Удаляет записи устаревших версий промпта, записи без обращений
+    дольше LLM_CACHE_TTL_DAYS и самые старые сверх LLM_CACHE_MAX_ENTRIES.
+
+    Returns:
+        Количество удаленных записей по причинам
+    """
+    try:
+        logger.info("Starting LLM extraction cache cleanup")
+
+        result = _run_async_task(_cleanup_llm_cache_async())
+
+        logger.info("LLM extraction cache cleanup completed", **result)
+        return {"status": "completed", **result}
+
+    except Exception as e:
+        logger.error("Error in LLM cache cleanup", error=str(e))
+        return {"status": "failed", "error": str(e)}
+
+
+async def _cleanup_llm_cache_async() -> Dict[str, Any]:
+    """Асинхронная очистка кэша LLM извлечения и кэша переводов."""
+    from app.services.gemini_extractor import GeminiDirectExtractor
+    from app.services.imagen_generator import PromptTranslator
+    from app.services.llm_extraction_cache import (
+        compute_prompt_version,
+        llm_extraction_cache,
+    )
+    from app.services.translation_cache import translation_cache
+
+    result: Dict[str, Any] = await llm_extraction_cache.cleanup(
+        current_prompt_version=compute_prompt_version(GeminiDirectExtractor.EXTRACTION_PROMPT)
+    )
+    result["translations"] = await translation_cache.cleanup(
+        current_prompt_version=PromptTranslator.prompt_version()
+    )
+    return result
+
+
 @celery_app.task(
     name="generate_image_task",
     bind=True,
@@ -615,6 +896,7 @@ async def _generate_image_async(
                 status="completed",
                 image_url=http_url,
                 local_path=generation_result.local_path,
+                content_hash=generation_result.content_hash,
                 prompt_used=generation_result.prompt_used or custom_style or "default",
                 generation_time_seconds=generation_result.generation_time_seconds,
             )
@@ -622,6 +904,7 @@ async def _generate_image_async(
             db.add(generated_image)
             await db.commit()
             await db.refresh(generated_image)
+            enqueue_image_variants(generation_result.content_hash)
 
             logger.info(
                 "Image saved to DB",
@@ -699,8 +982,9 @@ def generate_image_batch_task(
     """
     Celery task for batch image generation for a chapter.
 
-    Processes multiple descriptions and generates images for each.
-    Uses Redis for persistence and supports retries.
+    Generates images concurrently (ImageBatchGenerator), saves each image
+    as soon as it is ready and reports per-item progress via the PROGRESS
+    task state. Uses Redis for persistence and supports retries.
 
     Args:
         chapter_id_str: String ID of the chapter (UUID)
@@ -720,6 +1004,18 @@ def generate_image_batch_task(
         descriptions_count=len(descriptions),
     )
 
+    async def report_progress(meta: Dict[str, Any]) -> None:
+        # Частичные результаты доступны через GET /images/task/{task_id}.
+        # Вызывается в потоке loop воркера, где self.request (thread-local)
+        # пуст - task_id передаётся явно; запись в Redis - вне loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.update_state, task_id=task_id, state="PROGRESS", meta=meta
+            ),
+        )
+
     try:
         result = _run_async_task(
             _generate_batch_async(
@@ -728,6 +1024,7 @@ def generate_image_batch_task(
                 user_id_str=user_id_str,
                 descriptions=descriptions[:max_images],
                 book_genre=book_genre,
+                on_progress=report_progress,
             )
         )
 
@@ -765,17 +1062,22 @@ async def _generate_batch_async(
     user_id_str: str,
     descriptions: List[Dict[str, Any]],
     book_genre: Optional[str] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
 ) -> Dict[str, Any]:
     """
     Async function for batch image generation within Celery task.
+
+    Each generated image is committed right away, so partial results are
+    visible before the whole batch finishes. Descriptions that already have
+    a completed GeneratedImage of this user (e.g. saved by the attempt a
+    Celery retry replaces) are not generated again.
     """
     from app.services.imagen_generator import get_imagen_service
+    from app.services.image_batch_generator import ImageBatchGenerator
     from app.models.image import GeneratedImage
     import os
-    import asyncio
 
     async with AsyncSessionLocal() as db:
-        chapter_id = UUID(chapter_id_str)
         user_id = UUID(user_id_str)
 
         imagen_service = get_imagen_service()
@@ -789,92 +1091,159 @@ async def _generate_batch_async(
                 "status": "service_unavailable",
             }
 
-        results = []
-        successful = 0
-        failed = 0
+        results: List[Optional[Dict[str, Any]]] = [None] * len(descriptions)
+        progress = {
+            "task_id": task_id,
+            "chapter_id": chapter_id_str,
+            "total": len(descriptions),
+            "completed": 0,
+            "successful": 0,
+            "failed": 0,
+        }
+
+        # Retry после частичного успеха: уже сохранённые изображения
+        # не генерируются повторно (нет дублей и лишнего расхода квоты)
+        existing_images = await _find_generated_images(db, user_id, descriptions)
+        pending = []
+        for index, desc_data in enumerate(descriptions):
+            existing = existing_images.get(desc_data.get("id"))
+            if existing is None:
+                pending.append((index, desc_data))
+                continue
+            results[index] = {
+                "description_id": desc_data["id"],
+                "description_type": desc_data.get("type", "location"),
+                "image_id": str(existing.id),
+                "image_url": existing.image_url,
+                "generation_time": existing.generation_time_seconds,
+                "success": True,
+                "reused": True,
+            }
+            progress["successful"] += 1
+            progress["completed"] += 1
+
+        if existing_images:
+            logger.info(
+                "Batch reuses images saved by a previous attempt",
+                task_id=task_id,
+                reused=len(existing_images),
+                pending=len(pending),
+            )
+
+        # Все описания пакета переводятся заранее несколькими запросами
+        translations = {}
+        if pending:
+            translations = await imagen_service.translate_descriptions(
+                [desc_data["content"] for _, desc_data in pending]
+            )
+
+        async def generate(item):
+            _, desc_data = item
+            return await imagen_service.generate_image(
+                description=desc_data["content"],
+                description_type=desc_data.get("type", "location"),
+                genre=book_genre,
+                english_description=translations.get(desc_data["content"]),
+            )
 
-        for desc_data in descriptions:
+        async def save_result(_position: int, item, generation_result) -> None:
+            index, desc_data = item
+            description_id_str = desc_data.get("id", "unknown")
             try:
-                description_id = UUID(desc_data["id"])
-                description_content = desc_data["content"]
-                description_type = desc_data.get("type", "location")
+                if not generation_result.success:
+                    raise RuntimeError(generation_result.error_message)
 
-                # Generate image
-                generation_result = await imagen_service.generate_image(
-                    description=description_content,
-                    description_type=description_type,
-                    genre=book_genre,
+                # Create HTTP URL from local_path
+                filename = (
+                    os.path.basename(generation_result.local_path)
+                    if generation_result.local_path else None
                 )
+                http_url = f"/api/v1/images/file/{filename}" if filename else None
 
-                if generation_result.success:
-                    # Create HTTP URL from local_path
-                    filename = (
-                        os.path.basename(generation_result.local_path)
-                        if generation_result.local_path else None
-                    )
-                    http_url = f"/api/v1/images/file/{filename}" if filename else None
-
-                    # Save to database
-                    generated_image = GeneratedImage(
-                        description_id=description_id,
-                        user_id=user_id,
-                        service_used="imagen",
-                        status="completed",
-                        image_url=http_url,
-                        local_path=generation_result.local_path,
-                        prompt_used=generation_result.prompt_used or "default",
-                        generation_time_seconds=generation_result.generation_time_seconds,
-                    )
-
-                    db.add(generated_image)
-
-                    results.append({
-                        "description_id": str(description_id),
-                        "description_type": description_type,
-                        "image_url": http_url or generation_result.image_url,
-                        "generation_time": generation_result.generation_time_seconds,
-                        "success": True,
-                    })
-                    successful += 1
-                else:
-                    results.append({
-                        "description_id": str(description_id),
-                        "error": generation_result.error_message,
-                        "success": False,
-                    })
-                    failed += 1
-
-                # Small delay between requests to avoid rate limiting
-                await asyncio.sleep(2)
+                generated_image = GeneratedImage(
+                    description_id=UUID(description_id_str),
+                    user_id=user_id,
+                    service_used="imagen",
+                    status="completed",
+                    image_url=http_url,
+                    local_path=generation_result.local_path,
+                    content_hash=generation_result.content_hash,
+                    prompt_used=generation_result.prompt_used or "default",
+                    generation_time_seconds=generation_result.generation_time_seconds,
+                )
+                db.add(generated_image)
+                await db.commit()
+                enqueue_image_variants(generation_result.content_hash)
 
+                results[index] = {
+                    "description_id": description_id_str,
+                    "description_type": desc_data.get("type", "location"),
+                    "image_id": str(generated_image.id),
+                    "image_url": http_url or generation_result.image_url,
+                    "generation_time": generation_result.generation_time_seconds,
+                    "success": True,
+                }
+                progress["successful"] += 1
             except Exception as e:
+                await db.rollback()
                 logger.error(
                     "Error generating for description",
-                    description_id=desc_data.get("id", "unknown"),
+                    description_id=description_id_str,
                     error=str(e),
                 )
-                results.append({
-                    "description_id": desc_data.get("id", "unknown"),
+                results[index] = {
+                    "description_id": description_id_str,
                     "error": str(e),
                     "success": False,
-                })
-                failed += 1
+                }
+                progress["failed"] += 1
 
-        # Commit all successful generations
-        await db.commit()
+            progress["completed"] += 1
+            if on_progress is not None:
+                await on_progress({**progress, "results": [r for r in results if r]})
+
+        await ImageBatchGenerator().run(pending, generate, on_result=save_result)
 
         return {
             "task_id": task_id,
             "chapter_id": chapter_id_str,
             "total": len(descriptions),
-            "successful": successful,
-            "failed": failed,
+            "successful": progress["successful"],
+            "failed": progress["failed"],
             "results": results,
-            "success": successful > 0,
+            "success": progress["successful"] > 0,
             "status": "completed",
         }
 
 
+async def _find_generated_images(
+    db, user_id: UUID, descriptions: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Completed GeneratedImage of the user by description id (str)."""
+    from app.models.image import GeneratedImage
+
+    description_ids = []
+    for desc_data in descriptions:
+        try:
+            description_ids.append(UUID(str(desc_data.get("id"))))
+        except ValueError:
+            continue
+    if not description_ids:
+        return {}
+
+    rows = await db.execute(
+        select(GeneratedImage)
+        .where(
+            GeneratedImage.description_id.in_(description_ids),
+            GeneratedImage.user_id == user_id,
+            GeneratedImage.status == "completed",
+        )
+        .order_by(GeneratedImage.created_at)
+    )
+    # Для описания с несколькими изображениями берём последнее
+    return {str(image.description_id): image for image in rows.scalars().all()}
+
+
 @celery_app.task(name="health_check")
 def health_check_task() -> str:
     """Проверка работоспособности Celery worker."""
@@ -31,9 +31,14 @@ from .routers.admin import admin_router
 from .routers.books import books_router
 from .core.config import settings
 from .core.cache import cache_manager
+from .core.container import get_book_parsing_engine
 from .core.secrets import startup_secrets_check
 from .core.logging import logger
 from .services.settings_manager import settings_manager
+from .services.llm_transport import close_llm_transports
+from .services.book.progress_buffer import reading_progress_buffer
+from .services.token_blacklist import token_blacklist
+from .services.password_hasher import password_hasher
 from .middleware.security_headers import SecurityHeadersMiddleware
 from .middleware.cache_control import CacheControlMiddleware
 from .middleware.rate_limit import rate_limiter, rate_limit
@@ -96,6 +101,16 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("Failed to initialize Redis cache", error=str(e))
 
+    # Индекс отзыва токенов (Bloom filter + Redis pub/sub)
+    try:
+        await token_blacklist.start()
+    except Exception as e:
+        logger.warning("Failed to start token revocation index", error=str(e))
+
+    # Фоновый сброс write-behind буфера прогресса чтения
+    if settings.PROGRESS_BUFFER_ENABLED:
+        reading_progress_buffer.start()
+
     # Инициализация настроек по умолчанию
     try:
         await settings_manager.initialize_default_settings()
@@ -120,6 +135,38 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("Error closing rate limiter", error=str(e))
 
+    # Останавливаем пул процессов парсинга книг
+    try:
+        get_book_parsing_engine().shutdown()
+    except Exception as e:
+        logger.warning("Error stopping book parsing pool", error=str(e))
+
+    # Останавливаем пул хеширования паролей
+    try:
+        password_hasher.shutdown()
+    except Exception as e:
+        logger.warning("Error stopping password hashing pool", error=str(e))
+
+    # Закрываем пулы HTTP соединений к Google GenAI
+    try:
+        await close_llm_transports()
+    except Exception as e:
+        logger.warning("Error closing LLM transport", error=str(e))
+
+    # Сбрасываем остаток буфера прогресса чтения (до закрытия Redis кэша)
+    if settings.PROGRESS_BUFFER_ENABLED:
+        try:
+            await reading_progress_buffer.stop()
+            logger.info("Reading progress buffer flushed")
+        except Exception as e:
+            logger.warning("Error flushing reading progress buffer", error=str(e))
+
+    # Останавливаем индекс отзыва токенов
+    try:
+        await token_blacklist.stop()
+    except Exception as e:
+        logger.warning("Error stopping token revocation index", error=str(e))
+
     # Закрываем Redis connection pool
     try:
         await cache_manager.close()
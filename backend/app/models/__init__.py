@@ -13,6 +13,8 @@ from .reading_session import ReadingSession
 from .reading_goal import ReadingGoal, GoalType, GoalPeriod
 from .feature_flag import FeatureFlag, FeatureFlagCategory
 from .push_subscription import PushSubscription
+from .llm_cache import LLMExtractionCacheEntry
+from .translation_cache import PromptTranslationCacheEntry
 
 __all__ = [
     "User",
@@ -30,4 +32,6 @@ __all__ = [
     "FeatureFlag",
     "FeatureFlagCategory",
     "PushSubscription",
+    "LLMExtractionCacheEntry",
+    "PromptTranslationCacheEntry",
 ]
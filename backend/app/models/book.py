@@ -13,7 +13,9 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     Float,
+    Index,
     select,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
@@ -64,11 +66,13 @@ class Book(Base):
         file_path: Путь к файлу книги на сервере
         file_format: Формат файла (EPUB, FB2)
         file_size: Размер файла в байтах
+        content_hash: SHA-256 файла книги (для дедупликации загрузок)
         cover_image: Путь к обложке книги
         description: Описание/аннотация книги
         metadata: Дополнительные метаданные из файла
         total_pages: Общее количество страниц (расчетное)
         estimated_reading_time: Расчетное время чтения в минутах
+        total_chapters: Количество глав (денормализовано для списка библиотеки)
         is_parsed: Флаг завершения парсинга содержимого
         parsing_progress: Прогресс парсинга (0-100)
     """
@@ -90,6 +94,8 @@ class Book(Base):
     file_path = Column(String(1000), nullable=False)
     file_format = Column(String(10), nullable=False)  # epub, fb2
     file_size = Column(Integer, nullable=False)  # размер в байтах
+    # SHA-256 исходного файла - дедупликация одинаковых загрузок
+    content_hash = Column(String(64), nullable=True, index=True)
 
     # Контент
     cover_image = Column(String(1000), nullable=True)
@@ -101,6 +107,8 @@ class Book(Base):
     # Статистика
     total_pages = Column(Integer, default=0, nullable=False)
     estimated_reading_time = Column(Integer, default=0, nullable=False)  # минуты
+    # Заполняется при вставке глав - список библиотеки не загружает главы
+    total_chapters = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Статус обработки
     is_parsed = Column(Boolean, default=False, nullable=False)
@@ -133,6 +141,19 @@ class Book(Base):
         "ReadingSession", back_populates="book", cascade="all, delete-orphan", lazy="raise"
     )
 
+    __table_args__ = (
+        # Keyset пагинация списка библиотеки (BookProgressService.get_library_page)
+        Index("idx_books_user_created", "user_id", "created_at", "id"),
+        Index("idx_books_user_title", "user_id", "title", "id"),
+        Index("idx_books_user_author", "user_id", text("coalesce(author, '')"), "id"),
+        Index(
+            "idx_books_user_accessed",
+            "user_id",
+            text("coalesce(last_accessed, created_at)"),
+            "id",
+        ),
+    )
+
     def __repr__(self):
         return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
 
@@ -279,11 +300,17 @@ class ReadingProgress(Base):
         current_chapter: Номер текущей главы
         current_page: Номер текущей страницы
         current_position: Позиция в главе (для точного позиционирования)
+        progress_percent: Общий прогресс по книге 0-100 (пересчитывается при обновлении)
         reading_time_minutes: Время чтения в минутах
         reading_speed_wpm: Скорость чтения (слов в минуту)
     """
 
     __tablename__ = "reading_progress"
+    __table_args__ = (
+        # Одна запись прогресса на пару (user, book) - цель ON CONFLICT
+        # многострочного upsert при сбросе буфера прогресса (progress_buffer.py)
+        Index("idx_reading_progress_user_book", "user_id", "book_id", unique=True),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     user_id = Column(
@@ -303,6 +330,8 @@ class ReadingProgress(Base):
     scroll_offset_percent = Column(
         Float, default=0.0, nullable=False
     )  # Точный % скролла внутри страницы (0-100)
+    # Общий прогресс по книге - список библиотеки читает его без пересчёта
+    progress_percent = Column(Float, default=0.0, server_default="0", nullable=False)
 
     # Статистика чтения
     reading_time_minutes = Column(Integer, default=0, nullable=False)
@@ -24,6 +24,7 @@ class Chapter(Base):
         title: Название главы
         content: Текстовое содержимое главы
         html_content: HTML содержимое (если есть форматирование)
+        content_hash: SHA-256 текста главы (для дедупликации описаний)
         word_count: Количество слов в главе
         estimated_reading_time: Расчетное время чтения в минутах
         is_description_parsed: Флаг завершения парсинга описаний
@@ -44,6 +45,8 @@ class Chapter(Base):
     # Контент
     content = Column(Text, nullable=False)  # Чистый текст
     html_content = Column(Text, nullable=True)  # HTML с форматированием
+    # SHA-256 текста главы - переиспользование извлечённых описаний
+    content_hash = Column(String(64), nullable=True, index=True)
 
     # Статистика
     word_count = Column(Integer, default=0, nullable=False)
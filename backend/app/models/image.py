@@ -54,6 +54,8 @@ class GeneratedImage(Base):
         status: Статус генерации
         image_url: URL сгенерированного изображения
         local_path: Локальный путь к файлу изображения
+        content_hash: SHA-256 файла изображения (content-addressed хранилище)
+        variants: Варианты файла (WebP/AVIF в нескольких ширинах)
         prompt_used: Промпт, отправленный в AI сервис
         generation_parameters: Параметры генерации (размер, стиль, etc.)
         generation_time_seconds: Время генерации в секундах
@@ -93,6 +95,8 @@ class GeneratedImage(Base):
     # Результат генерации
     image_url = Column(String(2000), nullable=True)  # URL от сервиса
     local_path = Column(String(1000), nullable=True)  # Локальный путь
+    # SHA-256 файла - один файл на диске делят строки с одинаковым содержимым
+    content_hash = Column(String(64), nullable=True, index=True)
     prompt_used = Column(Text, nullable=False)  # Использованный промпт
 
     # Параметры генерации
@@ -106,6 +110,9 @@ class GeneratedImage(Base):
     image_width = Column(Integer, nullable=True)
     image_height = Column(Integer, nullable=True)
     file_format = Column(String(10), nullable=True)  # jpg, png, webp
+    # [{"format": "webp", "width": 640, "height": 480, "size": 51234,
+    #   "filename": "<sha256>.w640.webp"}, ...] - пишет generate_image_variants
+    variants = Column(JSONB, nullable=True)
 
     # Качество и модерация
     quality_score = Column(Float, nullable=True)  # 0.0-1.0
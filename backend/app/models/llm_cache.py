@@ -0,0 +1,63 @@
+"""
+Модель кэша результатов LLM извлечения описаний.
+
+Ключ - (SHA-256 текста чанка, версия промпта, модель). Повторная загрузка
+той же книги, retry после таймаута или extract_new для неизменённой главы
+получают описания из кэша вместо повторного запроса к Gemini.
+"""
+
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    DateTime,
+    Index,
+    PrimaryKeyConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from ..core.database import Base
+
+
+class LLMExtractionCacheEntry(Base):
+    """
+    Закэшированный ответ LLM для одного чанка текста.
+
+    Attributes:
+        chunk_hash: SHA-256 текста чанка (hex)
+        prompt_version: Хэш шаблона EXTRACTION_PROMPT (смена промпта = промах)
+        model: ID модели (gemini-3-flash-preview, ...)
+        response: Распарсенный JSON ответа ({"descriptions": [...]})
+        hit_count: Сколько раз запись была переиспользована
+        created_at: Когда ответ был получен от LLM
+        last_accessed_at: Последнее обращение (для LRU вытеснения)
+    """
+
+    __tablename__ = "llm_extraction_cache"
+
+    chunk_hash = Column(String(64), nullable=False)
+    prompt_version = Column(String(16), nullable=False)
+    model = Column(String(100), nullable=False)
+
+    response = Column(JSONB, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_accessed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("chunk_hash", "prompt_version", "model"),
+        # LRU / TTL очистка идёт по времени последнего обращения
+        Index("idx_llm_extraction_cache_last_accessed", "last_accessed_at"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<LLMExtractionCacheEntry(chunk_hash={self.chunk_hash[:12]}..., "
+            f"prompt_version={self.prompt_version}, model={self.model})>"
+        )
@@ -0,0 +1,63 @@
+"""
+Модель кэша переводов промптов (русское описание -> английский промпт Imagen).
+
+Ключ - (SHA-256 исходного текста, версия промпта, модель). Одно и то же
+описание переводится через Gemini один раз для всех API и Celery процессов,
+а не заново в каждом воркере после рестарта.
+"""
+
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    Text,
+    DateTime,
+    Index,
+    PrimaryKeyConstraint,
+)
+from sqlalchemy.sql import func
+
+from ..core.database import Base
+
+
+class PromptTranslationCacheEntry(Base):
+    """
+    Закэшированный перевод одного описания.
+
+    Attributes:
+        text_hash: SHA-256 исходного русского текста (hex)
+        prompt_version: Хэш шаблона TRANSLATION_PROMPT (смена промпта = промах)
+        model: ID модели перевода
+        translation: Английский перевод для промпта Imagen
+        hit_count: Сколько раз перевод был переиспользован
+        created_at: Когда перевод был получен от LLM
+        last_accessed_at: Последнее обращение (для LRU вытеснения)
+    """
+
+    __tablename__ = "prompt_translation_cache"
+
+    text_hash = Column(String(64), nullable=False)
+    prompt_version = Column(String(16), nullable=False)
+    model = Column(String(100), nullable=False)
+
+    translation = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    last_accessed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        PrimaryKeyConstraint("text_hash", "prompt_version", "model"),
+        # LRU / TTL очистка идёт по времени последнего обращения
+        Index("idx_prompt_translation_cache_last_accessed", "last_accessed_at"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<PromptTranslationCacheEntry(text_hash={self.text_hash[:12]}..., "
+            f"prompt_version={self.prompt_version}, model={self.model})>"
+        )
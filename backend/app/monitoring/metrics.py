@@ -3,8 +3,13 @@ Prometheus metrics для мониторинга Reading Sessions в fancai.
 
 Метрики:
 - Counters: sessions_started_total, sessions_ended_total, session_errors_total
+- Counters: content_dedup_lookups_total (book/chapter content-hash reuse)
+- Counters: llm_cache_lookups_total (LLM extraction cache by chunk hash),
+  translation_cache_lookups_total (PromptTranslator cache by text hash)
+- Counters: password_hash_rejected_total (bcrypt pool queue full)
 - Histograms: session_duration_seconds, session_pages_read
-- Gauges: active_sessions_count, abandoned_sessions_count
+- Histograms: password_hash_duration_seconds, password_hash_queue_wait_seconds
+- Gauges: active_sessions_count, abandoned_sessions_count, password_hash_in_flight
 
 Integration:
 - Используется в routers/reading_sessions.py
@@ -45,6 +50,36 @@ session_errors_total = Counter(
     ["operation", "error_type"],
 )
 
+content_dedup_lookups_total = Counter(
+    "content_dedup_lookups_total",
+    "Content-hash deduplication lookups (hit rate = hit / all)",
+    ["kind", "result"],
+)
+
+llm_cache_lookups_total = Counter(
+    "llm_cache_lookups_total",
+    "LLM extraction cache lookups by chunk content hash",
+    ["result"],
+)
+
+translation_cache_lookups_total = Counter(
+    "translation_cache_lookups_total",
+    "Prompt translation cache lookups by source text hash",
+    ["result"],
+)
+
+auth_principal_cache_lookups_total = Counter(
+    "auth_principal_cache_lookups_total",
+    "Authenticated principal cache lookups by access token jti",
+    ["result"],
+)
+
+password_hash_rejected_total = Counter(
+    "password_hash_rejected_total",
+    "bcrypt operations rejected because the hashing queue was full",
+    ["operation"],
+)
+
 
 # ============================================================================
 # Histograms - распределение значений
@@ -79,6 +114,20 @@ session_api_latency_seconds = Histogram(
     labelnames=["endpoint", "method", "status_code"],
 )
 
+password_hash_duration_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify time in the hashing pool",
+    buckets=[0.05, 0.1, 0.15, 0.2, 0.25, 0.35, 0.5, 1.0],
+    labelnames=["operation"],
+)
+
+password_hash_queue_wait_seconds = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a bcrypt operation waited for a free hashing thread",
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+    labelnames=["operation"],
+)
+
 
 # ============================================================================
 # Gauges - значения, которые могут расти и падать
@@ -99,6 +148,11 @@ concurrent_users_count = Gauge(
     "reading_sessions_concurrent_users", "Number of unique users with active sessions"
 )
 
+password_hash_in_flight = Gauge(
+    "password_hash_in_flight",
+    "bcrypt operations running or queued in the hashing pool",
+)
+
 
 # ============================================================================
 # Info - метаинформация (не изменяется часто)
@@ -297,6 +351,71 @@ def update_concurrent_users_gauge(count: int):
     concurrent_users_count.set(count)
 
 
+def record_dedup_lookup(kind: str, hit: bool):
+    """
+    Записать результат поиска дубликата по content hash.
+
+    Args:
+        kind: Что искали (book, chapter)
+        hit: True если найден переиспользуемый результат
+    """
+    content_dedup_lookups_total.labels(kind=kind, result="hit" if hit else "miss").inc()
+
+
+def record_llm_cache_lookup(result: str):
+    """
+    Записать результат поиска в кэше LLM извлечения.
+
+    Args:
+        result: redis_hit, db_hit или miss
+    """
+    llm_cache_lookups_total.labels(result=result).inc()
+
+
+def record_translation_cache_lookup(result: str, count: int = 1):
+    """
+    Записать результаты поиска в кэше переводов промптов.
+
+    Args:
+        result: memory_hit, redis_hit, db_hit или miss
+        count: Количество поисков с этим результатом (пакетный lookup)
+    """
+    translation_cache_lookups_total.labels(result=result).inc(count)
+
+
+def record_auth_principal_lookup(result: str):
+    """
+    Записать результат поиска пользователя в кэше аутентификации.
+
+    Args:
+        result: memory_hit, redis_hit или miss
+    """
+    auth_principal_cache_lookups_total.labels(result=result).inc()
+
+
+def record_password_hash(operation: str, queue_wait: float, duration: float):
+    """
+    Записать выполненную bcrypt операцию.
+
+    Args:
+        operation: hash или verify
+        queue_wait: Ожидание свободного потока пула (секунды)
+        duration: Время самой bcrypt операции (секунды)
+    """
+    password_hash_queue_wait_seconds.labels(operation=operation).observe(queue_wait)
+    password_hash_duration_seconds.labels(operation=operation).observe(duration)
+
+
+def record_password_hash_rejected(operation: str):
+    """
+    Записать bcrypt операцию, отклонённую из-за заполненной очереди.
+
+    Args:
+        operation: hash или verify
+    """
+    password_hash_rejected_total.labels(operation=operation).inc()
+
+
 # ============================================================================
 # Export all metrics for /metrics endpoint
 # ============================================================================
@@ -306,6 +425,13 @@ __all__ = [
     "sessions_ended_total",
     "sessions_updated_total",
     "session_errors_total",
+    "content_dedup_lookups_total",
+    "llm_cache_lookups_total",
+    "auth_principal_cache_lookups_total",
+    "password_hash_rejected_total",
+    "password_hash_duration_seconds",
+    "password_hash_queue_wait_seconds",
+    "password_hash_in_flight",
     "session_duration_seconds",
     "session_pages_read",
     "session_progress_delta",
@@ -322,4 +448,10 @@ __all__ = [
     "update_active_sessions_gauge",
     "update_abandoned_sessions_gauge",
     "update_concurrent_users_gauge",
+    "record_dedup_lookup",
+    "record_llm_cache_lookup",
+    "record_translation_cache_lookup",
+    "record_auth_principal_lookup",
+    "record_password_hash",
+    "record_password_hash_rejected",
 ]
@@ -10,11 +10,15 @@ from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from uuid import UUID
 
 from ..core.database import get_database_session
 from ..core.auth import get_current_active_user, security
 from ..services.auth_service import AuthService
 from ..services.token_blacklist import TokenBlacklist
+from ..services.principal_cache import principal_cache
+from ..services.password_hasher import PasswordHasherBusyError
+from ..core.exceptions import PasswordHashingBusyException
 from ..core.container import get_auth_service_dep, get_token_blacklist_dep
 from ..models.user import User
 from ..middleware.rate_limit import rate_limit, RATE_LIMIT_PRESETS
@@ -135,6 +139,8 @@ async def register_user(
 
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PasswordHasherBusyError:
+        raise PasswordHashingBusyException()
 
 
 @router.post("/auth/login", response_model=LoginResponse)
@@ -160,9 +166,12 @@ async def login_user(
         HTTPException: Если неверные учетные данные
     """
     # Аутентифицируем пользователя (используем DI)
-    user = await auth_svc.authenticate_user(
-        db=db, email=user_request.email, password=user_request.password
-    )
+    try:
+        user = await auth_svc.authenticate_user(
+            db=db, email=user_request.email, password=user_request.password
+        )
+    except PasswordHasherBusyError:
+        raise PasswordHashingBusyException()
 
     if not user:
         raise HTTPException(
@@ -308,13 +317,16 @@ async def update_user_profile(
         )
 
     # Обновляем профиль (используем DI)
-    success = await auth_svc.update_user_profile(
-        db=db,
-        user_id=current_user.id,
-        full_name=request.full_name,
-        current_password=request.current_password,
-        new_password=request.new_password,
-    )
+    try:
+        success = await auth_svc.update_user_profile(
+            db=db,
+            user_id=current_user.id,
+            full_name=request.full_name,
+            current_password=request.current_password,
+            new_password=request.new_password,
+        )
+    except PasswordHasherBusyError:
+        raise PasswordHashingBusyException()
 
     if not success:
         raise HTTPException(
@@ -365,7 +377,17 @@ async def logout_user(
         if exp_timestamp:
             expires_at = datetime.fromtimestamp(exp_timestamp, tz=timezone.utc)
             # Add token to blacklist (используем DI)
-            await token_bl.add(token, expires_at)
+            await token_bl.add(token, expires_at, payload)
+
+        # Удаляем закэшированного пользователя этого токена
+        try:
+            user_id = UUID(payload["sub"])
+        except ValueError:
+            user_id = None
+        if user_id is not None:
+            await principal_cache.invalidate_token(
+                user_id, principal_cache.token_key(token, payload)
+            )
 
     return LogoutResponse()
 
@@ -9,17 +9,13 @@ Core CRUD operations для работы с книгами.
 - Получение обложек книг
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Response, status
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-import tempfile
 import os
 from pathlib import Path
-import shutil
-from uuid import uuid4
-
-import aiofiles
+from typing import Optional
 
 from ...core.database import get_database_session
 from ...core.auth import get_current_active_user
@@ -32,24 +28,42 @@ from ...core.exceptions import (
     NoFilenameProvidedException,
     FileReadException,
     BookProcessingException,
+    BookParsingBusyException,
+    BookParsingCrashedException,
     BookListFetchException,
     BookFetchException,
     BookFileNotFoundException,
     BookRetrievalException,
     CoverImageNotFoundException,
     CoverFetchException,
+    InvalidPaginationCursorException,
 )
 from ...services.book_parser import BookParser
+from ...services.book_parsing_engine import (
+    BookParsingEngine,
+    ParsingEngineBusyError,
+    ParsingEngineCrashedError,
+    PARSING_MODE_CELERY,
+)
 from ...services.book import BookService
-from ...services.book.book_progress_service import BookProgressService
+from ...services.book.book_storage_service import (
+    BookStorageService,
+    StoredBookFile,
+    UploadTooLargeError,
+)
+from ...services.book.book_dedup_service import BookDeduplicationService
+from ...services.book.book_progress_service import BookProgressService, InvalidCursorError
 from ...core.container import (
     get_book_parser_dep,
+    get_book_parsing_engine_dep,
     get_book_service_dep,
     get_book_progress_service_dep,
+    get_book_storage_service_dep,
+    get_book_dedup_service_dep,
 )
 from ...models.book import Book
 from ...models.user import User
-from ...core.tasks import process_book_task
+from ...core.tasks import process_book_task, parse_uploaded_book_task
 from ...schemas.responses import (
     BookListResponse,
     BookDetailResponse,
@@ -62,15 +76,26 @@ router = APIRouter()
 
 @router.post("/upload", response_model=BookUploadResponse)
 async def upload_book(
+    response: Response,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_database_session),
     parser: BookParser = Depends(get_book_parser_dep),
+    parsing_engine: BookParsingEngine = Depends(get_book_parsing_engine_dep),
     book_svc: BookService = Depends(get_book_service_dep),
+    storage_svc: BookStorageService = Depends(get_book_storage_service_dep),
+    dedup_svc: BookDeduplicationService = Depends(get_book_dedup_service_dep),
 ) -> BookUploadResponse:
     """
     Загружает книгу, парсит её и сохраняет в базе данных.
 
+    Файл потоково пишется в content-addressed хранилище (без буферизации
+    в памяти и повторной записи). Если такой же файл уже распарсен для
+    другой книги, главы и описания копируются без парсинга и LLM.
+    Парсинг выполняется в пуле процессов BookParsingEngine. В режиме
+    BOOK_PARSING_MODE=celery файл отдаётся воркеру и ответ приходит
+    со статусом 202 до завершения парсинга.
+
     Args:
         file: Загруженный файл книги
         current_user: Текущий аутентифицированный пользователь
@@ -80,7 +105,7 @@ async def upload_book(
         Информация о загруженной и обработанной книге
 
     Raises:
-        HTTPException: 400 если файл невалидный
+        HTTPException: 400 если файл невалидный, 503 если очередь парсинга заполнена
     """
     logger.info(
         "Book upload request received",
@@ -97,48 +122,74 @@ async def upload_book(
     if file_extension not in [".epub", ".fb2"]:
         raise InvalidFileFormatException(file_extension, [".epub", ".fb2"])
 
+    # Потоково пишем файл сразу в content-addressed хранилище:
+    # память ограничена размером чанка, SHA-256 считается на лету
     try:
-        file_content = await file.read()
-        file_size = len(file_content)
-        logger.debug("File read successfully", file_size=file_size)
+        stored_file = await storage_svc.store_upload(file, file_extension, db=db)
+        logger.debug(
+            "File stored",
+            path=str(stored_file.path),
+            file_size=stored_file.size,
+            sha256=stored_file.sha256,
+            deduplicated=not stored_file.created,
+        )
+    except UploadTooLargeError as e:
+        raise FileTooLargeException(e.max_size // (1024 * 1024))
     except Exception as e:
         logger.error("Failed to read file", error=str(e))
         raise FileReadException(str(e))
 
-    if file_size > 50 * 1024 * 1024:
-        raise FileTooLargeException(50)
-
-    # Создаем временный файл для парсинга (async write to avoid blocking)
-    temp_file = tempfile.NamedTemporaryFile(suffix=file_extension, delete=False)
-    temp_file_path = temp_file.name
-    temp_file.close()
-
-    async with aiofiles.open(temp_file_path, "wb") as f:
-        await f.write(file_content)
+    file_size = stored_file.size
+    file_path = str(stored_file.path)
+    pending_book: Optional[Book] = None
 
     try:
-        logger.debug("Parsing book", temp_file_path=temp_file_path)
-        # Парсим книгу (используем DI)
-        parsed_book = await parser.parse_book(temp_file_path)
-        logger.info("Book parsed successfully", title=parsed_book.metadata.title)
-
-        # Создаем постоянное хранилище для файла
-        storage_dir = Path("/app/storage/books")
-        storage_dir.mkdir(parents=True, exist_ok=True)
+        # Файл уже был в хранилище - значит на него ссылается другая книга
+        if not stored_file.created:
+            source_book = await dedup_svc.find_parsed_book(db, stored_file.sha256)
+            if source_book is not None:
+                return await _reuse_duplicate_book(
+                    source_book=source_book,
+                    file_path=file_path,
+                    file_size=file_size,
+                    current_user=current_user,
+                    db=db,
+                    dedup_svc=dedup_svc,
+                )
 
-        permanent_path = storage_dir / f"{uuid4()}{file_extension}"
-        shutil.move(temp_file_path, permanent_path)
-        logger.debug("File moved to permanent storage", path=str(permanent_path))
+        if parsing_engine.mode == PARSING_MODE_CELERY:
+            return await _enqueue_book_parsing(
+                response=response,
+                file_path=file_path,
+                file_extension=file_extension,
+                file_size=file_size,
+                content_hash=stored_file.sha256,
+                original_filename=file.filename,
+                current_user=current_user,
+                db=db,
+                book_svc=book_svc,
+            )
 
-        # Сохраняем книгу в базе данных (используем DI)
-        logger.debug("Creating book in database")
-        book = await book_svc.create_book_from_upload(
+        # Книга-заглушка коммитится до парсинга: строка Book удерживает файл
+        # от удаления, а коммит снимает блокировку store_upload - соединение
+        # с БД не держится открытой транзакцией на всё время парсинга
+        pending_book = await book_svc.create_pending_book(
             db=db,
             user_id=current_user.id,
-            file_path=str(permanent_path),
+            file_path=file_path,
             original_filename=file.filename,
-            parsed_book=parsed_book,
+            file_format=file_extension.lstrip("."),
+            content_hash=stored_file.sha256,
         )
+
+        logger.debug("Parsing book", file_path=file_path, book_id=str(pending_book.id))
+        # Парсим книгу в пуле процессов, не блокируя event loop (используем DI)
+        parsed_book = await parsing_engine.parse(parser, file_path)
+        logger.info("Book parsed successfully", title=parsed_book.metadata.title)
+
+        # Заполняем книгу результатом парсинга (используем DI)
+        logger.debug("Saving parsed book in database")
+        book = await book_svc.populate_parsed_book(db, pending_book, parsed_book)
         await db.refresh(book)  # FIX: Refresh object to avoid greenlet_spawn error
         logger.info("Book created in database", book_id=str(book.id))
 
@@ -153,71 +204,197 @@ async def upload_book(
             logger.warning("Failed to start background task", error=str(e))
             # Не прерываем процесс, если Celery недоступен
 
-        # КРИТИЧЕСКИ ВАЖНО: Инвалидируем кэш списка книг пользователя
-        # чтобы новая книга сразу появилась в библиотеке
-        try:
-            logger.debug("Invalidating book list cache", user_id=str(current_user.id))
-            # Используем pattern-based deletion для удаления ВСЕХ вариантов пагинации
-            # Это намного эффективнее чем цикл с 30 итерациями
-            pattern = f"user:{current_user.id}:books:*"
-            deleted_count = await cache_manager.delete_pattern(pattern)
-            logger.debug("Book list cache invalidated", keys_deleted=deleted_count)
-        except Exception as e:
-            logger.warning("Failed to invalidate cache", error=str(e))
-            # Не критичная ошибка, продолжаем
-
-        # Создаем ответ в правильном формате согласно BookUploadResponse схеме
-        book_response = BookDetailResponse(
-            id=book.id,
-            user_id=book.user_id,
-            title=book.title,
-            author=book.author,
-            genre=book.genre,
-            language=book.language,
-            file_path=book.file_path,
-            file_format=book.file_format,
-            file_size=book.file_size,
-            cover_image=book.cover_image,
-            description=book.description,
-            book_metadata=book.book_metadata,
-            total_pages=book.total_pages,
-            estimated_reading_time=book.estimated_reading_time,
-            is_parsed=book.is_parsed,
-            is_processing=book.is_processing if hasattr(book, 'is_processing') else True,
-            parsing_progress=book.parsing_progress,
-            parsing_error=book.parsing_error,
-            created_at=book.created_at,
-            updated_at=book.updated_at,
-            last_accessed=book.last_accessed,
-            # Computed fields для frontend
-            estimated_reading_time_hours=round(book.estimated_reading_time / 60, 1),
-            file_size_mb=round(file_size / (1024 * 1024), 2),
-            has_cover=bool(book.cover_image),
-        )
+        await _invalidate_user_books_cache(current_user)
 
         return BookUploadResponse(
-            book=book_response,
+            book=_build_book_detail(book, file_size),
             task_id=task_id,
             message=f"Book '{book.title}' uploaded successfully. Processing descriptions in background...",
         )
 
+    except ParsingEngineBusyError as e:
+        logger.warning("Book parsing queue is full", error=str(e))
+        await _discard_upload(db, stored_file, pending_book, current_user, storage_svc, book_svc)
+        raise BookParsingBusyException()
+
+    except ParsingEngineCrashedError as e:
+        await _discard_upload(db, stored_file, pending_book, current_user, storage_svc, book_svc)
+        raise BookParsingCrashedException() from e
+
     except Exception as e:
         logger.error("Book processing failed", error=str(e), exc_info=True)
-        # Удаляем временный файл в случае ошибки
-        try:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-        except OSError:
-            pass
+        # Удаляем сохранённый файл в случае ошибки (если он не общий с другой книгой)
+        await _discard_upload(db, stored_file, pending_book, current_user, storage_svc, book_svc)
 
         raise BookProcessingException(str(e))
 
 
+async def _discard_upload(
+    db: AsyncSession,
+    stored_file: StoredBookFile,
+    pending_book: Optional[Book],
+    current_user: User,
+    storage_svc: BookStorageService,
+    book_svc: BookService,
+) -> None:
+    """
+    Откатывает неудачную загрузку.
+
+    Удаляет книгу-заглушку (если она уже закоммичена) и файл - только
+    если на него не ссылаются другие книги.
+    """
+    await db.rollback()
+    if pending_book is not None:
+        await book_svc.delete_book(db, pending_book.id, current_user.id)
+    await storage_svc.discard(db, stored_file)
+
+
+async def _invalidate_user_books_cache(current_user: User) -> None:
+    """
+    Инвалидирует кэш списка книг пользователя.
+
+    КРИТИЧЕСКИ ВАЖНО: новая книга должна сразу появиться в библиотеке.
+    """
+    try:
+        logger.debug("Invalidating book list cache", user_id=str(current_user.id))
+        # Используем pattern-based deletion для удаления ВСЕХ вариантов пагинации
+        # Это намного эффективнее чем цикл с 30 итерациями
+        pattern = f"user:{current_user.id}:books:*"
+        deleted_count = await cache_manager.delete_pattern(pattern)
+        logger.debug("Book list cache invalidated", keys_deleted=deleted_count)
+    except Exception as e:
+        logger.warning("Failed to invalidate cache", error=str(e))
+        # Не критичная ошибка, продолжаем
+
+
+def _build_book_detail(book: Book, file_size: int) -> BookDetailResponse:
+    """Создает BookDetailResponse для ответа на загрузку книги."""
+    return BookDetailResponse(
+        id=book.id,
+        user_id=book.user_id,
+        title=book.title,
+        author=book.author,
+        genre=book.genre,
+        language=book.language,
+        file_path=book.file_path,
+        file_format=book.file_format,
+        file_size=book.file_size,
+        cover_image=book.cover_image,
+        description=book.description,
+        book_metadata=book.book_metadata,
+        total_pages=book.total_pages,
+        estimated_reading_time=book.estimated_reading_time,
+        is_parsed=book.is_parsed,
+        is_processing=book.is_processing if hasattr(book, 'is_processing') else True,
+        parsing_progress=book.parsing_progress,
+        parsing_error=book.parsing_error,
+        created_at=book.created_at,
+        updated_at=book.updated_at,
+        last_accessed=book.last_accessed,
+        # Computed fields для frontend
+        estimated_reading_time_hours=round(book.estimated_reading_time / 60, 1),
+        file_size_mb=round(file_size / (1024 * 1024), 2),
+        has_cover=bool(book.cover_image),
+    )
+
+
+async def _enqueue_book_parsing(
+    response: Response,
+    file_path: str,
+    file_extension: str,
+    file_size: int,
+    content_hash: str,
+    original_filename: str,
+    current_user: User,
+    db: AsyncSession,
+    book_svc: BookService,
+) -> BookUploadResponse:
+    """
+    Режим BOOK_PARSING_MODE=celery: отдаёт парсинг сохранённого файла воркеру.
+
+    Создаёт книгу-заглушку (is_processing=True) и отвечает 202 Accepted,
+    не дожидаясь парсинга. Метаданные и главы заполняет parse_uploaded_book_task.
+    """
+    file_format = file_extension.lstrip(".")
+
+    book = await book_svc.create_pending_book(
+        db=db,
+        user_id=current_user.id,
+        file_path=file_path,
+        original_filename=original_filename,
+        file_format=file_format,
+        content_hash=content_hash,
+    )
+    await db.refresh(book)
+
+    try:
+        task = parse_uploaded_book_task.delay(str(book.id), file_format)
+    except Exception:
+        # Без воркера книга навсегда останется в обработке - откатываем загрузку
+        await book_svc.delete_book(db, book.id, current_user.id)
+        raise
+
+    task_id = task.id if task else None
+    logger.info("Book parsing queued", book_id=str(book.id), task_id=task_id)
+
+    await _invalidate_user_books_cache(current_user)
+
+    response.status_code = status.HTTP_202_ACCEPTED
+    return BookUploadResponse(
+        book=_build_book_detail(book, file_size),
+        task_id=task_id,
+        message=f"Book '{book.title}' uploaded successfully. Parsing in background...",
+    )
+
+
+async def _reuse_duplicate_book(
+    source_book: Book,
+    file_path: str,
+    file_size: int,
+    current_user: User,
+    db: AsyncSession,
+    dedup_svc: BookDeduplicationService,
+) -> BookUploadResponse:
+    """
+    Создаёт книгу из уже распарсенной копии того же файла.
+
+    Главы и описания копируются в БД. Если исходная книга обработана
+    полностью, Celery задача не нужна - книга сразу готова к чтению.
+    """
+    book = await dedup_svc.clone_book_for_user(
+        db=db,
+        source=source_book,
+        user_id=current_user.id,
+        file_path=file_path,
+        file_size=file_size,
+    )
+    await db.refresh(book)
+
+    task_id = None
+    if not book.is_parsed:
+        # Исходная книга ещё обрабатывается - дообрабатываем копию
+        # (главы с готовыми описаниями будут пропущены)
+        try:
+            task = process_book_task.delay(str(book.id))
+            task_id = task.id if task else None
+        except Exception as e:
+            logger.warning("Failed to start background task", error=str(e))
+
+    await _invalidate_user_books_cache(current_user)
+
+    return BookUploadResponse(
+        book=_build_book_detail(book, file_size),
+        task_id=task_id,
+        message=f"Book '{book.title}' uploaded successfully.",
+    )
+
+
 @router.get("/", response_model=BookListResponse)
 async def get_user_books(
     skip: int = 0,
     limit: int = 50,
     sort_by: str = "created_desc",
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_database_session),
     current_user: User = Depends(get_current_active_user),
     book_progress_svc: BookProgressService = Depends(get_book_progress_service_dep),
@@ -225,11 +402,15 @@ async def get_user_books(
     """
     Получает список книг пользователя.
 
+    Один узкий запрос: количество глав и прогресс берутся из
+    денормализованных колонок, главы не загружаются.
+
     Args:
-        skip: Количество записей для пропуска
+        skip: Количество записей для пропуска (если cursor не передан)
         limit: Максимальное количество записей
         sort_by: Тип сортировки (created_desc, created_asc, title_asc, title_desc,
                  author_asc, author_desc, accessed_desc). По умолчанию: created_desc
+        cursor: next_cursor предыдущей страницы (keyset пагинация)
         db: Сессия базы данных
         current_user: Текущий пользователь
 
@@ -238,7 +419,7 @@ async def get_user_books(
 
     Cache:
         TTL: 10 seconds (frequently updated - parsing status changes)
-        Key: user:{user_id}:books:skip:{skip}:limit:{limit}:sort:{sort_by}
+        Key: user:{user_id}:books:skip:{skip}:limit:{limit}:sort:{sort_by}[:cursor:{cursor}]
     """
     logger.debug(
         "Books request started",
@@ -246,76 +427,72 @@ async def get_user_books(
         sort_by=sort_by,
         skip=skip,
         limit=limit,
+        has_cursor=cursor is not None,
     )
 
     # Try to get from cache
-    cache_key_str = cache_key(
-        "user",
-        current_user.id,
-        "books",
-        f"skip:{skip}",
-        f"limit:{limit}",
-        f"sort:{sort_by}",
-    )
+    key_parts = [f"skip:{skip}", f"limit:{limit}", f"sort:{sort_by}"]
+    if cursor:
+        key_parts.append(f"cursor:{cursor}")
+    cache_key_str = cache_key("user", current_user.id, "books", *key_parts)
     cached_result = await cache_manager.get(cache_key_str)
     if cached_result is not None:
         logger.debug("Cache HIT for books", user_id=str(current_user.id))
+        await book_progress_svc.merge_buffered_library_progress(
+            current_user.id, cached_result["books"]
+        )
         return cached_result
 
     logger.debug("Cache MISS for books - querying database", user_id=str(current_user.id))
 
     try:
-        # ОПТИМИЗАЦИЯ: Получаем книги пользователя с предрасчитанным прогрессом
-        # Использует eager loading, чтобы избежать N+1 queries (используем DI)
-        books_with_progress = await book_progress_svc.get_books_with_progress(
-            db, current_user.id, skip, limit, sort_by
+        rows, next_cursor = await book_progress_svc.get_library_page(
+            db, current_user.id, limit=limit, sort_by=sort_by, cursor=cursor, skip=skip
         )
-        logger.debug("Retrieved books from service", books_count=len(books_with_progress))
+        logger.debug("Retrieved books from service", books_count=len(rows))
 
         # Формируем ответ
         books_data = []
-        for book, reading_progress in books_with_progress:
+        for row in rows:
             try:
                 books_data.append(
                     {
-                        "id": str(book.id),
-                        "title": book.title,
-                        "author": book.author or "Неизвестный автор",
-                        "genre": book.genre,
-                        "language": book.language,
-                        "description": book.description or "",
-                        "cover_image": book.cover_image,
-                        "file_format": book.file_format,
-                        "file_size": book.file_size,
-                        "total_pages": book.total_pages,
-                        "estimated_reading_time": book.estimated_reading_time or 0,
+                        "id": str(row.id),
+                        "title": row.title,
+                        "author": row.author or "Неизвестный автор",
+                        "genre": row.genre,
+                        "language": row.language,
+                        "description": row.description or "",
+                        "cover_image": row.cover_image,
+                        "file_format": row.file_format,
+                        "file_size": row.file_size,
+                        "total_pages": row.total_pages,
+                        "estimated_reading_time": row.estimated_reading_time or 0,
                         "estimated_reading_time_hours": (
-                            round(book.estimated_reading_time / 60, 1)
-                            if book.estimated_reading_time > 0
+                            round(row.estimated_reading_time / 60, 1)
+                            if row.estimated_reading_time > 0
                             else 0.0
                         ),
-                        "chapters_count": (
-                            len(book.chapters)
-                            if hasattr(book, "chapters") and book.chapters
-                            else 0
+                        "chapters_count": row.total_chapters or 0,
+                        "reading_progress_percent": round(
+                            row.reading_progress_percent, 1
                         ),
-                        "reading_progress_percent": round(reading_progress, 1),
-                        "has_cover": bool(book.cover_image),
-                        "is_parsed": book.is_parsed,
-                        "parsing_progress": book.parsing_progress,
-                        "is_processing": book.is_processing if hasattr(book, 'is_processing') else not book.is_parsed,
+                        "has_cover": bool(row.cover_image),
+                        "is_parsed": row.is_parsed,
+                        "parsing_progress": row.parsing_progress,
+                        "is_processing": row.is_processing,
                         "created_at": (
-                            book.created_at.isoformat() if book.created_at else None
+                            row.created_at.isoformat() if row.created_at else None
                         ),
                         "last_accessed": (
-                            book.last_accessed.isoformat()
-                            if book.last_accessed
+                            row.last_accessed.isoformat()
+                            if row.last_accessed
                             else None
                         ),
                     }
                 )
             except Exception as e:
-                logger.warning("Error processing book", book_id=str(book.id), error=str(e))
+                logger.warning("Error processing book", book_id=str(row.id), error=str(e))
 
         # Получаем общее количество книг для пагинации
         total_books_result = await db.execute(
@@ -334,13 +511,21 @@ async def get_user_books(
             "total": total_books,
             "skip": skip,
             "limit": limit,
+            "next_cursor": next_cursor,
         }
 
         # Cache the result (5 minutes TTL for book lists)
         await cache_manager.set(cache_key_str, response, ttl=CACHE_TTL["book_list"])
 
+        # Несброшенный прогресс из буфера - поверх кэшируемого ответа
+        await book_progress_svc.merge_buffered_library_progress(
+            current_user.id, response["books"]
+        )
+
         return response
 
+    except InvalidCursorError:
+        raise InvalidPaginationCursorException()
     except Exception as e:
         logger.error("Error fetching books", error=str(e))
         raise BookListFetchException(str(e))
@@ -351,14 +536,19 @@ async def get_book(
     book: Book = Depends(get_user_book),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_database_session),
+    book_progress_svc: BookProgressService = Depends(get_book_progress_service_dep),
 ) -> BookDetailResponse:
     """
     Получает информацию о конкретной книге.
 
+    Прогресс чтения, ещё не сброшенный из write-behind буфера,
+    подмешивается поверх ответа из БД / кэша.
+
     Args:
         book: Книга (автоматически получена через dependency)
         current_user: Текущий аутентифицированный пользователь
         db: Сессия базы данных
+        book_progress_svc: Сервис прогресса чтения (write-behind буфер)
 
     Returns:
         Подробная информация о книге
@@ -376,6 +566,7 @@ async def get_book(
     cached_result = await cache_manager.get(cache_key_str)
     if cached_result is not None:
         logger.debug("Cache HIT for book", book_id=str(book.id))
+        await book_progress_svc.merge_buffered_book_progress(current_user.id, cached_result)
         return cached_result
 
     logger.debug("Cache MISS for book - building response", book_id=str(book.id))
@@ -455,6 +646,8 @@ async def get_book(
         # Cache the result (1 hour TTL for book metadata)
         await cache_manager.set(cache_key_str, response, ttl=CACHE_TTL["book_metadata"])
 
+        await book_progress_svc.merge_buffered_book_progress(current_user.id, response)
+
         return response
 
     except HTTPException:
@@ -14,7 +14,6 @@ NLP REMOVAL (December 2025):
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from typing import Dict, Any, List
 
 from ..core.database import get_database_session
@@ -148,13 +147,11 @@ async def get_chapter(
         return cached_result
 
     try:
-        # Загружаем книгу для навигационной информации с eager loading для chapters
-        book_result = await db.execute(
-            select(Book)
-            .where(Book.id == chapter.book_id)
-            .options(selectinload(Book.chapters))
-        )
+        # Книга и лёгкий индекс глав для навигации (без тел остальных глав)
+        book_result = await db.execute(select(Book).where(Book.id == chapter.book_id))
         book = book_result.scalar_one()
+        chapter_index = await book_service.get_chapter_index(db, chapter.book_id)
+        total_chapters = len(chapter_index)
 
         # NLP REMOVAL: Descriptions are now extracted on-demand via LLM API
         # Get images for this chapter (images now linked to chapters, not descriptions)
@@ -178,7 +175,7 @@ async def get_chapter(
 
         # Навигационная информация
         has_previous = chapter.chapter_number > 1
-        has_next = chapter.chapter_number < len(book.chapters)
+        has_next = chapter.chapter_number < total_chapters
         previous_chapter = chapter.chapter_number - 1 if has_previous else None
         next_chapter = chapter.chapter_number + 1 if has_next else None
 
@@ -196,7 +193,7 @@ async def get_chapter(
             id=book.id,
             title=book.title,
             author=book.author,
-            total_chapters=len(book.chapters),
+            total_chapters=total_chapters,
         )
 
         response = ChapterDetailResponse(
@@ -11,7 +11,7 @@ import asyncio
 
 from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import inspect, select
 from typing import Dict, List
 from uuid import UUID
 from datetime import datetime
@@ -23,7 +23,7 @@ from ..core.exceptions import (
     ChapterNotFoundException,
     BookNotFoundException,
 )
-from ..services.book import book_service
+from ..services.book import book_service, book_dedup_service
 from ..services.langextract_processor import langextract_processor
 from ..models.user import User
 from ..models.description import Description, DescriptionType
@@ -44,6 +44,23 @@ from loguru import logger
 router = APIRouter()
 
 
+async def _ensure_chapter_content(db: AsyncSession, chapter: Chapter) -> None:
+    """Догружает тело главы, загруженной через book_service без тел."""
+    if "content" in inspect(chapter).unloaded:
+        await db.refresh(chapter, attribute_names=["content"])
+
+
+async def _check_service_page(db: AsyncSession, chapter: Chapter) -> bool:
+    """
+    Chapter.check_is_service_page для главы без тела.
+
+    Тело (первые 500 символов) нужно только пока статус не закэширован.
+    """
+    if chapter.is_service_page is None:
+        await _ensure_chapter_content(db, chapter)
+    return chapter.check_is_service_page()
+
+
 @router.get(
     "/{book_id}/chapters/{chapter_number}/descriptions",
     response_model=ChapterDescriptionsResponse,
@@ -93,7 +110,7 @@ async def get_chapter_descriptions(
 
     # Проверка на служебные страницы (не парсим их)
     # P1.1 OPTIMIZATION: Use cached method from Chapter model
-    is_service_page = chapter.check_is_service_page()
+    is_service_page = await _check_service_page(db, chapter)
 
     # Cache the result if not already cached
     if chapter.is_service_page is None:
@@ -167,6 +184,7 @@ async def get_chapter_descriptions(
                 await db.delete(old_desc)
 
             # Извлекаем описания из контента главы через LLM
+            await _ensure_chapter_content(db, chapter)
             # TIMEOUT PROTECTION (P0.3): Prevent infinite hangs on LLM API issues
             LLM_EXTRACTION_TIMEOUT = 30.0  # seconds (API response + processing)
             try:
@@ -407,7 +425,7 @@ async def _get_chapter_descriptions_internal(
         raise ChapterNotFoundException(chapter_number, book_id)
 
     # P1.1 OPTIMIZATION: Use cached method from Chapter model
-    is_service_page = chapter.check_is_service_page()
+    is_service_page = await _check_service_page(db, chapter)
 
     chapter_info = ChapterMinimalInfo(
         id=chapter.id,
@@ -553,7 +571,7 @@ async def get_batch_descriptions(
             continue
 
         # P1.1 OPTIMIZATION: Use cached method from Chapter model
-        is_service_page = chapter.check_is_service_page()
+        is_service_page = await _check_service_page(db, chapter)
 
         # Track for batch caching
         if chapter.is_service_page is None:
@@ -756,6 +774,17 @@ async def _background_extract_descriptions(
                 logger.info(f"[BG] Chapter {chapter_id} already has descriptions, skipping")
                 return
 
+            # Same chapter text already processed (e.g. same book of another user)
+            reused = await book_dedup_service.reuse_chapter_descriptions(db, chapter)
+            if reused is not None:
+                chapter.parsed_at = datetime.utcnow()
+                await db.commit()
+                await cache_manager.delete(
+                    f"descriptions:book:{book_id}:chapter:{chapter.chapter_number}"
+                )
+                logger.info(f"[BG] Reused {reused} descriptions for chapter {chapter_id}")
+                return
+
             # Check if LLM processor is available
             if not langextract_processor.is_available():
                 logger.error("[BG] LLM processor unavailable. Check GOOGLE_API_KEY.")
@@ -878,7 +907,7 @@ async def trigger_background_extraction(
         raise HTTPException(status_code=404, detail="Chapter not found")
 
     # 3. Check for service page
-    if chapter.check_is_service_page():
+    if await _check_service_page(db, chapter):
         return {"status": "skipped", "reason": "service_page", "chapter_number": chapter_number}
 
     # 4. Check for existing descriptions
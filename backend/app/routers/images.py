@@ -5,19 +5,23 @@ API роуты для генерации изображений в fancai.
 с использованием AI и управления очередью генерации.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import Dict, Any, List, Optional
+from sqlalchemy import select, func, or_
+from typing import AsyncIterator, Dict, Any, List, Optional
 from uuid import UUID
 from pydantic import BaseModel
-from pathlib import Path
+import asyncio
+import json
 import os
 
 from ..core.database import get_database_session
 from ..core.auth import get_current_active_user, get_current_admin_user
 from ..services.image_generator import ImageGeneratorService
+from ..services.generated_image_store import generated_image_store
+from ..services.image_variants import MEDIA_TYPES, select_variant
 from ..core.container import get_image_generator_service_dep
 from ..models.user import User
 from ..models.book import Book
@@ -36,25 +40,28 @@ from ..schemas.responses.images import (
 
 router = APIRouter()
 
-# Directory where Imagen saves images (persistent storage)
-# Uses /app/storage which is mounted as Docker volume for persistence
-GENERATED_IMAGES_DIR = Path("/app/storage/generated_images")
-
-
 @router.get("/images/file/{filename}")
 async def get_generated_image_file(
     filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=16, le=4096, description="Desired width in pixels"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_database_session),
 ):
     """
     Serve generated image file with ownership verification.
 
-    This endpoint serves image files from the generated_images directory.
+    This endpoint serves image files from the content-addressed image store
+    (SHA-256 names in sharded directories) and legacy flat-directory files.
     Authentication required - verifies image belongs to a book owned by the user.
 
+    When WebP/AVIF variants exist, the best one for the Accept header and
+    the requested width is served instead of the original PNG.
+
     Args:
-        filename: The image filename (UUID-based)
+        filename: The image filename (SHA-256 or legacy name)
+        request: Request (Accept header)
+        w: Desired width; the smallest variant at least this wide is served
         current_user: Current authenticated user
         db: Database session
 
@@ -66,16 +73,14 @@ async def get_generated_image_file(
         HTTPException 403: Access denied (image doesn't belong to user)
         HTTPException 404: Image not found
     """
-    # Validate filename (prevent path traversal)
-    if ".." in filename or "/" in filename or "\\" in filename:
+    # Resolve file path (rejects path traversal)
+    file_path = generated_image_store.resolve_filename(filename)
+    if file_path is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid filename"
         )
 
-    # Build full file path
-    file_path = GENERATED_IMAGES_DIR / filename
-
     # Check if file exists
     if not file_path.exists():
         raise HTTPException(
@@ -84,42 +89,58 @@ async def get_generated_image_file(
         )
 
     # SECURITY FIX: Verify ownership through database
-    # Image -> Description -> Chapter -> Book -> User
-    # OR Image -> Chapter -> Book -> User (for new schema)
-    image_result = await db.execute(
-        select(GeneratedImage)
-        .where(GeneratedImage.local_path == str(file_path))
-    )
-    image = image_result.scalar_one_or_none()
-
-    if not image:
-        # Try matching by filename in image_url field (API path format)
-        api_path = f"/api/v1/images/file/{filename}"
-        image_result = await db.execute(
-            select(GeneratedImage)
-            .where(GeneratedImage.image_url == api_path)
+    # Identical images share one file, so several rows (possibly of different
+    # users) may reference it - access is granted if any of them is the user's
+    content_hash = generated_image_store.hash_from_path(filename)
+    if content_hash:
+        image_condition = GeneratedImage.content_hash == content_hash
+    else:
+        image_condition = or_(
+            GeneratedImage.local_path == str(file_path),
+            GeneratedImage.image_url == f"/api/v1/images/file/{filename}",
         )
-        image = image_result.scalar_one_or_none()
 
-    if not image:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Image not found in database"
+    owned_row = (
+        await db.execute(
+            select(GeneratedImage.id, GeneratedImage.variants)
+            .where(image_condition)
+            .where(GeneratedImage.user_id == current_user.id)
+            .limit(1)
+        )
+    ).first()
+    if owned_row is None:
+        any_result = await db.execute(
+            select(GeneratedImage.id).where(image_condition).limit(1)
         )
+        if any_result.scalar_one_or_none() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Image not found in database"
+            )
 
-    # Check ownership: image.user_id should match current_user.id
-    if image.user_id != current_user.id:
+        # Check ownership: image.user_id should match current_user.id
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied: Image does not belong to current user"
         )
 
+    media_type = MEDIA_TYPES.get(file_path.suffix.lstrip(".").lower(), "image/png")
+
+    # Best variant for the client (WebP/AVIF, responsive width)
+    variant = select_variant(owned_row.variants, request.headers.get("accept"), w)
+    if variant:
+        variant_path = generated_image_store.resolve_filename(variant["filename"])
+        if variant_path is not None and variant_path.exists():
+            file_path = variant_path
+            media_type = MEDIA_TYPES[variant["format"]]
+
     # Use content_disposition_type="inline" to display image in browser
     # instead of forcing download (which happens with filename parameter)
     return FileResponse(
         path=str(file_path),
-        media_type="image/png",
-        content_disposition_type="inline"
+        media_type=media_type,
+        content_disposition_type="inline",
+        headers={"Vary": "Accept"},
     )
 
 
@@ -358,6 +379,7 @@ async def generate_image_for_description(
             status="completed",
             image_url=http_url,  # Store HTTP URL instead of data URL
             local_path=result.local_path,
+            content_hash=result.content_hash,
             prompt_used=result.prompt_used or params.style_prompt or "default",
             generation_time_seconds=result.generation_time_seconds,
         )
@@ -366,6 +388,9 @@ async def generate_image_for_description(
         await db.commit()
         await db.refresh(generated_image)
 
+        from ..core.tasks import enqueue_image_variants
+        enqueue_image_variants(result.content_hash)
+
         return ImageGenerationSuccessResponse(
             image_id=generated_image.id,
             description_id=description.id,
@@ -385,42 +410,34 @@ async def generate_image_for_description(
         )
 
 
-@router.post("/images/generate/chapter/{chapter_id}")
-async def generate_images_for_chapter(
+async def _submit_chapter_batch(
     chapter_id: UUID,
     request: BatchGenerationRequest,
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_database_session),
-    image_gen_svc: ImageGeneratorService = Depends(get_image_generator_service_dep),
+    current_user: User,
+    db: AsyncSession,
+    image_gen_svc: ImageGeneratorService,
 ) -> Dict[str, Any]:
     """
-    Генерирует изображения для всех подходящих описаний в главе.
+    Ставит пакетную генерацию главы в очередь Celery.
 
-    Args:
-        chapter_id: ID главы
-        request: Параметры пакетной генерации
-        background_tasks: Фоновые задачи
-        current_user: Текущий пользователь
-        db: Сессия базы данных
-
-    Returns:
-        Информация о запущенной пакетной генерации
+    Изображения генерирует и сохраняет воркер (generate_image_batch_task),
+    API только выбирает описания без изображений и возвращает ID задачи.
     """
     # Проверяем, что глава принадлежит пользователю
     chapter_result = await db.execute(
-        select(Chapter)
+        select(Chapter, Book.genre)
         .join(Book)
         .where(Chapter.id == chapter_id)
         .where(Book.user_id == current_user.id)
     )
-    chapter = chapter_result.scalar_one_or_none()
+    chapter_row = chapter_result.one_or_none()
 
-    if not chapter:
+    if not chapter_row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chapter not found or access denied",
         )
+    book_genre = chapter_row.genre
 
     # Получаем описания для генерации
     descriptions_query = select(Description).where(Description.chapter_id == chapter_id)
@@ -462,66 +479,61 @@ async def generate_images_for_chapter(
             "skipped": len(all_descriptions),
         }
 
-    # Запускаем пакетную генерацию (используем DI)
-    try:
-        results = await image_gen_svc.batch_generate_for_chapter(
-            descriptions=descriptions_to_process,
-            user_id=str(current_user.id),
-            max_images=request.max_images,
-        )
+    # Данные описаний для Celery задачи
+    descriptions_data = [
+        {
+            "id": str(d.id),
+            "content": d.content,
+            "type": d.type.value if hasattr(d.type, 'value') else str(d.type),
+        }
+        for d in descriptions_to_process
+    ]
 
-        # Сохраняем результаты в базе данных
-        generated_images = []
-        successful_generations = 0
-
-        for i, result in enumerate(results):
-            if result.success and i < len(descriptions_to_process):
-                description = descriptions_to_process[i]
-
-                # Create HTTP URL from local_path
-                filename = os.path.basename(result.local_path) if result.local_path else None
-                http_url = f"/api/v1/images/file/{filename}" if filename else None
-
-                generated_image = GeneratedImage(
-                    description_id=description.id,
-                    user_id=current_user.id,
-                    service_used="imagen",
-                    status="completed",
-                    image_url=http_url,  # Store HTTP URL instead of data URL
-                    local_path=result.local_path,
-                    prompt_used=result.prompt_used or request.style_prompt or "default",
-                    generation_time_seconds=result.generation_time_seconds,
-                )
-
-                db.add(generated_image)
-                generated_images.append(
-                    {
-                        "description_id": str(description.id),
-                        "description_type": description.type.value,
-                        "image_url": http_url or result.image_url,
-                        "generation_time": result.generation_time_seconds,
-                    }
-                )
-                successful_generations += 1
+    # Ставим задачу в очередь (используем DI)
+    queue_result = image_gen_svc.queue_batch_generation(
+        chapter_id=str(chapter_id),
+        user_id=str(current_user.id),
+        descriptions=descriptions_data,
+        book_genre=book_genre,
+        max_images=request.max_images,
+    )
+    task_id = queue_result["task_id"]
 
-        await db.commit()
+    return {
+        **queue_result,
+        "total_descriptions": len(all_descriptions),
+        "queued_for_processing": len(descriptions_to_process),
+        "skipped_existing": len(existing_desc_ids),
+        "status_url": f"/api/v1/images/task/{task_id}",
+        "events_url": f"/api/v1/images/task/{task_id}/events",
+    }
 
-        return {
-            "chapter_id": str(chapter_id),
-            "total_descriptions": len(all_descriptions),
-            "processed": len(descriptions_to_process),
-            "successful": successful_generations,
-            "failed": len(descriptions_to_process) - successful_generations,
-            "images": generated_images,
-            "message": f"Generated {successful_generations} images for chapter",
-        }
 
-    except Exception as e:
-        await db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Batch generation failed: {str(e)}",
-        )
+@router.post("/images/generate/chapter/{chapter_id}", status_code=202)
+async def generate_images_for_chapter(
+    chapter_id: UUID,
+    request: BatchGenerationRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_database_session),
+    image_gen_svc: ImageGeneratorService = Depends(get_image_generator_service_dep),
+) -> Dict[str, Any]:
+    """
+    Запускает генерацию изображений для подходящих описаний главы.
+
+    Возвращает ID задачи сразу: генерация идёт в Celery воркере, прогресс
+    доступен через GET /images/task/{task_id} (polling) и
+    GET /images/task/{task_id}/events (SSE).
+
+    Args:
+        chapter_id: ID главы
+        request: Параметры пакетной генерации
+        current_user: Текущий пользователь
+        db: Сессия базы данных
+
+    Returns:
+        Информация о поставленной в очередь задаче
+    """
+    return await _submit_chapter_batch(chapter_id, request, current_user, db, image_gen_svc)
 
 
 @router.get("/images/description/{description_id}")
@@ -710,19 +722,15 @@ async def delete_generated_image(
         )
 
     try:
-        # Удаляем локальный файл если он существует
-        if image.local_path:
-            import os
-
-            try:
-                os.unlink(image.local_path)
-            except OSError:
-                pass  # Файл уже удален или недоступен
+        local_path = image.local_path
 
         # Удаляем запись из базы данных
         await db.delete(image)
         await db.commit()
 
+        # Файл удаляется только если его не делят другие изображения
+        await generated_image_store.release(db, local_path)
+
         return {"message": "Image deleted successfully"}
 
     except Exception as e:
@@ -773,14 +781,7 @@ async def regenerate_image(
     existing_image, description = result_row
 
     try:
-        # Удаляем старый локальный файл если существует
-        if existing_image.local_path:
-            import os
-
-            try:
-                os.unlink(existing_image.local_path)
-            except OSError:
-                pass  # Файл уже удален или недоступен
+        previous_local_path = existing_image.local_path
 
         # Генерируем новое изображение (используем DI)
         generation_result = (
@@ -800,6 +801,8 @@ async def regenerate_image(
         # Обновляем существующую запись в базе данных
         existing_image.image_url = generation_result.image_url
         existing_image.local_path = generation_result.local_path
+        existing_image.content_hash = generation_result.content_hash
+        existing_image.variants = None
         existing_image.prompt_used = params.style_prompt or "default"
         existing_image.generation_time_seconds = (
             generation_result.generation_time_seconds
@@ -809,6 +812,13 @@ async def regenerate_image(
         await db.commit()
         await db.refresh(existing_image)
 
+        # Старый файл удаляется только если на него больше никто не ссылается
+        if previous_local_path != existing_image.local_path:
+            await generated_image_store.release(db, previous_local_path)
+
+        from ..core.tasks import enqueue_image_variants
+        enqueue_image_variants(generation_result.content_hash)
+
         return {
             "image_id": str(existing_image.id),
             "description_id": str(description.id),
@@ -1003,6 +1013,8 @@ async def queue_async_batch_generation(
     """
     Queue batch async image generation for a chapter via Celery.
 
+    Same as POST /images/generate/chapter/{chapter_id}.
+
     Args:
         chapter_id: ID of the chapter
         request: Batch generation parameters
@@ -1012,93 +1024,7 @@ async def queue_async_batch_generation(
     Returns:
         Task information with task_id for tracking
     """
-    # Validate chapter access
-    chapter_result = await db.execute(
-        select(Chapter)
-        .join(Book)
-        .where(Chapter.id == chapter_id)
-        .where(Book.user_id == current_user.id)
-    )
-    chapter = chapter_result.scalar_one_or_none()
-
-    if not chapter:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chapter not found or access denied",
-        )
-
-    # Get book for genre
-    book_result = await db.execute(
-        select(Book).where(Book.id == chapter.book_id)
-    )
-    book = book_result.scalar_one_or_none()
-    book_genre = book.genre if book else None
-
-    # Get descriptions for this chapter
-    descriptions_query = select(Description).where(Description.chapter_id == chapter_id)
-
-    if request.description_types:
-        descriptions_query = descriptions_query.where(
-            Description.type.in_(request.description_types)
-        )
-
-    descriptions_result = await db.execute(
-        descriptions_query.order_by(Description.priority_score.desc())
-    )
-    all_descriptions = descriptions_result.scalars().all()
-
-    if not all_descriptions:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No descriptions found in this chapter",
-        )
-
-    # Exclude descriptions with existing images
-    existing_images = await db.execute(
-        select(GeneratedImage.description_id).where(
-            GeneratedImage.description_id.in_([d.id for d in all_descriptions])
-        )
-    )
-    existing_desc_ids = set(img_id for img_id, in existing_images.fetchall())
-
-    descriptions_to_process = [
-        d for d in all_descriptions if d.id not in existing_desc_ids
-    ][:request.max_images]
-
-    if not descriptions_to_process:
-        return {
-            "message": "All suitable descriptions already have images",
-            "chapter_id": str(chapter_id),
-            "processed": 0,
-            "skipped": len(all_descriptions),
-        }
-
-    # Prepare descriptions for Celery task
-    descriptions_data = [
-        {
-            "id": str(d.id),
-            "content": d.content,
-            "type": d.type.value if hasattr(d.type, 'value') else str(d.type),
-        }
-        for d in descriptions_to_process
-    ]
-
-    # Queue the batch generation task (используем DI)
-    queue_result = image_gen_svc.queue_batch_generation(
-        chapter_id=str(chapter_id),
-        user_id=str(current_user.id),
-        descriptions=descriptions_data,
-        book_genre=book_genre,
-        max_images=request.max_images,
-    )
-
-    return {
-        **queue_result,
-        "total_descriptions": len(all_descriptions),
-        "queued_for_processing": len(descriptions_to_process),
-        "skipped_existing": len(existing_desc_ids),
-        "status_url": f"/api/v1/images/task/{queue_result['task_id']}",
-    }
+    return await _submit_chapter_batch(chapter_id, request, current_user, db, image_gen_svc)
 
 
 @router.get(
@@ -1123,8 +1049,11 @@ async def get_task_status(
     """
     # Получаем статус задачи (используем DI)
     status_info = image_gen_svc.get_task_status(task_id)
+    return _with_status_message(status_info)
 
-    # Add friendly status messages
+
+def _with_status_message(status_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Добавляет понятное сообщение к статусу Celery задачи."""
     status_messages = {
         "PENDING": "Task is waiting in queue",
         "STARTED": "Task has started processing",
@@ -1132,6 +1061,7 @@ async def get_task_status(
         "FAILURE": "Task failed",
         "RETRY": "Task is being retried",
         "REVOKED": "Task was cancelled",
+        "PROGRESS": "Task is generating images",
     }
 
     status_info["message"] = status_messages.get(
@@ -1140,3 +1070,89 @@ async def get_task_status(
     )
 
     return status_info
+
+
+# SSE поток статуса задачи
+TASK_EVENTS_POLL_SECONDS = 1.0
+TASK_EVENTS_HEARTBEAT_SECONDS = 15.0  # Меньше proxy_read_timeout nginx
+TASK_EVENTS_MAX_SECONDS = 1800.0  # task_time_limit Celery
+
+
+async def _task_status_events(
+    task_id: str,
+    image_gen_svc: ImageGeneratorService,
+    http_request: Request,
+) -> AsyncIterator[str]:
+    """
+    События SSE по статусу задачи.
+
+    "progress" - при каждом изменении статуса / прогресса, "done" - когда
+    задача завершилась, комментарий-heartbeat - пока ничего не меняется.
+    Статус читается из result backend в threadpool, чтобы не блокировать
+    event loop.
+    """
+    loop = asyncio.get_running_loop()
+    started_at = last_sent_at = loop.time()
+    last_payload = None
+
+    while True:
+        if await http_request.is_disconnected():
+            return
+
+        status_info = _with_status_message(
+            await run_in_threadpool(image_gen_svc.get_task_status, task_id)
+        )
+        payload = json.dumps(status_info, default=str)
+        now = loop.time()
+
+        if payload != last_payload:
+            event = "done" if status_info.get("ready") else "progress"
+            yield f"event: {event}\ndata: {payload}\n\n"
+            if event == "done":
+                return
+            last_payload = payload
+            last_sent_at = now
+        elif now - last_sent_at >= TASK_EVENTS_HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent_at = now
+
+        if now - started_at >= TASK_EVENTS_MAX_SECONDS:
+            yield f"event: timeout\ndata: {payload}\n\n"
+            return
+
+        await asyncio.sleep(TASK_EVENTS_POLL_SECONDS)
+
+
+@router.get(
+    "/images/task/{task_id}/events",
+    summary="Stream async generation task status (SSE)",
+    description="Server-Sent Events stream with progress of an async image generation task."
+)
+async def stream_task_status(
+    task_id: str,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    image_gen_svc: ImageGeneratorService = Depends(get_image_generator_service_dep),
+) -> StreamingResponse:
+    """
+    SSE поток статуса задачи генерации.
+
+    Те же данные, что GET /images/task/{task_id}, но без polling на клиенте:
+    сервер отправляет событие при каждом изменении прогресса.
+
+    Args:
+        task_id: Celery task ID
+        http_request: HTTP запрос (для отслеживания отключения клиента)
+        current_user: Current authenticated user
+
+    Returns:
+        StreamingResponse с text/event-stream
+    """
+    return StreamingResponse(
+        _task_status_events(task_id, image_gen_svc, http_request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx не буферизует поток
+        },
+    )
@@ -17,6 +17,7 @@ from ..core.database import get_database_session
 from ..core.auth import get_current_active_user
 from ..core.cache import cache_manager, cache_key, CACHE_TTL
 from ..services.book import book_service, book_progress_service
+from ..services.book.progress_buffer import invalidate_progress_caches
 from ..models.user import User
 from ..models.book import ReadingProgress
 from ..schemas.responses import (
@@ -51,6 +52,7 @@ async def get_reading_progress(
     Cache:
         TTL: 5 minutes (frequently updated)
         Key: user:{user_id}:progress:{book_id}
+        Несброшенный прогресс из write-behind буфера имеет приоритет над кэшем
 
     Example:
         ```bash
@@ -58,6 +60,13 @@ async def get_reading_progress(
              -H "Authorization: Bearer <token>"
         ```
     """
+    # Свежее несброшенное обновление из буфера (книга пользователя проверена при записи)
+    buffered = await book_progress_service.get_buffered_progress(current_user.id, book_id)
+    if buffered is not None:
+        return ReadingProgressDetailResponse(
+            progress=ReadingProgressResponse.model_validate(buffered)
+        )
+
     # Try to get from cache
     cache_key_str = cache_key("user", current_user.id, "progress", book_id)
     cached_result = await cache_manager.get(cache_key_str)
@@ -143,14 +152,6 @@ async def update_reading_progress(
         HTTPException: 404 если книга не найдена
     """
     try:
-        # Проверяем, что книга принадлежит пользователю
-        book = await book_service.get_book_by_id(
-            db=db, book_id=book_id, user_id=current_user.id
-        )
-
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-
         current_chapter = max(1, progress_data.get("current_chapter", 1))
 
         # Получаем CFI если передан (для epub.js)
@@ -169,27 +170,23 @@ async def update_reading_progress(
 
         position_percent = max(0.0, min(100.0, float(position_percent)))
 
-        # Обновляем прогресс чтения
-        progress = await book_progress_service.update_reading_progress(
-            db=db,
-            user_id=current_user.id,
-            book_id=book_id,
-            chapter_number=current_chapter,
-            position_percent=position_percent,
-            reading_location_cfi=reading_location_cfi,
-            scroll_offset_percent=scroll_offset_percent,
-        )
-
-        # Invalidate cache for this user's progress
-        cache_key_str = cache_key("user", current_user.id, "progress", book_id)
-        await cache_manager.delete(cache_key_str)
-
-        # Also invalidate user's book list cache (progress affects book list)
-        await cache_manager.delete_pattern(f"user:{current_user.id}:books:*")
+        # Обновляем прогресс чтения (сервис проверяет, что книга принадлежит пользователю)
+        try:
+            progress = await book_progress_service.update_reading_progress(
+                db=db,
+                user_id=current_user.id,
+                book_id=book_id,
+                chapter_number=current_chapter,
+                position_percent=position_percent,
+                reading_location_cfi=reading_location_cfi,
+                scroll_offset_percent=scroll_offset_percent,
+            )
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Book not found")
 
-        # FIX: Invalidate book metadata cache (BookPage displays progress from here)
-        book_cache_key = cache_key("book", book_id, "metadata")
-        await cache_manager.delete(book_cache_key)
+        # С write-behind буфером кэши инвалидируются при сбросе в БД
+        if book_progress_service.progress_buffer is None:
+            await invalidate_progress_caches([(current_user.id, book_id)])
 
         return {
             "progress": {
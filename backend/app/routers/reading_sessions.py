@@ -25,6 +25,7 @@ from ..models.book import Book
 from ..core.exceptions import BookNotFoundException
 from ..services.reading_session_cache import reading_session_cache
 from ..services.reading_session_service import reading_session_service
+from ..services.user_statistics_service import UserStatisticsService
 
 
 router = APIRouter()
@@ -318,6 +319,7 @@ async def start_reading_session(
                 end_position=active_session.start_position,  # Не было прогресса
                 ended_at=datetime.now(timezone.utc),
             )
+            await UserStatisticsService.record_longest_streak(db, current_user.id)
             await db.commit()
 
         # Создаем новую сессию
@@ -506,6 +508,9 @@ async def end_reading_session(
         except ValueError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+        # Рекорд streak обновляется здесь, а не при чтении статистики
+        await UserStatisticsService.record_longest_streak(db, current_user.id)
+
         await db.commit()
         await db.refresh(session)
 
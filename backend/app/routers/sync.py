@@ -98,16 +98,16 @@ async def get_user_from_token(
         return None
 
     try:
-        # Check if token is blacklisted
-        if await token_blacklist.is_blacklisted(token):
-            logger.warning("Sync request with blacklisted token")
-            return None
-
         # Verify token
         payload = auth_service.verify_token(token, "access")
         if payload is None:
             return None
 
+        # Check if token is blacklisted
+        if await token_blacklist.is_blacklisted(token, payload):
+            logger.warning("Sync request with blacklisted token")
+            return None
+
         # Get user ID
         user_id_str = payload.get("sub")
         if user_id_str is None:
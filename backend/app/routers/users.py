@@ -144,12 +144,25 @@ async def get_user_profile(
     )
 
     # Создаем response objects
-    user_response = UserResponse.model_validate(current_user)
-
     subscription_response = None
     if subscription:
         subscription_response = SubscriptionResponse.model_validate(subscription)
 
+    # Связь current_user.subscription не загружена (lazy="raise") -
+    # подписка передаётся явно
+    user_response = UserResponse(
+        id=current_user.id,
+        email=current_user.email,
+        full_name=current_user.full_name,
+        is_active=current_user.is_active,
+        is_verified=current_user.is_verified,
+        is_admin=current_user.is_admin,
+        created_at=current_user.created_at,
+        updated_at=current_user.updated_at,
+        last_login=current_user.last_login,
+        subscription=subscription_response,
+    )
+
     statistics = UserStatistics(
         total_books=total_books,
         total_descriptions=total_descriptions,
@@ -228,6 +228,9 @@ class BookListResponse(BaseModel):
     total: int = Field(ge=0)
     skip: int = Field(ge=0)
     limit: int = Field(ge=1, le=100)
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы (keyset пагинация)"
+    )
 
 
 class BookUploadResponse(BaseModel):
@@ -6,15 +6,16 @@
 
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from uuid import UUID
+from uuid import UUID, uuid4
 from jose import JWTError, jwt
-import bcrypt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
 from ..models.user import User, Subscription, SubscriptionPlan, SubscriptionStatus
 from ..core.config import settings
+from .password_hasher import hash_password, password_hasher, verify_password
+from .principal_cache import principal_cache
 
 
 class AuthService:
@@ -29,7 +30,7 @@ class AuthService:
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """
-        Проверяет пароль против хеша.
+        Проверяет пароль против хеша (синхронно, блокирует поток).
 
         Args:
             plain_password: Пароль в открытом виде
@@ -38,13 +39,11 @@ class AuthService:
         Returns:
             True если пароль верный
         """
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-        )
+        return verify_password(plain_password, hashed_password)
 
     def get_password_hash(self, password: str) -> str:
         """
-        Создает хеш пароля.
+        Создает хеш пароля (синхронно, блокирует поток).
 
         Args:
             password: Пароль в открытом виде
@@ -56,19 +55,27 @@ class AuthService:
             Bcrypt has a 72-byte limitation. If password exceeds this when
             encoded as UTF-8, it will be truncated to 72 bytes.
         """
-        # Bcrypt limitation: maximum 72 bytes
-        # Truncate password to 72 bytes if needed (this should be prevented by validation)
-        password_bytes = password.encode("utf-8")
-        if len(password_bytes) > 72:
-            # Truncate to 72 bytes, but ensure we don't cut in the middle of a multi-byte character
-            password_bytes = password_bytes[:72]
+        return hash_password(password)
 
-        # Generate salt and hash password
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password_bytes, salt)
+    async def verify_password_async(
+        self, plain_password: str, hashed_password: str
+    ) -> bool:
+        """
+        Проверяет пароль в пуле хеширования, не блокируя event loop.
 
-        # Return as string (bcrypt returns bytes)
-        return hashed.decode("utf-8")
+        Raises:
+            PasswordHasherBusyError: Очередь хеширования заполнена
+        """
+        return await password_hasher.verify(plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        """
+        Создает хеш пароля в пуле хеширования, не блокируя event loop.
+
+        Raises:
+            PasswordHasherBusyError: Очередь хеширования заполнена
+        """
+        return await password_hasher.hash(password)
 
     def create_access_token(self, data: Dict[str, Any]) -> str:
         """
@@ -84,7 +91,8 @@ class AuthService:
         expire = datetime.now(timezone.utc) + timedelta(
             minutes=self.access_token_expire_minutes
         )
-        to_encode.update({"exp": expire, "type": "access"})
+        # jti - ключ кэша пользователя (principal_cache) для этого токена
+        to_encode.update({"exp": expire, "type": "access", "jti": uuid4().hex})
         return jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
 
     def create_refresh_token(self, data: Dict[str, Any]) -> str:
@@ -101,7 +109,7 @@ class AuthService:
         expire = datetime.now(timezone.utc) + timedelta(
             days=self.refresh_token_expire_days
         )
-        to_encode.update({"exp": expire, "type": "refresh"})
+        to_encode.update({"exp": expire, "type": "refresh", "jti": uuid4().hex})
         return jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
 
     def verify_token(
@@ -161,7 +169,7 @@ class AuthService:
             raise ValueError("User with this email already exists")
 
         # Создаем нового пользователя
-        hashed_password = self.get_password_hash(password)
+        hashed_password = await self.get_password_hash_async(password)
         user = User(
             email=email,
             password_hash=hashed_password,
@@ -212,7 +220,7 @@ class AuthService:
         if not user:
             return None
 
-        if not self.verify_password(password, user.password_hash):
+        if not await self.verify_password_async(password, user.password_hash):
             return None
 
         if not user.is_active:
@@ -221,6 +229,7 @@ class AuthService:
         # Обновляем время последнего входа
         user.last_login = datetime.now(timezone.utc)
         await db.commit()
+        await principal_cache.invalidate_user(user.id)
 
         # CRITICAL FIX: Refresh user object to ensure all server-default fields
         # (created_at, updated_at) are loaded from database after commit
@@ -322,6 +331,9 @@ class AuthService:
         """
         Обновляет профиль пользователя.
 
+        Пользователь перечитывается из БД: current_user может быть снимком
+        из principal_cache без password_hash.
+
         Args:
             db: Сессия базы данных
             user_id: ID пользователя
@@ -342,11 +354,12 @@ class AuthService:
 
         # Обновляем пароль если предоставлено
         if new_password and current_password:
-            if not self.verify_password(current_password, user.password_hash):
+            if not await self.verify_password_async(current_password, user.password_hash):
                 return False
-            user.password_hash = self.get_password_hash(new_password)
+            user.password_hash = await self.get_password_hash_async(new_password)
 
         await db.commit()
+        await principal_cache.invalidate_user(user_id)
         return True
 
     async def deactivate_user(self, db: AsyncSession, user_id: UUID) -> bool:
@@ -366,6 +379,7 @@ class AuthService:
 
         user.is_active = False
         await db.commit()
+        await principal_cache.invalidate_user(user_id)
         return True
 
 
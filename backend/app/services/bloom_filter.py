@@ -0,0 +1,62 @@
+"""
+Bloom filter - вероятностное множество без ложноотрицательных ответов.
+
+Используется индексом отзыва токенов (token_blacklist.py): отрицательный
+ответ фильтра окончателен и не требует похода в Redis, положительный -
+подтверждается в Redis. Удаление не поддерживается; устаревшие элементы
+убирает периодическая перестройка фильтра.
+
+Позиции битов - double hashing по SHA-256 элемента (Kirsch-Mitzenmacher).
+"""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Bloom filter на bytearray с заданной вероятностью ложноположительных."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Args:
+            capacity: Ожидаемое количество элементов
+            error_rate: Вероятность ложноположительного ответа при capacity элементов
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        """Добавляет элемент."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def is_saturated(self) -> bool:
+        """Добавлено больше элементов, чем рассчитан фильтр."""
+        return self.count > self.capacity
@@ -6,6 +6,9 @@
 - BookProgressService: Прогресс чтения и расчеты
 - BookStatisticsService: Статистика и аналитика
 - BookParsingService: NLP парсинг и обработка описаний
+- BookStorageService: Потоковое сохранение файлов книг на диск
+- BookDeduplicationService: Переиспользование парсинга по content hash
+- ReadingProgressBuffer: Write-behind буфер прогресса чтения
 
 Каждый сервис имеет одну четко определенную ответственность и может быть
 протестирован и использован независимо от других.
@@ -24,10 +27,13 @@ Example usage:
     >>> stats = await book_statistics_service.get_book_statistics(db, user_id)
 """
 
-from .book_service import BookService, book_service
+from .book_service import BookService, book_service, chapters_without_body
 from .book_progress_service import BookProgressService, book_progress_service
 from .book_statistics_service import BookStatisticsService, book_statistics_service
 from .book_parsing_service import BookParsingService, book_parsing_service
+from .book_storage_service import BookStorageService, book_storage_service
+from .book_dedup_service import BookDeduplicationService, book_dedup_service
+from .progress_buffer import ReadingProgressBuffer, reading_progress_buffer
 
 __all__ = [
     # Classes
@@ -35,9 +41,17 @@ __all__ = [
     "BookProgressService",
     "BookStatisticsService",
     "BookParsingService",
+    "BookStorageService",
+    "BookDeduplicationService",
+    "ReadingProgressBuffer",
     # Singleton instances (for backward compatibility)
     "book_service",
     "book_progress_service",
     "book_statistics_service",
     "book_parsing_service",
+    "book_storage_service",
+    "book_dedup_service",
+    "reading_progress_buffer",
+    # Loader options
+    "chapters_without_body",
 ]
@@ -0,0 +1,325 @@
+"""
+Сервис дедупликации книг и глав по content hash.
+
+Ответственности:
+- Поиск уже распарсенной книги с тем же SHA-256 файла
+- Копирование глав и описаний найденной книги новому владельцу
+- Переиспользование описаний главы с тем же SHA-256 текста (без LLM)
+- Учёт hit rate (Prometheus content_dedup_lookups_total + get_stats())
+
+Single Responsibility Principle:
+Сервис отвечает ТОЛЬКО за переиспользование результатов парсинга.
+
+Copy-on-write per user: строки Chapter/Description копируются в книгу
+пользователя внутри БД, поэтому перепарсинг главы одним пользователем
+(extract_new=True) не затрагивает копии других пользователей.
+"""
+
+import asyncio
+import hashlib
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select, insert, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...models.book import Book, ReadingProgress
+from ...models.chapter import Chapter
+from ...models.description import Description
+from ...monitoring.metrics import record_dedup_lookup
+from ...core.logging import logger
+
+
+# Колонки, копируемые из исходной главы
+_CHAPTER_COPY_COLUMNS = (
+    "chapter_number",
+    "title",
+    "content",
+    "html_content",
+    "content_hash",
+    "word_count",
+    "estimated_reading_time",
+    "is_description_parsed",
+    "descriptions_found",
+    "parsing_progress",
+    "is_service_page",
+    "parsed_at",
+)
+
+# Колонки, копируемые из исходного описания (статус генерации - per user)
+_DESCRIPTION_COPY_COLUMNS = (
+    "type",
+    "content",
+    "context",
+    "confidence_score",
+    "position_in_chapter",
+    "word_count",
+    "is_suitable_for_generation",
+    "priority_score",
+    "entities_mentioned",
+    "emotional_tone",
+    "complexity_level",
+)
+
+
+def compute_content_hash(text: str) -> str:
+    """
+    Вычисляет SHA-256 текста главы.
+
+    Совпадает с SQL backfill: encode(sha256(convert_to(content, 'UTF8')), 'hex').
+    """
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class BookDeduplicationService:
+    """Сервис переиспользования результатов парсинга по content hash."""
+
+    def __init__(self):
+        """Инициализация сервиса дедупликации."""
+        self._stats = {
+            "book_hits": 0,
+            "book_misses": 0,
+            "chapter_hits": 0,
+            "chapter_misses": 0,
+        }
+
+    def _record(self, kind: str, hit: bool) -> None:
+        """Учитывает результат поиска в статистике и Prometheus."""
+        self._stats[f"{kind}_{'hits' if hit else 'misses'}"] += 1
+        record_dedup_lookup(kind, hit)
+
+    async def find_parsed_book(
+        self, db: AsyncSession, content_hash: str
+    ) -> Optional[Book]:
+        """
+        Ищет книгу с тем же файлом, у которой уже есть главы.
+
+        Предпочитает полностью обработанные книги (is_parsed=True).
+
+        Args:
+            db: Сессия базы данных
+            content_hash: SHA-256 загруженного файла
+
+        Returns:
+            Исходная книга или None
+        """
+        has_chapters = exists().where(Chapter.book_id == Book.id)
+        result = await db.execute(
+            select(Book)
+            .where(
+                Book.content_hash == content_hash,
+                Book.parsing_error.is_(None),
+                has_chapters,
+            )
+            .order_by(Book.is_parsed.desc(), Book.created_at.asc())
+            .limit(1)
+        )
+        source = result.scalar_one_or_none()
+        self._record("book", source is not None)
+        return source
+
+    async def clone_book_for_user(
+        self,
+        db: AsyncSession,
+        source: Book,
+        user_id: UUID,
+        file_path: str,
+        file_size: int,
+        covers_directory: Optional[Path] = None,
+    ) -> Book:
+        """
+        Создаёт книгу пользователя из уже распарсенной книги без парсинга.
+
+        Главы и описания копируются одним INSERT на таблицу.
+
+        Args:
+            db: Сессия базы данных
+            source: Исходная книга (find_parsed_book)
+            user_id: ID нового владельца
+            file_path: Путь к файлу книги (content-addressed, общий)
+            file_size: Размер файла
+            covers_directory: Директория обложек (по умолчанию UPLOAD_DIRECTORY/covers)
+
+        Returns:
+            Созданный объект Book
+        """
+        book = Book(
+            user_id=user_id,
+            title=source.title,
+            author=source.author,
+            genre=source.genre,
+            language=source.language,
+            file_path=file_path,
+            file_format=source.file_format,
+            file_size=file_size,
+            content_hash=source.content_hash,
+            description=source.description,
+            book_metadata=source.book_metadata,
+            total_pages=source.total_pages,
+            estimated_reading_time=source.estimated_reading_time,
+            # Если исходная книга полностью обработана - копия сразу готова
+            is_parsed=source.is_parsed,
+            is_processing=not source.is_parsed,
+            parsing_progress=100 if source.is_parsed else 0,
+        )
+        db.add(book)
+        await db.flush()
+
+        # Обложка удаляется вместе с книгой - у копии своя
+        if source.cover_image and Path(source.cover_image).exists():
+            book.cover_image = await self._copy_cover(
+                source.cover_image, book.id, covers_directory
+            )
+
+        chapter_id_map = await self._copy_chapters(db, source.id, book.id)
+        book.total_chapters = len(chapter_id_map)
+        descriptions_copied = await self._copy_descriptions(db, chapter_id_map)
+
+        db.add(
+            ReadingProgress(
+                user_id=user_id,
+                book_id=book.id,
+                current_chapter=1,
+                current_page=1,
+                current_position=0,
+            )
+        )
+
+        await db.commit()
+
+        logger.info(
+            "Book reused from duplicate upload",
+            source_book_id=str(source.id),
+            book_id=str(book.id),
+            chapters=len(chapter_id_map),
+            descriptions=descriptions_copied,
+        )
+        return book
+
+    async def reuse_chapter_descriptions(
+        self, db: AsyncSession, chapter: Chapter
+    ) -> Optional[int]:
+        """
+        Копирует описания из уже обработанной главы с тем же текстом.
+
+        Коммит выполняет вызывающий код.
+
+        Args:
+            db: Сессия базы данных
+            chapter: Глава, для которой нужны описания
+
+        Returns:
+            Количество скопированных описаний или None, если дубликата нет
+        """
+        if not chapter.content_hash:
+            chapter.content_hash = compute_content_hash(chapter.content)
+
+        result = await db.execute(
+            select(Chapter.id, Chapter.descriptions_found)
+            .where(
+                Chapter.content_hash == chapter.content_hash,
+                Chapter.id != chapter.id,
+                Chapter.is_description_parsed.is_(True),
+            )
+            .order_by(Chapter.parsed_at.desc())
+            .limit(1)
+        )
+        source = result.first()
+        self._record("chapter", source is not None)
+
+        if source is None:
+            return None
+
+        copied = await self._copy_descriptions(db, {source.id: chapter.id})
+
+        chapter.descriptions_found = copied
+        chapter.is_description_parsed = True
+        chapter.parsing_progress = 100
+
+        logger.debug(
+            "Chapter descriptions reused",
+            chapter_id=str(chapter.id),
+            source_chapter_id=str(source.id),
+            descriptions=copied,
+        )
+        return copied
+
+    @staticmethod
+    async def _copy_cover(
+        cover_image: str, book_id: UUID, covers_directory: Optional[Path]
+    ) -> str:
+        """Копирует файл обложки под ID новой книги."""
+        if covers_directory is None:
+            from ...core.config import settings
+
+            covers_directory = Path(settings.UPLOAD_DIRECTORY) / "covers"
+
+        covers_directory.mkdir(parents=True, exist_ok=True)
+        cover_path = covers_directory / f"{book_id}{Path(cover_image).suffix}"
+        await asyncio.to_thread(shutil.copyfile, cover_image, cover_path)
+        return str(cover_path)
+
+    async def _copy_chapters(
+        self, db: AsyncSession, source_book_id: UUID, target_book_id: UUID
+    ) -> Dict[UUID, UUID]:
+        """Копирует главы книги, возвращает маппинг old_id -> new_id."""
+        columns = [getattr(Chapter, name) for name in _CHAPTER_COPY_COLUMNS]
+        result = await db.execute(
+            select(Chapter.id, *columns)
+            .where(Chapter.book_id == source_book_id)
+            .order_by(Chapter.chapter_number)
+        )
+
+        id_map: Dict[UUID, UUID] = {}
+        rows = []
+        for row in result:
+            new_id = uuid.uuid4()
+            id_map[row.id] = new_id
+            values = {name: getattr(row, name) for name in _CHAPTER_COPY_COLUMNS}
+            values.update(id=new_id, book_id=target_book_id)
+            rows.append(values)
+
+        if rows:
+            await db.execute(insert(Chapter), rows)
+        return id_map
+
+    async def _copy_descriptions(
+        self, db: AsyncSession, chapter_id_map: Dict[UUID, UUID]
+    ) -> int:
+        """Копирует описания глав по маппингу old_chapter_id -> new_chapter_id."""
+        if not chapter_id_map:
+            return 0
+
+        columns = [getattr(Description, name) for name in _DESCRIPTION_COPY_COLUMNS]
+        result = await db.execute(
+            select(Description.chapter_id, *columns)
+            .where(Description.chapter_id.in_(list(chapter_id_map.keys())))
+            .order_by(Description.chapter_id, Description.position_in_chapter)
+        )
+
+        rows = []
+        for row in result:
+            values = {name: getattr(row, name) for name in _DESCRIPTION_COPY_COLUMNS}
+            values.update(id=uuid.uuid4(), chapter_id=chapter_id_map[row.chapter_id])
+            rows.append(values)
+
+        if rows:
+            await db.execute(insert(Description), rows)
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику hit rate (в пределах процесса)."""
+        stats: Dict[str, Any] = dict(self._stats)
+        for kind in ("book", "chapter"):
+            lookups = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_rate"] = (
+                round(stats[f"{kind}_hits"] / lookups, 3) if lookups else 0.0
+            )
+        return stats
+
+
+# Глобальный экземпляр сервиса (для обратной совместимости)
+book_dedup_service = BookDeduplicationService()
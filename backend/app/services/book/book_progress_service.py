@@ -3,8 +3,9 @@
 
 Ответственности:
 - Получение книг с предрасчитанным прогрессом
+- Страница библиотеки одним запросом (keyset пагинация)
 - Расчет прогресса чтения (CFI и legacy режимы)
-- Обновление прогресса чтения
+- Обновление прогресса чтения (напрямую или через write-behind буфер)
 - Валидация данных прогресса
 
 Single Responsibility Principle:
@@ -12,29 +13,120 @@ Single Responsibility Principle:
 Все остальные операции с книгами делегируются BookService.
 """
 
-from typing import List, Optional, Tuple, TYPE_CHECKING
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
 from uuid import UUID
 from datetime import datetime, timezone
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func, text, tuple_
 
 from ...models.book import Book, ReadingProgress
 from ...models.chapter import Chapter
+from ...core.config import settings
+from ...core.logging import logger
+from .progress_buffer import (
+    BufferedProgress,
+    ReadingProgressBuffer,
+    invalidate_progress_caches,
+    reading_progress_buffer,
+    write_progress_rows,
+)
 
 if TYPE_CHECKING:
     from .book_service import BookService
 
 
+# Ключи сортировки библиотеки: sort_by -> (выражение, по убыванию).
+# Выражения совпадают с индексами idx_books_user_* (models/book.py).
+LIBRARY_SORT_KEYS = {
+    "created_desc": (Book.created_at, True),
+    "created_asc": (Book.created_at, False),
+    "title_asc": (Book.title, False),
+    "title_desc": (Book.title, True),
+    "author_asc": (func.coalesce(Book.author, text("''")), False),
+    "author_desc": (func.coalesce(Book.author, text("''")), True),
+    "accessed_desc": (func.coalesce(Book.last_accessed, Book.created_at), True),
+}
+
+# Колонки книги, нужные списку библиотеки (без book_metadata, file_path и т.п.)
+LIBRARY_COLUMNS = (
+    Book.id,
+    Book.title,
+    Book.author,
+    Book.genre,
+    Book.language,
+    Book.description,
+    Book.cover_image,
+    Book.file_format,
+    Book.file_size,
+    Book.total_pages,
+    Book.estimated_reading_time,
+    Book.total_chapters,
+    Book.is_parsed,
+    Book.parsing_progress,
+    Book.is_processing,
+    Book.created_at,
+    Book.last_accessed,
+)
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагинации повреждён или выдан для другой сортировки."""
+
+
+def encode_library_cursor(sort_by: str, sort_value: Any, book_id: UUID) -> str:
+    """Кодирует позицию последней книги страницы в непрозрачный курсор."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_by, sort_value, str(book_id)], ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_library_cursor(cursor: str, sort_by: str) -> Tuple[Any, UUID]:
+    """
+    Декодирует курсор библиотеки.
+
+    Raises:
+        InvalidCursorError: Если курсор некорректен или сортировка другая
+    """
+    try:
+        cursor_sort, sort_value, book_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        book_uuid = UUID(book_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}") from e
+
+    if cursor_sort != sort_by:
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+
+    if sort_by.startswith(("created", "accessed")):
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursorError(f"Invalid cursor: {e}") from e
+    return sort_value, book_uuid
+
+
 class BookProgressService:
     """Сервис для работы с прогрессом чтения книг."""
 
-    def __init__(self, book_service: Optional["BookService"] = None):
+    def __init__(
+        self,
+        book_service: Optional["BookService"] = None,
+        progress_buffer: Optional[ReadingProgressBuffer] = None,
+    ):
         """
         Инициализация сервиса прогресса.
 
         Args:
             book_service: Опциональная зависимость от BookService (Dependency Injection)
+            progress_buffer: Write-behind буфер прогресса (None - запись сразу в БД)
         """
+        self.progress_buffer = progress_buffer
+
         # Lazy import для избежания circular dependency
         if book_service is None:
             from .book_service import book_service as default_service
@@ -80,6 +172,148 @@ class BookProgressService:
 
         return books_with_progress
 
+    async def get_library_page(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        limit: int = 50,
+        sort_by: str = "created_desc",
+        cursor: Optional[str] = None,
+        skip: int = 0,
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        Получает страницу библиотеки одним узким запросом.
+
+        Количество глав и прогресс берутся из денормализованных колонок
+        (Book.total_chapters, ReadingProgress.progress_percent) - главы и
+        прогресс не загружаются. С курсором используется keyset пагинация
+        по индексу (user_id, <ключ сортировки>, id), без курсора - offset
+        (обратная совместимость со skip). Прогресс, ещё не сброшенный из
+        write-behind буфера, подмешивает merge_buffered_library_progress.
+
+        Args:
+            db: Сессия базы данных
+            user_id: ID пользователя
+            limit: Размер страницы
+            sort_by: Тип сортировки (ключ LIBRARY_SORT_KEYS)
+            cursor: next_cursor предыдущей страницы
+            skip: Offset, если курсор не передан
+
+        Returns:
+            Кортеж (строки LIBRARY_COLUMNS + reading_progress_percent, next_cursor)
+
+        Raises:
+            InvalidCursorError: Если курсор некорректен
+        """
+        if sort_by not in LIBRARY_SORT_KEYS:
+            sort_by = "created_desc"
+        sort_expr, descending = LIBRARY_SORT_KEYS[sort_by]
+
+        progress_percent = (
+            select(ReadingProgress.progress_percent)
+            .where(
+                ReadingProgress.book_id == Book.id,
+                ReadingProgress.user_id == user_id,
+            )
+            .order_by(ReadingProgress.last_read_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        query = (
+            select(
+                *LIBRARY_COLUMNS,
+                sort_expr.label("sort_value"),
+                func.coalesce(progress_percent, 0.0).label("reading_progress_percent"),
+            )
+            .where(Book.user_id == user_id)
+            .limit(limit + 1)
+        )
+
+        if descending:
+            query = query.order_by(sort_expr.desc(), Book.id.desc())
+        else:
+            query = query.order_by(sort_expr.asc(), Book.id.asc())
+
+        if cursor:
+            sort_value, last_id = decode_library_cursor(cursor, sort_by)
+            position = tuple_(sort_expr, Book.id)
+            query = query.where(
+                position < (sort_value, last_id)
+                if descending
+                else position > (sort_value, last_id)
+            )
+        elif skip:
+            query = query.offset(skip)
+
+        rows = list((await db.execute(query)).all())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_library_cursor(sort_by, last.sort_value, last.id)
+
+        return rows, next_cursor
+
+    @staticmethod
+    def compute_progress_percent(
+        current_chapter: int,
+        current_position: float,
+        reading_location_cfi: Optional[str],
+        total_chapters: int,
+    ) -> float:
+        """
+        Вычисляет общий прогресс по книге (0.0-100.0).
+
+        CFI mode (epub.js): current_position уже общий процент по книге.
+        Legacy mode: завершённые главы + процент внутри текущей главы.
+        """
+        current_position = max(0.0, min(100.0, float(current_position or 0.0)))
+
+        if reading_location_cfi:
+            return current_position
+
+        if not total_chapters:
+            return 0.0
+
+        current_chapter = max(1, min(current_chapter or 1, total_chapters))
+        completed_chapters_progress = ((current_chapter - 1) / total_chapters) * 100
+        current_chapter_progress = (current_position / 100) * (100 / total_chapters)
+
+        return min(100.0, max(0.0, completed_chapters_progress + current_chapter_progress))
+
+    @staticmethod
+    def is_suspicious_regression(existing_position: float, new_position: float) -> bool:
+        """
+        Похож ли откат позиции на баг гонки на фронтенде.
+
+        SMART REGRESSION PROTECTION (2026-01-06)
+
+        Problem: Race condition bug could save ~0% progress, overwriting real progress.
+        But users legitimately navigate backward (re-read chapters, TOC jumps).
+
+        Solution: Block ONLY the classic bug pattern - dropping to near-zero.
+
+        BLOCKED (suspicious - race condition bug):
+        - existing > 5% AND new < 2% (dropping to first page from real progress)
+
+        ALLOWED (all legitimate navigation):
+        - 50% → 5% (TOC jump to earlier chapter)
+        - 50% → 40% (re-reading previous section)
+        - 20% → 10% (going back several pages)
+        - 10% → 3% (backward navigation with some progress)
+
+        Why this works: The race condition bug specifically shows the FIRST PAGE
+        (position ~0-1%), not a random earlier position. TOC jumps and backward
+        navigation will have position > 2% because chapters start after the cover.
+        """
+        return (
+            new_position < existing_position
+            and existing_position > 5.0
+            and new_position < 2.0
+        )
+
     def calculate_reading_progress(self, book: Book, user_id: UUID) -> float:
         """
         Вычисляет прогресс чтения используя уже загруженные relationships.
@@ -114,38 +348,15 @@ class BookProgressService:
             if not progress:
                 return 0.0
 
-            # НОВАЯ ЛОГИКА: Если есть CFI - это EPUB reader с точным процентом
-            if progress.reading_location_cfi:
-                # current_position уже содержит общий процент по всей книге (0-100)
-                current_position = max(
-                    0.0, min(100.0, float(progress.current_position))
-                )
-                return current_position
-
-            # СТАРАЯ ЛОГИКА: Для обратной совместимости со старыми данными без CFI
             # Используем уже загруженные chapters (NO QUERY!)
             total_chapters = len(book.chapters) if book.chapters else 0
 
-            if not total_chapters or total_chapters == 0:
-                return 0.0
-
-            # Валидация данных
-            current_chapter = max(1, min(progress.current_chapter, total_chapters))
-            current_position = max(0.0, min(100.0, float(progress.current_position)))
-
-            # Если читает главу за пределами книги, возвращаем 100%
-            if current_chapter > total_chapters:
-                return 100.0
-
-            # Расчет прогресса:
-            # - Завершенные главы: (current_chapter - 1) глав
-            # - Текущая глава: current_position% от 1/total_chapters
-            completed_chapters_progress = ((current_chapter - 1) / total_chapters) * 100
-            current_chapter_progress = (current_position / 100) * (100 / total_chapters)
-
-            total_progress = completed_chapters_progress + current_chapter_progress
-
-            return min(100.0, max(0.0, total_progress))
+            return self.compute_progress_percent(
+                progress.current_chapter,
+                progress.current_position,
+                progress.reading_location_cfi,
+                total_chapters,
+            )
         except Exception as e:
             # В случае любой ошибки возвращаем 0
             print(f"⚠️ Error calculating reading progress: {e}")
@@ -160,10 +371,14 @@ class BookProgressService:
         position_percent: float = 0.0,
         reading_location_cfi: str = None,
         scroll_offset_percent: float = 0.0,
-    ) -> ReadingProgress:
+    ) -> Union[ReadingProgress, BufferedProgress]:
         """
         Обновляет прогресс чтения книги пользователем.
 
+        С write-behind буфером обновление сохраняется в буфер и попадает в
+        БД при ближайшем сбросе; возвращается BufferedProgress с теми же
+        атрибутами, что и ReadingProgress.
+
         CRITICAL FIX (2026-01-06): Added regression protection to prevent
         accidental progress reset to 0% due to frontend race conditions.
 
@@ -177,31 +392,36 @@ class BookProgressService:
             scroll_offset_percent: Точный процент скролла внутри страницы (0.0-100.0)
 
         Returns:
-            Объект ReadingProgress
+            Объект ReadingProgress (или BufferedProgress в режиме буфера)
 
         Raises:
-            ValueError: Если книга не найдена
+            ValueError: Если книга не найдена или принадлежит другому пользователю
         """
-        # Получаем книгу для валидации
-        book_result = await db.execute(select(Book).where(Book.id == book_id))
+        if self.progress_buffer is not None:
+            return await self._update_buffered_progress(
+                db,
+                user_id,
+                book_id,
+                chapter_number,
+                position_percent,
+                reading_location_cfi,
+                scroll_offset_percent,
+            )
+
+        # Получаем книгу для валидации (только книги пользователя)
+        book_result = await db.execute(
+            select(Book).where(Book.id == book_id, Book.user_id == user_id)
+        )
         book = book_result.scalar_one_or_none()
         if not book:
             raise ValueError(f"Book with id {book_id} not found")
 
-        # Загружаем главы для валидации номера главы
-        chapters_result = await db.execute(
-            select(Chapter).where(Chapter.book_id == book_id)
-        )
-        chapters = chapters_result.scalars().all()
-        total_chapters = len(chapters)
+        # Количество глав для валидации номера главы (без загрузки глав)
+        total_chapters = book.total_chapters or await self._count_chapters(db, book_id)
 
-        # Валидируем и нормализуем входные данные
-        valid_chapter = (
-            max(1, min(chapter_number or 1, total_chapters))
-            if total_chapters > 0
-            else 1
+        valid_chapter, valid_position = self._normalize_position(
+            chapter_number, position_percent, total_chapters
         )
-        valid_position = max(0.0, min(100.0, float(position_percent or 0.0)))
 
         # Для обратной совместимости сохраняем current_page = 1
         # (в будущем можно убрать это поле из модели)
@@ -218,6 +438,10 @@ class BookProgressService:
         )
         progress = result.scalar_one_or_none()
 
+        progress_percent = self.compute_progress_percent(
+            valid_chapter, valid_position, reading_location_cfi, total_chapters
+        )
+
         if not progress:
             # Создаем новый прогресс
             progress = ReadingProgress(
@@ -228,49 +452,23 @@ class BookProgressService:
                 current_position=valid_position,  # Теперь хранит процент 0-100
                 reading_location_cfi=reading_location_cfi,  # CFI для epub.js
                 scroll_offset_percent=scroll_offset_percent,  # Точный скролл внутри страницы
+                progress_percent=progress_percent,
             )
             db.add(progress)
         else:
-            # SMART REGRESSION PROTECTION (2026-01-06)
-            #
-            # Problem: Race condition bug could save ~0% progress, overwriting real progress.
-            # But users legitimately navigate backward (re-read chapters, TOC jumps).
-            #
-            # Solution: Block ONLY the classic bug pattern - dropping to near-zero.
-            #
-            # BLOCKED (suspicious - race condition bug):
-            # - existing > 5% AND new < 2% (dropping to first page from real progress)
-            #
-            # ALLOWED (all legitimate navigation):
-            # - 50% → 5% (TOC jump to earlier chapter)
-            # - 50% → 40% (re-reading previous section)
-            # - 20% → 10% (going back several pages)
-            # - 10% → 3% (backward navigation with some progress)
-            #
-            # Why this works: The race condition bug specifically shows the FIRST PAGE
-            # (position ~0-1%), not a random earlier position. TOC jumps and backward
-            # navigation will have position > 2% because chapters start after the cover.
             existing_position = float(progress.current_position or 0.0)
 
-            # Check if this is a suspicious regression
-            if valid_position < existing_position:
-                # Only block: dropping to near-zero from significant progress
-                # This is the specific pattern of the race condition bug
-                is_suspicious = existing_position > 5.0 and valid_position < 2.0
-
-                if is_suspicious:
-                    print(
-                        f"📌 [PROGRESS PROTECTION] Blocking suspicious near-zero drop: "
-                        f"book_id={book_id}, user_id={user_id}, "
-                        f"existing={existing_position:.1f}% → new={valid_position:.1f}%"
-                    )
-                    # Still update CFI and timestamp for position tracking
-                    if reading_location_cfi:
-                        progress.reading_location_cfi = reading_location_cfi
-                    progress.scroll_offset_percent = scroll_offset_percent
-                    progress.last_read_at = datetime.now(timezone.utc)
-                    await db.commit()
-                    return progress
+            if self.is_suspicious_regression(existing_position, valid_position):
+                self._log_blocked_regression(
+                    book_id, user_id, existing_position, valid_position
+                )
+                # Still update CFI and timestamp for position tracking
+                if reading_location_cfi:
+                    progress.reading_location_cfi = reading_location_cfi
+                progress.scroll_offset_percent = scroll_offset_percent
+                progress.last_read_at = datetime.now(timezone.utc)
+                await db.commit()
+                return progress
 
             # Обновляем существующий
             progress.current_chapter = valid_chapter
@@ -280,16 +478,195 @@ class BookProgressService:
             progress.scroll_offset_percent = (
                 scroll_offset_percent  # Точный скролл внутри страницы
             )
+            progress.progress_percent = progress_percent
             progress.last_read_at = datetime.now(timezone.utc)
 
         # Обновляем время последнего доступа к книге
-        book_result = await db.execute(select(Book).where(Book.id == book_id))
-        book = book_result.scalar_one()
         book.last_accessed = datetime.now(timezone.utc)
 
         await db.commit()
         return progress
 
+    async def _update_buffered_progress(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        book_id: UUID,
+        chapter_number: int,
+        position_percent: float,
+        reading_location_cfi: Optional[str],
+        scroll_offset_percent: float,
+    ) -> BufferedProgress:
+        """
+        Обновляет прогресс в write-behind буфере.
+
+        Повторные обновления той же книги не обращаются к БД: количество
+        глав и базовое состояние берутся из записи буфера. Первое
+        обновление читает книгу (id, total_chapters) и строку прогресса.
+        Если буфер недоступен, запись сразу пишется upsert'ом.
+        """
+        entry = await self.progress_buffer.get(user_id, book_id)
+        if entry is None:
+            entry = await self._load_progress_baseline(db, user_id, book_id)
+
+        valid_chapter, valid_position = self._normalize_position(
+            chapter_number, position_percent, entry.total_chapters
+        )
+        now = datetime.now(timezone.utc)
+
+        if self.is_suspicious_regression(float(entry.current_position), valid_position):
+            self._log_blocked_regression(
+                book_id, user_id, float(entry.current_position), valid_position
+            )
+            if reading_location_cfi:
+                entry.reading_location_cfi = reading_location_cfi
+        else:
+            entry.current_chapter = valid_chapter
+            entry.current_page = 1
+            # Колонка current_position целочисленная - округляем как при записи в БД
+            entry.current_position = int(round(valid_position))
+            entry.reading_location_cfi = reading_location_cfi
+            entry.progress_percent = self.compute_progress_percent(
+                valid_chapter, valid_position, reading_location_cfi, entry.total_chapters
+            )
+
+        entry.scroll_offset_percent = scroll_offset_percent
+        entry.last_read_at = now
+        entry.updated_at = now
+
+        if not await self.progress_buffer.put(entry):
+            await write_progress_rows(db, [entry])
+            await db.commit()
+            await invalidate_progress_caches([(user_id, book_id)])
+
+        return entry
+
+    async def _load_progress_baseline(
+        self, db: AsyncSession, user_id: UUID, book_id: UUID
+    ) -> BufferedProgress:
+        """
+        Начальное состояние записи буфера из БД.
+
+        Raises:
+            ValueError: Если книга не найдена или принадлежит другому пользователю
+        """
+        book_row = (
+            await db.execute(
+                select(Book.id, Book.total_chapters).where(
+                    Book.id == book_id, Book.user_id == user_id
+                )
+            )
+        ).first()
+        if not book_row:
+            raise ValueError(f"Book with id {book_id} not found")
+
+        total_chapters = book_row.total_chapters or await self._count_chapters(db, book_id)
+
+        progress = (
+            await db.execute(
+                select(ReadingProgress).where(
+                    ReadingProgress.user_id == user_id,
+                    ReadingProgress.book_id == book_id,
+                )
+            )
+        ).scalar_one_or_none()
+
+        if progress:
+            return BufferedProgress.from_model(progress, total_chapters)
+        return BufferedProgress.new(
+            user_id, book_id, total_chapters, datetime.now(timezone.utc)
+        )
+
+    async def get_buffered_progress(
+        self, user_id: UUID, book_id: UUID
+    ) -> Optional[BufferedProgress]:
+        """Несброшенный прогресс из буфера (None - читать из БД)."""
+        if self.progress_buffer is None:
+            return None
+        return await self.progress_buffer.get(user_id, book_id)
+
+    async def merge_buffered_library_progress(
+        self, user_id: UUID, books: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Подмешивает несброшенный прогресс в элементы списка библиотеки.
+
+        Страница библиотеки (и её кэш) видит только сброшенный в БД
+        прогресс. Элементы ответа обновляются на месте одним чтением буфера.
+
+        Args:
+            user_id: ID пользователя
+            books: Элементы ответа списка книг ("id", "reading_progress_percent")
+        """
+        if self.progress_buffer is None or not books:
+            return
+
+        pending = await self.progress_buffer.get_many(
+            user_id, [UUID(book["id"]) for book in books]
+        )
+        for book in books:
+            entry = pending.get(UUID(book["id"]))
+            if entry is not None:
+                book["reading_progress_percent"] = round(entry.progress_percent, 1)
+
+    async def merge_buffered_book_progress(
+        self, user_id: UUID, book: Dict[str, Any]
+    ) -> None:
+        """
+        Подмешивает несброшенный прогресс в ответ страницы книги.
+
+        Args:
+            user_id: ID пользователя
+            book: Ответ страницы книги ("id", "reading_progress")
+        """
+        entry = await self.get_buffered_progress(user_id, UUID(book["id"]))
+        if entry is None:
+            return
+
+        book["reading_progress"] = {
+            "current_chapter": entry.current_chapter,
+            "current_page": entry.current_page,
+            "current_position": entry.current_position,
+            "reading_location_cfi": entry.reading_location_cfi,
+            "progress_percent": round(entry.progress_percent, 1),
+        }
+
+    @staticmethod
+    async def _count_chapters(db: AsyncSession, book_id: UUID) -> int:
+        """Количество глав книги, если Book.total_chapters не заполнен."""
+        return (
+            await db.execute(
+                select(func.count(Chapter.id)).where(Chapter.book_id == book_id)
+            )
+        ).scalar() or 0
+
+    @staticmethod
+    def _normalize_position(
+        chapter_number: int, position_percent: float, total_chapters: int
+    ) -> Tuple[int, float]:
+        """Валидирует и нормализует номер главы и позицию в главе."""
+        valid_chapter = (
+            max(1, min(chapter_number or 1, total_chapters))
+            if total_chapters > 0
+            else 1
+        )
+        valid_position = max(0.0, min(100.0, float(position_percent or 0.0)))
+        return valid_chapter, valid_position
+
+    @staticmethod
+    def _log_blocked_regression(
+        book_id: UUID, user_id: UUID, existing_position: float, new_position: float
+    ) -> None:
+        logger.warning(
+            "Blocked suspicious reading progress regression",
+            book_id=str(book_id),
+            user_id=str(user_id),
+            existing_position=round(existing_position, 1),
+            new_position=round(new_position, 1),
+        )
+
 
 # Глобальный экземпляр сервиса (для обратной совместимости)
-book_progress_service = BookProgressService()
+book_progress_service = BookProgressService(
+    progress_buffer=reading_progress_buffer if settings.PROGRESS_BUFFER_ENABLED else None
+)
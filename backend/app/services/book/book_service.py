@@ -5,7 +5,7 @@
 - Создание книг из загруженных файлов
 - Чтение списка книг пользователя
 - Получение книги по ID
-- Получение глав книги
+- Получение глав книги (полных и лёгкого индекса без тел)
 - Удаление книг
 - Сохранение обложек (вспомогательная функция)
 
@@ -15,17 +15,35 @@ Single Responsibility Principle:
 """
 
 import os
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from pathlib import Path
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, and_, desc, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import defer, selectinload
 
 from ...models.book import Book, ReadingProgress, BookGenre
 from ...models.chapter import Chapter
-from ...services.book_parser import ParsedBook
+from ...services.book_parser import BookChapter, BookMetadata, ParsedBook
 from ...core.cache import cache_manager
+from .book_dedup_service import compute_content_hash
+
+
+def chapters_without_body():
+    """
+    selectinload(Book.chapters) без тел глав (content/html_content).
+
+    Тела - основной объём строки chapters (сотни KB на главу), а спискам
+    книг, навигации и расчёту прогресса нужны только номера и метаданные.
+    Обращение к незагруженному телу падает (raiseload), а не делает
+    скрытый запрос - тело загружается явно:
+    await db.refresh(chapter, attribute_names=["content"]).
+    """
+    return selectinload(Book.chapters).options(
+        defer(Chapter.content, raiseload=True),
+        defer(Chapter.html_content, raiseload=True),
+    )
 
 
 class BookService:
@@ -45,6 +63,7 @@ class BookService:
         file_path: str,
         original_filename: str,
         parsed_book: ParsedBook,
+        content_hash: Optional[str] = None,
     ) -> Book:
         """
         Создает запись о книге в базе данных на основе загруженного файла.
@@ -55,6 +74,7 @@ class BookService:
             file_path: Путь к загруженному файлу
             original_filename: Оригинальное название файла
             parsed_book: Результат парсинга книги
+            content_hash: SHA-256 файла (для дедупликации загрузок)
 
         Returns:
             Созданный объект Book
@@ -72,13 +92,9 @@ class BookService:
             file_path=file_path,
             file_format=parsed_book.file_format,
             file_size=file_size,
+            content_hash=content_hash,
             description=parsed_book.metadata.description,
-            book_metadata={
-                "isbn": parsed_book.metadata.isbn,
-                "publisher": parsed_book.metadata.publisher,
-                "publish_date": parsed_book.metadata.publish_date,
-                "has_cover": parsed_book.metadata.cover_image_data is not None,
-            },
+            book_metadata=self._build_book_metadata(parsed_book.metadata),
             total_pages=parsed_book.total_pages,
             estimated_reading_time=parsed_book.estimated_reading_time,
             is_parsed=False,
@@ -89,6 +105,201 @@ class BookService:
         db.add(book)
         await db.flush()  # Получаем ID книги
 
+        await self._attach_parsed_content(db, book, parsed_book)
+
+        await db.commit()
+        return book
+
+    async def create_pending_book(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        file_path: str,
+        original_filename: str,
+        file_format: str,
+        content_hash: Optional[str] = None,
+    ) -> Book:
+        """
+        Создает запись о книге до парсинга (режим BOOK_PARSING_MODE=celery).
+
+        Метаданные и главы заполняются воркером через populate_parsed_book().
+
+        Args:
+            db: Сессия базы данных
+            user_id: ID пользователя-владельца
+            file_path: Путь к сохранённому файлу
+            original_filename: Оригинальное название файла
+            file_format: Формат файла (epub, fb2)
+            content_hash: SHA-256 файла (для дедупликации загрузок)
+
+        Returns:
+            Созданный объект Book
+        """
+        book = Book(
+            user_id=user_id,
+            title=(Path(original_filename).stem or "Unknown")[:500],
+            file_path=file_path,
+            file_format=file_format,
+            file_size=os.path.getsize(file_path),
+            content_hash=content_hash,
+            genre=BookGenre.OTHER.value,
+            total_pages=0,
+            estimated_reading_time=0,
+            is_parsed=False,
+            is_processing=True,
+            parsing_progress=0,
+        )
+
+        db.add(book)
+        await db.commit()
+        return book
+
+    async def populate_parsed_book(
+        self,
+        db: AsyncSession,
+        book: Book,
+        parsed_book: ParsedBook,
+    ) -> Book:
+        """
+        Заполняет ранее созданную книгу результатом парсинга.
+
+        Args:
+            db: Сессия базы данных
+            book: Книга, созданная через create_pending_book()
+            parsed_book: Результат парсинга книги
+
+        Returns:
+            Обновлённый объект Book
+        """
+        book.title = parsed_book.metadata.title
+        book.author = parsed_book.metadata.author
+        book.genre = self._map_genre(parsed_book.metadata.genre)
+        book.language = parsed_book.metadata.language
+        book.file_format = parsed_book.file_format
+        book.description = parsed_book.metadata.description
+        book.book_metadata = self._build_book_metadata(parsed_book.metadata)
+        book.total_pages = parsed_book.total_pages
+        book.estimated_reading_time = parsed_book.estimated_reading_time
+
+        await self._attach_parsed_content(db, book, parsed_book)
+
+        await db.commit()
+        return book
+
+    async def populate_book_from_stream(
+        self,
+        db: AsyncSession,
+        book: Book,
+        reader,
+        batch_size: int = 50,
+    ) -> int:
+        """
+        Заполняет книгу главами из потокового парсера по мере их чтения.
+
+        Главы вставляются пачками по batch_size (Core INSERT без ORM объектов),
+        поэтому полный ParsedBook в памяти не собирается. Метаданные и
+        обложка применяются после чтения файла.
+
+        Args:
+            db: Сессия базы данных
+            book: Книга, созданная через create_pending_book()
+            reader: Итератор BookChapter с атрибутом metadata (FB2StreamReader)
+            batch_size: Размер пачки INSERT
+
+        Returns:
+            Количество сохранённых глав
+        """
+        chapters_count = 0
+        total_words = 0
+
+        batch: List[BookChapter] = []
+        for chapter_data in reader:
+            batch.append(chapter_data)
+            chapters_count += 1
+            total_words += chapter_data.word_count
+
+            if len(batch) >= batch_size:
+                await self._insert_chapters(db, book.id, batch)
+                batch = []
+
+        await self._insert_chapters(db, book.id, batch)
+
+        metadata: BookMetadata = reader.metadata
+        book.title = metadata.title
+        book.author = metadata.author
+        book.genre = self._map_genre(metadata.genre)
+        book.language = metadata.language
+        book.description = metadata.description
+        book.book_metadata = self._build_book_metadata(metadata)
+        # Те же формулы, что и в ParsedBook.__post_init__
+        book.total_pages = max(1, total_words // 250)
+        book.estimated_reading_time = max(1, total_words // 200)
+        book.total_chapters = chapters_count
+
+        if metadata.cover_image_data:
+            cover_path = await self._save_book_cover(
+                book.id, metadata.cover_image_data, metadata.cover_image_type
+            )
+            book.cover_image = str(cover_path)
+
+        db.add(
+            ReadingProgress(
+                user_id=book.user_id,
+                book_id=book.id,
+                current_chapter=1,
+                current_page=1,
+                current_position=0,
+            )
+        )
+
+        await db.commit()
+        return chapters_count
+
+    async def _insert_chapters(
+        self, db: AsyncSession, book_id: UUID, chapters: Iterable[BookChapter]
+    ) -> int:
+        """
+        Вставляет главы книги одним Core INSERT (executemany).
+
+        В отличие от db.add(Chapter(...)) не создаёт ORM объекты и не
+        нагружает identity map / unit of work - для книг на тысячи глав
+        это основная стоимость создания книги. SQLAlchemy собирает строки
+        в многострочные INSERT ... VALUES (insertmanyvalues).
+
+        Returns:
+            Количество вставленных глав
+        """
+        rows = [self._chapter_row(book_id, chapter_data) for chapter_data in chapters]
+        if rows:
+            await db.execute(insert(Chapter), rows)
+        return len(rows)
+
+    @staticmethod
+    def _chapter_row(book_id: UUID, chapter_data: BookChapter) -> dict:
+        """Формирует значения колонок Chapter для INSERT."""
+        return {
+            "id": uuid4(),
+            "book_id": book_id,
+            "chapter_number": chapter_data.number,
+            "title": chapter_data.title,
+            "content": chapter_data.content,
+            "html_content": chapter_data.html_content,
+            "content_hash": compute_content_hash(chapter_data.content),
+            "word_count": chapter_data.word_count,
+            "estimated_reading_time": max(1, chapter_data.word_count // 200),
+            "is_description_parsed": False,
+            "descriptions_found": 0,
+            "parsing_progress": 0,
+        }
+
+    async def _attach_parsed_content(
+        self, db: AsyncSession, book: Book, parsed_book: ParsedBook
+    ) -> None:
+        """
+        Добавляет обложку, главы и начальный прогресс чтения к книге.
+
+        Книга должна иметь ID (после flush). Коммит выполняет вызывающий код.
+        """
         # Сохраняем обложку, если есть
         if parsed_book.metadata.cover_image_data:
             cover_path = await self._save_book_cover(
@@ -98,22 +309,14 @@ class BookService:
             )
             book.cover_image = str(cover_path)
 
-        # Создаем главы
-        for chapter_data in parsed_book.chapters:
-            chapter = Chapter(
-                book_id=book.id,
-                chapter_number=chapter_data.number,
-                title=chapter_data.title,
-                content=chapter_data.content,
-                html_content=chapter_data.html_content,
-                word_count=chapter_data.word_count,
-                estimated_reading_time=max(1, chapter_data.word_count // 200),
-            )
-            db.add(chapter)
+        # Создаем главы (bulk INSERT без ORM объектов)
+        book.total_chapters = await self._insert_chapters(
+            db, book.id, parsed_book.chapters
+        )
 
         # Создаем прогресс чтения для пользователя
         reading_progress = ReadingProgress(
-            user_id=user_id,
+            user_id=book.user_id,
             book_id=book.id,
             current_chapter=1,
             current_page=1,
@@ -121,8 +324,15 @@ class BookService:
         )
         db.add(reading_progress)
 
-        await db.commit()
-        return book
+    @staticmethod
+    def _build_book_metadata(metadata: BookMetadata) -> dict:
+        """Формирует JSONB метаданные книги из результата парсинга."""
+        return {
+            "isbn": metadata.isbn,
+            "publisher": metadata.publisher,
+            "publish_date": metadata.publish_date,
+            "has_cover": metadata.cover_image_data is not None,
+        }
 
     async def get_user_books(
         self,
@@ -167,7 +377,7 @@ class BookService:
         result = await db.execute(
             select(Book)
             .where(Book.user_id == user_id)
-            .options(selectinload(Book.chapters))
+            .options(chapters_without_body())
             .options(selectinload(Book.reading_progress))
             .order_by(order_clause)
             .offset(skip)
@@ -181,6 +391,8 @@ class BookService:
         """
         Получает книгу по ID.
 
+        Главы загружаются без тел (см. chapters_without_body).
+
         Args:
             db: Сессия базы данных
             book_id: ID книги
@@ -191,7 +403,7 @@ class BookService:
         """
         query = (
             select(Book)
-            .options(selectinload(Book.chapters))
+            .options(chapters_without_body())
             .options(selectinload(Book.reading_progress))
             .where(Book.id == book_id)
         )
@@ -206,7 +418,7 @@ class BookService:
         self, db: AsyncSession, book_id: UUID, user_id: Optional[UUID] = None
     ) -> List[Chapter]:
         """
-        Получает главы книги.
+        Получает главы книги с описаниями (без тел глав).
 
         Args:
             db: Сессия базы данных
@@ -227,11 +439,52 @@ class BookService:
         result = await db.execute(
             select(Chapter)
             .where(Chapter.book_id == book_id)
-            .options(selectinload(Chapter.descriptions))
+            .options(
+                selectinload(Chapter.descriptions),
+                defer(Chapter.content, raiseload=True),
+                defer(Chapter.html_content, raiseload=True),
+            )
             .order_by(Chapter.chapter_number)
         )
         return result.scalars().all()
 
+    async def get_chapter_index(
+        self, db: AsyncSession, book_id: UUID, user_id: Optional[UUID] = None
+    ) -> List[Row]:
+        """
+        Получает лёгкий индекс глав книги без тел.
+
+        Строки (id, chapter_number, title, word_count, is_service_page)
+        вместо ORM объектов - для подсчёта глав и поиска главы по номеру.
+
+        Args:
+            db: Сессия базы данных
+            book_id: ID книги
+            user_id: ID пользователя (для проверки доступа)
+
+        Returns:
+            Список строк индекса, отсортированный по номеру главы
+        """
+        query = (
+            select(
+                Chapter.id,
+                Chapter.chapter_number,
+                Chapter.title,
+                Chapter.word_count,
+                Chapter.is_service_page,
+            )
+            .where(Chapter.book_id == book_id)
+            .order_by(Chapter.chapter_number)
+        )
+
+        if user_id:
+            query = query.join(Book, Book.id == Chapter.book_id).where(
+                Book.user_id == user_id
+            )
+
+        result = await db.execute(query)
+        return list(result.all())
+
     async def get_chapter_by_number(
         self,
         db: AsyncSession,
@@ -291,10 +544,14 @@ class BookService:
         if not book:
             return False
 
-        # Удаляем файл книги
+        # Удаляем файл книги (content-addressed файл может быть общим
+        # для нескольких одинаковых загрузок - удаляем только последнюю ссылку)
         try:
-            if os.path.exists(book.file_path):
-                os.remove(book.file_path)
+            from .book_storage_service import book_storage_service
+
+            await book_storage_service.delete_book_file(
+                db, book.file_path, exclude_book_id=book.id
+            )
         except Exception as e:
             print(f"Warning: Could not delete book file {book.file_path}: {e}")
 
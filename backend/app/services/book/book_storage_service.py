@@ -0,0 +1,241 @@
+"""
+Сервис хранения файлов книг - потоковая запись загрузок на диск.
+
+Ответственности:
+- Потоковое копирование UploadFile чанками прямо в хранилище книг
+- Подсчёт SHA-256 во время записи (content-addressed имена файлов)
+- Прерывание загрузки сразу после превышения лимита размера
+- Удаление файла книги только когда на него не ссылаются другие книги
+
+Гонки загрузки и удаления одного и того же файла сериализуются
+транзакционными advisory блокировками PostgreSQL по пути файла:
+загрузка держит разделяемую блокировку от проверки существования файла
+до коммита записи Book, удаление - эксклюзивную на пересчёт ссылок
+и удаление файла.
+
+Single Responsibility Principle:
+Сервис отвечает ТОЛЬКО за файлы книг на диске.
+Записи в БД создаёт BookService.
+
+Память на одну загрузку ограничена размером чанка (UPLOAD_CHUNK_SIZE),
+файл записывается на диск один раз - без промежуточного temp файла и move.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Protocol
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...models.book import Book
+
+
+class AsyncReadable(Protocol):
+    """Источник данных загрузки (fastapi.UploadFile и совместимые)."""
+
+    async def read(self, size: int = -1) -> bytes:
+        """Читает до size байт."""
+        ...
+
+
+class UploadTooLargeError(ValueError):
+    """Загрузка превысила максимальный размер - запись прервана."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"Upload exceeds {max_size} bytes")
+
+
+@dataclass
+class StoredBookFile:
+    """Результат сохранения загруженного файла."""
+
+    path: Path
+    sha256: str
+    size: int
+    # False если файл с таким содержимым уже был в хранилище
+    created: bool
+
+
+class BookStorageService:
+    """Сервис потокового сохранения файлов книг."""
+
+    def __init__(
+        self,
+        storage_directory: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        max_upload_size: Optional[int] = None,
+    ):
+        """
+        Инициализация сервиса хранения.
+
+        Args:
+            storage_directory: Директория хранилища книг
+            chunk_size: Размер чанка потокового чтения (байт)
+            max_upload_size: Максимальный размер загрузки (байт)
+        """
+        from ...core.config import settings
+
+        self.storage_directory = Path(storage_directory or settings.BOOK_STORAGE_DIRECTORY)
+        self.chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        self.max_upload_size = max_upload_size or settings.MAX_UPLOAD_SIZE
+
+    def path_for_hash(self, sha256: str, extension: str) -> Path:
+        """Возвращает content-addressed путь файла книги."""
+        return self.storage_directory / f"{sha256}{extension}"
+
+    async def store_upload(
+        self,
+        upload: AsyncReadable,
+        extension: str,
+        db: Optional[AsyncSession] = None,
+    ) -> StoredBookFile:
+        """
+        Потоково сохраняет загрузку в хранилище книг.
+
+        Данные пишутся в частичный файл в той же директории (rename атомарен
+        в пределах файловой системы) и хэшируются по мере чтения. Как только
+        размер превышает лимит, запись прерывается и частичный файл удаляется.
+
+        Если передана сессия, перед проверкой существования файла берётся
+        разделяемая блокировка его пути: до коммита (или отката) транзакции
+        delete_book_file/discard не удалят файл из-под этой загрузки.
+        Запись Book нужно закоммитить сразу (до парсинга) - иначе блокировка
+        и соединение с БД удерживаются на всё время парсинга.
+
+        Args:
+            upload: Источник данных (UploadFile)
+            extension: Расширение файла (.epub, .fb2)
+            db: Сессия базы данных, в которой будет создана запись Book
+
+        Returns:
+            StoredBookFile с итоговым путём, SHA-256 и размером
+
+        Raises:
+            UploadTooLargeError: Размер превысил max_upload_size
+        """
+        self.storage_directory.mkdir(parents=True, exist_ok=True)
+        partial_path = self.storage_directory / f".upload-{uuid4().hex}{extension}.part"
+
+        hasher = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(partial_path, "wb") as f:
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+
+                    size += len(chunk)
+                    if size > self.max_upload_size:
+                        raise UploadTooLargeError(self.max_upload_size)
+
+                    hasher.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            await self._remove_quietly(partial_path)
+            raise
+
+        sha256 = hasher.hexdigest()
+        final_path = self.path_for_hash(sha256, extension)
+
+        if db is not None:
+            try:
+                await self._lock_file(db, str(final_path), shared=True)
+            except BaseException:
+                await self._remove_quietly(partial_path)
+                raise
+
+        if final_path.exists():
+            # Такой файл уже есть - второй экземпляр не нужен
+            await self._remove_quietly(partial_path)
+            return StoredBookFile(path=final_path, sha256=sha256, size=size, created=False)
+
+        await aiofiles.os.replace(partial_path, final_path)
+        return StoredBookFile(path=final_path, sha256=sha256, size=size, created=True)
+
+    async def discard(self, db: AsyncSession, stored: StoredBookFile) -> bool:
+        """
+        Удаляет сохранённый файл после неудачной обработки загрузки.
+
+        Откатывает транзакцию загрузки (и её разделяемую блокировку), затем
+        удаляет файл через ту же проверку ссылок, что и delete_book_file:
+        файл мог быть создан этой загрузкой, но к этому моменту на него уже
+        ссылается параллельная загрузка того же содержимого.
+
+        Args:
+            db: Сессия базы данных загрузки
+            stored: Результат store_upload
+
+        Returns:
+            True если файл был удалён
+        """
+        await db.rollback()
+        try:
+            return await self.delete_book_file(db, str(stored.path))
+        finally:
+            # Завершаем транзакцию - снимаем эксклюзивную блокировку
+            await db.rollback()
+
+    async def delete_book_file(
+        self, db: AsyncSession, file_path: str, exclude_book_id=None
+    ) -> bool:
+        """
+        Удаляет файл книги, если на него не ссылаются другие книги.
+
+        Content-addressed хранилище делит один файл между одинаковыми
+        загрузками, поэтому удалять файл можно только вместе с последней книгой.
+        Ссылки считаются под эксклюзивной блокировкой пути: незавершённые
+        загрузки того же файла сначала коммитят свою книгу (и попадают
+        в подсчёт), а новые ждут конца транзакции удаления.
+
+        Args:
+            db: Сессия базы данных
+            file_path: Путь к файлу книги
+            exclude_book_id: ID удаляемой книги (не учитывается в подсчёте)
+
+        Returns:
+            True если файл был удалён
+        """
+        await self._lock_file(db, file_path, shared=False)
+
+        query = select(func.count(Book.id)).where(Book.file_path == file_path)
+        if exclude_book_id is not None:
+            query = query.where(Book.id != exclude_book_id)
+
+        references = (await db.execute(query)).scalar() or 0
+        if references:
+            return False
+
+        return await self._remove_quietly(Path(file_path))
+
+    @staticmethod
+    async def _lock_file(db: AsyncSession, file_path: str, shared: bool) -> None:
+        """Берёт транзакционную advisory блокировку пути файла книги."""
+        lock_function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+        await db.execute(
+            text(f"SELECT {lock_function}(hashtext(:file_path))"),
+            {"file_path": file_path},
+        )
+
+    @staticmethod
+    async def _remove_quietly(path: Path) -> bool:
+        """Удаляет файл, игнорируя отсутствие файла и ошибки ФС."""
+        try:
+            if os.path.exists(path):
+                await aiofiles.os.remove(path)
+                return True
+        except OSError:
+            pass
+        return False
+
+
+# Глобальный экземпляр сервиса (для обратной совместимости)
+book_storage_service = BookStorageService()
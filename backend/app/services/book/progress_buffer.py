@@ -0,0 +1,597 @@
+"""
+Write-behind буфер прогресса чтения.
+
+Каждое перелистывание страницы - запись прогресса, это самый
+нагруженный путь записи. Буфер собирает обновления по ключу
+(user_id, book_id) с last-writer-wins и сбрасывает их в PostgreSQL
+пачками: один многострочный INSERT ... ON CONFLICT DO UPDATE на пачку.
+
+Ответственности:
+- Хранение последнего состояния прогресса (Redis, fallback в память)
+- Чтение прогресса из буфера раньше БД
+- Периодический сброс (flush) пачками с многострочным upsert
+- Инвалидация кэшей прогресса / библиотеки для сброшенных записей
+
+Защита от регрессии прогресса применяется BookProgressService до записи
+в буфер. В Redis записи видны всем API воркерам; in-memory буфер живёт в
+процессе и сбрасывается его собственным фоновым циклом. Между
+обновлением и сбросом проходит не больше PROGRESS_BUFFER_FLUSH_SECONDS.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+import redis.asyncio as redis
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.cache import cache_key, cache_manager
+from ...core.config import settings
+from ...core.logging import logger
+from ...models.book import Book, ReadingProgress
+
+
+PENDING_KEY_PREFIX = "reading_progress:pending:"
+DIRTY_SET_KEY = "reading_progress:dirty"
+FLUSH_LOCK_KEY = "reading_progress:flush_lock"
+FLUSH_LOCK_TTL_SECONDS = 60
+
+# Повторное подключение к Redis: экспоненциальная задержка между попытками
+REDIS_RETRY_INITIAL_SECONDS = 1.0
+REDIS_RETRY_MAX_SECONDS = 60.0
+
+# Снимает блокировку сброса, только если её держит этот процесс
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Удаляет запись, только если она не изменилась после чтения для сброса
+_RELEASE_IF_UNCHANGED = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_DATETIME_FIELDS = ("created_at", "updated_at", "last_read_at")
+_UUID_FIELDS = ("id", "user_id", "book_id")
+
+# Колонки reading_progress, которые пишет сброс буфера
+_UPSERT_COLUMNS = (
+    "current_chapter",
+    "current_page",
+    "current_position",
+    "reading_location_cfi",
+    "scroll_offset_percent",
+    "progress_percent",
+    "last_read_at",
+    "updated_at",
+)
+
+
+@dataclass
+class BufferedProgress:
+    """
+    Прогресс чтения в буфере.
+
+    Атрибуты совпадают с ReadingProgress, поэтому объект можно отдавать
+    в ReadingProgressResponse.model_validate и в ответ роутера.
+    total_chapters хранится для валидации номера главы без запроса к БД.
+    """
+
+    id: UUID
+    user_id: UUID
+    book_id: UUID
+    current_chapter: int
+    current_page: int
+    current_position: int
+    reading_location_cfi: Optional[str]
+    scroll_offset_percent: float
+    progress_percent: float
+    reading_time_minutes: int
+    reading_speed_wpm: float
+    total_chapters: int
+    created_at: datetime
+    updated_at: datetime
+    last_read_at: datetime
+
+    @classmethod
+    def new(
+        cls, user_id: UUID, book_id: UUID, total_chapters: int, now: datetime
+    ) -> "BufferedProgress":
+        """Прогресс для книги, которую пользователь ещё не читал."""
+        return cls(
+            id=uuid4(),
+            user_id=user_id,
+            book_id=book_id,
+            current_chapter=1,
+            current_page=1,
+            current_position=0,
+            reading_location_cfi=None,
+            scroll_offset_percent=0.0,
+            progress_percent=0.0,
+            reading_time_minutes=0,
+            reading_speed_wpm=0.0,
+            total_chapters=total_chapters,
+            created_at=now,
+            updated_at=now,
+            last_read_at=now,
+        )
+
+    @classmethod
+    def from_model(cls, progress: ReadingProgress, total_chapters: int) -> "BufferedProgress":
+        """Начальное состояние буфера из строки reading_progress."""
+        return cls(
+            id=progress.id,
+            user_id=progress.user_id,
+            book_id=progress.book_id,
+            current_chapter=progress.current_chapter,
+            current_page=progress.current_page,
+            current_position=progress.current_position or 0,
+            reading_location_cfi=progress.reading_location_cfi,
+            scroll_offset_percent=progress.scroll_offset_percent or 0.0,
+            progress_percent=progress.progress_percent or 0.0,
+            reading_time_minutes=progress.reading_time_minutes or 0,
+            reading_speed_wpm=progress.reading_speed_wpm or 0.0,
+            total_chapters=total_chapters,
+            created_at=progress.created_at,
+            updated_at=progress.updated_at,
+            last_read_at=progress.last_read_at,
+        )
+
+    def to_json(self) -> str:
+        """Сериализует запись для Redis / in-memory буфера."""
+        data = asdict(self)
+        for name in _UUID_FIELDS:
+            data[name] = str(data[name])
+        for name in _DATETIME_FIELDS:
+            data[name] = data[name].isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "BufferedProgress":
+        """Восстанавливает запись из JSON."""
+        data = json.loads(raw)
+        for name in _UUID_FIELDS:
+            data[name] = UUID(data[name])
+        for name in _DATETIME_FIELDS:
+            data[name] = datetime.fromisoformat(data[name])
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def to_row(self) -> Dict[str, Any]:
+        """Значения колонок reading_progress для upsert."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "book_id": self.book_id,
+            "created_at": self.created_at,
+            **{name: getattr(self, name) for name in _UPSERT_COLUMNS},
+        }
+
+
+def _member(user_id: UUID, book_id: UUID) -> str:
+    return f"{user_id}:{book_id}"
+
+
+async def invalidate_progress_caches(pairs: Iterable[Tuple[UUID, UUID]]) -> None:
+    """
+    Инвалидирует кэши, в которых виден прогресс чтения.
+
+    - user:{user_id}:progress:{book_id} (GET прогресса)
+    - user:{user_id}:books:* (список библиотеки, один SCAN на пользователя)
+    - book:{book_id}:metadata (страница книги)
+    """
+    pairs = list(pairs)
+    for user_id, book_id in pairs:
+        await cache_manager.delete(cache_key("user", user_id, "progress", book_id))
+        await cache_manager.delete(cache_key("book", book_id, "metadata"))
+    for user_id in {user_id for user_id, _ in pairs}:
+        await cache_manager.delete_pattern(f"user:{user_id}:books:*")
+
+
+async def write_progress_rows(db: AsyncSession, entries: List[BufferedProgress]) -> int:
+    """
+    Записывает прогресс одним многострочным upsert (без commit).
+
+    Записи удалённых книг пропускаются. Более старое состояние
+    (last_read_at меньше, чем в строке) не перезаписывает более новое.
+
+    Returns:
+        Количество записанных записей
+    """
+    if not entries:
+        return 0
+
+    existing_books = set(
+        (
+            await db.execute(
+                select(Book.id).where(Book.id.in_({entry.book_id for entry in entries}))
+            )
+        ).scalars()
+    )
+    entries = [entry for entry in entries if entry.book_id in existing_books]
+    if not entries:
+        return 0
+
+    stmt = pg_insert(ReadingProgress).values([entry.to_row() for entry in entries])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ReadingProgress.user_id, ReadingProgress.book_id],
+        set_={name: stmt.excluded[name] for name in _UPSERT_COLUMNS},
+        where=ReadingProgress.last_read_at <= stmt.excluded.last_read_at,
+    )
+    await db.execute(stmt)
+
+    # Время последнего доступа к книге (ORM bulk UPDATE по первичному ключу)
+    last_accessed: Dict[UUID, datetime] = {}
+    for entry in entries:
+        current = last_accessed.get(entry.book_id)
+        if current is None or entry.last_read_at > current:
+            last_accessed[entry.book_id] = entry.last_read_at
+    await db.execute(
+        update(Book),
+        [{"id": book_id, "last_accessed": ts} for book_id, ts in last_accessed.items()],
+    )
+
+    return len(entries)
+
+
+class ReadingProgressBuffer:
+    """Write-behind буфер прогресса чтения (Redis или память процесса)."""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        use_redis: Optional[bool] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        entry_ttl: int = 7 * 24 * 3600,
+    ):
+        """
+        Инициализация буфера.
+
+        Args:
+            redis_url: URL Redis (default: settings.REDIS_URL)
+            use_redis: Хранить записи в Redis (False - только память процесса)
+            batch_size: Записей в одном upsert
+            flush_interval: Период фонового сброса (секунды)
+            entry_ttl: TTL записи в Redis - страховка от вечных ключей
+        """
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.use_redis = (
+            settings.PROGRESS_BUFFER_BACKEND == "redis" if use_redis is None else use_redis
+        )
+        self.batch_size = batch_size or settings.PROGRESS_BUFFER_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.PROGRESS_BUFFER_FLUSH_SECONDS
+        self.entry_ttl = entry_ttl
+
+        self._redis: Optional[redis.Redis] = None
+        self._redis_retry_at = 0.0
+        self._redis_retry_delay = REDIS_RETRY_INITIAL_SECONDS
+        self._memory: Dict[str, str] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+        self._stats = {"buffered": 0, "flushed": 0, "flushes": 0, "flush_errors": 0}
+
+    async def _client(self) -> Optional[redis.Redis]:
+        """
+        Redis клиент; при недоступности Redis буфер работает в памяти процесса.
+
+        Неудачное подключение повторяется с экспоненциальной задержкой
+        (REDIS_RETRY_INITIAL_SECONDS..REDIS_RETRY_MAX_SECONDS), поэтому
+        буфер возвращается в Redis, когда тот снова доступен.
+        """
+        if not self.use_redis or self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+
+        try:
+            client = redis.from_url(self.redis_url, encoding="utf-8", decode_responses=True)
+            await client.ping()
+        except Exception as e:
+            logger.warning(
+                "Progress buffer: Redis unavailable, buffering in process memory",
+                error=str(e),
+                retry_in_seconds=self._redis_retry_delay,
+            )
+            self._redis_retry_at = time.monotonic() + self._redis_retry_delay
+            self._redis_retry_delay = min(self._redis_retry_delay * 2, REDIS_RETRY_MAX_SECONDS)
+            return None
+
+        self._redis = client
+        self._redis_retry_delay = REDIS_RETRY_INITIAL_SECONDS
+        return client
+
+    async def get(self, user_id: UUID, book_id: UUID) -> Optional[BufferedProgress]:
+        """Возвращает несброшенный прогресс или None."""
+        return (await self.get_many(user_id, [book_id])).get(book_id)
+
+    async def get_many(
+        self, user_id: UUID, book_ids: Iterable[UUID]
+    ) -> Dict[UUID, BufferedProgress]:
+        """
+        Несброшенный прогресс пользователя по нескольким книгам (один MGET).
+
+        Записи, накопленные в памяти процесса, пока Redis был недоступен,
+        тоже учитываются: из двух записей пары берётся более новая.
+
+        Returns:
+            Словарь book_id -> BufferedProgress (только книги с записью в буфере)
+        """
+        members = {_member(user_id, book_id): book_id for book_id in book_ids}
+        if not members:
+            return {}
+
+        client = await self._client()
+        values: List[Optional[str]] = [None] * len(members)
+        if client:
+            try:
+                values = await client.mget([PENDING_KEY_PREFIX + member for member in members])
+            except Exception as e:
+                logger.warning("Progress buffer read failed", error=str(e))
+
+        found: Dict[UUID, BufferedProgress] = {}
+        for (member, book_id), raw in zip(members.items(), values):
+            for candidate in (raw, self._memory.get(member)):
+                if not candidate:
+                    continue
+                try:
+                    entry = BufferedProgress.from_json(candidate)
+                except (ValueError, TypeError, KeyError) as e:
+                    logger.warning("Progress buffer: malformed entry", member=member, error=str(e))
+                    continue
+                current = found.get(book_id)
+                if current is None or entry.last_read_at > current.last_read_at:
+                    found[book_id] = entry
+        return found
+
+    async def put(self, progress: BufferedProgress) -> bool:
+        """
+        Сохраняет последнее состояние прогресса (last-writer-wins).
+
+        Returns:
+            False если запись в буфер не удалась (вызывающий пишет в БД сам)
+        """
+        member = _member(progress.user_id, progress.book_id)
+        raw = progress.to_json()
+        client = await self._client()
+        try:
+            if client:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.set(PENDING_KEY_PREFIX + member, raw, ex=self.entry_ttl)
+                    pipe.sadd(DIRTY_SET_KEY, member)
+                    await pipe.execute()
+                # Запись в памяти (времён недоступности Redis) устарела
+                self._memory.pop(member, None)
+            else:
+                self._memory[member] = raw
+        except Exception as e:
+            logger.warning("Progress buffer write failed", error=str(e))
+            return False
+
+        self._stats["buffered"] += 1
+        return True
+
+    async def flush(self) -> int:
+        """
+        Сбрасывает буфер в PostgreSQL пачками по batch_size.
+
+        В Redis режиме одновременно сбрасывает один процесс (lock со
+        случайным токеном - истёкшая блокировка, уже взятая другим процессом,
+        не снимается); запись, изменённая во время сброса, остаётся в буфере
+        до следующего цикла. Записи, накопленные в памяти процесса, пока
+        Redis был недоступен, сбрасываются первыми.
+
+        Returns:
+            Количество записанных записей
+        """
+        client = await self._client()
+        lock_token = uuid4().hex
+        if client and not await client.set(
+            FLUSH_LOCK_KEY, lock_token, nx=True, ex=FLUSH_LOCK_TTL_SECONDS
+        ):
+            return 0
+
+        sources: List[Optional[redis.Redis]] = [None] if self._memory or not client else []
+        if client:
+            sources.append(client)
+
+        flushed = 0
+        try:
+            for source in sources:
+                while True:
+                    batch = await self._next_batch(source)
+                    if not batch:
+                        break
+
+                    flushed += await self._flush_batch(source, batch)
+
+                    if len(batch) < self.batch_size:
+                        break
+        except Exception as e:
+            self._stats["flush_errors"] += 1
+            logger.error("Progress buffer flush failed", error=str(e))
+        finally:
+            if client:
+                try:
+                    await client.eval(_RELEASE_LOCK, 1, FLUSH_LOCK_KEY, lock_token)
+                except Exception as e:
+                    logger.warning("Progress buffer: flush lock release failed", error=str(e))
+
+        self._stats["flushes"] += 1
+        self._stats["flushed"] += flushed
+        return flushed
+
+    async def _flush_batch(
+        self, client: Optional[redis.Redis], batch: List[Tuple[str, str]]
+    ) -> int:
+        """
+        Записывает одну пачку и удаляет записанные записи из буфера.
+
+        Повреждённые записи и записи, которые БД отвергла при поштучной
+        повторной записи, логируются и удаляются из буфера - иначе одна
+        запись останавливала бы каждый сброс.
+        """
+        parsed: List[Tuple[Tuple[str, str], BufferedProgress]] = []
+        for item in batch:
+            try:
+                parsed.append((item, BufferedProgress.from_json(item[1])))
+            except (ValueError, TypeError, KeyError) as e:
+                self._stats["flush_errors"] += 1
+                logger.error(
+                    "Progress buffer: dropping malformed entry", member=item[0], error=str(e)
+                )
+
+        written, rejected = await self._write_entries([entry for _, entry in parsed])
+
+        await self._release(client, batch)
+        await invalidate_progress_caches(
+            (entry.user_id, entry.book_id)
+            for _, entry in parsed
+            if entry not in rejected
+        )
+        return written
+
+    async def _write_entries(
+        self, entries: List[BufferedProgress]
+    ) -> Tuple[int, List[BufferedProgress]]:
+        """
+        Пишет записи одним upsert; если пачка не записалась - по одной.
+
+        Returns:
+            Кортеж (записано, отвергнутые записи)
+
+        Raises:
+            Exception: Не записалась ни одна запись (скорее всего БД
+                недоступна) - пачка остаётся в буфере
+        """
+        from ...core.database import AsyncSessionLocal
+
+        if not entries:
+            return 0, []
+
+        try:
+            async with AsyncSessionLocal() as db:
+                written = await write_progress_rows(db, entries)
+                await db.commit()
+            return written, []
+        except Exception as e:
+            if len(entries) == 1:
+                raise
+            logger.warning(
+                "Progress buffer batch write failed, retrying per entry",
+                entries=len(entries),
+                error=str(e),
+            )
+
+        written = 0
+        failures: List[Tuple[BufferedProgress, Exception]] = []
+        for entry in entries:
+            try:
+                async with AsyncSessionLocal() as db:
+                    written += await write_progress_rows(db, [entry])
+                    await db.commit()
+            except Exception as e:
+                failures.append((entry, e))
+
+        if len(failures) == len(entries):
+            raise failures[-1][1]
+
+        for entry, error in failures:
+            self._stats["flush_errors"] += 1
+            logger.error(
+                "Progress buffer: dropping entry rejected by database",
+                user_id=str(entry.user_id),
+                book_id=str(entry.book_id),
+                error=str(error),
+            )
+        rejected = [entry for entry, _ in failures]
+        return written, rejected
+
+    async def _next_batch(self, client: Optional[redis.Redis]) -> List[Tuple[str, str]]:
+        """Следующая пачка (member, json) для сброса."""
+        if not client:
+            return list(self._memory.items())[: self.batch_size]
+
+        members = await client.srandmember(DIRTY_SET_KEY, self.batch_size)
+        if not members:
+            return []
+
+        values = await client.mget([PENDING_KEY_PREFIX + member for member in members])
+        expired = [member for member, raw in zip(members, values) if raw is None]
+        if expired:
+            await client.srem(DIRTY_SET_KEY, *expired)
+        return [(member, raw) for member, raw in zip(members, values) if raw is not None]
+
+    async def _release(self, client: Optional[redis.Redis], batch: List[Tuple[str, str]]) -> None:
+        """Удаляет сброшенные записи, если их не обновили во время сброса."""
+        if not client:
+            for member, raw in batch:
+                if self._memory.get(member) == raw:
+                    del self._memory[member]
+            return
+
+        async with client.pipeline(transaction=False) as pipe:
+            for member, raw in batch:
+                pipe.eval(
+                    _RELEASE_IF_UNCHANGED, 2, PENDING_KEY_PREFIX + member, DIRTY_SET_KEY, raw, member
+                )
+            await pipe.execute()
+
+    async def _flush_loop(self) -> None:
+        """Фоновый цикл сброса."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Запускает фоновый сброс (startup приложения)."""
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+            logger.info(
+                "Reading progress buffer started",
+                flush_interval=self.flush_interval,
+                backend="redis" if self.use_redis else "memory",
+            )
+
+    async def stop(self) -> None:
+        """Останавливает фоновый сброс и сбрасывает остаток (shutdown)."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+            self._redis_retry_at = 0.0
+            self._redis_retry_delay = REDIS_RETRY_INITIAL_SECONDS
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика буфера."""
+        return {
+            "backend": "redis" if self._redis is not None else "memory",
+            "pending_in_memory": len(self._memory),
+            **self._stats,
+        }
+
+
+# Глобальный экземпляр буфера
+reading_progress_buffer = ReadingProgressBuffer()
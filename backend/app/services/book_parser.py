@@ -4,12 +4,15 @@
 Использует встроенный Table of Contents (TOC) для надёжного определения структуры книги.
 """
 
+import base64
+import io
 import logging
 import os
 import re
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 
 import aiofiles
 from bs4 import BeautifulSoup
@@ -34,6 +37,30 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# Backends извлечения текста EPUB (ParserConfig.epub_html_backend)
+EPUB_BACKEND_LXML = "lxml"
+EPUB_BACKEND_BS4 = "bs4"
+
+# Режимы парсинга FB2 (ParserConfig.fb2_backend)
+FB2_BACKEND_ITERPARSE = "iterparse"
+FB2_BACKEND_TREE = "tree"
+
+# Теги заголовка главы в порядке приоритета
+_TITLE_TAGS = ("h1", "h2", "h3", "title")
+
+# lxml парсеры не потокобезопасны - один экземпляр на поток
+_lxml_local = threading.local()
+
+
+def _get_lxml_html_parser():
+    """Возвращает переиспользуемый lxml HTMLParser (UTF-8, без комментариев)."""
+    parser = getattr(_lxml_local, "html_parser", None)
+    if parser is None:
+        parser = html.HTMLParser(encoding="utf-8", remove_comments=True)
+        _lxml_local.html_parser = parser
+    return parser
+
+
 # ============================================================================
 # DATA MODELS
 # ============================================================================
@@ -116,6 +143,16 @@ class ParserConfig:
     # Использовать TOC если доступен
     prefer_toc: bool = True
 
+    # Backend извлечения текста EPUB:
+    # "lxml" - один проход lxml на документ (текст + заголовок),
+    # "bs4" - BeautifulSoup html.parser (legacy, медленнее на больших книгах)
+    epub_html_backend: str = "lxml"
+
+    # Режим парсинга FB2:
+    # "iterparse" - потоковый lxml.iterparse, память ограничена одной секцией,
+    # "tree" - полное XML дерево в памяти (legacy, включая base64 картинки)
+    fb2_backend: str = "iterparse"
+
     # Паттерны для определения номера главы
     chapter_patterns: List[str] = field(
         default_factory=lambda: [
@@ -420,6 +457,13 @@ class EPUBParser:
         logger.info("Could not detect genre from text, defaulting to 'other'")
         return "other"
 
+    @property
+    def html_backend(self) -> str:
+        """Фактический backend извлечения текста (bs4 если lxml недоступен)."""
+        if self.config.epub_html_backend == EPUB_BACKEND_LXML and LXML_AVAILABLE:
+            return EPUB_BACKEND_LXML
+        return EPUB_BACKEND_BS4
+
     def _extract_chapters(self, book) -> List[BookChapter]:
         """
         Извлекает главы из EPUB.
@@ -458,10 +502,15 @@ class EPUBParser:
 
             logger.info(f"📚 Found {len(flat_toc)} items in TOC")
 
+            # Индекс name -> item строится один раз (вместо скана на каждую ссылку)
+            item_index = _EPUBItemIndex(book)
+
             for idx, (link, title) in enumerate(flat_toc, start=1):
                 try:
                     # Получаем контент по ссылке
-                    content, html_content = self._get_content_by_link(book, link)
+                    content, html_content = self._get_content_by_link(
+                        book, link, item_index
+                    )
 
                     if not content or len(content) < self.config.min_chapter_length:
                         logger.debug(f"⏭️  Skipping short TOC item: {title}")
@@ -520,17 +569,25 @@ class EPUBParser:
 
         return flat
 
-    def _get_content_by_link(self, book, link: str) -> Tuple[str, str]:
+    def _get_content_by_link(
+        self, book, link: str, item_index: Optional["_EPUBItemIndex"] = None
+    ) -> Tuple[str, str]:
         """Получает контент по ссылке из TOC."""
         # Убираем якорь из ссылки
         file_name = link.split("#")[0]
 
-        # Ищем item по имени файла
-        for item in book.get_items():
-            if item.get_name() == file_name or item.get_name().endswith(file_name):
-                return self._extract_text_from_item(item)
+        if item_index is None:
+            item_index = _EPUBItemIndex(book)
+
+        item = item_index.resolve(file_name)
+        if item is None:
+            return "", ""
 
-        return "", ""
+        # Несколько ссылок TOC (якоря) часто ведут в один файл - парсим его один раз
+        text_content, html_content, _ = item_index.get_document(
+            item, lambda doc: self._extract_document(doc, with_title=False)
+        )
+        return text_content, html_content
 
     def _extract_chapters_from_spine(self, book) -> List[BookChapter]:
         """Извлекает главы из spine с умной фильтрацией."""
@@ -548,15 +605,14 @@ class EPUBParser:
                     if not item or item.get_type() != ebooklib.ITEM_DOCUMENT:
                         continue
 
-                    text_content, html_content = self._extract_text_from_item(item)
+                    text_content, html_content, title = self._extract_document(item)
 
                     # Пропускаем короткий контент
                     if len(text_content) < self.config.min_chapter_length:
                         logger.debug(f"⏭️  Skipping short content: {item.get_name()}")
                         continue
 
-                    # Извлекаем заголовок
-                    title = self._extract_title_from_html(html_content)
+                    # Заголовок (h1/h2/h3/title) извлечён тем же проходом
                     if not title:
                         title = text_content.split("\n")[0].strip()[:100]
 
@@ -597,6 +653,63 @@ class EPUBParser:
 
         return chapters
 
+    def _extract_document(self, item, with_title: bool = True) -> Tuple[str, str, str]:
+        """
+        Извлекает текст, HTML и заголовок документа выбранным backend.
+
+        Args:
+            item: Документ EPUB
+            with_title: Нужен ли заголовок (bs4 backend парсит HTML повторно)
+
+        Returns:
+            (text_content, html_content, title)
+        """
+        if self.html_backend == EPUB_BACKEND_LXML:
+            return self._extract_document_lxml(item)
+
+        text_content, html_content = self._extract_text_from_item(item)
+        title = ""
+        if with_title and len(text_content) >= self.config.min_chapter_length:
+            title = self._extract_title_from_html(html_content)
+        return text_content, html_content, title
+
+    def _extract_document_lxml(self, item) -> Tuple[str, str, str]:
+        """
+        Извлекает текст и заголовок за один проход lxml.
+
+        Результат совпадает с BeautifulSoup backend: текст без script/style
+        с нормализованными пробелами, заголовок - первый h1/h2/h3/title.
+        """
+        try:
+            content = item.get_content().decode("utf-8", errors="ignore")
+            if not content.strip():
+                return "", content, ""
+
+            # Парсим bytes: lxml не принимает str с XML encoding declaration
+            root = html.document_fromstring(
+                content.encode("utf-8"), parser=_get_lxml_html_parser()
+            )
+
+            title = ""
+            for tag in _TITLE_TAGS:
+                title_element = root.find(f".//{tag}")
+                if title_element is not None:
+                    title = title_element.text_content().strip()
+                    if title:
+                        break
+
+            # Удаляем скрипты и стили (хвостовой текст сохраняется)
+            etree.strip_elements(root, "script", "style", with_tail=False)
+
+            # Эквивалент re.sub(r"\s+", " ", text).strip(), но заметно быстрее
+            text_content = " ".join(root.text_content().split())
+
+            return text_content, content, title
+
+        except Exception as e:
+            logger.warning(f"Error extracting text from item: {e}")
+            return "", "", ""
+
     def _extract_text_from_item(self, item) -> Tuple[str, str]:
         """Извлекает текст и HTML из item."""
         try:
@@ -632,6 +745,44 @@ class EPUBParser:
         return ""
 
 
+class _EPUBItemIndex:
+    """
+    Индекс документов EPUB для разрешения ссылок TOC.
+
+    Строится один раз на книгу: поиск по имени - O(1) вместо линейного
+    скана book.get_items() на каждую запись TOC. Также кэширует результат
+    извлечения текста для документов, на которые ссылаются несколько записей.
+    """
+
+    def __init__(self, book):
+        self._items = list(book.get_items())
+        self._by_name: Dict[str, Any] = {}
+        for item in self._items:
+            self._by_name.setdefault(item.get_name(), item)
+        self._suffix_cache: Dict[str, Any] = {}
+        self._documents: Dict[str, Tuple[str, str, str]] = {}
+
+    def resolve(self, file_name: str):
+        """Находит item по имени файла (точное совпадение или суффикс пути)."""
+        item = self._by_name.get(file_name)
+        if item is not None:
+            return item
+
+        # Ссылки TOC бывают относительными (chapter1.xhtml vs OEBPS/chapter1.xhtml)
+        if file_name not in self._suffix_cache:
+            self._suffix_cache[file_name] = next(
+                (i for i in self._items if i.get_name().endswith(file_name)), None
+            )
+        return self._suffix_cache[file_name]
+
+    def get_document(self, item, extract) -> Tuple[str, str, str]:
+        """Возвращает (text, html, title) документа, извлекая его не более одного раза."""
+        name = item.get_name()
+        if name not in self._documents:
+            self._documents[name] = extract(item)
+        return self._documents[name]
+
+
 # ============================================================================
 # FB2 PARSER
 # ============================================================================
@@ -649,11 +800,58 @@ class FB2Parser:
         if not LXML_AVAILABLE:
             raise ImportError("lxml is required for FB2 parsing")
 
+        # Читаем FB2 файл (async to avoid blocking event loop)
         try:
-            # Читаем FB2 файл (async to avoid blocking event loop)
             async with aiofiles.open(file_path, "rb") as f:
                 content = await f.read()
+        except Exception as e:
+            logger.error(f"Error reading FB2: {e}", exc_info=True)
+            raise Exception(f"Error parsing FB2 file: {str(e)}")
+
+        return self.parse_content(content)
+
+    def parse_file(self, file_path: str) -> ParsedBook:
+        """
+        Синхронно парсит FB2 файл.
+
+        Используется там, где event loop отсутствует (process pool, Celery worker).
+        """
+        if not LXML_AVAILABLE:
+            raise ImportError("lxml is required for FB2 parsing")
+
+        if self.config.fb2_backend == FB2_BACKEND_ITERPARSE:
+            return self._parse_stream(file_path)
+
+        try:
+            with open(file_path, "rb") as f:
+                content = f.read()
+        except Exception as e:
+            logger.error(f"Error reading FB2: {e}", exc_info=True)
+            raise Exception(f"Error parsing FB2 file: {str(e)}")
 
+        return self.parse_content(content)
+
+    def stream(self, source: Union[str, BinaryIO]) -> "FB2StreamReader":
+        """
+        Возвращает потоковый читатель FB2 (главы по одной, без дерева в памяти).
+
+        Args:
+            source: Путь к файлу или бинарный file-like объект
+
+        Returns:
+            FB2StreamReader - итератор по BookChapter с атрибутом metadata
+        """
+        if not LXML_AVAILABLE:
+            raise ImportError("lxml is required for FB2 parsing")
+
+        return FB2StreamReader(source, self.config, self._extract_metadata)
+
+    def parse_content(self, content: bytes) -> ParsedBook:
+        """Парсит содержимое FB2 файла (CPU-bound, синхронно)."""
+        if self.config.fb2_backend == FB2_BACKEND_ITERPARSE:
+            return self._parse_stream(io.BytesIO(content))
+
+        try:
             # Парсим XML
             try:
                 root = etree.fromstring(content)
@@ -672,6 +870,17 @@ class FB2Parser:
             logger.error(f"Error parsing FB2: {e}", exc_info=True)
             raise Exception(f"Error parsing FB2 file: {str(e)}")
 
+    def _parse_stream(self, source: Union[str, BinaryIO]) -> ParsedBook:
+        """Собирает ParsedBook из потокового читателя."""
+        try:
+            reader = self.stream(source)
+            chapters = list(reader)
+            return ParsedBook(metadata=reader.metadata, chapters=chapters, file_format="fb2")
+
+        except Exception as e:
+            logger.error(f"Error parsing FB2: {e}", exc_info=True)
+            raise Exception(f"Error parsing FB2 file: {str(e)}")
+
     def _extract_metadata(self, root) -> BookMetadata:
         """Извлекает метаданные из FB2."""
         metadata = BookMetadata(title="Unknown")
@@ -784,6 +993,164 @@ class FB2Parser:
         return chapters
 
 
+def _local_name(tag) -> str:
+    """Имя тега без namespace ("{ns}section" -> "section")."""
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+
+@dataclass
+class _FB2SectionFrame:
+    """Открытая секция FB2 при потоковом разборе."""
+
+    title: Optional[str] = None
+    parts: List[str] = field(default_factory=list)
+    content: Optional[str] = None
+
+
+class FB2StreamReader:
+    """
+    Потоковый парсер FB2 на lxml.etree.iterparse.
+
+    Главы выдаются по мере чтения файла: обработанные элементы очищаются,
+    поэтому в памяти находится только текущая секция верхнего уровня.
+    Картинки <binary> не декодируются, кроме обложки (coverpage) - она
+    декодируется один раз после чтения файла.
+
+    Результат совпадает с FB2Parser в режиме "tree" (номера, заголовки
+    и текст глав, включая вложенные секции).
+
+    Example:
+        >>> reader = FB2Parser(config).stream(file_path)
+        >>> for chapter in reader:
+        ...     save(chapter)
+        >>> reader.metadata.cover_image_data  # доступно после итерации
+    """
+
+    def __init__(self, source: Union[str, BinaryIO], config: ParserConfig, extract_metadata):
+        self.source = source
+        self.config = config
+        self.metadata = BookMetadata(title="Unknown")
+        self._extract_metadata = extract_metadata
+        self._cover_id: Optional[str] = None
+        self._cover_base64: Optional[str] = None
+        self._consumed = False
+
+    def __iter__(self) -> Iterator[BookChapter]:
+        if self._consumed:
+            raise RuntimeError("FB2StreamReader can only be iterated once")
+        self._consumed = True
+
+        yield from self._iter_chapters()
+        self._decode_cover()
+
+    def _iter_chapters(self) -> Iterator[BookChapter]:
+        """Разбирает файл и выдаёт главы секция за секцией."""
+        stack: List[_FB2SectionFrame] = []
+        pending: List[_FB2SectionFrame] = []
+        title_parts: Optional[List[str]] = None
+        chapter_number = 1
+
+        context = etree.iterparse(
+            self.source, events=("start", "end"), recover=True, huge_tree=True
+        )
+
+        for event, elem in context:
+            name = _local_name(elem.tag)
+
+            if event == "start":
+                if name == "section":
+                    frame = _FB2SectionFrame()
+                    stack.append(frame)
+                    pending.append(frame)
+                elif name == "title" and stack:
+                    title_parts = []
+                continue
+
+            # Элементы вне секций (аннотация в description и т.п.) не трогаем
+            if name == "p" and stack:
+                text = elem.text.strip() if elem.text else None
+                if title_parts is not None and text is not None:
+                    title_parts.append(text)
+                # Параграфы заголовков не входят в текст главы
+                parent = elem.getparent()
+                if text is not None and not _local_name(parent.tag).endswith("title"):
+                    for frame in stack:
+                        frame.parts.append(text)
+                self._release(elem)
+
+            elif name == "title" and title_parts is not None:
+                # Заголовок секции - первый <title> внутри неё
+                title = " ".join(title_parts)
+                for frame in stack:
+                    if frame.title is None:
+                        frame.title = title
+                title_parts = None
+                self._release(elem)
+
+            elif name == "section" and stack:
+                frame = stack.pop()
+                frame.content = " ".join(" ".join(frame.parts).split())
+                frame.parts = []
+                self._release(elem)
+
+                # Секция верхнего уровня закрыта - порядок глав известен
+                if not stack:
+                    for ready in pending:
+                        if len(ready.content) < self.config.min_chapter_length:
+                            continue
+                        yield BookChapter(
+                            number=chapter_number,
+                            title=ready.title or f"Глава {chapter_number}",
+                            content=ready.content,
+                            html_content="",
+                        )
+                        chapter_number += 1
+                    pending = []
+
+            elif name == "description":
+                self.metadata = self._extract_metadata(elem)
+                self._cover_id = self._find_cover_id(elem)
+                self._release(elem)
+
+            elif name == "binary":
+                if self._cover_id and elem.get("id") == self._cover_id:
+                    self._cover_base64 = elem.text or ""
+                    self.metadata.cover_image_type = elem.get("content-type", "")
+                self._release(elem)
+
+        del context
+
+    @staticmethod
+    def _find_cover_id(description) -> Optional[str]:
+        """Возвращает id binary обложки из <coverpage><image l:href="#id"/>."""
+        for coverpage in description.iter("{*}coverpage"):
+            for image in coverpage.iter("{*}image"):
+                for attr_name, value in image.attrib.items():
+                    if _local_name(attr_name) == "href" and value:
+                        return value.lstrip("#")
+        return None
+
+    def _decode_cover(self) -> None:
+        """Декодирует base64 обложки (единственная декодируемая картинка)."""
+        if not self._cover_base64:
+            return
+        try:
+            self.metadata.cover_image_data = base64.b64decode(self._cover_base64)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Error decoding FB2 cover: {e}")
+        finally:
+            self._cover_base64 = None
+
+    @staticmethod
+    def _release(elem) -> None:
+        """Очищает обработанный элемент и уже прочитанных соседей."""
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
 # ============================================================================
 # MAIN BOOK PARSER
 # ============================================================================
@@ -0,0 +1,306 @@
+"""
+Движок парсинга книг вне event loop.
+
+EPUBParser/FB2Parser - CPU-bound код (ebooklib, BeautifulSoup, lxml). Вызов
+из async хендлера блокирует event loop воркера на всё время парсинга, поэтому
+движок выполняет парсинг в ограниченном пуле процессов.
+
+Режимы (settings.BOOK_PARSING_MODE):
+- inline: парсинг в текущем процессе (legacy поведение, для отладки)
+- process: ProcessPoolExecutor с ограничением размера, очереди и таймаутом
+- celery: файл отдаётся Celery воркеру (см. parse_uploaded_book_task),
+  роутер отвечает 202 сразу после сохранения файла
+
+Usage:
+    >>> from app.core.container import get_book_parsing_engine
+    >>> engine = get_book_parsing_engine()
+    >>> parsed_book = await engine.parse(parser, "/app/storage/books/book.epub")
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from .book_parser import BookParser, EPUBParser, FB2Parser, ParsedBook, ParserConfig
+from ..core.logging import logger
+
+
+PARSING_MODE_INLINE = "inline"
+PARSING_MODE_PROCESS = "process"
+PARSING_MODE_CELERY = "celery"
+
+PARSING_MODES = (PARSING_MODE_INLINE, PARSING_MODE_PROCESS, PARSING_MODE_CELERY)
+
+
+class ParsingEngineBusyError(RuntimeError):
+    """Очередь парсинга заполнена - новые задания не принимаются."""
+
+
+class ParsingEngineTimeoutError(TimeoutError):
+    """Парсинг книги не уложился в BOOK_PARSING_TIMEOUT_SECONDS."""
+
+
+class ParsingEngineCrashedError(RuntimeError):
+    """Процесс-парсер аварийно завершился (OOM, segfault) во время задания."""
+
+
+def parse_book_file(
+    file_path: str, file_format: str, config: Optional[ParserConfig] = None
+) -> ParsedBook:
+    """
+    Синхронно парсит файл книги.
+
+    Функция уровня модуля, чтобы её можно было передать в дочерний процесс
+    (pickle) и вызвать из Celery воркера.
+
+    Args:
+        file_path: Путь к файлу книги
+        file_format: Формат файла ("epub" или "fb2")
+        config: Конфигурация парсера
+
+    Returns:
+        ParsedBook
+
+    Raises:
+        ValueError: Если формат не поддерживается
+    """
+    config = config or ParserConfig()
+
+    if file_format == "epub":
+        return EPUBParser(config).parse(file_path)
+    if file_format == "fb2":
+        return FB2Parser(config).parse_file(file_path)
+
+    raise ValueError(f"Unsupported book format: {file_format}")
+
+
+class BookParsingEngine:
+    """
+    Ограниченный пул процессов для парсинга книг.
+
+    - pool_size: число процессов-парсеров
+    - max_queue: сколько заданий может ждать свободный процесс; при
+      переполнении parse() сразу поднимает ParsingEngineBusyError
+    - timeout: максимальное время ожидания результата одного задания
+
+    Задание, превысившее таймаут, не ждёт завершения в дочернем процессе:
+    процессы пула убиваются, пул пересоздаётся при следующем задании,
+    а слот освобождается сразу. Упавший пул (BrokenProcessPool)
+    перезапускается так же.
+    """
+
+    def __init__(
+        self,
+        mode: str = PARSING_MODE_PROCESS,
+        pool_size: int = 2,
+        max_queue: int = 8,
+        timeout: float = 120,
+        max_tasks_per_child: Optional[int] = None,
+    ):
+        if mode not in PARSING_MODES:
+            raise ValueError(f"Unknown parsing mode: {mode}")
+
+        self.mode = mode
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "total_parse_time": 0.0,
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Максимальное число заданий (выполняемых + ожидающих)."""
+        return self.pool_size + self.max_queue
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Создаёт пул процессов лениво (и пересоздаёт после BrokenProcessPool)."""
+        if self._executor is None:
+            # spawn: не форкаем процесс с работающим event loop и потоками
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+            logger.info(
+                "Book parsing pool started",
+                pool_size=self.pool_size,
+                max_queue=self.max_queue,
+            )
+        return self._executor
+
+    def _slot_releaser(self) -> Callable[..., None]:
+        """
+        Возвращает функцию освобождения слота задания.
+
+        Слот освобождается ровно один раз: по завершении задания в процессе
+        или явно при таймауте (после перезапуска пула).
+        """
+        released = False
+
+        def release(_future: Optional[Future] = None) -> None:
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                self._in_flight -= 1
+
+        return release
+
+    def _recycle_executor(self, executor: Optional[ProcessPoolExecutor] = None) -> None:
+        """
+        Завершает процессы пула и сбрасывает его.
+
+        Таймаут ожидания не останавливает дочерний процесс: зависший файл
+        держал бы процесс и слот пула бесконечно. Задания, выполнявшиеся
+        в других процессах пула, завершаются с BrokenProcessPool.
+
+        Args:
+            executor: Пул, который нужно остановить (по умолчанию текущий).
+                Если текущий пул уже пересоздан другим заданием, он не трогается.
+        """
+        with self._lock:
+            if executor is None:
+                executor = self._executor
+            if executor is None:
+                return
+            if self._executor is executor:
+                self._executor = None
+
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("Book parsing pool recycled", killed_processes=len(processes))
+
+    async def parse(self, parser: BookParser, file_path: str) -> ParsedBook:
+        """
+        Парсит книгу, не блокируя event loop.
+
+        Args:
+            parser: Парсер (используется для определения формата и конфигурации)
+            file_path: Путь к файлу книги
+
+        Returns:
+            ParsedBook
+
+        Raises:
+            ParsingEngineBusyError: Очередь парсинга заполнена
+            ParsingEngineTimeoutError: Превышен таймаут парсинга
+            ParsingEngineCrashedError: Процесс-парсер аварийно завершился
+            ValueError: Формат не поддерживается
+        """
+        # Переопределённые через DI парсеры (моки, кастомные реализации)
+        # нельзя передать в дочерний процесс - выполняем их как есть
+        if self.mode != PARSING_MODE_PROCESS or not isinstance(parser, BookParser):
+            return await parser.parse_book(file_path)
+
+        file_format = await parser.detect_format(file_path)
+        if not parser.is_format_supported(file_format):
+            raise ValueError(f"Unsupported book format: {file_format}")
+
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                raise ParsingEngineBusyError(
+                    f"Book parsing queue is full ({self.capacity} jobs)"
+                )
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        release_slot = self._slot_releaser()
+        start_time = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            try:
+                concurrent_future = executor.submit(
+                    parse_book_file, file_path, file_format, parser.config
+                )
+            except BrokenProcessPool:
+                # Процесс-парсер упал (OOM и т.п.) - пересоздаём пул
+                self._recycle_executor(executor)
+                executor = self._get_executor()
+                concurrent_future = executor.submit(
+                    parse_book_file, file_path, file_format, parser.config
+                )
+        except Exception:
+            release_slot()
+            raise
+        concurrent_future.add_done_callback(release_slot)
+
+        try:
+            parsed_book = await asyncio.wait_for(
+                asyncio.wrap_future(concurrent_future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            self._recycle_executor(executor)
+            release_slot()
+            logger.error(
+                "Book parsing timed out",
+                file_path=file_path,
+                timeout=self.timeout,
+            )
+            raise ParsingEngineTimeoutError(
+                f"Book parsing exceeded {self.timeout}s"
+            )
+        except BrokenProcessPool as e:
+            self._recycle_executor(executor)
+            self._stats["failed"] += 1
+            logger.error("Book parsing worker crashed", file_path=file_path, error=str(e))
+            raise ParsingEngineCrashedError(f"Book parsing worker crashed: {e}") from e
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+
+        elapsed = time.perf_counter() - start_time
+        self._stats["completed"] += 1
+        self._stats["total_parse_time"] += elapsed
+        logger.debug(
+            "Book parsed in worker process",
+            file_path=file_path,
+            parse_time=round(elapsed, 3),
+        )
+        return parsed_book
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Останавливает пул процессов (вызывается при shutdown приложения)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Book parsing pool stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику движка."""
+        completed = self._stats["completed"]
+        return {
+            "mode": self.mode,
+            "pool_size": self.pool_size,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "in_flight": self._in_flight,
+            **self._stats,
+            "avg_parse_time": (
+                round(self._stats["total_parse_time"] / completed, 3)
+                if completed
+                else 0.0
+            ),
+        }
+
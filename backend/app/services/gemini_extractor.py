@@ -6,10 +6,13 @@ REPLACES LangExtract library:
 - This module uses direct API calls to get full paragraphs
 
 ARCHITECTURE:
-- google-generativeai SDK for direct Gemini access
+- google-genai async SDK via shared LLMTransport (pooled keep-alive HTTP)
 - Few-shot prompts for Russian literature
 - JSON repair with retry logic
 - Recursive text chunking
+- Concurrent chunk extraction with shared RPM/TPM rate limiter
+- Persistent cache of chunk responses (Redis + PostgreSQL) by content hash
+- Batched prompts: several short segments (chapters/chunk tails) per request
 - Exponential backoff retry with tenacity
 
 Created: 2025-12-13
@@ -33,6 +36,13 @@ from app.core.retry import (
     RateLimitError,
     TimeoutError as RetryTimeoutError,
 )
+from app.services.llm_rate_limiter import get_llm_rate_limiter, map_bounded
+from app.services.llm_transport import get_llm_transport
+from app.services.llm_extraction_cache import (
+    LLMExtractionCache,
+    compute_prompt_version,
+    llm_extraction_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -119,6 +129,20 @@ class GeminiConfig:
     retry_delay_seconds: float = 1.0
     timeout_seconds: int = 30
 
+    # Параллелизм и квоты провайдера (общий limiter на модель)
+    max_concurrent_chunks: int = field(
+        default_factory=lambda: int(os.getenv("LLM_MAX_CONCURRENT_CHUNKS", "4"))
+    )
+    requests_per_minute: int = field(
+        default_factory=lambda: int(os.getenv("LLM_REQUESTS_PER_MINUTE", "150"))
+    )
+    tokens_per_minute: int = field(
+        default_factory=lambda: int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    )
+
+    # Кэш ответов по (sha256 чанка, версия промпта, модель)
+    use_cache: bool = True
+
 
 class RecursiveTextChunker:
     """
@@ -391,15 +415,67 @@ class GeminiDirectExtractor:
 
 Верни ТОЛЬКО JSON с найденными описаниями. Если описаний нет, верни {{"descriptions": []}}."""
 
-    def __init__(self, config: Optional[GeminiConfig] = None):
+    # Промпт для пакета фрагментов из разных глав (короткие главы, хвосты чанков).
+    # Каждое описание помечается segment - по нему ответ делится обратно по главам.
+    BATCH_EXTRACTION_PROMPT = """Ты - эксперт по извлечению визуальных описаний из русской литературы для создания иллюстраций.
+
+ЗАДАЧА: Ниже несколько НЕЗАВИСИМЫХ фрагментов книги. Найди визуальные описания в каждом фрагменте отдельно и верни их в формате JSON.
+
+ТИПЫ ОПИСАНИЙ:
+- location: места, здания, ландшафты, интерьеры, природа
+- character: внешность персонажей, одежда, черты лица, поза
+- atmosphere: настроение сцены, освещение, погода, звуки, запахи
+
+КРИТИЧЕСКИ ВАЖНЫЕ ПРАВИЛА:
+1. Извлекай ТОЛЬКО ПОЛНЫЕ ПРЕДЛОЖЕНИЯ - от заглавной буквы до знака препинания
+2. Минимум 200 символов, максимум 2000 символов на описание
+3. Сохраняй ОРИГИНАЛЬНЫЙ текст автора БЕЗ ИЗМЕНЕНИЙ
+4. НЕ извлекай диалоги, мысли, действия без визуальных деталей
+5. confidence: 0.9+ для детальных описаний, 0.7-0.9 для средних
+6. Описание не может объединять текст из разных фрагментов
+7. В поле "segment" укажи ID фрагмента, из которого взято описание
+
+ФОРМАТ ОТВЕТА (ОБЯЗАТЕЛЬНО JSON):
+```json
+{{
+  "descriptions": [
+    {{
+      "segment": "s0",
+      "content": "Полный текст описания из фрагмента, несколько предложений с визуальными деталями.",
+      "type": "location",
+      "confidence": 0.85
+    }}
+  ]
+}}
+```
+
+ФРАГМЕНТЫ:
+{segments}
+
+Верни ТОЛЬКО JSON с найденными описаниями. Если описаний нет, верни {{"descriptions": []}}."""
+
+    def __init__(
+        self,
+        config: Optional[GeminiConfig] = None,
+        cache: Optional[LLMExtractionCache] = None,
+    ):
         """Инициализация экстрактора."""
         self.config = config or GeminiConfig()
         self.config.api_key = self.config.api_key or os.getenv("LANGEXTRACT_API_KEY")
 
         self.chunker = RecursiveTextChunker(self.config)
         self.parser = JSONResponseParser()
+        self.rate_limiter = get_llm_rate_limiter(
+            self.config.model_id,
+            self.config.requests_per_minute,
+            self.config.tokens_per_minute,
+        )
+        self.cache = (cache or llm_extraction_cache) if self.config.use_cache else None
+        # Изменение EXTRACTION_PROMPT делает старые записи кэша промахами
+        self.prompt_version = compute_prompt_version(self.EXTRACTION_PROMPT)
+        self.batch_prompt_version = compute_prompt_version(self.BATCH_EXTRACTION_PROMPT)
 
-        self._client = None  # google-genai Client
+        self._transport = None  # LLMTransport (async google-genai)
         self._model = None   # model ID string
         self._types = None   # google.genai.types module
         self._available = False
@@ -407,6 +483,9 @@ class GeminiDirectExtractor:
         # Статистика
         self.stats = {
             "total_calls": 0,
+            "batch_calls": 0,
+            "batched_segments": 0,
+            "cache_hits": 0,
             "successful_calls": 0,
             "failed_calls": 0,
             "total_descriptions": 0,
@@ -417,22 +496,21 @@ class GeminiDirectExtractor:
         self._initialize()
 
     def _initialize(self):
-        """Инициализация Gemini API с новым google-genai SDK (December 2025)."""
+        """Инициализация Gemini API через общий async транспорт (google-genai SDK)."""
         if not self.config.api_key:
             logger.warning("LANGEXTRACT_API_KEY not set. Gemini extractor disabled.")
             return
 
         try:
-            from google import genai
             from google.genai import types
 
-            # Создаём клиент с новым SDK
-            self._client = genai.Client(api_key=self.config.api_key)
+            # Общий транспорт: пул keep-alive соединений и лимит запросов на модель
+            self._transport = get_llm_transport(self.config.api_key)
             self._model = self.config.model_id
             self._types = types
 
             self._available = True
-            logger.info(f"Gemini extractor initialized (model: {self.config.model_id}, SDK: google-genai)")
+            logger.info(f"Gemini extractor initialized (model: {self.config.model_id}, SDK: google-genai async)")
 
         except ImportError:
             logger.error("google-genai not installed. Run: pip install google-genai")
@@ -473,21 +551,21 @@ class GeminiDirectExtractor:
         chunks = self.chunker.chunk(text)
         logger.info(f"Text split into {len(chunks)} chunks for extraction")
 
-        for i, chunk in enumerate(chunks):
-            try:
-                chunk_descriptions = await self._extract_from_chunk(
-                    chunk["text"],
-                    chunk["start"]
-                )
-                all_descriptions.extend(chunk_descriptions)
-
-                # Пауза между запросами для rate limiting
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(0.1)
+        # Чанки независимы - обрабатываем параллельно (квоты соблюдает rate limiter)
+        results = await map_bounded(
+            lambda chunk: self._extract_from_chunk(chunk["text"], chunk["start"]),
+            chunks,
+            self.config.max_concurrent_chunks,
+        )
 
-            except Exception as e:
-                logger.warning(f"Chunk {i} extraction failed: {e}")
+        # map_bounded сохраняет порядок чанков (по смещению в тексте),
+        # поэтому дедупликация оставляет то же первое вхождение, что и раньше
+        for i, (chunk_descriptions, error) in enumerate(results):
+            if error is not None:
+                logger.warning(f"Chunk {i} extraction failed: {error}")
                 self.stats["failed_calls"] += 1
+                continue
+            all_descriptions.extend(chunk_descriptions)
 
         # Дедупликация
         unique_descriptions = self._deduplicate(all_descriptions)
@@ -515,6 +593,12 @@ class GeminiDirectExtractor:
         offset: int
     ) -> List[ExtractedDescription]:
         """Extract descriptions from a single chunk using tenacity retry."""
+        if self.cache is not None:
+            cached = await self.cache.get(chunk_text, self.config.model_id, self.prompt_version)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return self._parse_descriptions(cached, offset)
+
         self.stats["total_calls"] += 1
 
         prompt = self.EXTRACTION_PROMPT.format(text=chunk_text)
@@ -534,6 +618,9 @@ class GeminiDirectExtractor:
             # Estimate tokens
             self.stats["total_tokens"] += len(prompt) // 4 + len(response_text) // 4
 
+            if self.cache is not None:
+                await self._store_in_cache(chunk_text, parsed, response_text)
+
             return descriptions
 
         except Exception as e:
@@ -541,6 +628,141 @@ class GeminiDirectExtractor:
             self.stats["failed_calls"] += 1
             return []
 
+    async def extract_batch(
+        self,
+        segments: List[Dict[str, Any]],
+    ) -> List[List[ExtractedDescription]]:
+        """
+        Извлечь описания из нескольких коротких фрагментов одним запросом.
+
+        Фрагменты (короткие главы, хвосты чанков) помечаются ID в промпте,
+        ответ делится обратно по полю "segment". Фрагменты, найденные в
+        кэше, в запрос не попадают. Если ответ не удалось разобрать,
+        каждый фрагмент обрабатывается отдельным запросом.
+
+        Args:
+            segments: [{"text": str, "start": int}] - текст и смещение в главе
+
+        Returns:
+            Списки описаний в порядке segments
+        """
+        results: List[Optional[List[ExtractedDescription]]] = [None] * len(segments)
+        pending: List[int] = []
+
+        for i, segment in enumerate(segments):
+            if self.cache is not None:
+                cached = await self.cache.get(
+                    segment["text"], self.config.model_id, self.batch_prompt_version
+                )
+                if cached is not None:
+                    self.stats["cache_hits"] += 1
+                    results[i] = self._parse_descriptions(cached, segment["start"])
+                    continue
+            pending.append(i)
+
+        if len(pending) == 1:
+            i = pending[0]
+            results[i] = await self._extract_from_chunk(segments[i]["text"], segments[i]["start"])
+        elif pending:
+            by_segment = await self._call_batch(segments, pending)
+            if by_segment is None:
+                # Ответ не разобран - не теряем фрагменты, обрабатываем по одному
+                fallback = await map_bounded(
+                    lambda i: self._extract_from_chunk(segments[i]["text"], segments[i]["start"]),
+                    pending,
+                    self.config.max_concurrent_chunks,
+                )
+                for i, (descriptions, error) in zip(pending, fallback):
+                    results[i] = descriptions if error is None else []
+            else:
+                for i in pending:
+                    items = by_segment.get(f"s{i}", [])
+                    results[i] = self._parse_descriptions(items, segments[i]["start"])
+                    if self.cache is not None:
+                        await self.cache.set(
+                            segments[i]["text"],
+                            self.config.model_id,
+                            self.batch_prompt_version,
+                            {"descriptions": items},
+                        )
+
+        return [r if r is not None else [] for r in results]
+
+    async def _call_batch(
+        self,
+        segments: List[Dict[str, Any]],
+        pending: List[int],
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Один запрос для пакета фрагментов.
+
+        Returns:
+            Сырые описания по ID фрагмента или None, если ответ не разобран
+        """
+        self.stats["total_calls"] += 1
+        self.stats["batch_calls"] += 1
+        self.stats["batched_segments"] += len(pending)
+
+        segments_text = "\n\n".join(
+            f"<<<s{i}>>>\n{segments[i]['text']}\n<<<END s{i}>>>" for i in pending
+        )
+        prompt = self.BATCH_EXTRACTION_PROMPT.format(segments=segments_text)
+
+        try:
+            response_text = await self._call_gemini_with_retry(prompt)
+        except Exception as e:
+            logger.warning(f"Batch extraction failed after all retries: {e}")
+            self.stats["failed_calls"] += 1
+            return None
+
+        self.stats["total_tokens"] += len(prompt) // 4 + len(response_text) // 4
+
+        parsed = self.parser.parse(response_text)
+        items = parsed.get("descriptions") if isinstance(parsed, dict) else None
+        if not isinstance(items, list) or (not items and '"descriptions"' not in response_text):
+            logger.warning("Batch response could not be parsed, falling back to single requests")
+            self.stats["failed_calls"] += 1
+            return None
+
+        self.stats["successful_calls"] += 1
+
+        by_segment: Dict[str, List[Dict[str, Any]]] = {f"s{i}": [] for i in pending}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            segment_id = str(item.get("segment", "")).strip()
+            if segment_id in by_segment:
+                by_segment[segment_id].append(item)
+            else:
+                logger.debug(f"Description with unknown segment id dropped: {segment_id!r}")
+
+        return by_segment
+
+    async def _store_in_cache(self, chunk_text: str, parsed: Any, response_text: str) -> None:
+        """
+        Сохранить распарсенный ответ в кэш.
+
+        Кэшируется сырой список описаний (до фильтров конфигурации и без
+        смещения чанка). Пустой результат кэшируется только если модель
+        явно вернула "descriptions" - иначе это может быть нераспарсенный ответ.
+        """
+        if isinstance(parsed, list):
+            items = parsed
+        elif isinstance(parsed, dict):
+            items = parsed.get("descriptions", [])
+        else:
+            return
+
+        if not isinstance(items, list) or (not items and '"descriptions"' not in response_text):
+            return
+
+        await self.cache.set(
+            chunk_text,
+            self.config.model_id,
+            self.prompt_version,
+            {"descriptions": items},
+        )
+
     @retry_llm_extraction
     async def _call_gemini_with_retry(self, prompt: str) -> str:
         """
@@ -548,6 +770,9 @@ class GeminiDirectExtractor:
 
         Raises retryable exceptions that trigger tenacity retry logic.
         """
+        # Каждая попытка (включая retry) проходит через общий limiter
+        await self.rate_limiter.acquire(self._estimate_tokens(prompt))
+
         try:
             # Call Gemini API with new SDK (google-genai)
             # Using types.GenerateContentConfig for proper configuration
@@ -557,8 +782,7 @@ class GeminiDirectExtractor:
             )
 
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self._client.models.generate_content,
+                self._transport.generate_content(
                     model=self._model,
                     contents=prompt,
                     config=config,
@@ -579,16 +803,25 @@ class GeminiDirectExtractor:
         except Exception as e:
             error_msg = str(e)
             # Check if it's a rate limit error
-            if "rate" in error_msg.lower() and "limit" in error_msg.lower():
-                raise RateLimitError(error_msg) from e
-            if "quota" in error_msg.lower():
-                raise RateLimitError(error_msg) from e
-            if "429" in error_msg:
-                raise RateLimitError(error_msg) from e
+            lowered = error_msg.lower()
+            if (
+                ("rate" in lowered and "limit" in lowered)
+                or "quota" in lowered
+                or "429" in error_msg
+            ):
+                rate_limit_error = RateLimitError(error_msg)
+                # Притормаживаем все параллельные запросы к модели
+                self.rate_limiter.penalize(rate_limit_error.retry_after)
+                raise rate_limit_error from e
             # Other errors - wrap as retryable LLMExtractionError
             logger.error(f"Gemini extraction error: {error_msg}")
             raise LLMExtractionError(error_msg) from e
 
+    @staticmethod
+    def _estimate_tokens(prompt: str) -> int:
+        """Оценка токенов запроса для TPM квоты (prompt + сопоставимый ответ)."""
+        return len(prompt) // 4 * 2
+
     def _parse_descriptions(
         self,
         parsed: Any,
@@ -683,6 +916,9 @@ class GeminiDirectExtractor:
                 self.stats["total_descriptions"] / self.stats["successful_calls"]
                 if self.stats["successful_calls"] > 0 else 0
             ),
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "transport": self._transport.get_stats() if self._transport is not None else None,
         }
 
 
@@ -0,0 +1,413 @@
+"""
+Хранилище сгенерированных изображений - content-addressed файлы в шардах.
+
+Ответственности:
+- Сохранение изображения под SHA-256 именем содержимого
+- Двухуровневые шардированные директории (ab/cd/abcd....png)
+- Подсчёт ссылок по строкам GeneratedImage перед удалением файла
+- Сборка мусора: удаление файлов, на которые не ссылается ни одна строка
+- Миграция файлов из старой плоской директории (imagen_<timestamp>_<md5>.png)
+
+Варианты изображения (WebP/AVIF, см. image_variants) лежат в шарде
+оригинала под именем <sha256>.w<width>.<format> и удаляются вместе с ним.
+
+Одинаковые изображения (повторная генерация с тем же результатом,
+копии между пользователями) хранятся на диске один раз. Шарды по 256
+поддиректорий на уровень держат каждую директорию маленькой даже при
+сотнях тысяч файлов - листинг и бэкап не деградируют.
+
+Created: 2026-01-20
+Author: fancai Team
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.logging import logger
+from ..models.image import GeneratedImage
+
+
+# Префикс HTTP URL, по которому роутер отдаёт файлы изображений
+IMAGE_URL_PREFIX = "/api/v1/images/file/"
+
+# <sha256>.<ext> (оригинал) или <sha256>.w<width>.<ext> (вариант)
+_HASH_FILENAME_RE = re.compile(r"^([0-9a-f]{64})(?:\.w[0-9]{1,5})?\.[a-z0-9]{2,5}$")
+_SHARD_DIR_RE = re.compile(r"^[0-9a-f]{2}$")
+
+
+@dataclass
+class StoredImage:
+    """Результат сохранения изображения."""
+
+    path: Path
+    sha256: str
+    size: int
+    # False если файл с таким содержимым уже был в хранилище
+    created: bool
+
+    @property
+    def url(self) -> str:
+        """HTTP URL изображения для фронтенда."""
+        return f"{IMAGE_URL_PREFIX}{self.path.name}"
+
+
+class GeneratedImageStore:
+    """Content-addressed хранилище сгенерированных изображений."""
+
+    def __init__(
+        self,
+        root_directory: Optional[str] = None,
+        gc_grace_seconds: Optional[int] = None,
+    ):
+        """
+        Инициализация хранилища.
+
+        Args:
+            root_directory: Корневая директория изображений
+            gc_grace_seconds: Минимальный возраст файла для удаления сборщиком мусора
+        """
+        from ..core.config import settings
+
+        self.root_directory = Path(root_directory or settings.GENERATED_IMAGES_DIRECTORY)
+        self.gc_grace_seconds = (
+            gc_grace_seconds if gc_grace_seconds is not None else settings.IMAGE_GC_GRACE_SECONDS
+        )
+
+    def shard_directory(self, sha256: str) -> Path:
+        """Директория шарда: <root>/ab/cd."""
+        return self.root_directory / sha256[:2] / sha256[2:4]
+
+    def path_for_hash(self, sha256: str, extension: str = ".png") -> Path:
+        """Возвращает шардированный путь файла: <root>/ab/cd/<sha256><ext>."""
+        return self.shard_directory(sha256) / f"{sha256}{extension}"
+
+    @staticmethod
+    def hash_from_path(path: str) -> Optional[str]:
+        """SHA-256 из имени content-addressed файла или варианта (None для старых имён)."""
+        match = _HASH_FILENAME_RE.match(os.path.basename(path))
+        return match.group(1) if match else None
+
+    def resolve_filename(self, filename: str) -> Optional[Path]:
+        """
+        Возвращает путь файла по имени из URL /api/v1/images/file/{filename}.
+
+        Content-addressed имена (оригиналы и варианты) ищутся в шардах,
+        остальные - в плоской директории (файлы, ещё не перенесённые
+        migrate_legacy).
+
+        Returns:
+            Путь к файлу или None если имя недопустимо (path traversal)
+        """
+        if not filename or ".." in filename or "/" in filename or "\\" in filename:
+            return None
+
+        match = _HASH_FILENAME_RE.match(filename)
+        if match:
+            return self.shard_directory(match.group(1)) / filename
+        return self.root_directory / filename
+
+    async def save(self, data: bytes, extension: str = ".png") -> StoredImage:
+        """
+        Сохраняет изображение под SHA-256 именем содержимого.
+
+        Данные пишутся (в потоке) в частичный файл в директории шарда и
+        атомарно переименовываются. Если файл с таким содержимым уже есть,
+        второй экземпляр не создаётся - обновляется только mtime, чтобы
+        сборщик мусора не удалил файл до коммита новой строки GeneratedImage.
+
+        Args:
+            data: Байты изображения
+            extension: Расширение файла (.png)
+
+        Returns:
+            StoredImage с путём, SHA-256 и размером
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        final_path = self.path_for_hash(sha256, extension)
+
+        if final_path.exists():
+            try:
+                os.utime(final_path)
+            except OSError:
+                pass
+            return StoredImage(path=final_path, sha256=sha256, size=len(data), created=False)
+
+        await asyncio.to_thread(self._write_atomically, final_path, data)
+
+        logger.debug("Generated image stored", path=str(final_path), size=len(data))
+        return StoredImage(path=final_path, sha256=sha256, size=len(data), created=True)
+
+    async def reference_count(
+        self, db: AsyncSession, local_path: str, exclude_image_id=None
+    ) -> int:
+        """
+        Количество строк GeneratedImage, ссылающихся на файл.
+
+        Args:
+            db: Сессия базы данных
+            local_path: Путь к файлу изображения
+            exclude_image_id: ID строки, которая не учитывается (удаляемая)
+        """
+        sha256 = self.hash_from_path(local_path)
+        condition = GeneratedImage.local_path == local_path
+        if sha256:
+            condition = or_(GeneratedImage.content_hash == sha256, condition)
+
+        query = select(func.count(GeneratedImage.id)).where(condition)
+        if exclude_image_id is not None:
+            query = query.where(GeneratedImage.id != exclude_image_id)
+
+        return (await db.execute(query)).scalar() or 0
+
+    async def release(
+        self, db: AsyncSession, local_path: Optional[str], exclude_image_id=None
+    ) -> bool:
+        """
+        Удаляет файл изображения, если на него больше не ссылаются строки.
+
+        Вызывается после удаления строки или смены её local_path
+        (перегенерация). Файл, общий с другими изображениями, остаётся.
+        Вместе с оригиналом удаляются его варианты.
+
+        Returns:
+            True если файл был удалён
+        """
+        if not local_path:
+            return False
+
+        if await self.reference_count(db, local_path, exclude_image_id):
+            return False
+
+        removed = await self._remove_quietly(Path(local_path))
+
+        sha256 = self.hash_from_path(local_path)
+        if sha256:
+            for variant_path in Path(local_path).parent.glob(f"{sha256}.w*"):
+                await self._remove_quietly(variant_path)
+
+        return removed
+
+    async def collect_garbage(
+        self, db: AsyncSession, grace_seconds: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Удаляет из шардов файлы, на которые не ссылается ни одна строка.
+
+        Файлы моложе grace_seconds не удаляются: изображение могло быть
+        сохранено, а его строка GeneratedImage ещё не закоммичена.
+        Плоская директория (старые имена) не затрагивается - её переносит
+        migrate_legacy().
+
+        Args:
+            db: Сессия базы данных
+            grace_seconds: Минимальный возраст удаляемого файла
+
+        Returns:
+            Статистика: просмотрено / удалено файлов, освобождено байт
+        """
+        result = await db.execute(
+            select(GeneratedImage.content_hash)
+            .where(GeneratedImage.content_hash.isnot(None))
+            .distinct()
+        )
+        referenced = {row[0] for row in result}
+
+        grace = self.gc_grace_seconds if grace_seconds is None else grace_seconds
+        stats = await asyncio.to_thread(self.sweep, referenced, grace)
+
+        logger.info("Generated image GC completed", **stats)
+        return stats
+
+    def sweep(self, referenced: Set[str], grace_seconds: int) -> Dict[str, Any]:
+        """
+        Синхронный обход шардов для collect_garbage() (выполняется в потоке).
+
+        Args:
+            referenced: SHA-256 файлов, на которые есть ссылки
+            grace_seconds: Минимальный возраст удаляемого файла
+        """
+        cutoff = time.time() - grace_seconds
+        stats = {"scanned_files": 0, "deleted_files": 0, "freed_bytes": 0}
+
+        for shard in self._shard_directories():
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stats["scanned_files"] += 1
+
+                    sha256 = self.hash_from_path(entry.name)
+                    if sha256 and sha256 in referenced:
+                        continue
+
+                    try:
+                        file_stat = entry.stat(follow_symlinks=False)
+                        if file_stat.st_mtime > cutoff:
+                            continue
+                        os.unlink(entry.path)
+                    except OSError:
+                        continue
+
+                    stats["deleted_files"] += 1
+                    stats["freed_bytes"] += file_stat.st_size
+
+            self._remove_empty_directory(shard)
+            self._remove_empty_directory(shard.parent)
+
+        return stats
+
+    async def migrate_legacy(
+        self, db: AsyncSession, dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Переносит файлы из плоской директории в content-addressed шарды.
+
+        Для каждого файла: копия в шарде (одинаковые файлы схлопываются),
+        обновление ссылающихся строк GeneratedImage (local_path, image_url,
+        content_hash, file_size), коммит, затем удаление старого файла.
+        Прерванную миграцию можно безопасно запустить повторно.
+
+        Args:
+            db: Сессия базы данных
+            dry_run: Только подсчитать файлы, ничего не менять
+
+        Returns:
+            Статистика миграции
+        """
+        stats = {
+            "legacy_files": 0,
+            "migrated_files": 0,
+            "deduplicated_files": 0,
+            "updated_rows": 0,
+            "failed_files": 0,
+        }
+
+        for legacy_path in self._legacy_files():
+            stats["legacy_files"] += 1
+            if dry_run:
+                continue
+
+            try:
+                async with aiofiles.open(legacy_path, "rb") as f:
+                    data = await f.read()
+
+                stored = await self.save(data, legacy_path.suffix.lower() or ".png")
+                legacy_url = f"{IMAGE_URL_PREFIX}{legacy_path.name}"
+
+                rows = await db.execute(
+                    update(GeneratedImage)
+                    .where(
+                        or_(
+                            GeneratedImage.local_path == str(legacy_path),
+                            GeneratedImage.image_url == legacy_url,
+                        )
+                    )
+                    .values(
+                        local_path=str(stored.path),
+                        content_hash=stored.sha256,
+                        file_size=stored.size,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    update(GeneratedImage)
+                    .where(GeneratedImage.image_url == legacy_url)
+                    .values(image_url=stored.url)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+                await self._remove_quietly(legacy_path)
+
+                stats["updated_rows"] += rows.rowcount or 0
+                if stored.created:
+                    stats["migrated_files"] += 1
+                else:
+                    stats["deduplicated_files"] += 1
+
+            except Exception as e:
+                await db.rollback()
+                stats["failed_files"] += 1
+                logger.error(
+                    "Failed to migrate generated image",
+                    path=str(legacy_path),
+                    error=str(e),
+                )
+
+        return stats
+
+    @staticmethod
+    def _write_atomically(final_path: Path, data: bytes) -> None:
+        """Пишет частичный файл рядом с final_path и переименовывает его."""
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = final_path.parent / f".{uuid4().hex}{final_path.suffix}.part"
+
+        try:
+            with open(partial_path, "wb") as f:
+                f.write(data)
+            os.replace(partial_path, final_path)
+        except BaseException:
+            try:
+                os.unlink(partial_path)
+            except OSError:
+                pass
+            raise
+
+    def _legacy_files(self) -> Iterable[Path]:
+        """Файлы в корне хранилища (старая плоская раскладка)."""
+        if not self.root_directory.is_dir():
+            return []
+        return sorted(
+            Path(entry.path)
+            for entry in os.scandir(self.root_directory)
+            if entry.is_file(follow_symlinks=False) and not entry.name.startswith(".")
+        )
+
+    def _shard_directories(self) -> Iterable[Path]:
+        """Директории второго уровня шардов (<root>/ab/cd)."""
+        if not self.root_directory.is_dir():
+            return []
+
+        shards = []
+        for first in os.scandir(self.root_directory):
+            if not (first.is_dir(follow_symlinks=False) and _SHARD_DIR_RE.match(first.name)):
+                continue
+            for second in os.scandir(first.path):
+                if second.is_dir(follow_symlinks=False) and _SHARD_DIR_RE.match(second.name):
+                    shards.append(Path(second.path))
+        return shards
+
+    @staticmethod
+    def _remove_empty_directory(path: Path) -> None:
+        """Удаляет пустую директорию шарда (непустую оставляет)."""
+        try:
+            path.rmdir()
+        except OSError:
+            pass
+
+    @staticmethod
+    async def _remove_quietly(path: Path) -> bool:
+        """Удаляет файл, игнорируя отсутствие файла и ошибки ФС."""
+        try:
+            if os.path.exists(path):
+                await aiofiles.os.remove(path)
+                return True
+        except OSError:
+            pass
+        return False
+
+
+# Глобальный экземпляр хранилища
+generated_image_store = GeneratedImageStore()
@@ -0,0 +1,178 @@
+"""
+Image Batch Generator - параллельная генерация изображений для главы.
+
+Заменяет последовательные циклы с фиксированным asyncio.sleep() между
+вызовами в ImageGeneratorService.batch_generate_for_chapter и
+generate_image_batch_task:
+- Окно одновременных генераций (IMAGEN_BATCH_CONCURRENCY)
+- Адаптивный темп (AIMD): после ответа 429 / quota окно уменьшается
+  вдвое, после окна успешных генераций растёт на 1. Паузу после 429 для
+  всех вызовов модели держит общий limiter (GoogleImagenGenerator)
+- on_result вызывается по мере готовности каждого изображения и никогда
+  параллельно - можно писать в одну сессию БД и обновлять прогресс
+
+ИСПОЛЬЗОВАНИЕ:
+    engine = ImageBatchGenerator()
+    results = await engine.run(descriptions, generate, on_result=save_image)
+
+Created: 2026-01-18
+Author: fancai Team
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.imagen_generator import IMAGEN_TOKENS_PER_MINUTE, ImageGenerationResult
+from app.services.llm_rate_limiter import TokenBucketRateLimiter, get_llm_rate_limiter
+
+T = TypeVar("T")
+
+# on_result(index, item, result)
+ResultHandler = Callable[[int, Any, Any], Awaitable[None]]
+
+
+def is_rate_limited_result(result: Any) -> bool:
+    """Генерация завершилась ошибкой 429 / quota (после всех retry)."""
+    if getattr(result, "success", False):
+        return False
+    message = (getattr(result, "error_message", None) or "").lower()
+    return "429" in message or "quota" in message or (
+        "rate" in message and "limit" in message
+    )
+
+
+class AdaptiveConcurrencyWindow:
+    """
+    Окно одновременных запросов с AIMD регулировкой.
+
+    Additive increase: +1 после size успешных запросов подряд.
+    Multiplicative decrease: size / 2 после ответа 429.
+    """
+
+    def __init__(self, max_size: int, min_size: int = 1):
+        """
+        Args:
+            max_size: Максимальный (и начальный) размер окна
+            min_size: Минимальный размер окна
+        """
+        self.max_size = max(1, max_size)
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.size = self.max_size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Ждёт свободного места в окне."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.size)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def release(self, rate_limited: bool = False) -> None:
+        """Освобождает место и подстраивает размер окна."""
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.size = max(self.min_size, self.size // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.size and self.size < self.max_size:
+                    self.size += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class ImageBatchGenerator:
+    """Параллельная генерация пакета изображений с адаптивным темпом."""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+    ):
+        """
+        Args:
+            max_concurrency: Максимум одновременных генераций
+                (по умолчанию IMAGEN_BATCH_CONCURRENCY)
+            rate_limiter: Limiter модели, по 429 которого сужается окно
+                (по умолчанию общий limiter IMAGEN_MODEL)
+        """
+        self.max_concurrency = max_concurrency or settings.IMAGEN_BATCH_CONCURRENCY
+        self.rate_limiter = rate_limiter or get_llm_rate_limiter(
+            settings.IMAGEN_MODEL,
+            settings.IMAGEN_REQUESTS_PER_MINUTE,
+            IMAGEN_TOKENS_PER_MINUTE,
+        )
+        self.stats: Dict[str, Any] = {}
+
+    async def run(
+        self,
+        items: Sequence[T],
+        generate: Callable[[T], Awaitable[Any]],
+        on_result: Optional[ResultHandler] = None,
+    ) -> List[Any]:
+        """
+        Генерирует изображения для всех items.
+
+        Args:
+            items: Описания (порядок сохраняется в результате)
+            generate: Генерация одного изображения -> ImageGenerationResult
+            on_result: Обработчик готового результата (index, item, result)
+
+        Returns:
+            Результаты в порядке items
+        """
+        window = AdaptiveConcurrencyWindow(self.max_concurrency)
+        results: List[Any] = [None] * len(items)
+        handler_lock = asyncio.Lock()
+        rate_limited_total = 0
+        # Один 429 виден всем запросам в полёте - окно сужается один раз
+        seen_penalties = self.rate_limiter.stats["rate_limited"]
+        start_time = time.monotonic()
+
+        async def run_item(index: int, item: T) -> None:
+            nonlocal rate_limited_total, seen_penalties
+
+            await window.acquire()
+            try:
+                result = await generate(item)
+            except Exception as e:
+                logger.error("Batch item generation error", index=index, error=str(e))
+                result = ImageGenerationResult(
+                    success=False, error_message=f"Generation error: {e}"
+                )
+            penalties = self.rate_limiter.stats["rate_limited"]
+            rate_limited = penalties > seen_penalties or is_rate_limited_result(result)
+            seen_penalties = max(seen_penalties, penalties)
+            if rate_limited:
+                rate_limited_total += 1
+            await window.release(rate_limited)
+
+            results[index] = result
+            if on_result is not None:
+                async with handler_lock:
+                    try:
+                        await on_result(index, item, result)
+                    except Exception as e:
+                        logger.error(
+                            "Batch result handler failed", index=index, error=str(e)
+                        )
+
+        await asyncio.gather(*(run_item(i, item) for i, item in enumerate(items)))
+
+        self.stats = {
+            "total": len(items),
+            "successful": sum(1 for r in results if getattr(r, "success", False)),
+            "rate_limited": rate_limited_total,
+            "peak_concurrency": window.peak_in_flight,
+            "final_window": window.size,
+            "elapsed_seconds": round(time.monotonic() - start_time, 2),
+        }
+        logger.info("Image batch completed", **self.stats)
+        return results
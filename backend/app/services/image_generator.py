@@ -8,7 +8,7 @@ Features:
 - Automatic Russian -> English prompt translation
 - Type-specific style templates (location, character, atmosphere)
 - Genre-aware styling
-- Batch generation support
+- Concurrent batch generation with adaptive pacing (ImageBatchGenerator)
 - Celery-based persistent queue (replaces in-memory queue)
 
 Architecture (December 2025):
@@ -17,13 +17,13 @@ Architecture (December 2025):
 - Retry logic: Automatic retries with exponential backoff
 """
 
-import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Awaitable
 from dataclasses import dataclass
 import logging
 from uuid import UUID
 
 from ..models.description import Description, DescriptionType
+from .image_batch_generator import ImageBatchGenerator
 from .imagen_generator import (
     get_imagen_service,
     ImageGenerationResult as ImagenResult,
@@ -33,6 +33,13 @@ from .imagen_generator import (
 logger = logging.getLogger(__name__)
 
 
+def _priority_score(description: Any) -> float:
+    """priority_score of a Description model or a description dict."""
+    if isinstance(description, dict):
+        return description.get('priority_score') or 0
+    return getattr(description, 'priority_score', None) or 0
+
+
 @dataclass
 class ImageGenerationRequest:
     """Request for image generation."""
@@ -51,6 +58,7 @@ class ImageGenerationResult:
     success: bool
     image_url: Optional[str] = None
     local_path: Optional[str] = None
+    content_hash: Optional[str] = None
     error_message: Optional[str] = None
     generation_time_seconds: Optional[float] = None
     model_used: Optional[str] = None
@@ -63,6 +71,7 @@ class ImageGenerationResult:
             success=result.success,
             image_url=result.image_url,
             local_path=result.local_path,
+            content_hash=result.content_hash,
             error_message=result.error_message,
             generation_time_seconds=result.generation_time_seconds,
             model_used=result.model_used,
@@ -99,7 +108,8 @@ class ImageGeneratorService:
         description: Description,
         user_id: str,
         book_genre: Optional[str] = None,
-        custom_style: Optional[str] = None
+        custom_style: Optional[str] = None,
+        english_description: Optional[str] = None,
     ) -> ImageGenerationResult:
         """
         Generate image for a description from the database.
@@ -109,6 +119,7 @@ class ImageGeneratorService:
             user_id: ID of requesting user
             book_genre: Genre for style adaptation
             custom_style: Additional style instructions
+            english_description: Translation prepared for the whole batch
 
         Returns:
             ImageGenerationResult with image URL or error
@@ -125,6 +136,7 @@ class ImageGeneratorService:
             description_type=description.type.value if hasattr(description.type, 'value') else str(description.type),
             genre=book_genre,
             custom_style=custom_style,
+            english_description=english_description,
         )
 
         logger.info(
@@ -169,51 +181,62 @@ class ImageGeneratorService:
 
     async def batch_generate_for_chapter(
         self,
-        descriptions: List[Dict[str, Any]],
+        descriptions: List[Any],
         user_id: str,
         book_genre: Optional[str] = None,
-        max_images: int = 5
+        max_images: int = 5,
+        on_result: Optional[
+            Callable[[Any, ImageGenerationResult], Awaitable[None]]
+        ] = None,
     ) -> List[ImageGenerationResult]:
         """
         Generate images for a list of descriptions from a chapter.
 
+        All descriptions are translated up front in batched Gemini calls,
+        then generated concurrently (ImageBatchGenerator) with the window
+        adapting to 429 / quota responses.
+
         Args:
-            descriptions: List of description dicts to generate images for
+            descriptions: Descriptions to generate images for
             user_id: ID of requesting user
             book_genre: Genre for style adaptation
             max_images: Maximum number of images to generate
+            on_result: Called with (description, result) as soon as each
+                image is ready, never concurrently (e.g. to persist it)
 
         Returns:
-            List of ImageGenerationResult
+            List of ImageGenerationResult (in priority order)
         """
         # Sort by priority and take top N
         sorted_descriptions = sorted(
             descriptions,
-            key=lambda d: d.get('priority_score', 0),
+            key=_priority_score,
             reverse=True
         )[:max_images]
 
-        results = []
+        translations = await self.imagen_service.translate_descriptions(
+            [desc.content for desc in sorted_descriptions]
+        )
 
-        for desc in sorted_descriptions:
+        async def generate(desc: Any) -> ImageGenerationResult:
             try:
-                result = await self.generate_image_for_description(
-                    desc, user_id, book_genre
+                return await self.generate_image_for_description(
+                    desc, user_id, book_genre,
+                    english_description=translations.get(desc.content),
                 )
-                results.append(result)
-
-                # Small delay between requests to avoid rate limiting
-                if len(results) < len(sorted_descriptions):
-                    await asyncio.sleep(1)
-
             except Exception as e:
                 logger.error(f"Error generating image for description: {e}")
-                results.append(ImageGenerationResult(
+                return ImageGenerationResult(
                     success=False,
                     error_message=f"Generation error: {str(e)}"
-                ))
+                )
+
+        handler = None
+        if on_result is not None:
+            async def handler(index: int, desc: Any, result: ImageGenerationResult) -> None:
+                await on_result(desc, result)
 
-        return results
+        return await ImageBatchGenerator().run(sorted_descriptions, generate, handler)
 
     def add_to_queue(self, request: ImageGenerationRequest) -> str:
         """
@@ -349,6 +372,10 @@ class ImageGeneratorService:
             "ready": result.ready(),
         }
 
+        if result.status == "PROGRESS" and isinstance(result.info, dict):
+            # Batch task: images generated so far
+            status_info["progress"] = result.info
+
         if result.ready():
             if result.successful():
                 status_info["result"] = result.result
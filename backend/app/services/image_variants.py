@@ -0,0 +1,212 @@
+"""
+Варианты сгенерированных изображений - WebP/AVIF в нескольких ширинах.
+
+Imagen отдаёт PNG в несколько мегабайт; мобильному PWA клиенту почти
+всегда достаточно WebP/AVIF шириной с экран. После генерации Celery
+задача generate_image_variants строит варианты исходного файла:
+
+    <root>/ab/cd/<sha256>.png          - оригинал
+    <root>/ab/cd/<sha256>.w640.webp    - вариант шириной 640px
+
+Варианты лежат в шарде оригинала и именуются по его SHA-256, поэтому
+подсчёт ссылок и GC хранилища распространяются на них автоматически.
+Список вариантов записывается в GeneratedImage.variants, эндпоинт файла
+выбирает вариант по заголовку Accept и параметру w (select_variant).
+
+Модуль не импортирует Pillow и SQLAlchemy на уровне модуля - он
+используется и в API процессе (выбор варианта), и в Celery воркере.
+
+Created: 2026-01-21
+Author: fancai Team
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import uuid4
+
+
+# Предпочтение форматов при согласовании по Accept (лучшее сжатие первым)
+FORMAT_PREFERENCE = ("avif", "webp")
+
+MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+}
+
+
+def variant_filename(sha256: str, width: int, image_format: str) -> str:
+    """Имя файла варианта: <sha256>.w<width>.<format>."""
+    return f"{sha256}.w{width}.{image_format}"
+
+
+def avif_supported() -> bool:
+    """Поддерживает ли установленный Pillow кодирование AVIF."""
+    try:
+        from PIL import features
+
+        if features.check("avif"):
+            return True
+    except Exception:
+        pass
+
+    try:
+        import pillow_avif  # noqa: F401 - регистрирует AVIF плагин Pillow
+
+        return True
+    except ImportError:
+        return False
+
+
+def build_image_variants(
+    source_path: str,
+    sha256: str,
+    widths: Sequence[int],
+    formats: Sequence[str],
+    quality: int = 80,
+) -> Dict[str, Any]:
+    """
+    Синхронно строит варианты изображения (CPU-bound, выполняется в воркере).
+
+    Ширины больше исходной пропускаются, вариант исходной ширины строится
+    всегда. Уже существующие файлы вариантов не перекодируются - одинаковые
+    изображения разных пользователей делят и оригинал, и варианты.
+
+    Args:
+        source_path: Путь к оригиналу в content-addressed хранилище
+        sha256: SHA-256 оригинала (префикс имён вариантов)
+        widths: Целевые ширины в пикселях
+        formats: Форматы вариантов ("webp", "avif")
+        quality: Качество кодирования (0-100)
+
+    Returns:
+        {"width", "height", "variants": [{"format", "width", "height",
+        "size", "filename"}, ...]}
+    """
+    from PIL import Image
+
+    if "avif" in formats and not avif_supported():
+        formats = [image_format for image_format in formats if image_format != "avif"]
+
+    directory = os.path.dirname(source_path)
+    variants: List[Dict[str, Any]] = []
+
+    with Image.open(source_path) as source:
+        source.load()
+        source_width, source_height = source.size
+
+        image = source
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        target_widths = sorted({w for w in widths if w < source_width} | {source_width})
+
+        for target_width in target_widths:
+            target_height = max(1, round(source_height * target_width / source_width))
+            resized = None
+
+            for image_format in formats:
+                filename = variant_filename(sha256, target_width, image_format)
+                path = os.path.join(directory, filename)
+
+                if not os.path.exists(path):
+                    if resized is None:
+                        resized = (
+                            image
+                            if target_width == source_width
+                            else image.resize((target_width, target_height), Image.LANCZOS)
+                        )
+                    _save_atomically(resized, path, image_format, quality)
+
+                variants.append({
+                    "format": image_format,
+                    "width": target_width,
+                    "height": target_height,
+                    "size": os.path.getsize(path),
+                    "filename": filename,
+                })
+
+    return {"width": source_width, "height": source_height, "variants": variants}
+
+
+def _save_atomically(image, path: str, image_format: str, quality: int) -> None:
+    """Кодирует изображение в частичный файл и переименовывает его."""
+    partial_path = os.path.join(
+        os.path.dirname(path), f".{uuid4().hex}.{image_format}.part"
+    )
+    try:
+        image.save(partial_path, format=image_format.upper(), quality=quality)
+        os.replace(partial_path, path)
+    except BaseException:
+        try:
+            os.unlink(partial_path)
+        except OSError:
+            pass
+        raise
+
+
+def accepted_formats(accept_header: Optional[str]) -> List[str]:
+    """
+    Форматы вариантов, явно принимаемые клиентом (по заголовку Accept).
+
+    Браузеры с поддержкой WebP/AVIF перечисляют их явно, поэтому image/*
+    и */* не считаются согласием - такие клиенты получают оригинал.
+    """
+    if not accept_header:
+        return []
+
+    accepted = set()
+    for part in accept_header.split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality <= 0:
+            continue
+        for image_format in FORMAT_PREFERENCE:
+            if media_type.strip().lower() == MEDIA_TYPES[image_format]:
+                accepted.add(image_format)
+
+    return [image_format for image_format in FORMAT_PREFERENCE if image_format in accepted]
+
+
+def select_variant(
+    variants: Optional[Sequence[Dict[str, Any]]],
+    accept_header: Optional[str],
+    width: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Выбирает лучший вариант изображения для клиента.
+
+    Формат - первый из FORMAT_PREFERENCE, принимаемый клиентом и
+    имеющийся среди вариантов. Ширина - наименьшая не меньше запрошенной
+    (иначе наибольшая); без w - вариант исходной ширины.
+
+    Returns:
+        Запись варианта или None (отдать оригинал)
+    """
+    if not variants:
+        return None
+
+    for image_format in accepted_formats(accept_header):
+        candidates = sorted(
+            (v for v in variants if v.get("format") == image_format),
+            key=lambda v: v["width"],
+        )
+        if not candidates:
+            continue
+
+        if width is not None:
+            for candidate in candidates:
+                if candidate["width"] >= width:
+                    return candidate
+        return candidates[-1]
+
+    return None
@@ -9,8 +9,12 @@ Features:
 - Optimized prompts for book illustrations
 - Type-specific style templates (location, character, atmosphere)
 - Genre-aware styling
-- Caching support for translations
+- Shared translation cache (in-process LRU + Redis + PostgreSQL)
+- Batched translation for multi-description jobs (one Gemini call per chunk)
 - Exponential backoff retry for resilience
+- Async google-genai calls via shared LLMTransport (pooled keep-alive HTTP)
+- Shared per-model RPM limiter, paused on 429 / quota responses
+- Content-addressed image storage (SHA-256 names, sharded directories)
 
 Created: 2025-12-13
 Updated: 2025-12-28 - Added tenacity-based retry logic
@@ -18,25 +22,36 @@ Updated: 2025-12-28 - Added tenacity-based retry logic
 
 import os
 import asyncio
-import hashlib
+import json
 import time
 import base64
-from pathlib import Path
-from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Sequence
 from dataclasses import dataclass
 from enum import Enum
 import logging
 
+from app.core.config import settings
 from app.core.retry import (
     retry_image_generation,
     ImageGenerationError,
     RateLimitError,
     TimeoutError as RetryTimeoutError,
 )
+from app.services.generated_image_store import (
+    GeneratedImageStore,
+    StoredImage,
+    generated_image_store,
+)
+from app.services.llm_extraction_cache import compute_prompt_version
+from app.services.llm_rate_limiter import get_llm_rate_limiter
+from app.services.llm_transport import get_llm_transport
+from app.services.translation_cache import TranslationCache, translation_cache
 
 logger = logging.getLogger(__name__)
 
+# Imagen квотируется только по запросам в минуту - токены не ограничиваем
+IMAGEN_TOKENS_PER_MINUTE = 1_000_000_000
+
 
 class DescriptionType(Enum):
     """Types of descriptions for image generation."""
@@ -58,6 +73,7 @@ class ImagenConfig:
     timeout_seconds: int = 60
     max_retries: int = 3
     retry_delay: float = 1.0
+    requests_per_minute: int = 20
 
 
 @dataclass
@@ -67,6 +83,7 @@ class ImageGenerationResult:
     image_url: Optional[str] = None
     image_data: Optional[bytes] = None
     local_path: Optional[str] = None
+    content_hash: Optional[str] = None
     error_message: Optional[str] = None
     generation_time_seconds: Optional[float] = None
     model_used: Optional[str] = None
@@ -78,6 +95,9 @@ class PromptTranslator:
     Translates Russian descriptions to English for Imagen.
 
     Uses Gemini for accurate literary translation optimized for visual prompts.
+    Translations are cached by (sha256(text), prompt version, model) in the
+    shared TranslationCache, so each description is translated once for all
+    API and Celery processes.
     """
 
     TRANSLATION_PROMPT = """You are a translator specializing in visual descriptions for image generation.
@@ -97,21 +117,51 @@ Russian text:
 
 English translation (visual elements only, no explanations):"""
 
-    def __init__(self, api_key: str):
+    BATCH_TRANSLATION_PROMPT = """You are a translator specializing in visual descriptions for image generation.
+
+TASK: Translate each Russian visual description below to English for AI image generation.
+
+RULES:
+1. Focus ONLY on visual elements (appearance, colors, textures, lighting)
+2. Use vivid, descriptive adjectives
+3. Preserve the mood and atmosphere
+4. Use common English art and photography terms
+5. Keep each translation under 150 words
+6. Do NOT add interpretations - translate only what's written
+7. Translate every description separately, never merge them
+
+Descriptions (JSON array of {{"id", "text"}}):
+{items}
+
+Respond with JSON only:
+{{"translations": [{{"id": "<id>", "translation": "<English translation>"}}]}}"""
+
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[TranslationCache] = None,
+        batch_size: Optional[int] = None,
+    ):
         self.api_key = api_key
-        self._client = None
+        self._transport = None
         self._model = "gemini-3-flash-preview"  # Dec 2025: gemini-3-flash-preview
-        self._cache: Dict[str, str] = {}  # Simple in-memory cache
+        self._cache = cache or translation_cache
+        self._prompt_version = self.prompt_version()
+        self._batch_size = batch_size or settings.TRANSLATION_BATCH_SIZE
         self._initialize()
 
+    @classmethod
+    def prompt_version(cls) -> str:
+        """Версия промптов перевода для ключа кэша (одиночный и пакетный)."""
+        return compute_prompt_version(cls.TRANSLATION_PROMPT + cls.BATCH_TRANSLATION_PROMPT)
+
     def _initialize(self):
         """Initialize Gemini for translation with new google-genai SDK."""
         try:
-            from google import genai
             from google.genai import types
-            self._client = genai.Client(api_key=self.api_key)
+            self._transport = get_llm_transport(self.api_key)
             self._types = types
-            logger.info("PromptTranslator initialized with Gemini 3.0 Flash (google-genai SDK)")
+            logger.info("PromptTranslator initialized with Gemini 3.0 Flash (google-genai async)")
         except Exception as e:
             logger.error(f"Failed to initialize translator: {e}")
             self._types = None
@@ -126,13 +176,13 @@ English translation (visual elements only, no explanations):"""
         Returns:
             English translation optimized for image generation
         """
-        # Check cache
-        cache_key = hashlib.md5(russian_text.encode(), usedforsecurity=False).hexdigest()[:16]
-        if cache_key in self._cache:
-            logger.debug(f"Translation cache hit: {cache_key}")
-            return self._cache[cache_key]
+        # Check cache (memory -> Redis -> PostgreSQL)
+        cached = await self._cache.get(russian_text, self._model, self._prompt_version)
+        if cached is not None:
+            logger.debug(f"Translation cache hit: {russian_text[:50]}...")
+            return cached
 
-        if not self._client:
+        if not self._transport:
             logger.warning("Translator not available, returning original text")
             return russian_text
 
@@ -144,8 +194,7 @@ English translation (visual elements only, no explanations):"""
                 temperature=0.3,
             ) if self._types else None
 
-            response = await asyncio.to_thread(
-                self._client.models.generate_content,
+            response = await self._transport.generate_content(
                 model=self._model,
                 contents=prompt,
                 config=config,
@@ -154,8 +203,9 @@ English translation (visual elements only, no explanations):"""
             # Extract text from response
             translation = (response.text if hasattr(response, 'text') else str(response)).strip()
 
-            # Cache result
-            self._cache[cache_key] = translation
+            # Cache result (errors and empty responses are not cached)
+            if translation:
+                await self._cache.set(russian_text, self._model, self._prompt_version, translation)
             logger.debug(f"Translated: {russian_text[:50]}... → {translation[:50]}...")
 
             return translation
@@ -164,6 +214,118 @@ English translation (visual elements only, no explanations):"""
             logger.error(f"Translation failed: {e}")
             return russian_text
 
+    async def translate_many(self, russian_texts: Sequence[str]) -> Dict[str, str]:
+        """
+        Translate many descriptions with as few Gemini calls as possible.
+
+        Cached translations are looked up in one batch; the rest are sent
+        in structured prompts of up to TRANSLATION_BATCH_SIZE descriptions
+        and split back by ID. Descriptions missing from a batch response
+        (or from a failed batch) fall back to translate().
+
+        Args:
+            russian_texts: Russian visual descriptions (duplicates allowed)
+
+        Returns:
+            English translation by original text
+        """
+        texts = list(dict.fromkeys(text for text in russian_texts if text))
+        if not texts:
+            return {}
+
+        translations = await self._cache.get_many(texts, self._model, self._prompt_version)
+        pending = [text for text in texts if text not in translations]
+        if not pending or not self._transport:
+            for text in pending:
+                translations[text] = await self.translate(text)
+            return translations
+
+        chunks = [
+            pending[i:i + self._batch_size]
+            for i in range(0, len(pending), self._batch_size)
+        ]
+        batch_results = await asyncio.gather(
+            *(self._translate_batch(chunk) for chunk in chunks)
+        )
+        for batch in batch_results:
+            translations.update(batch)
+
+        missing = [text for text in pending if text not in translations]
+        if missing:
+            logger.warning(
+                f"Batch translation returned {len(pending) - len(missing)}/{len(pending)} "
+                f"items, translating {len(missing)} individually"
+            )
+            for text, translation in zip(
+                missing, await asyncio.gather(*(self.translate(text) for text in missing))
+            ):
+                translations[text] = translation
+
+        logger.info(
+            f"Translated {len(texts)} descriptions: {len(texts) - len(pending)} cached, "
+            f"{len(pending) - len(missing)} in {len(chunks)} batch calls, "
+            f"{len(missing)} individually"
+        )
+        return translations
+
+    async def _translate_batch(self, russian_texts: List[str]) -> Dict[str, str]:
+        """One structured Gemini call for a chunk; failures return {}."""
+        if len(russian_texts) == 1:
+            return {}  # Одиночный промпт дешевле и проверен временем
+
+        items = [
+            {"id": str(i), "text": text} for i, text in enumerate(russian_texts, start=1)
+        ]
+        try:
+            prompt = self.BATCH_TRANSLATION_PROMPT.format(
+                items=json.dumps(items, ensure_ascii=False, indent=2)
+            )
+            config = self._types.GenerateContentConfig(
+                temperature=0.3,
+                response_mime_type="application/json",
+            ) if self._types else None
+
+            response = await self._transport.generate_content(
+                model=self._model,
+                contents=prompt,
+                config=config,
+            )
+            raw = response.text if hasattr(response, 'text') else str(response)
+            by_id = self._parse_batch_response(raw)
+        except Exception as e:
+            logger.error(f"Batch translation of {len(russian_texts)} items failed: {e}")
+            return {}
+
+        translations: Dict[str, str] = {}
+        for item in items:
+            translation = by_id.get(item["id"])
+            if translation:
+                translations[item["text"]] = translation
+                await self._cache.set(
+                    item["text"], self._model, self._prompt_version, translation
+                )
+        return translations
+
+    @staticmethod
+    def _parse_batch_response(raw: str) -> Dict[str, str]:
+        """Parse {"translations": [{"id", "translation"}]} into {id: translation}."""
+        cleaned = raw.strip()
+        if cleaned.startswith("```"):
+            cleaned = cleaned.strip("`").removeprefix("json").strip()
+
+        data = json.loads(cleaned)
+        if isinstance(data, dict):
+            data = data.get("translations", [])
+
+        result: Dict[str, str] = {}
+        for entry in data if isinstance(data, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            translation = entry.get("translation")
+            if isinstance(translation, str) and translation.strip():
+                result[str(entry.get("id"))] = translation.strip()
+        return result
+
 
 class ImagenPromptEngineer:
     """
@@ -220,7 +382,8 @@ class ImagenPromptEngineer:
         description: str,
         description_type: DescriptionType,
         genre: Optional[str] = None,
-        custom_style: Optional[str] = None
+        custom_style: Optional[str] = None,
+        english_description: Optional[str] = None,
     ) -> str:
         """
         Create optimized English prompt for Imagen.
@@ -230,12 +393,15 @@ class ImagenPromptEngineer:
             description_type: Type of description
             genre: Book genre for style adaptation
             custom_style: Additional custom style instructions
+            english_description: Translation prepared in advance
+                (translate_many for batches), skips the translator call
 
         Returns:
             Optimized English prompt (max ~450 tokens)
         """
         # Translate Russian to English
-        english_description = await self.translator.translate(description)
+        if not english_description:
+            english_description = await self.translator.translate(description)
 
         # Get template for type
         template = self.STYLE_TEMPLATES.get(
@@ -280,10 +446,15 @@ class GoogleImagenGenerator:
         result = await generator.generate("A castle on a hill")
     """
 
-    def __init__(self, config: ImagenConfig):
+    def __init__(self, config: ImagenConfig, image_store: Optional[GeneratedImageStore] = None):
         self.config = config
-        self._client = None
+        self.image_store = image_store or generated_image_store
+        self._transport = None
         self._available = False
+        # Один limiter на модель: пакетные и одиночные генерации делят квоту
+        self.rate_limiter = get_llm_rate_limiter(
+            config.model, config.requests_per_minute, IMAGEN_TOKENS_PER_MINUTE
+        )
         self._initialize()
 
     def _initialize(self):
@@ -293,9 +464,9 @@ class GoogleImagenGenerator:
             return
 
         try:
-            from google import genai
+            import google.genai  # noqa: F401 - проверка наличия SDK
 
-            self._client = genai.Client(api_key=self.config.api_key)
+            self._transport = get_llm_transport(self.config.api_key)
             self._available = True
             logger.info(f"Imagen generator initialized (model: {self.config.model})")
 
@@ -370,10 +541,12 @@ class GoogleImagenGenerator:
             logger.info("Generating image with Imagen")
             logger.debug(f"Prompt: {prompt[:100]}...")
 
-            # Generate (sync call wrapped in asyncio.to_thread)
+            # Each attempt (including retries) goes through the shared limiter
+            await self.rate_limiter.acquire()
+
+            # Generate (async API, shared connection pool)
             response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    self._client.models.generate_images,
+                self._transport.generate_images(
                     model=self.config.model,
                     prompt=prompt,
                     config=gen_config,
@@ -413,7 +586,7 @@ class GoogleImagenGenerator:
                     raise ValueError(f"Unexpected data type: {type(raw_image_data)}")
 
                 # Save locally (decoded bytes)
-                local_path = await self._save_image(image_bytes, prompt)
+                stored = await self._save_image(image_bytes)
 
                 # Create data URL for frontend
                 image_url = f"data:image/png;base64,{image_base64}"
@@ -426,7 +599,8 @@ class GoogleImagenGenerator:
                     success=True,
                     image_url=image_url,
                     image_data=image_bytes,
-                    local_path=local_path,
+                    local_path=str(stored.path),
+                    content_hash=stored.sha256,
                     generation_time_seconds=generation_time,
                     model_used=self.config.model,
                     prompt_used=prompt,
@@ -450,44 +624,35 @@ class GoogleImagenGenerator:
         except Exception as e:
             error_msg = str(e)
             # Check if it's a rate limit error
-            if "rate" in error_msg.lower() and "limit" in error_msg.lower():
-                raise RateLimitError(error_msg) from e
-            if "quota" in error_msg.lower():
-                raise RateLimitError(error_msg) from e
+            lowered = error_msg.lower()
+            if (
+                ("rate" in lowered and "limit" in lowered)
+                or "quota" in lowered
+                or "429" in error_msg
+            ):
+                rate_limit_error = RateLimitError(error_msg)
+                # Pause all concurrent generations for this model
+                self.rate_limiter.penalize(rate_limit_error.retry_after)
+                raise rate_limit_error from e
             # Other errors - wrap as retryable ImageGenerationError
             logger.error(f"Image generation error: {error_msg}")
             raise ImageGenerationError(error_msg) from e
 
-    async def _save_image(self, image_data: bytes, prompt: str) -> str:
+    async def _save_image(self, image_data: bytes) -> StoredImage:
         """
-        Save image to local storage.
+        Save image to the content-addressed image store.
+
+        Identical images (same bytes) share one file in the store.
 
         Args:
             image_data: Raw image bytes
-            prompt: Prompt used (for filename generation)
 
         Returns:
-            Path to saved file
+            StoredImage with sharded path and SHA-256
         """
-        # Create directory (persistent storage)
-        # Uses /app/storage which is mounted as Docker volume for persistence
-        images_dir = Path("/app/storage/generated_images")
-        images_dir.mkdir(parents=True, exist_ok=True)
-
-        # Create unique filename
-        prompt_hash = hashlib.md5(prompt.encode(), usedforsecurity=False).hexdigest()[:8]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"imagen_{timestamp}_{prompt_hash}.png"
-
-        file_path = images_dir / filename
-
-        # Save file (async to avoid blocking event loop)
-        import aiofiles
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(image_data)
-
-        logger.debug(f"Image saved: {file_path}")
-        return str(file_path)
+        stored = await self.image_store.save(image_data, ".png")
+        logger.debug(f"Image saved: {stored.path} (new file: {stored.created})")
+        return stored
 
 
 class ImagenService:
@@ -513,9 +678,6 @@ class ImagenService:
             return
 
         try:
-            # Get config from settings
-            from ..core.config import settings
-
             # Initialize translator
             self._translator = PromptTranslator(self._api_key)
 
@@ -529,6 +691,7 @@ class ImagenService:
                 aspect_ratio=settings.IMAGEN_ASPECT_RATIO,
                 safety_filter_level=settings.IMAGEN_SAFETY_LEVEL,
                 timeout_seconds=settings.IMAGEN_TIMEOUT_SECONDS,
+                requests_per_minute=settings.IMAGEN_REQUESTS_PER_MINUTE,
             )
             self._generator = GoogleImagenGenerator(config)
 
@@ -552,7 +715,8 @@ class ImagenService:
         description_type: str = "location",
         genre: Optional[str] = None,
         custom_style: Optional[str] = None,
-        aspect_ratio: Optional[str] = None
+        aspect_ratio: Optional[str] = None,
+        english_description: Optional[str] = None,
     ) -> ImageGenerationResult:
         """
         Generate image for a Russian description.
@@ -563,6 +727,8 @@ class ImagenService:
             genre: Book genre for style adaptation
             custom_style: Additional style instructions
             aspect_ratio: Override default aspect ratio
+            english_description: Translation from translate_descriptions()
+                (batch jobs); translated on the fly when missing
 
         Returns:
             ImageGenerationResult with generated image or error
@@ -585,7 +751,8 @@ class ImagenService:
                 description=description,
                 description_type=desc_type,
                 genre=genre,
-                custom_style=custom_style
+                custom_style=custom_style,
+                english_description=english_description,
             )
 
             # Generate image
@@ -600,6 +767,28 @@ class ImagenService:
                 error_message=str(e)
             )
 
+    async def translate_descriptions(self, descriptions: Sequence[str]) -> Dict[str, str]:
+        """
+        Translate descriptions of a batch job up front (PromptTranslator.translate_many).
+
+        Pass the result to generate_image(english_description=...). Errors
+        return {} - each image then falls back to its own translation.
+
+        Args:
+            descriptions: Russian descriptions of the batch
+
+        Returns:
+            English translation by original text
+        """
+        if not self._translator:
+            return {}
+
+        try:
+            return await self._translator.translate_many(descriptions)
+        except Exception as e:
+            logger.error(f"Batch translation failed, falling back to per-image: {e}")
+            return {}
+
     async def preview_prompt(
         self,
         description: str,
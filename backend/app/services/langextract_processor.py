@@ -33,11 +33,12 @@ import re
 import time
 import json
 import logging
-import asyncio
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
+from app.services.llm_rate_limiter import map_bounded
+
 logger = logging.getLogger(__name__)
 
 
@@ -142,7 +143,16 @@ class LangExtractConfig:
     # Производительность
     max_retries: int = 2
     timeout_seconds: int = 30
-    batch_delay_ms: int = 100  # Задержка между batch вызовами
+    batch_delay_ms: int = 100  # Не используется: темп задаёт rate limiter Gemini экстрактора
+    max_concurrent_chunks: int = field(
+        default_factory=lambda: int(os.getenv("LLM_MAX_CONCURRENT_CHUNKS", "4"))
+    )
+
+    # Пакетирование между главами (extract_descriptions_batch)
+    batch_max_chars: int = field(
+        default_factory=lambda: int(os.getenv("LLM_BATCH_MAX_CHARS", "24000"))
+    )  # ~6000 токенов текста на запрос
+    batch_small_chunk_chars: int = 3000  # Чанки короче упаковываются вместе
 
     # Feature flags
     enabled: bool = True
@@ -432,6 +442,7 @@ JSON формат:
                 max_description_chars=self.config.max_description_chars,
                 min_confidence=self.config.min_confidence,
                 max_retries=self.config.max_retries,
+                max_concurrent_chunks=self.config.max_concurrent_chunks,
             )
 
             self._gemini_extractor = GeminiDirectExtractor(gemini_config)
@@ -491,71 +502,31 @@ JSON формат:
             chunks = self.chunker.chunk(text)
             logger.info(f"Text split into {len(chunks)} chunks")
 
-            # Обработка чанков
+            # Обработка чанков: параллельно, не более max_concurrent_chunks
+            # одновременно (RPM/TPM квоты соблюдает rate limiter экстрактора)
+            results = await map_bounded(
+                lambda chunk: self._process_chunk(chunk["text"], chunk["start"]),
+                chunks,
+                self.config.max_concurrent_chunks,
+            )
+
+            # Результаты в порядке чанков (по смещению) - как при последовательной обработке
             all_descriptions = []
             total_tokens = 0
             api_calls = 0
 
-            for i, chunk in enumerate(chunks):
-                chunk_descriptions, tokens = await self._process_chunk(
-                    chunk["text"],
-                    chunk["start"],
-                )
+            for chunk_result, error in results:
+                api_calls += 1
+                if error is not None:
+                    logger.warning(f"Chunk processing failed: {error}")
+                    continue
+                chunk_descriptions, tokens = chunk_result
                 all_descriptions.extend(chunk_descriptions)
                 total_tokens += tokens
-                api_calls += 1
-
-                # Задержка между вызовами для rate limiting
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(self.config.batch_delay_ms / 1000)
-
-            # Дедупликация описаний
-            unique_descriptions = self._deduplicate_descriptions(all_descriptions)
-
-            # Фильтрация по confidence
-            filtered_descriptions = [
-                d for d in unique_descriptions
-                if d.confidence >= self.config.min_confidence
-            ]
-
-            # Сортировка по приоритету
-            sorted_descriptions = sorted(
-                filtered_descriptions,
-                key=lambda d: d._calculate_priority(),
-                reverse=True
-            )
-
-            processing_time = time.time() - start_time
 
-            # Обновление статистики
-            self.stats["total_extractions"] += 1
-            self.stats["total_tokens"] += total_tokens
             self.stats["total_api_calls"] += api_calls
-            self.stats["total_processing_time"] += processing_time
-
-            # Формирование результата
-            return ProcessingResult(
-                descriptions=[d.to_dict() for d in sorted_descriptions],
-                processor_results={"langextract": [d.to_dict() for d in sorted_descriptions]},
-                processing_time=processing_time,
-                processors_used=["langextract"],
-                quality_metrics={
-                    "total_extracted": len(all_descriptions),
-                    "unique_count": len(unique_descriptions),
-                    "filtered_count": len(filtered_descriptions),
-                    "avg_confidence": (
-                        sum(d.confidence for d in filtered_descriptions) / len(filtered_descriptions)
-                        if filtered_descriptions else 0
-                    ),
-                    "by_type": {
-                        "location": len([d for d in filtered_descriptions if d.description_type == DescriptionType.LOCATION]),
-                        "character": len([d for d in filtered_descriptions if d.description_type == DescriptionType.CHARACTER]),
-                        "atmosphere": len([d for d in filtered_descriptions if d.description_type == DescriptionType.ATMOSPHERE]),
-                    }
-                },
-                tokens_used=total_tokens,
-                api_calls=api_calls,
-                chunks_processed=len(chunks),
+            return self._build_result(
+                all_descriptions, start_time, total_tokens, api_calls, len(chunks)
             )
 
         except Exception as e:
@@ -567,6 +538,194 @@ JSON формат:
                 recommendations=["Check API key and network connection"]
             )
 
+    def _build_result(
+        self,
+        all_descriptions: List[ExtractedDescription],
+        start_time: float,
+        total_tokens: int,
+        api_calls: int,
+        chunks_count: int,
+    ) -> ProcessingResult:
+        """Дедупликация, фильтрация, сортировка и статистика для одной главы."""
+        # Дедупликация описаний
+        unique_descriptions = self._deduplicate_descriptions(all_descriptions)
+
+        # Фильтрация по confidence
+        filtered_descriptions = [
+            d for d in unique_descriptions
+            if d.confidence >= self.config.min_confidence
+        ]
+
+        # Сортировка по приоритету
+        sorted_descriptions = sorted(
+            filtered_descriptions,
+            key=lambda d: d._calculate_priority(),
+            reverse=True
+        )
+
+        processing_time = time.time() - start_time
+
+        # Обновление статистики
+        self.stats["total_extractions"] += 1
+        self.stats["total_tokens"] += total_tokens
+        self.stats["total_processing_time"] += processing_time
+
+        # Формирование результата
+        return ProcessingResult(
+            descriptions=[d.to_dict() for d in sorted_descriptions],
+            processor_results={"langextract": [d.to_dict() for d in sorted_descriptions]},
+            processing_time=processing_time,
+            processors_used=["langextract"],
+            quality_metrics={
+                "total_extracted": len(all_descriptions),
+                "unique_count": len(unique_descriptions),
+                "filtered_count": len(filtered_descriptions),
+                "avg_confidence": (
+                    sum(d.confidence for d in filtered_descriptions) / len(filtered_descriptions)
+                    if filtered_descriptions else 0
+                ),
+                "by_type": {
+                    "location": len([d for d in filtered_descriptions if d.description_type == DescriptionType.LOCATION]),
+                    "character": len([d for d in filtered_descriptions if d.description_type == DescriptionType.CHARACTER]),
+                    "atmosphere": len([d for d in filtered_descriptions if d.description_type == DescriptionType.ATMOSPHERE]),
+                }
+            },
+            tokens_used=total_tokens,
+            api_calls=api_calls,
+            chunks_processed=chunks_count,
+        )
+
+    async def extract_descriptions_batch(
+        self,
+        texts: List[str],
+    ) -> List[ProcessingResult]:
+        """
+        Извлечь описания из нескольких глав с пакетированием запросов.
+
+        Полноразмерные чанки уходят отдельными запросами, а короткие главы
+        и хвосты чанков разных глав упаковываются в общие запросы до
+        batch_max_chars. Ответ пакета делится обратно по ID фрагментов.
+        Итог для каждой главы такой же, как у extract_descriptions().
+
+        Args:
+            texts: Тексты глав
+
+        Returns:
+            ProcessingResult для каждой главы в порядке texts
+        """
+        start_time = time.time()
+
+        if not self.is_available() or self._gemini_extractor is None:
+            return [await self.extract_descriptions(text) for text in texts]
+
+        # (индекс главы, чанк) для всех глав, достаточно длинных для обработки
+        work: List[Tuple[int, Dict[str, Any]]] = []
+        chunk_counts = [0] * len(texts)
+        for index, text in enumerate(texts):
+            if len(text) < self.config.min_chunk_chars:
+                continue
+            chunks = self.chunker.chunk(text)
+            chunk_counts[index] = len(chunks)
+            work.extend((index, chunk) for chunk in chunks)
+
+        # Запросы: одиночные полноразмерные чанки и пакеты коротких фрагментов
+        requests = self._pack_requests(work)
+
+        async def run(request: List[int]) -> List[List[ExtractedDescription]]:
+            if len(request) == 1:
+                chunk = work[request[0]][1]
+                descriptions, _ = await self._process_chunk(chunk["text"], chunk["start"])
+                return [descriptions]
+            batch = await self._gemini_extractor.extract_batch(
+                [{"text": work[i][1]["text"], "start": work[i][1]["start"]} for i in request]
+            )
+            return [self._convert_descriptions(extracted) for extracted in batch]
+
+        responses = await map_bounded(run, requests, self.config.max_concurrent_chunks)
+
+        # Раскладываем по главам в порядке чанков
+        per_work: List[List[ExtractedDescription]] = [[] for _ in work]
+        for request, (response, error) in zip(requests, responses):
+            if error is not None:
+                logger.warning(f"Batched request failed: {error}")
+                continue
+            for i, descriptions in zip(request, response):
+                per_work[i] = descriptions
+
+        per_text: List[List[ExtractedDescription]] = [[] for _ in texts]
+        tokens = [0] * len(texts)
+        for (index, chunk), descriptions in zip(work, per_work):
+            per_text[index].extend(descriptions)
+            tokens[index] += len(chunk["text"]) // 4 * 2
+
+        self.stats["total_api_calls"] += len(requests)
+        logger.info(
+            f"Batched extraction: {len(texts)} chapters, {len(work)} chunks, "
+            f"{len(requests)} requests"
+        )
+
+        results = []
+        for index, text in enumerate(texts):
+            if len(text) < self.config.min_chunk_chars:
+                results.append(ProcessingResult(
+                    descriptions=[],
+                    quality_metrics={"skipped": True, "reason": "text_too_short"},
+                ))
+                continue
+            requests_for_text = sum(
+                1 for request in requests if any(work[i][0] == index for i in request)
+            )
+            results.append(self._build_result(
+                per_text[index], start_time, tokens[index], requests_for_text, chunk_counts[index]
+            ))
+        return results
+
+    def _pack_requests(self, work: List[Tuple[int, Dict[str, Any]]]) -> List[List[int]]:
+        """
+        Сгруппировать чанки в запросы.
+
+        Чанки не короче batch_small_chunk_chars идут отдельным запросом.
+        Короткие упаковываются по порядку, пока суммарный текст
+        не превысит batch_max_chars.
+
+        Returns:
+            Запросы - списки индексов в work
+        """
+        requests: List[List[int]] = []
+        batch: List[int] = []
+        batch_chars = 0
+
+        for i, (_, chunk) in enumerate(work):
+            length = len(chunk["text"])
+            if length >= self.config.batch_small_chunk_chars:
+                requests.append([i])
+                continue
+            if batch and batch_chars + length > self.config.batch_max_chars:
+                requests.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(i)
+            batch_chars += length
+
+        if batch:
+            requests.append(batch)
+        return requests
+
+    @staticmethod
+    def _convert_descriptions(extracted: List[Any]) -> List[ExtractedDescription]:
+        """Конвертация описаний GeminiDirectExtractor в локальный формат."""
+        return [
+            ExtractedDescription(
+                content=desc.content,
+                description_type=DescriptionType(desc.description_type.value),
+                confidence=desc.confidence,
+                entities=desc.entities,
+                attributes=desc.attributes,
+                position=desc.position,
+                source_span=desc.source_span,
+            )
+            for desc in extracted
+        ]
+
     async def _process_chunk(
         self,
         chunk_text: str,
@@ -592,17 +751,7 @@ JSON формат:
                 )
 
                 # Конвертируем в локальный формат ExtractedDescription
-                descriptions = []
-                for desc in extracted:
-                    descriptions.append(ExtractedDescription(
-                        content=desc.content,
-                        description_type=DescriptionType(desc.description_type.value),
-                        confidence=desc.confidence,
-                        entities=desc.entities,
-                        attributes=desc.attributes,
-                        position=desc.position,
-                        source_span=desc.source_span,
-                    ))
+                descriptions = self._convert_descriptions(extracted)
 
                 # Оценка токенов
                 tokens_used = len(chunk_text) // 4 * 2  # input + output
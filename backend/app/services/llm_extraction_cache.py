@@ -0,0 +1,285 @@
+"""
+LLM Extraction Cache - кэш ответов Gemini по содержимому чанка.
+
+АРХИТЕКТУРА:
+- Ключ: (sha256(chunk_text), prompt_version, model)
+- prompt_version - хэш шаблона EXTRACTION_PROMPT: изменение промпта
+  автоматически даёт промахи, старые записи удаляет cleanup()
+- L1: Redis (cache_manager, TTL LLM_CACHE_REDIS_TTL_SECONDS)
+- L2: PostgreSQL (llm_extraction_cache), переживает рестарт Redis и
+  доступен Celery воркерам, где cache_manager не инициализирован
+- Вытеснение: TTL по last_accessed_at + LRU сверх LLM_CACHE_MAX_ENTRIES
+- Fail-open: любая ошибка кэша = промах, извлечение не ломается
+
+Хранится распарсенный ответ LLM ({"descriptions": [...]}) без привязки
+к позиции чанка - позиции и фильтры конфигурации применяются при чтении.
+
+Created: 2026-01-16
+Author: fancai Team
+"""
+
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.cache import cache_manager
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.logging import logger
+from ..models.llm_cache import LLMExtractionCacheEntry
+from ..monitoring.metrics import record_llm_cache_lookup
+
+
+# Пауза перед повторным обращением к PostgreSQL после ошибки
+DB_ERROR_COOLDOWN_SECONDS = 60.0
+
+
+def compute_chunk_hash(chunk_text: str) -> str:
+    """SHA-256 текста чанка (hex)."""
+    return hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+
+
+def compute_prompt_version(prompt_template: str) -> str:
+    """Короткий хэш шаблона промпта - версия для ключа кэша."""
+    return hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMExtractionCache:
+    """
+    Двухуровневый кэш ответов LLM (Redis + PostgreSQL).
+
+    Redis промах с попаданием в PostgreSQL прогревает Redis.
+    """
+
+    REDIS_KEY_PREFIX = "llm_extract"
+
+    def __init__(self, enabled: Optional[bool] = None):
+        """
+        Args:
+            enabled: Включён ли кэш (по умолчанию settings.LLM_CACHE_ENABLED)
+        """
+        self.enabled = settings.LLM_CACHE_ENABLED if enabled is None else enabled
+        self._db_disabled_until = 0.0
+        self.stats = {
+            "redis_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "errors": 0,
+        }
+
+    def _redis_key(self, chunk_hash: str, prompt_version: str, model: str) -> str:
+        return f"{self.REDIS_KEY_PREFIX}:{model}:{prompt_version}:{chunk_hash}"
+
+    def _db_available(self) -> bool:
+        return time.monotonic() >= self._db_disabled_until
+
+    def _db_failed(self, operation: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        self._db_disabled_until = time.monotonic() + DB_ERROR_COOLDOWN_SECONDS
+        logger.warning(
+            "LLM cache database error, skipping database tier",
+            operation=operation,
+            error=str(error),
+            cooldown_seconds=DB_ERROR_COOLDOWN_SECONDS,
+        )
+
+    async def get(
+        self, chunk_text: str, model: str, prompt_version: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Получить закэшированный ответ LLM для чанка.
+
+        Args:
+            chunk_text: Текст чанка (как отправляется в промпт)
+            model: ID модели
+            prompt_version: Версия промпта (compute_prompt_version)
+
+        Returns:
+            Распарсенный ответ или None при промахе
+        """
+        if not self.enabled:
+            return None
+
+        chunk_hash = compute_chunk_hash(chunk_text)
+        redis_key = self._redis_key(chunk_hash, prompt_version, model)
+
+        cached = await cache_manager.get(redis_key)
+        if cached is not None:
+            self._record("redis_hits", "redis_hit")
+            return cached
+
+        if self._db_available():
+            try:
+                async with AsyncSessionLocal() as db:
+                    key_filter = (
+                        (LLMExtractionCacheEntry.chunk_hash == chunk_hash)
+                        & (LLMExtractionCacheEntry.prompt_version == prompt_version)
+                        & (LLMExtractionCacheEntry.model == model)
+                    )
+                    response = await db.scalar(
+                        select(LLMExtractionCacheEntry.response).where(key_filter)
+                    )
+                    if response is not None:
+                        await db.execute(
+                            update(LLMExtractionCacheEntry)
+                            .where(key_filter)
+                            .values(
+                                hit_count=LLMExtractionCacheEntry.hit_count + 1,
+                                last_accessed_at=func.now(),
+                            )
+                        )
+                        await db.commit()
+            except Exception as e:
+                self._db_failed("get", e)
+                response = None
+
+            if response is not None:
+                self._record("db_hits", "db_hit")
+                await cache_manager.set(
+                    redis_key, response, settings.LLM_CACHE_REDIS_TTL_SECONDS
+                )
+                return response
+
+        self._record("misses", "miss")
+        return None
+
+    async def set(
+        self,
+        chunk_text: str,
+        model: str,
+        prompt_version: str,
+        response: Dict[str, Any],
+    ) -> None:
+        """
+        Сохранить распарсенный ответ LLM для чанка в оба уровня.
+
+        Args:
+            chunk_text: Текст чанка
+            model: ID модели
+            prompt_version: Версия промпта
+            response: Распарсенный ответ ({"descriptions": [...]})
+        """
+        if not self.enabled:
+            return
+
+        chunk_hash = compute_chunk_hash(chunk_text)
+        await cache_manager.set(
+            self._redis_key(chunk_hash, prompt_version, model),
+            response,
+            settings.LLM_CACHE_REDIS_TTL_SECONDS,
+        )
+
+        if not self._db_available():
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = pg_insert(LLMExtractionCacheEntry).values(
+                    chunk_hash=chunk_hash,
+                    prompt_version=prompt_version,
+                    model=model,
+                    response=response,
+                )
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["chunk_hash", "prompt_version", "model"],
+                        set_={
+                            "response": stmt.excluded.response,
+                            "last_accessed_at": func.now(),
+                        },
+                    )
+                )
+                await db.commit()
+            self.stats["writes"] += 1
+        except Exception as e:
+            self._db_failed("set", e)
+
+    async def cleanup(
+        self,
+        current_prompt_version: Optional[str] = None,
+        ttl_days: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Вытеснение записей из PostgreSQL.
+
+        1. Записи других версий промпта (после изменения EXTRACTION_PROMPT)
+        2. Записи без обращений дольше ttl_days
+        3. Самые давно использованные записи сверх max_entries (LRU)
+
+        Redis записи истекают по собственному TTL.
+
+        Returns:
+            Количество удалённых записей по причинам
+        """
+        ttl_days = ttl_days or settings.LLM_CACHE_TTL_DAYS
+        max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        result = {"stale_prompt": 0, "expired": 0, "evicted": 0}
+
+        async with AsyncSessionLocal() as db:
+            if current_prompt_version:
+                deleted = await db.execute(
+                    delete(LLMExtractionCacheEntry).where(
+                        LLMExtractionCacheEntry.prompt_version != current_prompt_version
+                    )
+                )
+                result["stale_prompt"] = deleted.rowcount or 0
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+            deleted = await db.execute(
+                delete(LLMExtractionCacheEntry).where(
+                    LLMExtractionCacheEntry.last_accessed_at < cutoff
+                )
+            )
+            result["expired"] = deleted.rowcount or 0
+
+            total = await db.scalar(select(func.count()).select_from(LLMExtractionCacheEntry))
+            excess = (total or 0) - max_entries
+            if excess > 0:
+                oldest = (
+                    select(
+                        LLMExtractionCacheEntry.chunk_hash,
+                        LLMExtractionCacheEntry.prompt_version,
+                        LLMExtractionCacheEntry.model,
+                    )
+                    .order_by(LLMExtractionCacheEntry.last_accessed_at.asc())
+                    .limit(excess)
+                )
+                deleted = await db.execute(
+                    delete(LLMExtractionCacheEntry).where(
+                        tuple_(
+                            LLMExtractionCacheEntry.chunk_hash,
+                            LLMExtractionCacheEntry.prompt_version,
+                            LLMExtractionCacheEntry.model,
+                        ).in_(oldest)
+                    )
+                )
+                result["evicted"] = deleted.rowcount or 0
+
+            await db.commit()
+
+        logger.info("LLM cache cleanup completed", **result)
+        return result
+
+    def _record(self, counter: str, result: str) -> None:
+        self.stats[counter] += 1
+        record_llm_cache_lookup(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика hit/miss (в пределах процесса)."""
+        hits = self.stats["redis_hits"] + self.stats["db_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+# Global instance
+llm_extraction_cache = LLMExtractionCache()
@@ -0,0 +1,202 @@
+"""
+LLM Rate Limiter - token bucket под квоты провайдера (RPM/TPM).
+
+АРХИТЕКТУРА:
+- Два token bucket: запросы в минуту (RPM) и токены в минуту (TPM)
+- Резервирование без блокировок: ёмкость списывается сразу, вызывающий
+  ждёт, пока bucket не восполнится (работает в любом event loop, в том
+  числе в Celery, где каждая задача запускает свой asyncio.run)
+- Общая пауза после RateLimitError (429 / quota) для всех вызовов модели
+- Один limiter на модель в процессе (квоты Gemini считаются на модель)
+
+Плюс map_bounded() - параллельная обработка чанков с ограничением
+числа одновременных запросов и результатами в исходном порядке.
+
+ИСПОЛЬЗОВАНИЕ:
+    limiter = get_llm_rate_limiter("gemini-3-flash-preview", rpm=150, tpm=1_000_000)
+    await limiter.acquire(estimated_tokens)
+    try:
+        response = await call_api()
+    except RateLimitError as e:
+        limiter.penalize(e.retry_after)
+        raise
+
+Created: 2026-01-16
+Author: fancai Team
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class TokenBucketRateLimiter:
+    """
+    Rate limiter по квотам RPM и TPM.
+
+    Каждый acquire() резервирует 1 запрос и N токенов. Если bucket пуст,
+    резерв уходит "в минус", а вызывающий спит до момента, когда долг
+    будет восполнен - так одновременные вызовы выстраиваются в очередь
+    без asyncio.Lock.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        default_backoff_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            requests_per_minute: Квота запросов в минуту (RPM)
+            tokens_per_minute: Квота токенов в минуту (TPM)
+            default_backoff_seconds: Пауза после 429 без retry_after
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self.default_backoff_seconds = default_backoff_seconds
+        self._clock = clock
+
+        now = clock()
+        self._request_tokens = float(self.requests_per_minute)
+        self._token_tokens = float(self.tokens_per_minute)
+        self._updated_at = now
+        self._backoff_until = 0.0
+
+        self.stats = {
+            "acquired": 0,
+            "throttled": 0,
+            "rate_limited": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    def _refill(self, now: float) -> None:
+        """Восполняет оба bucket пропорционально прошедшему времени."""
+        elapsed = max(0.0, now - self._updated_at)
+        self._updated_at = now
+        self._request_tokens = min(
+            float(self.requests_per_minute),
+            self._request_tokens + elapsed * self.requests_per_minute / 60.0,
+        )
+        self._token_tokens = min(
+            float(self.tokens_per_minute),
+            self._token_tokens + elapsed * self.tokens_per_minute / 60.0,
+        )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Резервирует квоту и возвращает время ожидания в секундах.
+
+        Args:
+            tokens: Оценка токенов запроса (prompt + ответ)
+
+        Returns:
+            Сколько секунд нужно подождать перед запросом
+        """
+        now = self._clock()
+        self._refill(now)
+
+        # Запрос больше всей минутной квоты не должен ждать вечно
+        cost = min(max(0, tokens), self.tokens_per_minute)
+
+        self._request_tokens -= 1
+        self._token_tokens -= cost
+
+        wait = 0.0
+        if self._request_tokens < 0:
+            wait = max(wait, -self._request_tokens * 60.0 / self.requests_per_minute)
+        if self._token_tokens < 0:
+            wait = max(wait, -self._token_tokens * 60.0 / self.tokens_per_minute)
+        wait = max(wait, self._backoff_until - now)
+
+        self.stats["acquired"] += 1
+        if wait > 0:
+            self.stats["throttled"] += 1
+            self.stats["total_wait_seconds"] += wait
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Ждёт, пока квота позволит выполнить запрос."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"LLM rate limiter: waiting {wait:.2f}s (tokens={tokens})")
+            await asyncio.sleep(wait)
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """
+        Приостанавливает все запросы после ответа 429 / quota exceeded.
+
+        Args:
+            retry_after: Пауза из ответа провайдера (секунды)
+        """
+        delay = retry_after if retry_after and retry_after > 0 else self.default_backoff_seconds
+        now = self._clock()
+        self._backoff_until = max(self._backoff_until, now + delay)
+        # Провайдер считает квоту исчерпанной - не тратим остаток bucket сразу после паузы
+        self._request_tokens = min(self._request_tokens, 0.0)
+        self.stats["rate_limited"] += 1
+        logger.warning(f"LLM rate limit hit, backing off for {delay:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика limiter."""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            **self.stats,
+        }
+
+
+# Один limiter на модель в пределах процесса
+_limiters: Dict[str, TokenBucketRateLimiter] = {}
+
+
+def get_llm_rate_limiter(
+    model_id: str, requests_per_minute: int, tokens_per_minute: int
+) -> TokenBucketRateLimiter:
+    """
+    Получить общий limiter для модели.
+
+    Все экстракторы одной модели делят квоту, поэтому делят и limiter.
+    Параметры берутся при первом создании.
+    """
+    limiter = _limiters.get(model_id)
+    if limiter is None:
+        limiter = TokenBucketRateLimiter(requests_per_minute, tokens_per_minute)
+        _limiters[model_id] = limiter
+    return limiter
+
+
+async def map_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Sequence[T],
+    limit: int,
+) -> List[Tuple[Optional[R], Optional[BaseException]]]:
+    """
+    Выполняет func для всех items параллельно, не более limit одновременно.
+
+    Args:
+        func: Асинхронная функция обработки элемента
+        items: Элементы (порядок сохраняется в результате)
+        limit: Максимум одновременных вызовов
+
+    Returns:
+        Список (результат, исключение) в порядке items
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: T) -> Tuple[Optional[R], Optional[BaseException]]:
+        async with semaphore:
+            try:
+                return await func(item), None
+            except Exception as e:
+                return None, e
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
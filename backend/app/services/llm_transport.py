@@ -0,0 +1,198 @@
+"""
+LLM Transport - общий async транспорт к Google GenAI (Gemini + Imagen).
+
+Заменяет asyncio.to_thread(client.models.*) в GeminiDirectExtractor,
+PromptTranslator и GoogleImagenGenerator:
+- Нативный async API SDK (client.aio.models.*) - без потоков executor'а,
+  отмена по таймауту действительно прерывает HTTP запрос
+- Один httpx.AsyncClient с keep-alive пулом соединений на event loop
+  (LLM_HTTP_MAX_CONNECTIONS / LLM_HTTP_MAX_KEEPALIVE)
+- Ограничение одновременных запросов на модель (LLM_MODEL_MAX_CONCURRENCY)
+- LLM_API_BASE_URL / http_transport - подмена API локальным stand-in
+  сервером или httpx.MockTransport в тестах
+
+Клиенты создаются на каждый event loop: соединения httpx привязаны к
+loop. В Celery воркере все задачи идут через один loop процесса
+(core/async_runtime.py), вне воркера - через asyncio.run().
+
+ИСПОЛЬЗОВАНИЕ:
+    transport = get_llm_transport(api_key)
+    response = await transport.generate_content(model, prompt, config)
+
+Created: 2026-01-17
+Author: fancai Team
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopState:
+    """Клиенты и семафоры, привязанные к одному event loop."""
+
+    def __init__(self, client: Any, http_client: httpx.AsyncClient):
+        self.client = client
+        self.http_client = http_client
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+class LLMTransport:
+    """
+    Async транспорт к Google GenAI с пулом соединений.
+
+    Все сервисы с одним API ключом делят транспорт, а значит и пул
+    соединений, и лимиты одновременных запросов на модель.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        model_concurrency: Optional[int] = None,
+        http_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            api_key: Google API ключ
+            base_url: Адрес API (None - production endpoint SDK)
+            max_connections: Максимум соединений в пуле
+            max_keepalive_connections: Максимум keep-alive соединений
+            keepalive_expiry: Время жизни простаивающего соединения (сек)
+            model_concurrency: Максимум одновременных запросов на модель
+            http_transport: Подмена httpx транспорта (тесты)
+        """
+        self.api_key = api_key
+        self.base_url = base_url if base_url is not None else settings.LLM_API_BASE_URL
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.LLM_HTTP_MAX_KEEPALIVE
+            ),
+            keepalive_expiry=keepalive_expiry or settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        self.model_concurrency = model_concurrency or settings.LLM_MODEL_MAX_CONCURRENCY
+        self._http_transport = http_transport
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "clients_created": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+
+    def _state(self) -> _LoopState:
+        """Клиент текущего event loop (создаётся при первом обращении)."""
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            from google import genai
+            from google.genai import types
+
+            http_client = httpx.AsyncClient(
+                limits=self.limits,
+                transport=self._http_transport,
+                timeout=None,  # Таймауты задают вызывающие через asyncio.wait_for
+            )
+            client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(
+                    base_url=self.base_url,
+                    httpx_async_client=http_client,
+                ),
+            )
+            state = _LoopState(client, http_client)
+            self._states[loop] = state
+            self.stats["clients_created"] += 1
+            logger.debug(f"LLM transport client created (base_url={self.base_url or 'default'})")
+        return state
+
+    def _semaphore(self, state: _LoopState, model: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.model_concurrency)
+            state.semaphores[model] = semaphore
+        return semaphore
+
+    async def _call(self, model: str, method: str, **kwargs: Any) -> Any:
+        state = self._state()
+        async with self._semaphore(state, model):
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(
+                self.stats["peak_in_flight"], self.stats["in_flight"]
+            )
+            try:
+                return await getattr(state.client.aio.models, method)(model=model, **kwargs)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def generate_content(
+        self, model: str, contents: Any, config: Any = None
+    ) -> Any:
+        """Gemini generate_content через async API."""
+        return await self._call(model, "generate_content", contents=contents, config=config)
+
+    async def generate_images(
+        self, model: str, prompt: str, config: Any = None
+    ) -> Any:
+        """Imagen generate_images через async API."""
+        return await self._call(model, "generate_images", prompt=prompt, config=config)
+
+    async def aclose(self) -> None:
+        """Закрыть пул соединений текущего event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        state = self._states.pop(loop, None)
+        if state is not None:
+            # SDK не закрывает переданный ему httpx клиент - закрываем сами
+            await state.client.aio.aclose()
+            await state.http_client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика транспорта."""
+        return {
+            "base_url": self.base_url or "default",
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "model_concurrency": self.model_concurrency,
+            **self.stats,
+        }
+
+
+# Один транспорт на API ключ в пределах процесса
+_transports: Dict[str, LLMTransport] = {}
+
+
+def get_llm_transport(api_key: str) -> LLMTransport:
+    """Получить общий транспорт для API ключа."""
+    transport = _transports.get(api_key)
+    if transport is None:
+        transport = LLMTransport(api_key)
+        _transports[api_key] = transport
+    return transport
+
+
+async def close_llm_transports() -> None:
+    """Закрыть пулы соединений всех транспортов (shutdown приложения)."""
+    for transport in _transports.values():
+        await transport.aclose()
@@ -0,0 +1,196 @@
+"""
+Хеширование паролей вне event loop.
+
+bcrypt.hashpw/checkpw - 100-250 мс CPU на вызов. Вызов из async хендлера
+login/register останавливает event loop воркера, и во время волны входов
+(например, после утреннего push) задерживаются все остальные запросы.
+
+PasswordHasher выполняет bcrypt в ограниченном пуле потоков (bcrypt
+освобождает GIL на время хеширования):
+
+- pool_size: число потоков, одновременно считающих bcrypt
+- max_queue: сколько операций может ждать свободный поток; при
+  переполнении hash()/verify() сразу поднимают PasswordHasherBusyError
+  (роутер отвечает 503 с Retry-After)
+- метрики: время ожидания в очереди и время bcrypt (password_hash_*),
+  число операций в пуле, отклонённые операции
+
+Синхронные hash_password/verify_password остаются для скриптов и тестов.
+
+Usage:
+    >>> from app.services.password_hasher import password_hasher
+    >>> hashed = await password_hasher.hash("correct horse battery staple")
+    >>> await password_hasher.verify("correct horse battery staple", hashed)
+    True
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+from ..core.config import settings
+from ..core.logging import logger
+from ..monitoring.metrics import (
+    password_hash_in_flight,
+    record_password_hash,
+    record_password_hash_rejected,
+)
+
+
+# Ограничение bcrypt: учитываются только первые 72 байта пароля
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+class PasswordHasherBusyError(RuntimeError):
+    """Очередь хеширования паролей заполнена - новые операции не принимаются."""
+
+
+def hash_password(password: str) -> str:
+    """
+    Синхронно создаёт bcrypt хеш пароля.
+
+    Note:
+        Bcrypt has a 72-byte limitation. If password exceeds this when
+        encoded as UTF-8, it will be truncated to 72 bytes.
+    """
+    password_bytes = password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode("utf-8")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Синхронно проверяет пароль против bcrypt хеша."""
+    return bcrypt.checkpw(
+        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+    )
+
+
+class PasswordHasher:
+    """Ограниченный пул потоков для bcrypt."""
+
+    def __init__(self, pool_size: int = 2, max_queue: int = 32):
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        self._stats = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "total_queue_wait": 0.0,
+            "total_hash_time": 0.0,
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Максимальное число операций (выполняемых + ожидающих)."""
+        return self.pool_size + self.max_queue
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="bcrypt"
+            )
+            logger.info(
+                "Password hashing pool started",
+                pool_size=self.pool_size,
+                max_queue=self.max_queue,
+            )
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        """
+        Создаёт bcrypt хеш пароля, не блокируя event loop.
+
+        Raises:
+            PasswordHasherBusyError: Очередь хеширования заполнена
+        """
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Проверяет пароль против bcrypt хеша, не блокируя event loop.
+
+        Raises:
+            PasswordHasherBusyError: Очередь хеширования заполнена
+        """
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                record_password_hash_rejected(operation)
+                raise PasswordHasherBusyError(
+                    f"Password hashing queue is full ({self.capacity} operations)"
+                )
+            self._in_flight += 1
+            password_hash_in_flight.inc()
+
+        submitted_at = time.perf_counter()
+
+        def timed_call():
+            started_at = time.perf_counter()
+            return func(*args), started_at - submitted_at, time.perf_counter() - started_at
+
+        def release(_future=None):
+            # Слот освобождается, когда операция завершилась в потоке или
+            # была отменена в очереди вместе с вызывающим запросом
+            with self._lock:
+                self._in_flight -= 1
+            password_hash_in_flight.dec()
+
+        try:
+            future = self._get_executor().submit(timed_call)
+        except Exception:
+            release()
+            raise
+        future.add_done_callback(release)
+
+        try:
+            result, queue_wait, duration = await asyncio.wrap_future(future)
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+
+        self._stats["completed"] += 1
+        self._stats["total_queue_wait"] += queue_wait
+        self._stats["total_hash_time"] += duration
+        record_password_hash(operation, queue_wait, duration)
+        return result
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Останавливает пул потоков (вызывается при shutdown приложения)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Password hashing pool stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику пула."""
+        completed = self._stats["completed"]
+        return {
+            "pool_size": self.pool_size,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            **self._stats,
+            "avg_queue_wait": (
+                round(self._stats["total_queue_wait"] / completed, 4) if completed else 0.0
+            ),
+            "avg_hash_time": (
+                round(self._stats["total_hash_time"] / completed, 4) if completed else 0.0
+            ),
+        }
+
+
+# Глобальный экземпляр пула (один на процесс)
+password_hasher = PasswordHasher(
+    pool_size=settings.PASSWORD_HASH_POOL_SIZE,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,263 @@
+"""
+Principal Cache - кэш аутентифицированного пользователя по jti access токена.
+
+Каждый аутентифицированный запрос проходит get_current_user: проверка
+blacklist, декодирование JWT и SELECT пользователя. Кэш убирает SELECT:
+
+- Ключ: (user_id, jti) - jti выдаётся при создании токена, для старых
+  токенов без jti используется SHA-256 токена
+- L0: LRU в памяти процесса с коротким TTL (AUTH_PRINCIPAL_MEMORY_TTL_SECONDS)
+- L1: Redis (cache_manager), TTL не больше срока жизни токена
+- Значение - снимок колонок User без password_hash; из снимка собирается
+  detached объект User, поэтому роутеры не меняются
+- Инвалидация: logout (токен), вход, смена профиля, деактивация и смена
+  прав администратора (все токены пользователя). Redis очищается сразу,
+  L0 других воркеров - по TTL
+- Подписка и лимиты в снимок не входят: все их потребители читают
+  Subscription запросом по current_user.id (счётчики лимитов меняются на
+  каждой загрузке и генерации). Связи User - lazy="raise", на
+  пользователе из кэша они падают так же, как на загруженном из БД
+- Колонок вне снимка (password_hash, longest_streak_days) у пользователя
+  из кэша нет - обращение к ним падает DetachedInstanceError, а не
+  возвращает None. Обработчики, которым они нужны (смена пароля),
+  перечитывают пользователя: AuthService.get_user_by_id
+- Fail-open: любая ошибка кэша = промах, пользователь читается из БД
+
+В пределах одного запроса FastAPI кэширует результат get_current_user,
+поэтому get_current_active_user / get_current_admin_user повторно не
+обращаются ни к кэшу, ни к БД.
+
+Created: 2026-01-22
+Author: fancai Team
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..core.cache import cache_manager
+from ..core.config import settings
+from ..core.logging import logger
+from ..models.user import User
+from ..monitoring.metrics import record_auth_principal_lookup
+
+
+# Колонки User в снимке. password_hash в кэш не попадает, longest_streak_days
+# обновляется bulk UPDATE в конце сессии чтения без инвалидации кэша
+PRINCIPAL_FIELDS = (
+    "id",
+    "email",
+    "full_name",
+    "is_active",
+    "is_verified",
+    "is_admin",
+    "created_at",
+    "updated_at",
+    "last_login",
+    "timezone",
+)
+_DATETIME_FIELDS = ("created_at", "updated_at", "last_login")
+
+PrincipalKey = Tuple[str, str]
+
+
+def principal_snapshot(user: User) -> Dict[str, Any]:
+    """JSON-совместимый снимок пользователя для кэша."""
+    snapshot = {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+    snapshot["id"] = str(snapshot["id"])
+    for name in _DATETIME_FIELDS:
+        if snapshot[name] is not None:
+            snapshot[name] = snapshot[name].isoformat()
+    return snapshot
+
+
+def user_from_snapshot(snapshot: Dict[str, Any]) -> User:
+    """Detached объект User из снимка (без обращения к БД)."""
+    values = {name: snapshot.get(name) for name in PRINCIPAL_FIELDS}
+    values["id"] = UUID(values["id"])
+    for name in _DATETIME_FIELDS:
+        if values[name] is not None:
+            values[name] = datetime.fromisoformat(values[name])
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+class PrincipalCache:
+    """Двухуровневый кэш пользователя по jti токена (память процесса + Redis)."""
+
+    REDIS_KEY_PREFIX = "auth_principal"
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        ttl_seconds: Optional[int] = None,
+        memory_ttl_seconds: Optional[int] = None,
+        memory_entries: Optional[int] = None,
+    ):
+        """
+        Args:
+            enabled: Включён ли кэш (по умолчанию settings.AUTH_PRINCIPAL_CACHE_ENABLED)
+            ttl_seconds: TTL записи в Redis
+            memory_ttl_seconds: TTL записи в памяти процесса (0 - без L0)
+            memory_entries: Размер LRU в памяти процесса (0 - без L0)
+        """
+        self.enabled = (
+            settings.AUTH_PRINCIPAL_CACHE_ENABLED if enabled is None else enabled
+        )
+        self.ttl_seconds = (
+            settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.memory_ttl_seconds = (
+            settings.AUTH_PRINCIPAL_MEMORY_TTL_SECONDS
+            if memory_ttl_seconds is None
+            else memory_ttl_seconds
+        )
+        self.memory_entries = (
+            settings.AUTH_PRINCIPAL_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        )
+        self._memory: "OrderedDict[PrincipalKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "invalidations": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def token_key(token: str, payload: Dict[str, Any]) -> str:
+        """jti токена; для токенов, выданных до появления jti - SHA-256 токена."""
+        jti = payload.get("jti")
+        if jti:
+            return str(jti)
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _redis_key(self, key: PrincipalKey) -> str:
+        user_id, token_key = key
+        return f"{self.REDIS_KEY_PREFIX}:{user_id}:{token_key}"
+
+    def _memory_get(self, key: PrincipalKey) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if time.monotonic() >= expires_at:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return snapshot
+
+    def _memory_put(self, key: PrincipalKey, snapshot: Dict[str, Any]) -> None:
+        if self.memory_entries <= 0 or self.memory_ttl_seconds <= 0:
+            return
+        self._memory[key] = (time.monotonic() + self.memory_ttl_seconds, snapshot)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, user_id: UUID, token_key: str) -> Optional[User]:
+        """
+        Пользователь из кэша.
+
+        Args:
+            user_id: ID пользователя (claim sub)
+            token_key: PrincipalCache.token_key(token, payload)
+
+        Returns:
+            Detached User или None при промахе
+        """
+        if not self.enabled:
+            return None
+
+        key = (str(user_id), token_key)
+        snapshot = self._memory_get(key)
+        if snapshot is not None:
+            self._record("memory_hits", "memory_hit")
+            return user_from_snapshot(snapshot)
+
+        snapshot = await cache_manager.get(self._redis_key(key))
+        if snapshot is not None:
+            try:
+                user = user_from_snapshot(snapshot)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Corrupted auth principal cache entry", error=str(e))
+                await cache_manager.delete(self._redis_key(key))
+            else:
+                self._memory_put(key, snapshot)
+                self._record("redis_hits", "redis_hit")
+                return user
+
+        self._record("misses", "miss")
+        return None
+
+    async def put(
+        self, user: User, token_key: str, token_expires_at: Optional[float] = None
+    ) -> None:
+        """
+        Кэширует проверенного активного пользователя.
+
+        Args:
+            user: Пользователь, загруженный из БД
+            token_key: PrincipalCache.token_key(token, payload)
+            token_expires_at: Claim exp (unix time) - запись не переживёт токен
+        """
+        if not self.enabled or not user.is_active:
+            return
+
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, int(token_expires_at - time.time()))
+        if ttl <= 0:
+            return
+
+        key = (str(user.id), token_key)
+        snapshot = principal_snapshot(user)
+        self._memory_put(key, snapshot)
+        await cache_manager.set(self._redis_key(key), snapshot, ttl=ttl)
+        self.stats["writes"] += 1
+
+    async def invalidate_token(self, user_id: UUID, token_key: str) -> None:
+        """Удаляет запись одного токена (logout)."""
+        key = (str(user_id), token_key)
+        self._memory.pop(key, None)
+        await cache_manager.delete(self._redis_key(key))
+        self.stats["invalidations"] += 1
+
+    async def invalidate_user(self, user_id: UUID) -> None:
+        """Удаляет записи всех токенов пользователя (изменение колонок из снимка)."""
+        user_key = str(user_id)
+        for key in [key for key in self._memory if key[0] == user_key]:
+            del self._memory[key]
+        await cache_manager.delete_pattern(f"{self.REDIS_KEY_PREFIX}:{user_key}:*")
+        self.stats["invalidations"] += 1
+
+    def clear_memory(self) -> None:
+        """Очищает L0 (тесты)."""
+        self._memory.clear()
+
+    def _record(self, counter: str, result: str) -> None:
+        self.stats[counter] += 1
+        record_auth_principal_lookup(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика hit/miss (в пределах процесса)."""
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_size": len(self._memory),
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+# Глобальный экземпляр кэша
+principal_cache = PrincipalCache()
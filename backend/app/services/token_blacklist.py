@@ -4,17 +4,66 @@ Token Blacklist Service for fancai.
 Provides secure JWT token revocation using Redis storage.
 Tokens are stored until their natural expiration to prevent replay attacks.
 
+Revocation index:
+- Redis keys are SHA-256 hashes of the token's jti (or of the whole token
+  for tokens issued without a jti), never the raw JWT
+- Every API worker keeps a Bloom filter of revoked ids in memory, built
+  from a Redis SCAN on startup and kept current via Redis pub/sub
+- A negative filter answer is final (no network round trip); only
+  positive answers are confirmed with a Redis GET
+- While the filter is not ready (startup, lost pub/sub connection) every
+  check falls back to a Redis GET
+- A revocation whose publish is lost (after retries) bumps a shared
+  generation counter; listeners poll it, drop their filter and rebuild
+  it from Redis
+
 Security considerations:
 - Tokens are stored with TTL matching their original expiration
 - Redis key prefix prevents collision with other cache keys
 - Graceful degradation if Redis is unavailable (logs warning but allows operation)
+- A revocation reaches other workers' filters after pub/sub delivery
+  (milliseconds); the revoking worker's filter is updated synchronously
 """
 
+import asyncio
+import hashlib
+import re
+import time
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+from jose import JWTError, jwt
 from loguru import logger
 
 from ..core.cache import cache_manager
+from ..core.config import settings
+from .bloom_filter import BloomFilter
+
+
+_REVOCATION_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def revocation_id(token: str, payload: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hashed revocation id of a token.
+
+    Args:
+        token: The JWT token string
+        payload: Decoded payload (claims are read without verification if omitted)
+
+    Returns:
+        SHA-256 hex of the jti, or of the token itself if it has no jti
+    """
+    if payload is None:
+        try:
+            payload = jwt.get_unverified_claims(token)
+        except JWTError:
+            payload = {}
+
+    jti = payload.get("jti")
+    source = f"jti:{jti}" if jti else f"token:{token}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
 
 
 class TokenBlacklist:
@@ -34,14 +83,68 @@ class TokenBlacklist:
     """
 
     PREFIX = "token_blacklist:"
-
-    async def add(self, token: str, expires_at: datetime) -> bool:
+    CHANNEL = "token_blacklist:revocations"
+    # Outside PREFIX, so rebuild() does not treat it as a revoked token
+    GENERATION_KEY = "token_blacklist_generation"
+    PUBLISH_ATTEMPTS = 3
+    PUBLISH_RETRY_DELAY = 0.1
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        capacity: Optional[int] = None,
+        error_rate: Optional[float] = None,
+        rebuild_interval: Optional[int] = None,
+    ):
+        """
+        Args:
+            redis_url: Redis URL for SCAN and pub/sub (default: settings.REDIS_URL)
+            capacity: Expected number of revoked tokens per filter
+            error_rate: Bloom filter false positive rate at capacity
+            rebuild_interval: Seconds between filter rebuilds (drops expired ids)
+        """
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.capacity = capacity or settings.TOKEN_REVOCATION_FILTER_CAPACITY
+        self.error_rate = error_rate or settings.TOKEN_REVOCATION_FILTER_ERROR_RATE
+        self.rebuild_interval = (
+            rebuild_interval or settings.TOKEN_REVOCATION_FILTER_REBUILD_SECONDS
+        )
+
+        # None = filter not ready, every check goes to Redis
+        self._filter: Optional[BloomFilter] = None
+        # Revocation generation the current filter was built at
+        self._generation: Optional[str] = None
+        self._redis: Optional[redis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._stats = {
+            "filter_negatives": 0,
+            "redis_checks": 0,
+            "false_positives": 0,
+            "revoked_hits": 0,
+            "rebuilds": 0,
+        }
+
+    def _key(self, token_id: str) -> str:
+        return f"{self.PREFIX}{token_id}"
+
+    @property
+    def filter_ready(self) -> bool:
+        """Whether negative checks are answered from the in-memory filter."""
+        return self._filter is not None
+
+    async def add(
+        self,
+        token: str,
+        expires_at: datetime,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> bool:
         """
         Add token to blacklist until its natural expiration.
 
         Args:
             token: The JWT token string to blacklist
             expires_at: Token's original expiration datetime (from 'exp' claim)
+            payload: Decoded token payload, if already available
 
         Returns:
             True if successfully added or token already expired,
@@ -64,22 +167,32 @@ class TokenBlacklist:
             logger.debug(f"Token already expired, skipping blacklist")
             return True
 
-        key = f"{self.PREFIX}{token}"
+        token_id = revocation_id(token, payload)
 
         try:
-            await cache_manager.set(key, "1", ttl=ttl_seconds)
-            logger.info(f"Token blacklisted (TTL: {ttl_seconds}s)")
-            return True
+            if not await cache_manager.set(self._key(token_id), "1", ttl=ttl_seconds):
+                logger.error(f"Failed to blacklist token: cache unavailable")
+                return False
         except Exception as e:
             logger.error(f"Failed to blacklist token: {e}")
             return False
 
-    async def is_blacklisted(self, token: str) -> bool:
+        if self._filter is not None:
+            self._filter.add(token_id)
+        await self._publish(token_id)
+
+        logger.info(f"Token blacklisted (TTL: {ttl_seconds}s)")
+        return True
+
+    async def is_blacklisted(
+        self, token: str, payload: Optional[Dict[str, Any]] = None
+    ) -> bool:
         """
         Check if token is blacklisted (revoked).
 
         Args:
             token: The JWT token string to check
+            payload: Decoded token payload, if already available
 
         Returns:
             True if token is blacklisted,
@@ -90,14 +203,24 @@ class TokenBlacklist:
             This is a conscious security trade-off for availability.
             For high-security environments, consider fail-closed behavior.
         """
-        key = f"{self.PREFIX}{token}"
+        token_id = revocation_id(token, payload)
 
+        # Bloom filter has no false negatives - "not in filter" is final
+        token_filter = self._filter
+        if token_filter is not None and token_id not in token_filter:
+            self._stats["filter_negatives"] += 1
+            return False
+
+        self._stats["redis_checks"] += 1
         try:
-            result = await cache_manager.get(key)
+            result = await cache_manager.get(self._key(token_id))
             is_revoked = result is not None
 
             if is_revoked:
+                self._stats["revoked_hits"] += 1
                 logger.debug(f"Blacklisted token access attempted")
+            elif token_filter is not None:
+                self._stats["false_positives"] += 1
 
             return is_revoked
         except Exception as e:
@@ -110,22 +233,180 @@ class TokenBlacklist:
         """
         Remove token from blacklist (for testing or admin override).
 
+        The id stays in Bloom filters until the next rebuild; checks for it
+        are confirmed with Redis and pass.
+
         Args:
             token: The JWT token string to remove from blacklist
 
         Returns:
             True if successfully removed, False otherwise
         """
-        key = f"{self.PREFIX}{token}"
-
         try:
-            await cache_manager.delete(key)
+            await cache_manager.delete(self._key(revocation_id(token)))
             logger.info(f"Token removed from blacklist")
             return True
         except Exception as e:
             logger.error(f"Failed to remove token from blacklist: {e}")
             return False
 
+    # ------------------------------------------------------------------
+    # Revocation index (Bloom filter + pub/sub)
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Start the revocation index listener (application startup)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop the listener and close the Redis connection (shutdown)."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        self._filter = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                self.redis_url, encoding="utf-8", decode_responses=True
+            )
+        return self._redis
+
+    async def _publish(self, token_id: str) -> None:
+        """
+        Announce a revocation to the other workers' filters.
+
+        The publish is retried; if it is still lost, the shared revocation
+        generation is bumped so every listener stops trusting its filter
+        and rebuilds it from Redis.
+        """
+        for attempt in range(1, self.PUBLISH_ATTEMPTS + 1):
+            try:
+                await self._client().publish(self.CHANNEL, token_id)
+                return
+            except Exception as e:
+                error = e
+                if attempt < self.PUBLISH_ATTEMPTS:
+                    await asyncio.sleep(self.PUBLISH_RETRY_DELAY * attempt)
+
+        logger.warning(f"Failed to publish token revocation, invalidating filters: {error}")
+        try:
+            await self._client().incr(self.GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Failed to invalidate token revocation filters: {e}")
+
+    async def _listen(self) -> None:
+        """
+        Keep the filter current: subscribe, rebuild, apply revocations.
+
+        The subscription is established before the SCAN, so revocations
+        made during a rebuild are not lost. A changed revocation generation
+        (lost publish) drops the filter and rebuilds it. On any Redis error
+        the filter is dropped (checks fall back to Redis) until the next
+        reconnect.
+        """
+        while True:
+            pubsub = None
+            try:
+                client = self._client()
+                pubsub = client.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                await self.rebuild()
+                rebuilt_at = time.monotonic()
+
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message and self._filter is not None:
+                        token_id = message.get("data")
+                        if isinstance(token_id, str) and _REVOCATION_ID_RE.match(token_id):
+                            self._filter.add(token_id)
+
+                    if await client.get(self.GENERATION_KEY) != self._generation:
+                        # A revocation was not delivered over pub/sub
+                        self._filter = None
+                        await self.rebuild()
+                        rebuilt_at = time.monotonic()
+                    elif (
+                        time.monotonic() - rebuilt_at >= self.rebuild_interval
+                        or (self._filter is not None and self._filter.is_saturated)
+                    ):
+                        await self.rebuild()
+                        rebuilt_at = time.monotonic()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._filter = None
+                logger.warning(f"Token revocation index unavailable, checking Redis directly: {e}")
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the Bloom filter from Redis keys and swap it in.
+
+        Legacy keys (raw JWT after the prefix) are moved to hashed ids
+        with their remaining TTL.
+
+        Returns:
+            Number of revoked ids in the new filter
+        """
+        client = self._redis
+        if client is None:
+            return 0
+
+        # Read before the SCAN: a bump during the scan triggers another rebuild
+        generation = await client.get(self.GENERATION_KEY)
+
+        token_ids = []
+        async for key in client.scan_iter(match=f"{self.PREFIX}*", count=1000):
+            suffix = key[len(self.PREFIX):]
+            if _REVOCATION_ID_RE.match(suffix):
+                token_ids.append(suffix)
+            else:
+                token_ids.append(await self._migrate_legacy_key(client, key, suffix))
+
+        capacity = max(self.capacity, 2 * len(token_ids))
+        new_filter = BloomFilter(capacity, self.error_rate)
+        for token_id in token_ids:
+            if token_id:
+                new_filter.add(token_id)
+
+        # Revocations published during the scan wait on the subscription
+        # and are applied to the new filter right after the swap
+        self._filter = new_filter
+        self._generation = generation
+        self._stats["rebuilds"] += 1
+        logger.info(f"Token revocation filter rebuilt ({len(token_ids)} revoked tokens)")
+        return len(token_ids)
+
+    async def _migrate_legacy_key(
+        self, client: redis.Redis, key: str, token: str
+    ) -> Optional[str]:
+        """Move a raw-token key to its hashed revocation id."""
+        ttl = await client.ttl(key)
+        token_id = revocation_id(token)
+        if ttl and ttl > 0:
+            await client.set(self._key(token_id), "1", ex=ttl)
+        await client.delete(key)
+        return token_id if ttl and ttl > 0 else None
+
     async def get_blacklist_stats(self) -> dict:
         """
         Get statistics about blacklisted tokens.
@@ -133,19 +414,23 @@ class TokenBlacklist:
         Returns:
             Dictionary with count of blacklisted tokens
         """
-        if not cache_manager.is_available or not cache_manager._redis:
+        client = self._redis or cache_manager._redis
+        if not client:
             return {"available": False, "count": 0}
 
         try:
             # Count keys with blacklist prefix
             count = 0
-            async for _ in cache_manager._redis.scan_iter(match=f"{self.PREFIX}*"):
+            async for _ in client.scan_iter(match=f"{self.PREFIX}*"):
                 count += 1
 
             return {
                 "available": True,
                 "count": count,
-                "prefix": self.PREFIX
+                "prefix": self.PREFIX,
+                "filter_ready": self.filter_ready,
+                "filter_size": len(self._filter) if self._filter is not None else 0,
+                **self._stats,
             }
         except Exception as e:
             logger.error(f"Failed to get blacklist stats: {e}")
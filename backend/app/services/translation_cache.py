@@ -0,0 +1,348 @@
+"""
+Translation Cache - кэш переводов PromptTranslator по содержимому описания.
+
+АРХИТЕКТУРА:
+- Ключ: (sha256(russian_text), prompt_version, model)
+- prompt_version - хэш шаблона TRANSLATION_PROMPT: изменение промпта
+  автоматически даёт промахи, старые записи удаляет cleanup()
+- L0: LRU в памяти процесса (TRANSLATION_CACHE_MEMORY_ENTRIES), без I/O
+- L1: Redis (cache_manager, TTL LLM_CACHE_REDIS_TTL_SECONDS)
+- L2: PostgreSQL (prompt_translation_cache), общий для API и Celery
+  воркеров и переживает рестарт
+- Попадание на нижнем уровне прогревает верхние
+- get_many() - один MGET в Redis и один SELECT в PostgreSQL на пакет
+- Fail-open: любая ошибка кэша = промах, перевод не ломается
+
+Created: 2026-01-19
+Author: fancai Team
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.cache import cache_manager
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.logging import logger
+from ..models.translation_cache import PromptTranslationCacheEntry
+from ..monitoring.metrics import record_translation_cache_lookup
+from .llm_extraction_cache import DB_ERROR_COOLDOWN_SECONDS
+
+
+CacheKey = Tuple[str, str, str]
+
+
+def compute_text_hash(text: str) -> str:
+    """SHA-256 исходного текста (hex)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Трёхуровневый кэш переводов (память процесса + Redis + PostgreSQL).
+    """
+
+    REDIS_KEY_PREFIX = "prompt_translation"
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        memory_entries: Optional[int] = None,
+    ):
+        """
+        Args:
+            enabled: Включён ли кэш (по умолчанию settings.LLM_CACHE_ENABLED)
+            memory_entries: Размер LRU в памяти процесса
+                (по умолчанию settings.TRANSLATION_CACHE_MEMORY_ENTRIES, 0 - без L0)
+        """
+        self.enabled = settings.LLM_CACHE_ENABLED if enabled is None else enabled
+        self.memory_entries = (
+            settings.TRANSLATION_CACHE_MEMORY_ENTRIES
+            if memory_entries is None
+            else memory_entries
+        )
+        self._memory: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._db_disabled_until = 0.0
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    def _redis_key(self, key: CacheKey) -> str:
+        text_hash, prompt_version, model = key
+        return f"{self.REDIS_KEY_PREFIX}:{model}:{prompt_version}:{text_hash}"
+
+    def _db_available(self) -> bool:
+        return time.monotonic() >= self._db_disabled_until
+
+    def _db_failed(self, operation: str, error: Exception) -> None:
+        self.stats["errors"] += 1
+        self._db_disabled_until = time.monotonic() + DB_ERROR_COOLDOWN_SECONDS
+        logger.warning(
+            "Translation cache database error, skipping database tier",
+            operation=operation,
+            error=str(error),
+            cooldown_seconds=DB_ERROR_COOLDOWN_SECONDS,
+        )
+
+    def _memory_get(self, key: CacheKey) -> Optional[str]:
+        translation = self._memory.get(key)
+        if translation is not None:
+            self._memory.move_to_end(key)
+        return translation
+
+    def _memory_put(self, key: CacheKey, translation: str) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, text: str, model: str, prompt_version: str) -> Optional[str]:
+        """
+        Получить закэшированный перевод текста.
+
+        Args:
+            text: Исходный русский текст
+            model: ID модели перевода
+            prompt_version: Версия промпта (compute_prompt_version)
+
+        Returns:
+            Перевод или None при промахе
+        """
+        found = await self.get_many([text], model, prompt_version)
+        return found.get(text)
+
+    async def get_many(
+        self, texts: Iterable[str], model: str, prompt_version: str
+    ) -> Dict[str, str]:
+        """
+        Пакетный поиск переводов: каждый уровень опрашивается одним запросом
+        только для текстов, не найденных уровнем выше.
+
+        Args:
+            texts: Исходные тексты (дубликаты учитываются один раз)
+            model: ID модели перевода
+            prompt_version: Версия промпта
+
+        Returns:
+            Найденные переводы по исходному тексту (промахи отсутствуют)
+        """
+        if not self.enabled:
+            return {}
+
+        keys: Dict[str, CacheKey] = {
+            text: (compute_text_hash(text), prompt_version, model) for text in texts
+        }
+        if not keys:
+            return {}
+
+        found: Dict[str, str] = {}
+        pending: Dict[CacheKey, str] = {}
+        for text, key in keys.items():
+            translation = self._memory_get(key)
+            if translation is not None:
+                found[text] = translation
+            else:
+                pending[key] = text
+        self._record("memory_hits", "memory_hit", len(found))
+
+        if pending:
+            redis_keys = {self._redis_key(key): key for key in pending}
+            cached = await cache_manager.get_many(list(redis_keys))
+            for redis_key, translation in cached.items():
+                key = redis_keys[redis_key]
+                found[pending.pop(key)] = translation
+                self._memory_put(key, translation)
+            self._record("redis_hits", "redis_hit", len(cached))
+
+        if pending and self._db_available():
+            db_found = await self._db_get_many(list(pending))
+            for key, translation in db_found.items():
+                found[pending.pop(key)] = translation
+                self._memory_put(key, translation)
+                await cache_manager.set(
+                    self._redis_key(key), translation, settings.LLM_CACHE_REDIS_TTL_SECONDS
+                )
+            self._record("db_hits", "db_hit", len(db_found))
+
+        self._record("misses", "miss", len(pending))
+        return found
+
+    async def _db_get_many(self, keys: List[CacheKey]) -> Dict[CacheKey, str]:
+        columns = (
+            PromptTranslationCacheEntry.text_hash,
+            PromptTranslationCacheEntry.prompt_version,
+            PromptTranslationCacheEntry.model,
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await db.execute(
+                    select(*columns, PromptTranslationCacheEntry.translation).where(
+                        tuple_(*columns).in_(keys)
+                    )
+                )
+                found = {
+                    (text_hash, prompt_version, model): translation
+                    for text_hash, prompt_version, model, translation in rows.all()
+                }
+                if found:
+                    await db.execute(
+                        update(PromptTranslationCacheEntry)
+                        .where(tuple_(*columns).in_(list(found)))
+                        .values(
+                            hit_count=PromptTranslationCacheEntry.hit_count + 1,
+                            last_accessed_at=func.now(),
+                        )
+                    )
+                    await db.commit()
+                return found
+        except Exception as e:
+            self._db_failed("get_many", e)
+            return {}
+
+    async def set(
+        self, text: str, model: str, prompt_version: str, translation: str
+    ) -> None:
+        """
+        Сохранить перевод во все уровни.
+
+        Args:
+            text: Исходный русский текст
+            model: ID модели перевода
+            prompt_version: Версия промпта
+            translation: Английский перевод
+        """
+        if not self.enabled:
+            return
+
+        key = (compute_text_hash(text), prompt_version, model)
+        self._memory_put(key, translation)
+        await cache_manager.set(
+            self._redis_key(key), translation, settings.LLM_CACHE_REDIS_TTL_SECONDS
+        )
+
+        if not self._db_available():
+            return
+
+        try:
+            async with AsyncSessionLocal() as db:
+                stmt = pg_insert(PromptTranslationCacheEntry).values(
+                    text_hash=key[0],
+                    prompt_version=prompt_version,
+                    model=model,
+                    translation=translation,
+                )
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["text_hash", "prompt_version", "model"],
+                        set_={
+                            "translation": stmt.excluded.translation,
+                            "last_accessed_at": func.now(),
+                        },
+                    )
+                )
+                await db.commit()
+            self.stats["writes"] += 1
+        except Exception as e:
+            self._db_failed("set", e)
+
+    async def cleanup(
+        self,
+        current_prompt_version: Optional[str] = None,
+        ttl_days: Optional[int] = None,
+        max_entries: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Вытеснение записей из PostgreSQL (как LLMExtractionCache.cleanup).
+
+        1. Записи других версий промпта (после изменения TRANSLATION_PROMPT)
+        2. Записи без обращений дольше ttl_days
+        3. Самые давно использованные записи сверх max_entries (LRU)
+
+        Returns:
+            Количество удалённых записей по причинам
+        """
+        ttl_days = ttl_days or settings.LLM_CACHE_TTL_DAYS
+        max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        result = {"stale_prompt": 0, "expired": 0, "evicted": 0}
+
+        async with AsyncSessionLocal() as db:
+            if current_prompt_version:
+                deleted = await db.execute(
+                    delete(PromptTranslationCacheEntry).where(
+                        PromptTranslationCacheEntry.prompt_version != current_prompt_version
+                    )
+                )
+                result["stale_prompt"] = deleted.rowcount or 0
+
+            cutoff = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+            deleted = await db.execute(
+                delete(PromptTranslationCacheEntry).where(
+                    PromptTranslationCacheEntry.last_accessed_at < cutoff
+                )
+            )
+            result["expired"] = deleted.rowcount or 0
+
+            total = await db.scalar(
+                select(func.count()).select_from(PromptTranslationCacheEntry)
+            )
+            excess = (total or 0) - max_entries
+            if excess > 0:
+                columns = (
+                    PromptTranslationCacheEntry.text_hash,
+                    PromptTranslationCacheEntry.prompt_version,
+                    PromptTranslationCacheEntry.model,
+                )
+                oldest = (
+                    select(*columns)
+                    .order_by(PromptTranslationCacheEntry.last_accessed_at.asc())
+                    .limit(excess)
+                )
+                deleted = await db.execute(
+                    delete(PromptTranslationCacheEntry).where(tuple_(*columns).in_(oldest))
+                )
+                result["evicted"] = deleted.rowcount or 0
+
+            await db.commit()
+
+        logger.info("Translation cache cleanup completed", **result)
+        return result
+
+    def _record(self, counter: str, result: str, count: int = 1) -> None:
+        if count <= 0:
+            return
+        self.stats[counter] += count
+        record_translation_cache_lookup(result, count)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика hit/miss по уровням (в пределах процесса)."""
+        hits = (
+            self.stats["memory_hits"] + self.stats["redis_hits"] + self.stats["db_hits"]
+        )
+        lookups = hits + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory_size": len(self._memory),
+            "memory_max_entries": self.memory_entries,
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_hit_rate": self.stats["memory_hits"] / lookups if lookups else 0.0,
+        }
+
+
+# Global instance
+translation_cache = TranslationCache()
@@ -9,11 +9,18 @@
 Performance optimization (December 2025):
 - Redis caching for aggregated statistics with 5-minute TTL
 - Graceful fallback to direct DB queries if Redis unavailable
+
+Single-pass statistics:
+- На промахе кэша дашборд считается двумя запросами вместо ~15:
+  один проход по reading_sessions (GROUP BY дню с FILTER агрегатами) и
+  один запрос по книгам пользователя с прогрессом и числом глав
+- Отдельные get_* методы остаются для точечных эндпоинтов
 """
 
+from collections import Counter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, cast, Date, case, and_, Float
-from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, func, cast, Date, case, and_, Float, true
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from uuid import UUID
 
@@ -22,6 +29,7 @@ from loguru import logger
 from ..models.reading_session import ReadingSession
 from ..models.book import Book, ReadingProgress
 from ..core.cache import cache_manager
+from .book.book_progress_service import BookProgressService
 
 # Cache configuration for user statistics
 USER_STATS_CACHE_TTL = 300  # 5 minutes
@@ -32,6 +40,38 @@ USER_STATS_CACHE_KEY_PREFIX = "user_stats"
 MAX_VALID_SESSION_DURATION = 480  # 8 hours
 
 
+def _book_status(
+    current_chapter: int,
+    current_position: int,
+    reading_location_cfi: Optional[str],
+    total_chapters: int,
+) -> Optional[str]:
+    """
+    Статус книги по прогрессу - те же условия, что CASE в get_books_count_by_status.
+
+    Returns:
+        "completed", "in_progress" или None (не начата)
+    """
+    if reading_location_cfi is not None:
+        if current_position >= 95:
+            return "completed"
+        if 0 < current_position < 95:
+            return "in_progress"
+        return None
+
+    if total_chapters > 0:
+        ratio = (
+            float(current_chapter - 1) + float(current_position) / 100.0
+        ) / float(total_chapters)
+        if ratio >= 0.95:
+            return "completed"
+        if 0 < ratio < 0.95:
+            return "in_progress"
+        return None
+
+    return "in_progress" if current_chapter > 1 else None
+
+
 class UserStatisticsService:
     """Сервис для подсчета детальной статистики чтения пользователей."""
 
@@ -116,39 +156,44 @@ class UserStatisticsService:
         rows = result.fetchall()
 
         # Создаем словарь для быстрого доступа к данным по датам
-        activity_by_date = {}
-        for row in rows:
-            reading_date = row.reading_date
-            activity_by_date[reading_date] = {
-                "date": reading_date.isoformat(),
-                "day": UserStatisticsService.WEEKDAY_NAMES_RU[reading_date.weekday()],
-                "minutes": int(row.total_minutes or 0),
-                "sessions": int(row.sessions_count or 0),
-                "progress": int(row.total_progress or 0),
-            }
+        activity_by_date = {
+            row.reading_date: (row.total_minutes, row.sessions_count, row.total_progress)
+            for row in rows
+        }
+
+        return UserStatisticsService._build_weekly_activity(activity_by_date, now, days)
 
-        # Заполняем массив за последние N дней (включая дни без активности)
+    @staticmethod
+    def _build_weekly_activity(
+        activity_by_date: Dict[date, tuple], now: datetime, days: int
+    ) -> List[Dict]:
+        """
+        Собирает массив активности за последние N дней.
+
+        Args:
+            activity_by_date: {дата: (минуты, сессии, прогресс)} для дней с активностью
+            now: Текущий момент (UTC)
+            days: Количество дней
+
+        Returns:
+            Список ровно из `days` элементов, от сегодня назад
+        """
         weekly_activity = []
         for i in range(days):
             # Считаем дни в обратном порядке от сегодня
             current_date = (now - timedelta(days=i)).date()
+            # Нет активности - заполняем нулями
+            minutes, sessions, progress = activity_by_date.get(current_date, (0, 0, 0))
 
-            if current_date in activity_by_date:
-                # Есть активность за этот день
-                weekly_activity.append(activity_by_date[current_date])
-            else:
-                # Нет активности - заполняем нулями
-                weekly_activity.append(
-                    {
-                        "date": current_date.isoformat(),
-                        "day": UserStatisticsService.WEEKDAY_NAMES_RU[
-                            current_date.weekday()
-                        ],
-                        "minutes": 0,
-                        "sessions": 0,
-                        "progress": 0,
-                    }
-                )
+            weekly_activity.append(
+                {
+                    "date": current_date.isoformat(),
+                    "day": UserStatisticsService.WEEKDAY_NAMES_RU[current_date.weekday()],
+                    "minutes": int(minutes or 0),
+                    "sessions": int(sessions or 0),
+                    "progress": int(progress or 0),
+                }
+            )
 
         return weekly_activity
 
@@ -194,12 +239,26 @@ class UserStatisticsService:
         result = await db.execute(query)
         reading_dates = [row.reading_date for row in result.fetchall()]
 
+        return UserStatisticsService._count_current_streak(
+            reading_dates, datetime.now(timezone.utc).date()
+        )
+
+    @staticmethod
+    def _count_current_streak(reading_dates: List[date], today: date) -> int:
+        """
+        Считает активный streak по уникальным датам чтения.
+
+        Args:
+            reading_dates: Уникальные даты чтения, по убыванию
+            today: Сегодняшняя дата (UTC)
+
+        Returns:
+            Количество последовательных дней чтения (0 если streak прерван)
+        """
         if not reading_dates:
             # Нет завершенных сессий
             return 0
 
-        # Получаем сегодняшнюю дату и вчера (без времени)
-        today = datetime.now(timezone.utc).date()
         yesterday = today - timedelta(days=1)
         last_reading_date = reading_dates[0]
 
@@ -468,12 +527,13 @@ class UserStatisticsService:
             Общее количество прочитанных страниц
         """
         from sqlalchemy.orm import selectinload
+        from .book import chapters_without_body
 
-        # Загружаем книги с прогрессом и главами для корректного расчёта
+        # Загружаем книги с прогрессом и главами (без тел) для корректного расчёта
         books_query = (
             select(Book)
             .options(selectinload(Book.reading_progress))
-            .options(selectinload(Book.chapters))
+            .options(chapters_without_body())
             .where(Book.user_id == user_id)
         )
         result = await db.execute(books_query)
@@ -566,8 +626,8 @@ class UserStatisticsService:
         """
         Возвращает текущий и лучший streak.
 
-        Автоматически обновляет longest_streak_days в User если
-        текущий streak превышает сохраненный рекорд.
+        Лучший streak - максимум из сохранённого рекорда и текущего streak.
+        Рекорд в БД обновляет record_longest_streak при завершении сессий.
 
         Args:
             db: Асинхронная сессия БД
@@ -580,20 +640,45 @@ class UserStatisticsService:
 
         current_streak = await UserStatisticsService.get_reading_streak(db, user_id)
 
-        # Получаем пользователя для чтения/обновления longest_streak
-        user = await db.get(User, user_id)
-        if not user:
-            return {"current": current_streak, "longest": current_streak}
+        longest_streak = await db.scalar(
+            select(User.longest_streak_days).where(User.id == user_id)
+        )
 
-        longest_streak = user.longest_streak_days or 0
+        return {
+            "current": current_streak,
+            "longest": max(longest_streak or 0, current_streak),
+        }
 
-        # Обновляем longest если текущий больше
-        if current_streak > longest_streak:
-            user.longest_streak_days = current_streak
-            await db.commit()
-            longest_streak = current_streak
+    @staticmethod
+    async def record_longest_streak(db: AsyncSession, user_id: UUID) -> int:
+        """
+        Сохраняет текущий streak как рекорд, если он больше сохранённого.
 
-        return {"current": current_streak, "longest": longest_streak}
+        Вызывается в транзакции, завершающей сессию чтения (до её коммита);
+        коммит выполняет вызывающий код. UPDATE с GREATEST не затирает
+        рекорд, записанный параллельной транзакцией.
+
+        Args:
+            db: Асинхронная сессия БД
+            user_id: UUID пользователя
+
+        Returns:
+            Текущий streak
+        """
+        from ..models.user import User
+
+        current_streak = await UserStatisticsService.get_reading_streak(db, user_id)
+        if current_streak > 0:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    longest_streak_days=func.greatest(
+                        User.longest_streak_days, current_streak
+                    )
+                )
+            )
+        return current_streak
 
     @staticmethod
     async def get_monthly_statistics(
@@ -760,8 +845,277 @@ class UserStatisticsService:
         """
         Compute all reading statistics from database.
 
-        Internal method that performs all database queries to gather
-        statistics. Called on cache miss.
+        Internal method called on cache miss. Two round trips instead of
+        one query per metric:
+        1. _fetch_session_statistics - one pass over reading_sessions
+        2. _fetch_library_statistics - user's books with progress
+
+        The result is identical to _compute_all_statistics_sequential.
+
+        Args:
+            db: Async database session
+            user_id: UUID of the user
+
+        Returns:
+            Dictionary with all reading statistics
+        """
+        now = datetime.now(timezone.utc)
+
+        sessions = await UserStatisticsService._fetch_session_statistics(
+            db, user_id, now
+        )
+        library = await UserStatisticsService._fetch_library_statistics(db, user_id)
+
+        # Рекорд сохраняется при завершении сессий (record_longest_streak),
+        # расчёт статистики только читает
+        current_streak = sessions["current_streak"]
+        longest_streak = max(sessions["longest_streak"], current_streak)
+
+        return {
+            "total_books": library["total"],
+            "books_in_progress": library["in_progress"],
+            "books_completed": library["completed"],
+            "total_reading_time_minutes": sessions["total_minutes"],
+            "reading_streak_days": current_streak,
+            "longest_streak_days": longest_streak,
+            "average_reading_speed_wpm": sessions["average_speed"],
+            "favorite_genres": library["favorite_genres"],
+            "weekly_activity": sessions["weekly_activity"],
+            "total_pages_read": library["total_pages"],
+            "total_chapters_read": sessions["chapters_read"],
+            "avg_minutes_per_day": sessions["avg_minutes_per_day"],
+            "books_this_month": sessions["books_this_month"],
+            "reading_time_this_month": sessions["month_minutes"],
+            "pages_this_month": sessions["month_progress"],
+        }
+
+    @staticmethod
+    async def _fetch_session_statistics(
+        db: AsyncSession, user_id: UUID, now: datetime, days: int = 7
+    ) -> Dict[str, Any]:
+        """
+        Все метрики по сессиям чтения одним запросом.
+
+        daily - GROUP BY дню по сессиям пользователя; каждая метрика -
+        агрегат с FILTER, повторяющим WHERE соответствующего get_* метода.
+        totals - одна строка со скалярными подзапросами (книги за месяц,
+        скорость и главы из reading_progress, сохранённый рекорд streak).
+        totals LEFT JOIN daily гарантирует строку даже без сессий.
+
+        SQL:
+        WITH daily AS (
+            SELECT DATE(started_at) AS reading_date,
+                   COUNT(*) FILTER (WHERE NOT is_active) AS completed_sessions,
+                   SUM(duration_minutes) FILTER (WHERE <valid>) AS minutes,
+                   ...
+            FROM reading_sessions WHERE user_id = :user_id
+            GROUP BY DATE(started_at)
+        ), totals AS (SELECT (SELECT ...) AS books_this_month, ...)
+        SELECT * FROM totals LEFT JOIN daily ON true
+        ORDER BY reading_date DESC;
+
+        Args:
+            db: Асинхронная сессия БД
+            user_id: UUID пользователя
+            now: Текущий момент (UTC), общий для недели и месяца
+            days: Дней в weekly_activity
+
+        Returns:
+            Dict с метриками сессий, weekly_activity и текущим streak
+        """
+        from ..models.user import User
+
+        week_start = (now - timedelta(days=days - 1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        reading_date = cast(ReadingSession.started_at, Date)
+        progress = ReadingSession.end_position - ReadingSession.start_position
+        completed = ReadingSession.is_active == False  # noqa: E712
+        # Завершённые сессии без аномальной длительности
+        valid = and_(
+            completed, ReadingSession.duration_minutes <= MAX_VALID_SESSION_DURATION
+        )
+        this_week = and_(valid, ReadingSession.started_at >= week_start)
+        this_month = and_(valid, ReadingSession.started_at >= month_start)
+
+        daily = (
+            select(
+                reading_date.label("reading_date"),
+                func.count().filter(completed).label("completed_sessions"),
+                func.sum(ReadingSession.duration_minutes).filter(valid).label("minutes"),
+                func.count()
+                .filter(and_(valid, ReadingSession.duration_minutes >= 1))
+                .label("counted_sessions"),
+                func.sum(ReadingSession.duration_minutes).filter(this_week).label("week_minutes"),
+                func.count().filter(this_week).label("week_sessions"),
+                func.sum(progress).filter(this_week).label("week_progress"),
+                func.sum(ReadingSession.duration_minutes).filter(this_month).label("month_minutes"),
+                func.sum(progress).filter(this_month).label("month_progress"),
+            )
+            .where(ReadingSession.user_id == user_id)
+            .group_by(reading_date)
+            .cte("daily")
+        )
+
+        totals = select(
+            select(func.count(func.distinct(ReadingSession.book_id)))
+            .where(
+                ReadingSession.user_id == user_id,
+                ReadingSession.started_at >= month_start,
+            )
+            .scalar_subquery()
+            .label("books_this_month"),
+            select(func.avg(ReadingProgress.reading_speed_wpm))
+            .where(
+                ReadingProgress.user_id == user_id,
+                ReadingProgress.reading_speed_wpm > 0,
+            )
+            .scalar_subquery()
+            .label("average_speed"),
+            select(func.sum(func.greatest(ReadingProgress.current_chapter - 1, 0)))
+            .where(ReadingProgress.user_id == user_id)
+            .scalar_subquery()
+            .label("chapters_read"),
+            select(User.longest_streak_days)
+            .where(User.id == user_id)
+            .scalar_subquery()
+            .label("longest_streak"),
+        ).cte("totals")
+
+        query = (
+            select(totals, daily)
+            .select_from(totals.outerjoin(daily, true()))
+            .order_by(daily.c.reading_date.desc())
+        )
+
+        result = await db.execute(query)
+        rows = result.fetchall()
+        first = rows[0]
+        day_rows = [row for row in rows if row.reading_date is not None]
+
+        total_minutes = sum(int(row.minutes or 0) for row in day_rows)
+        active_days = sum(1 for row in day_rows if row.counted_sessions)
+        streak_dates = [row.reading_date for row in day_rows if row.completed_sessions]
+        activity_by_date = {
+            row.reading_date: (row.week_minutes, row.week_sessions, row.week_progress)
+            for row in day_rows
+            if row.week_sessions
+        }
+
+        return {
+            "total_minutes": total_minutes,
+            "avg_minutes_per_day": total_minutes // active_days if active_days else 0,
+            "current_streak": UserStatisticsService._count_current_streak(
+                streak_dates, now.date()
+            ),
+            "longest_streak": first.longest_streak or 0,
+            "weekly_activity": UserStatisticsService._build_weekly_activity(
+                activity_by_date, now, days
+            ),
+            "month_minutes": sum(int(row.month_minutes or 0) for row in day_rows),
+            "month_progress": sum(int(row.month_progress or 0) for row in day_rows),
+            "books_this_month": int(first.books_this_month or 0),
+            "average_speed": round(float(first.average_speed or 0.0), 1),
+            "chapters_read": int(first.chapters_read or 0),
+        }
+
+    @staticmethod
+    async def _fetch_library_statistics(
+        db: AsyncSession, user_id: UUID, genres_limit: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Метрики по книгам пользователя одним запросом.
+
+        Одна строка на книгу: жанр, total_pages, прогресс пользователя и
+        число глав (денормализованный Book.total_chapters, без подсчёта
+        по chapters). Статусы, жанры и страницы считаются по этим строкам
+        по тем же правилам, что get_books_count_by_status,
+        get_favorite_genres и get_total_pages_read.
+
+        Args:
+            db: Асинхронная сессия БД
+            user_id: UUID пользователя
+            genres_limit: Максимальное количество жанров
+
+        Returns:
+            Dict с ключами total, in_progress, completed,
+            favorite_genres, total_pages
+        """
+        query = (
+            select(
+                Book.genre,
+                Book.total_pages,
+                ReadingProgress.id.label("progress_id"),
+                ReadingProgress.current_chapter,
+                ReadingProgress.current_position,
+                ReadingProgress.reading_location_cfi,
+                Book.total_chapters.label("chapter_count"),
+            )
+            .select_from(Book)
+            .outerjoin(
+                ReadingProgress,
+                and_(
+                    ReadingProgress.book_id == Book.id,
+                    ReadingProgress.user_id == user_id,
+                ),
+            )
+            .where(Book.user_id == user_id)
+        )
+
+        result = await db.execute(query)
+        rows = result.fetchall()
+
+        in_progress = 0
+        completed = 0
+        total_pages = 0
+        for row in rows:
+            chapters = int(row.chapter_count or 0)
+            if row.progress_id is not None:
+                status = _book_status(
+                    row.current_chapter,
+                    row.current_position,
+                    row.reading_location_cfi,
+                    chapters,
+                )
+                if status == "completed":
+                    completed += 1
+                elif status == "in_progress":
+                    in_progress += 1
+
+            if row.total_pages and row.progress_id is not None:
+                percent = BookProgressService.compute_progress_percent(
+                    row.current_chapter,
+                    row.current_position,
+                    row.reading_location_cfi,
+                    chapters,
+                )
+                total_pages += int(row.total_pages * percent / 100)
+
+        genres = Counter(row.genre for row in rows)
+
+        return {
+            "total": len(rows),
+            "in_progress": in_progress,
+            "completed": completed,
+            "favorite_genres": [
+                {"genre": genre, "count": count}
+                for genre, count in genres.most_common(genres_limit)
+            ],
+            "total_pages": total_pages,
+        }
+
+    @staticmethod
+    async def _compute_all_statistics_sequential(
+        db: AsyncSession, user_id: UUID
+    ) -> Dict[str, Any]:
+        """
+        Compute all reading statistics with one query per metric.
+
+        Reference implementation built from the public get_* methods
+        (~15 sequential queries). Used by tests and benchmarks to check
+        that _compute_all_statistics returns the same dictionary.
 
         Args:
             db: Async database session
@@ -10,9 +10,11 @@ from datetime import datetime, timedelta, timezone
 from typing import List
 from sqlalchemy import select, and_, func
 
+from app.core.async_runtime import run_async
 from app.core.celery_app import celery_app
 from app.core.database import AsyncSessionLocal
 from app.models.reading_session import ReadingSession
+from app.services.user_statistics_service import UserStatisticsService
 
 logger = logging.getLogger(__name__)
 
@@ -61,10 +63,8 @@ def close_abandoned_sessions(self) -> dict:
         # Вычисляем deadline: сессии старше 2 часов
         deadline = datetime.now(timezone.utc) - timedelta(hours=2)
 
-        # Синхронно вызываем async функцию
-        import asyncio
-
-        closed_count = asyncio.run(_close_abandoned_sessions_impl(deadline))
+        # Синхронно вызываем async функцию (в loop процесса воркера)
+        closed_count = run_async(_close_abandoned_sessions_impl(deadline))
 
         execution_time_ms = (
             datetime.now(timezone.utc) - start_time
@@ -163,6 +163,10 @@ async def _close_abandoned_sessions_impl(deadline: datetime) -> int:
                     )
                     continue
 
+            # Рекорды streak пользователей с закрытыми сессиями
+            for user_id in {session.user_id for session in abandoned_sessions}:
+                await UserStatisticsService.record_longest_streak(db, user_id)
+
             # Commit всех изменений
             await db.commit()
 
@@ -200,9 +204,7 @@ def get_cleanup_statistics(hours: int = 24) -> dict:
         >>> print(stats.get())
         {"total_closed": 150, "total_active": 45, "avg_duration_minutes": 23.5}
     """
-    import asyncio
-
-    return asyncio.run(_get_cleanup_statistics_impl(hours))
+    return run_async(_get_cleanup_statistics_impl(hours))
 
 
 async def _get_cleanup_statistics_impl(hours: int) -> dict:
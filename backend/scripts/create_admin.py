@@ -22,8 +22,10 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from app.core.cache import cache_manager
 from app.core.database import get_database_session
 from app.services.auth_service import auth_service
+from app.services.principal_cache import principal_cache
 from app.models.user import User, SubscriptionPlan
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -85,6 +87,8 @@ async def create_admin_user():
                     existing_user.is_admin = True
                     existing_user.subscription_plan = SubscriptionPlan.ULTIMATE
                     await db.commit()
+                    # Токены пользователя в кэше ещё без прав администратора
+                    await principal_cache.invalidate_user(existing_user.id)
                     print(f"✅ Пользователь {email} обновлен до администратора")
                     return existing_user
             
@@ -122,6 +126,9 @@ async def main():
     print("🚀 Запуск скрипта создания администратора...")
     print(f"🔒 Environment: {os.getenv('ENVIRONMENT', 'unknown')}")
 
+    # Redis нужен для инвалидации кэша пользователя (principal_cache)
+    await cache_manager.initialize()
+
     try:
         admin_user = await create_admin_user()
         print(f"\n🎉 Администратор готов к использованию!")
@@ -133,6 +140,8 @@ async def main():
     except Exception as e:
         print(f"\n💥 Критическая ошибка: {str(e)}")
         sys.exit(1)
+    finally:
+        await cache_manager.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Скрипт переноса сгенерированных изображений в content-addressed хранилище.
+
+Переносит файлы из плоской директории generated_images в шарды
+(ab/cd/<sha256>.png), схлопывает одинаковые файлы и обновляет строки
+generated_images (local_path, image_url, content_hash, file_size).
+Повторный запуск безопасен - уже перенесённые файлы пропускаются.
+
+Использование:
+    python scripts/migrate_generated_images.py [--dry-run] [--gc]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import AsyncSessionLocal
+from app.services.generated_image_store import generated_image_store
+
+
+async def migrate_generated_images(dry_run: bool, collect_garbage: bool):
+    """Переносит старые файлы изображений и (опционально) запускает GC."""
+
+    print(f"Хранилище: {generated_image_store.root_directory}")
+
+    async with AsyncSessionLocal() as db:
+        stats = await generated_image_store.migrate_legacy(db, dry_run=dry_run)
+
+        if dry_run:
+            print(f"Найдено {stats['legacy_files']} файлов для переноса")
+            return
+
+        print(f"Файлов в плоской директории: {stats['legacy_files']}")
+        print(f"  ✓ Перенесено: {stats['migrated_files']}")
+        print(f"  ✓ Дубликатов удалено: {stats['deduplicated_files']}")
+        print(f"  ✓ Обновлено строк: {stats['updated_rows']}")
+        if stats["failed_files"]:
+            print(f"  × Ошибок: {stats['failed_files']}")
+
+        if collect_garbage:
+            gc_stats = await generated_image_store.collect_garbage(db)
+            print(
+                f"GC: удалено {gc_stats['deleted_files']} файлов без ссылок "
+                f"({gc_stats['freed_bytes'] / 1024 / 1024:.1f} MB)"
+            )
+
+    print("Перенос завершен")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Только подсчитать файлы")
+    parser.add_argument("--gc", action="store_true", help="Удалить файлы без ссылок после переноса")
+    args = parser.parse_args()
+
+    asyncio.run(migrate_generated_images(args.dry_run, args.gc))
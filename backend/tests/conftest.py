@@ -1,4 +1,5 @@
 import asyncio
+import os
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
@@ -8,6 +9,10 @@ from unittest.mock import AsyncMock, MagicMock
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, List
 
+# Роутеры и интеграционные тесты проверяют reading_progress сразу после POST -
+# write-behind буфер прогресса покрыт отдельно (tests/services/test_progress_buffer.py)
+os.environ.setdefault("PROGRESS_BUFFER_ENABLED", "false")
+
 from app.main import app
 from app.core.database import get_database_session, Base
 from app.core.config import settings
@@ -658,6 +663,8 @@ def mock_book_service():
     """
     mock = MagicMock()
     mock.create_book_from_upload = AsyncMock()
+    mock.create_pending_book = AsyncMock()
+    mock.populate_parsed_book = AsyncMock()
     mock.get_user_books = AsyncMock(return_value=[])
     mock.get_book_by_id = AsyncMock(return_value=None)
     mock.get_book_chapters = AsyncMock(return_value=[])
@@ -673,8 +680,11 @@ def mock_book_progress_service():
     """
     mock = MagicMock()
     mock.get_books_with_progress = AsyncMock(return_value=[])
+    mock.get_library_page = AsyncMock(return_value=([], None))
     mock.update_reading_progress = AsyncMock(return_value=True)
     mock.get_reading_progress = AsyncMock(return_value=None)
+    mock.merge_buffered_library_progress = AsyncMock()
+    mock.merge_buffered_book_progress = AsyncMock()
     return mock
 
 
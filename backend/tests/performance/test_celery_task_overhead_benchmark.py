@@ -0,0 +1,64 @@
+"""
+Benchmark: накладные расходы запуска async кода из Celery задачи.
+
+Сравнивает asyncio.run() на каждую задачу (создание и закрытие loop,
+shutdown asyncgens / executor) с WorkerAsyncRuntime (один loop процесса).
+Задача - короткая корутина с одним переключением, поэтому измеряется
+именно overhead запуска, без БД и сети.
+
+В реальном воркере разница больше: с asyncio.run() каждая задача
+открывает новые соединения PostgreSQL и HTTP (пулы привязаны к loop),
+а с runtime они переиспользуются.
+
+Run:
+    pytest tests/performance/test_celery_task_overhead_benchmark.py -m benchmark -s --no-cov
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.async_runtime import WorkerAsyncRuntime
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.slow]
+
+TASKS = 2000
+
+
+async def _task_body():
+    await asyncio.sleep(0)
+    return 1
+
+
+def _per_task_us(run) -> float:
+    start = time.perf_counter()
+    for _ in range(TASKS):
+        run(_task_body())
+    return (time.perf_counter() - start) / TASKS * 1_000_000
+
+
+def test_task_overhead_persistent_loop_vs_asyncio_run():
+    """Persistent loop дешевле asyncio.run() на задачу."""
+    engine = MagicMock()
+    engine.dispose = AsyncMock()
+
+    with patch("app.core.async_runtime.create_database_engine", return_value=engine):
+        runtime = WorkerAsyncRuntime()
+        runtime.start()
+        try:
+            runtime_us = _per_task_us(runtime.run)
+        finally:
+            runtime.shutdown()
+
+    asyncio_run_us = _per_task_us(asyncio.run)
+
+    print(
+        f"\n[tasks={TASKS}] asyncio.run={asyncio_run_us:.0f}us/task "
+        f"runtime={runtime_us:.0f}us/task "
+        f"speedup={asyncio_run_us / runtime_us:.1f}x"
+    )
+
+    assert runtime_us < asyncio_run_us
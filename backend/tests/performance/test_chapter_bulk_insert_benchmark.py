@@ -0,0 +1,111 @@
+"""
+Benchmark: создание глав книги через ORM (db.add) vs bulk Core INSERT.
+
+Сравнивает legacy путь (Chapter объект на каждую главу + flush unit of work)
+с BookService._insert_chapters (один executemany без identity map)
+для книг на 100 / 500 / 2000 глав.
+
+Требует тестовую PostgreSQL (fixture db_session).
+
+Run:
+    pytest tests/performance/test_chapter_bulk_insert_benchmark.py -m benchmark -s --no-cov
+"""
+
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book
+from app.models.chapter import Chapter
+from app.models.user import User
+from app.services.book import BookService
+from app.services.book.book_dedup_service import compute_content_hash
+from app.services.book_parser import BookChapter
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.slow]
+
+
+def _make_chapters(count: int) -> list:
+    """Главы реалистичного размера (~3000 слов текста + HTML)."""
+    paragraph = "Тёмный лес шумел над рекой, и старая мельница скрипела на ветру. " * 40
+    return [
+        BookChapter(
+            number=i,
+            title=f"Глава {i}",
+            content=paragraph * 5,
+            html_content=f"<p>{paragraph}</p>" * 5,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+async def _create_book(db: AsyncSession, user: User) -> Book:
+    book = Book(
+        user_id=user.id,
+        title="Benchmark Book",
+        file_path=f"/tmp/{uuid4()}.epub",
+        file_format="epub",
+        file_size=1,
+    )
+    db.add(book)
+    await db.flush()
+    return book
+
+
+async def _insert_chapters_orm(db: AsyncSession, book_id, chapters) -> None:
+    """Legacy путь: ORM объект на каждую главу."""
+    for chapter_data in chapters:
+        db.add(
+            Chapter(
+                book_id=book_id,
+                chapter_number=chapter_data.number,
+                title=chapter_data.title,
+                content=chapter_data.content,
+                html_content=chapter_data.html_content,
+                content_hash=compute_content_hash(chapter_data.content),
+                word_count=chapter_data.word_count,
+                estimated_reading_time=max(1, chapter_data.word_count // 200),
+            )
+        )
+    await db.flush()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chapters_count", [100, 500, 2000])
+async def test_bulk_chapter_insert_vs_orm(
+    db_session: AsyncSession, test_user: User, chapters_count: int
+):
+    """Bulk INSERT не медленнее ORM и создаёт те же строки."""
+    chapters = _make_chapters(chapters_count)
+    service = BookService()
+
+    orm_book = await _create_book(db_session, test_user)
+    started = time.perf_counter()
+    await _insert_chapters_orm(db_session, orm_book.id, chapters)
+    orm_seconds = time.perf_counter() - started
+    # Освобождаем identity map, чтобы не влиять на второй замер
+    db_session.expunge_all()
+
+    bulk_book = await _create_book(db_session, test_user)
+    started = time.perf_counter()
+    await service._insert_chapters(db_session, bulk_book.id, chapters)
+    bulk_seconds = time.perf_counter() - started
+
+    print(
+        f"\n[chapters={chapters_count}] orm={orm_seconds:.3f}s "
+        f"bulk={bulk_seconds:.3f}s speedup={orm_seconds / max(bulk_seconds, 1e-9):.1f}x"
+    )
+
+    for book_id in (orm_book.id, bulk_book.id):
+        stored = await db_session.scalar(
+            select(func.count(Chapter.id)).where(Chapter.book_id == book_id)
+        )
+        assert stored == chapters_count
+
+    assert bulk_seconds <= orm_seconds * 1.2
+
+    await db_session.rollback()
@@ -0,0 +1,116 @@
+"""
+Benchmark: байты глав, загружаемые одним запросом библиотеки (список книг).
+
+Сравнивает legacy загрузку selectinload(Book.chapters) (все колонки, включая
+content/html_content) с BookService.get_user_books (главы без тел) для
+библиотеки из 10 книг по 30 глав реалистичного размера.
+
+Байты считаются по значениям колонок, материализованных из строк chapters
+(ORM событие load) - это и есть объём, прошедший из PostgreSQL в процесс.
+
+Требует тестовую PostgreSQL (fixture db_session).
+
+Run:
+    pytest tests/performance/test_chapter_index_benchmark.py -m benchmark -s --no-cov
+"""
+
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.book import Book
+from app.models.chapter import Chapter
+from app.models.user import User
+from app.services.book import BookService
+from app.services.book_parser import BookChapter
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.slow]
+
+BOOKS_COUNT = 10
+CHAPTERS_PER_BOOK = 30
+
+
+class ChapterBytesMeter:
+    """Считает байты колонок глав, загруженных из БД."""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+    def _measure(self, target, *args):
+        self.rows += 1
+        for column in Chapter.__table__.columns:
+            value = target.__dict__.get(column.key)
+            if value is not None:
+                self.bytes += len(str(value).encode("utf-8"))
+
+    def __enter__(self):
+        event.listen(Chapter, "load", self._measure)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Chapter, "load", self._measure)
+
+
+async def _create_library(db: AsyncSession, user: User) -> None:
+    paragraph = "Тёмный лес шумел над рекой, и старая мельница скрипела на ветру. " * 40
+    chapters = [
+        BookChapter(
+            number=i,
+            title=f"Глава {i}",
+            content=paragraph * 5,
+            html_content=f"<p>{paragraph}</p>" * 5,
+        )
+        for i in range(1, CHAPTERS_PER_BOOK + 1)
+    ]
+    service = BookService()
+    for n in range(BOOKS_COUNT):
+        book = Book(
+            user_id=user.id,
+            title=f"Benchmark Book {n}",
+            file_path=f"/tmp/{uuid4()}.epub",
+            file_format="epub",
+            file_size=1,
+        )
+        db.add(book)
+        await db.flush()
+        await service._insert_chapters(db, book.id, chapters)
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_library_list_bytes_per_request(db_session: AsyncSession, test_user: User):
+    """Список библиотеки не тянет тела глав."""
+    await _create_library(db_session, test_user)
+    service = BookService()
+
+    db_session.expunge_all()
+    with ChapterBytesMeter() as legacy:
+        result = await db_session.execute(
+            select(Book)
+            .where(Book.user_id == test_user.id)
+            .options(selectinload(Book.chapters))
+            .options(selectinload(Book.reading_progress))
+        )
+        legacy_books = result.scalars().all()
+    legacy_chapters = sum(len(book.chapters) for book in legacy_books)
+
+    db_session.expunge_all()
+    with ChapterBytesMeter() as index:
+        books = await service.get_user_books(db_session, test_user.id, limit=BOOKS_COUNT)
+    index_chapters = sum(len(book.chapters) for book in books)
+
+    print(
+        f"\n[books={BOOKS_COUNT} chapters={legacy_chapters}] "
+        f"legacy={legacy.bytes / 1024:.0f}KB index={index.bytes / 1024:.0f}KB "
+        f"reduction={legacy.bytes / max(index.bytes, 1):.0f}x"
+    )
+
+    assert index_chapters == legacy_chapters == BOOKS_COUNT * CHAPTERS_PER_BOOK
+    assert index.rows == legacy.rows
+    # Метаданные главы - сотни байт, тело - десятки KB
+    assert index.bytes * 20 < legacy.bytes
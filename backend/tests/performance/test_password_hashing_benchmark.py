@@ -0,0 +1,90 @@
+"""
+Benchmark: задержка event loop во время волны логинов.
+
+Сравнивает bcrypt.checkpw прямо в корутине (как было в authenticate_user)
+с PasswordHasher (ограниченный пул потоков). Пока идёт волна проверок
+паролей, лёгкая корутина (аналог запроса /health или чтения главы)
+просыпается каждые 5 мс и меряет, насколько позже она получила управление.
+
+Inline bcrypt блокирует loop на всё время хеширования - p99 задержки
+лёгкого запроса равен времени одного-нескольких bcrypt. С пулом loop
+свободен, задержка остаётся в пределах единиц миллисекунд.
+
+Run:
+    pytest tests/performance/test_password_hashing_benchmark.py -m benchmark -s --no-cov
+"""
+
+import asyncio
+import statistics
+import time
+
+import bcrypt
+import pytest
+
+from app.services.password_hasher import PasswordHasher, hash_password
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.slow]
+
+LOGINS = 24
+PROBE_INTERVAL = 0.005
+PASSWORD = "Correct-Horse-Battery-42"
+
+
+async def _probe(stop: asyncio.Event, lags: list) -> None:
+    """Лёгкая корутина: меряет опоздание своего пробуждения."""
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _inline_login(hashed: str) -> bool:
+    await asyncio.sleep(0)
+    return bcrypt.checkpw(PASSWORD.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def _measure(login) -> dict:
+    stop = asyncio.Event()
+    lags: list = []
+    probe = asyncio.create_task(_probe(stop, lags))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+    assert all(results)
+
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "p50_ms": statistics.median(lags) * 1000,
+        "p99_ms": lags[int(len(lags) * 0.99) - 1 if len(lags) > 1 else 0] * 1000,
+        "max_ms": lags[-1] * 1000,
+    }
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_during_login_burst():
+    """Пул хеширования убирает блокировку event loop во время волны логинов."""
+    hashed = hash_password(PASSWORD)
+    hasher = PasswordHasher(pool_size=2, max_queue=LOGINS)
+
+    try:
+        inline = await _measure(lambda: _inline_login(hashed))
+        pooled = await _measure(lambda: hasher.verify(PASSWORD, hashed))
+    finally:
+        hasher.shutdown(wait=True)
+
+    print(f"\n{LOGINS} concurrent logins, probe every {PROBE_INTERVAL * 1000:.0f} ms")
+    for name, result in (("inline bcrypt", inline), ("hashing pool", pooled)):
+        print(
+            f"  {name:<14} total={result['elapsed']:.2f}s "
+            f"probe lag p50={result['p50_ms']:.1f}ms "
+            f"p99={result['p99_ms']:.1f}ms max={result['max_ms']:.1f}ms"
+        )
+
+    assert pooled["p99_ms"] < inline["p99_ms"] / 5
@@ -0,0 +1,147 @@
+"""
+Benchmark: расчёт дашборда статистики чтения на промахе кэша.
+
+Сравнивает _compute_all_statistics_sequential (отдельный запрос на каждую
+метрику, ~15 обходов reading_sessions / books) с _compute_all_statistics
+(один проход по reading_sessions с FILTER агрегатами + один запрос по
+книгам) для пользователя с 50 000 сессий за ~3 года и 20 книгами.
+
+Считаются SQL запросы (событие before_cursor_execute) и время на
+прогретой БД (лучшее из нескольких прогонов).
+
+Требует тестовую PostgreSQL (fixture db_session).
+
+Run:
+    pytest tests/performance/test_user_statistics_benchmark.py -m benchmark -s --no-cov
+"""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.book import Book, ReadingProgress
+from app.models.reading_session import ReadingSession
+from app.models.user import User
+from app.services.user_statistics_service import UserStatisticsService
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.slow]
+
+SESSIONS_COUNT = 50_000
+BOOKS_COUNT = 20
+HISTORY_DAYS = 1000
+INSERT_CHUNK = 5_000
+RUNS = 5
+
+
+class StatementCounter:
+    """Считает SQL запросы, отправленные движком."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+async def _create_heavy_reader(db: AsyncSession, user: User) -> None:
+    rng = random.Random(42)
+    # Разное число книг на жанр - порядок favorite_genres однозначен
+    genres = ["fantasy"] * 8 + ["sci-fi"] * 5 + ["detective"] * 4 + ["romance"] * 2 + ["classic"]
+
+    book_ids = []
+    for n in range(BOOKS_COUNT):
+        book = Book(
+            user_id=user.id,
+            title=f"Benchmark Book {n}",
+            genre=genres[n],
+            file_path=f"/tmp/{uuid4()}.epub",
+            file_format="epub",
+            file_size=1,
+            total_pages=300,
+        )
+        db.add(book)
+        await db.flush()
+        db.add(
+            ReadingProgress(
+                user_id=user.id,
+                book_id=book.id,
+                current_chapter=1,
+                current_position=rng.randint(0, 100),
+                reading_location_cfi="epubcfi(/6/4!/4/2)",
+                reading_speed_wpm=rng.uniform(150, 300),
+            )
+        )
+        book_ids.append(book.id)
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for _ in range(SESSIONS_COUNT):
+        started_at = now - timedelta(minutes=rng.randint(0, HISTORY_DAYS * 24 * 60))
+        duration = rng.choice([rng.randint(1, 90), rng.randint(0, 600)])
+        start = rng.randint(0, 90)
+        rows.append(
+            {
+                "user_id": user.id,
+                "book_id": rng.choice(book_ids),
+                "started_at": started_at,
+                "ended_at": started_at + timedelta(minutes=duration),
+                "duration_minutes": duration,
+                "start_position": start,
+                "end_position": start + rng.randint(0, 10),
+                "pages_read": 0,
+                "is_active": False,
+            }
+        )
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        await db.execute(insert(ReadingSession), rows[offset:offset + INSERT_CHUNK])
+    await db.commit()
+
+
+async def _measure(db: AsyncSession, compute, user_id) -> dict:
+    engine = db.bind.sync_engine
+    best = float("inf")
+    for _ in range(RUNS):
+        with StatementCounter(engine) as counter:
+            start = time.perf_counter()
+            stats = await compute(db, user_id)
+            best = min(best, time.perf_counter() - start)
+    return {"stats": stats, "seconds": best, "statements": counter.count}
+
+
+@pytest.mark.asyncio
+async def test_dashboard_statistics_50k_sessions(db_session: AsyncSession, test_user: User):
+    """Дашборд за два запроса быстрее и совпадает с расчётом по отдельным запросам."""
+    await _create_heavy_reader(db_session, test_user)
+
+    sequential = await _measure(
+        db_session, UserStatisticsService._compute_all_statistics_sequential, test_user.id
+    )
+    single_pass = await _measure(
+        db_session, UserStatisticsService._compute_all_statistics, test_user.id
+    )
+
+    print(f"\n[sessions={SESSIONS_COUNT} books={BOOKS_COUNT}]")
+    for name, result in (("sequential", sequential), ("single-pass", single_pass)):
+        print(
+            f"  {name:<12} statements={result['statements']:<3} "
+            f"time={result['seconds'] * 1000:.1f}ms"
+        )
+    print(f"  speedup={sequential['seconds'] / single_pass['seconds']:.1f}x")
+
+    assert single_pass["stats"] == sequential["stats"]
+    assert single_pass["statements"] == 2
+    assert single_pass["seconds"] < sequential["seconds"]
@@ -0,0 +1,115 @@
+"""
+Tests for BookDeduplicationService - переиспользование парсинга по content hash.
+
+Tests cover:
+1. compute_content_hash совпадает с SHA-256 UTF-8 (как SQL backfill)
+2. Промах по главе не меняет её и учитывается в статистике
+3. Попадание копирует описания и помечает главу обработанной
+4. hit rate в get_stats()
+"""
+
+import hashlib
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.models.chapter import Chapter
+from app.services.book.book_dedup_service import (
+    BookDeduplicationService,
+    compute_content_hash,
+)
+
+
+def _execute_result(first=None, rows=()):
+    """Результат db.execute(): .first() и итерация по строкам."""
+    result = MagicMock()
+    result.first.return_value = first
+    result.__iter__.return_value = iter(rows)
+    return result
+
+
+@pytest.fixture
+def dedup():
+    return BookDeduplicationService()
+
+
+def _chapter(content: str = "Тёмный лес шумел над рекой.") -> Chapter:
+    return Chapter(
+        id=uuid4(),
+        book_id=uuid4(),
+        chapter_number=1,
+        content=content,
+        is_description_parsed=False,
+        descriptions_found=0,
+    )
+
+
+class TestComputeContentHash:
+    """Хэш текста главы."""
+
+    def test_matches_sha256_utf8(self):
+        text = "Глава первая"
+        assert compute_content_hash(text) == hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def test_none_treated_as_empty(self):
+        assert compute_content_hash(None) == compute_content_hash("")
+
+
+class TestReuseChapterDescriptions:
+    """Переиспользование описаний главы с тем же текстом."""
+
+    async def test_miss_leaves_chapter_untouched(self, dedup):
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=_execute_result(first=None))
+        chapter = _chapter()
+
+        assert await dedup.reuse_chapter_descriptions(db, chapter) is None
+
+        assert chapter.is_description_parsed is False
+        assert chapter.content_hash == compute_content_hash(chapter.content)
+        assert dedup.get_stats()["chapter_misses"] == 1
+
+    async def test_hit_copies_descriptions(self, dedup):
+        source = MagicMock(id=uuid4(), descriptions_found=2)
+        rows = [
+            MagicMock(chapter_id=source.id, position_in_chapter=i, content=f"d{i}")
+            for i in range(2)
+        ]
+        db = MagicMock()
+        db.execute = AsyncMock(
+            side_effect=[
+                _execute_result(first=source),
+                _execute_result(rows=rows),
+                MagicMock(),  # INSERT
+            ]
+        )
+        chapter = _chapter()
+
+        copied = await dedup.reuse_chapter_descriptions(db, chapter)
+
+        assert copied == 2
+        assert chapter.is_description_parsed is True
+        assert chapter.descriptions_found == 2
+        # SELECT источника, SELECT описаний, один INSERT
+        assert db.execute.await_count == 3
+        inserted_rows = db.execute.await_args_list[2].args[1]
+        assert {row["chapter_id"] for row in inserted_rows} == {chapter.id}
+
+    async def test_hit_rate(self, dedup):
+        db = MagicMock()
+        db.execute = AsyncMock(
+            side_effect=[
+                _execute_result(first=None),
+                _execute_result(first=MagicMock(id=uuid4())),
+                _execute_result(rows=[]),
+            ]
+        )
+
+        await dedup.reuse_chapter_descriptions(db, _chapter("a"))
+        await dedup.reuse_chapter_descriptions(db, _chapter("b"))
+
+        stats = dedup.get_stats()
+        assert stats["chapter_hits"] == 1
+        assert stats["chapter_hit_rate"] == 0.5
+        assert stats["book_hit_rate"] == 0.0
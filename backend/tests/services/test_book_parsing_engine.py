@@ -0,0 +1,271 @@
+"""
+Tests for BookParsingEngine - парсинг книг в пуле процессов.
+
+Tests cover:
+1. Парсинг FB2 в дочернем процессе (результат совпадает с inline)
+2. Переполнение очереди (ParsingEngineBusyError)
+3. Таймаут задания (ParsingEngineTimeoutError), перезапуск зависшего пула
+4. Падение процесса-парсера (ParsingEngineCrashedError), перезапуск пула
+5. Inline режим и DI-переопределённые парсеры
+6. Синхронный FB2Parser.parse_file
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import book_parsing_engine
+from app.services.book_parser import BookParser, FB2Parser, ParsedBook, ParserConfig
+from app.services.book_parsing_engine import (
+    BookParsingEngine,
+    ParsingEngineBusyError,
+    ParsingEngineCrashedError,
+    ParsingEngineTimeoutError,
+    PARSING_MODE_INLINE,
+    PARSING_MODE_PROCESS,
+    parse_book_file,
+)
+
+
+# =============================================================================
+# Fixtures
+# =============================================================================
+
+
+FB2_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<FictionBook xmlns="http://www.gribuser.ru/xml/fictionbook/2.0">
+    <description>
+        <title-info>
+            <genre>fantasy</genre>
+            <author><first-name>Test</first-name><last-name>Author</last-name></author>
+            <book-title>Engine Book</book-title>
+            <lang>ru</lang>
+        </title-info>
+    </description>
+    <body>
+        {sections}
+    </body>
+</FictionBook>"""
+
+
+@pytest.fixture
+def fb2_file():
+    """FB2 файл с тремя главами достаточной длины."""
+    paragraph = "Тёмный лес окружал старинный замок на вершине холма. " * 5
+    sections = "".join(
+        f"<section><title><p>Глава {i}</p></title><p>{paragraph}</p></section>"
+        for i in range(1, 4)
+    )
+
+    temp_file = tempfile.NamedTemporaryFile(suffix=".fb2", delete=False, mode="wb")
+    temp_file.write(FB2_TEMPLATE.format(sections=sections).encode("utf-8"))
+    temp_file.close()
+
+    yield temp_file.name
+
+    Path(temp_file.name).unlink(missing_ok=True)
+
+
+def _hanging_parse(file_path, file_format, config):
+    """Парсинг, который не завершается (патологический файл)."""
+    time.sleep(600)
+
+
+def _crashing_parse(file_path, file_format, config):
+    """Парсинг, убивающий процесс (как OOM killer)."""
+    os._exit(1)
+
+
+@pytest.fixture
+def book_parser():
+    """BookParser с дефолтной конфигурацией."""
+    return BookParser(config=ParserConfig())
+
+
+# =============================================================================
+# Process pool mode
+# =============================================================================
+
+
+class TestProcessPoolParsing:
+    """Парсинг в пуле процессов."""
+
+    async def test_parse_fb2_in_process_pool(self, book_parser, fb2_file):
+        """Результат парсинга в процессе совпадает с inline парсингом."""
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS, pool_size=1, timeout=60)
+        try:
+            result = await engine.parse(book_parser, fb2_file)
+        finally:
+            engine.shutdown(wait=True)
+
+        expected = await book_parser.parse_book(fb2_file)
+
+        assert isinstance(result, ParsedBook)
+        assert result.metadata.title == "Engine Book"
+        assert result.file_format == "fb2"
+        assert [ch.title for ch in result.chapters] == [ch.title for ch in expected.chapters]
+        assert [ch.content for ch in result.chapters] == [ch.content for ch in expected.chapters]
+
+        stats = engine.get_stats()
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+
+    async def test_queue_full_rejects_job(self, book_parser, fb2_file):
+        """При заполненной очереди новое задание отклоняется сразу."""
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS, pool_size=1, max_queue=0)
+        engine._in_flight = engine.capacity
+
+        with pytest.raises(ParsingEngineBusyError):
+            await engine.parse(book_parser, fb2_file)
+
+        assert engine.get_stats()["rejected"] == 1
+
+    async def test_timeout_raises_and_releases_slot(self, book_parser, fb2_file):
+        """Таймаут поднимает ParsingEngineTimeoutError; слот освобождается по завершении задания."""
+        pending: Future = Future()
+        executor = MagicMock()
+        executor.submit.return_value = pending
+
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS, pool_size=1, timeout=0.05)
+        engine._executor = executor
+
+        with pytest.raises(ParsingEngineTimeoutError):
+            await engine.parse(book_parser, fb2_file)
+
+        # Незапущенное задание отменяется вместе с ожиданием
+        await asyncio.sleep(0)
+        assert pending.cancelled()
+        assert engine.get_stats()["timeouts"] == 1
+        assert engine.get_stats()["in_flight"] == 0
+
+    async def test_timeout_kills_hung_worker(self, book_parser, fb2_file, monkeypatch):
+        """Зависший парсинг: процесс завершается, слот свободен, пул пересоздаётся."""
+        monkeypatch.setattr(book_parsing_engine, "parse_book_file", _hanging_parse)
+        engine = BookParsingEngine(
+            mode=PARSING_MODE_PROCESS, pool_size=1, max_queue=0, timeout=2
+        )
+
+        killed = []
+        recycle = engine._recycle_executor
+
+        def recycle_and_record(executor=None):
+            killed.extend(engine._executor._processes.values())
+            recycle(executor)
+
+        engine._recycle_executor = recycle_and_record
+
+        try:
+            with pytest.raises(ParsingEngineTimeoutError):
+                await engine.parse(book_parser, fb2_file)
+
+            assert killed
+            for process in killed:
+                process.join(timeout=10)
+                assert not process.is_alive()
+            assert engine.get_stats()["in_flight"] == 0
+            assert engine._executor is None
+
+            # Следующая книга парсится в новом пуле
+            monkeypatch.undo()
+            result = await engine.parse(book_parser, fb2_file)
+            assert result.metadata.title == "Engine Book"
+        finally:
+            engine.shutdown(wait=True)
+
+    async def test_worker_crash_raises_and_recycles_pool(
+        self, book_parser, fb2_file, monkeypatch
+    ):
+        """Падение процесса: ParsingEngineCrashedError, пул остановлен и пересоздаётся."""
+        monkeypatch.setattr(book_parsing_engine, "parse_book_file", _crashing_parse)
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS, pool_size=1, timeout=60)
+
+        try:
+            with pytest.raises(ParsingEngineCrashedError) as exc_info:
+                await engine.parse(book_parser, fb2_file)
+
+            assert isinstance(exc_info.value.__cause__, BrokenProcessPool)
+            assert engine._executor is None
+            stats = engine.get_stats()
+            assert stats["failed"] == 1
+            assert stats["in_flight"] == 0
+
+            monkeypatch.undo()
+            result = await engine.parse(book_parser, fb2_file)
+            assert result.metadata.title == "Engine Book"
+        finally:
+            engine.shutdown(wait=True)
+
+    async def test_unsupported_format_raises(self, book_parser):
+        """Неподдерживаемый формат не отправляется в пул."""
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS)
+
+        with tempfile.NamedTemporaryFile(suffix=".txt") as temp_file:
+            with pytest.raises(ValueError):
+                await engine.parse(book_parser, temp_file.name)
+
+        assert engine.get_stats()["submitted"] == 0
+
+
+# =============================================================================
+# Inline mode / overrides
+# =============================================================================
+
+
+class TestInlineParsing:
+    """Inline режим и кастомные парсеры."""
+
+    async def test_inline_mode_uses_parser(self, book_parser, fb2_file):
+        """В inline режиме вызывается parse_book парсера."""
+        engine = BookParsingEngine(mode=PARSING_MODE_INLINE)
+
+        result = await engine.parse(book_parser, fb2_file)
+
+        assert result.metadata.title == "Engine Book"
+        assert engine._executor is None
+
+    async def test_overridden_parser_runs_inline(self, fb2_file):
+        """DI-переопределённый парсер не отправляется в дочерний процесс."""
+        mock_parser = MagicMock()
+        mock_parser.parse_book = AsyncMock(return_value="parsed")
+        engine = BookParsingEngine(mode=PARSING_MODE_PROCESS)
+
+        result = await engine.parse(mock_parser, fb2_file)
+
+        assert result == "parsed"
+        mock_parser.parse_book.assert_awaited_once_with(fb2_file)
+
+    def test_unknown_mode_rejected(self):
+        """Неизвестный режим вызывает ValueError."""
+        with pytest.raises(ValueError):
+            BookParsingEngine(mode="threads")
+
+
+# =============================================================================
+# Sync parsing helpers
+# =============================================================================
+
+
+class TestSyncParsing:
+    """Синхронные функции парсинга для воркеров."""
+
+    async def test_fb2_parse_file_matches_async_parse(self, fb2_file):
+        """FB2Parser.parse_file возвращает то же, что и async parse."""
+        fb2_parser = FB2Parser(ParserConfig())
+
+        sync_result = fb2_parser.parse_file(fb2_file)
+        async_result = await fb2_parser.parse(fb2_file)
+
+        assert sync_result.metadata.title == async_result.metadata.title
+        assert len(sync_result.chapters) == len(async_result.chapters) == 3
+
+    def test_parse_book_file_unknown_format(self, fb2_file):
+        """parse_book_file отклоняет неизвестный формат."""
+        with pytest.raises(ValueError):
+            parse_book_file(fb2_file, "pdf")
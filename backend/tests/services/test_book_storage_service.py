@@ -0,0 +1,165 @@
+"""
+Tests for BookStorageService - потоковое сохранение загрузок.
+
+Tests cover:
+1. Файл записывается под SHA-256 именем, хэш и размер совпадают
+2. Чтение идёт чанками, без загрузки всего файла в память
+3. Превышение лимита прерывает запись и удаляет частичный файл
+4. Повторная загрузка того же содержимого переиспользует файл
+5. discard/delete_book_file удаляют файл только без ссылок и под блокировкой
+"""
+
+import hashlib
+from pathlib import Path
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.book.book_storage_service import (
+    BookStorageService,
+    UploadTooLargeError,
+)
+
+
+class FakeUpload:
+    """Минимальный UploadFile: отдаёт данные чанками и запоминает размеры чтений."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._offset = 0
+        self.read_sizes = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.read_sizes.append(size)
+        if size < 0:
+            size = len(self._data) - self._offset
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+class FakeSession:
+    """AsyncSession: запоминает SQL и откаты, подсчёт ссылок задаётся в тесте."""
+
+    def __init__(self, references: int = 0):
+        self.references = references
+        self.statements = []
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        result = MagicMock()
+        result.scalar.return_value = self.references
+        return result
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Сервис с маленьким чанком и лимитом для тестов."""
+    return BookStorageService(
+        storage_directory=str(tmp_path / "books"),
+        chunk_size=1024,
+        max_upload_size=10 * 1024,
+    )
+
+
+class TestStoreUpload:
+    """Потоковое сохранение загрузок."""
+
+    async def test_store_upload_content_addressed(self, storage):
+        """Файл сохраняется под SHA-256 именем содержимого."""
+        data = b"epub-bytes" * 500
+        upload = FakeUpload(data)
+
+        stored = await storage.store_upload(upload, ".epub")
+
+        expected_hash = hashlib.sha256(data).hexdigest()
+        assert stored.sha256 == expected_hash
+        assert stored.size == len(data)
+        assert stored.created is True
+        assert stored.path == storage.path_for_hash(expected_hash, ".epub")
+        assert stored.path.read_bytes() == data
+
+    async def test_store_upload_reads_in_chunks(self, storage):
+        """Данные читаются чанками фиксированного размера."""
+        upload = FakeUpload(b"x" * 5000)
+
+        await storage.store_upload(upload, ".fb2")
+
+        assert all(size == storage.chunk_size for size in upload.read_sizes)
+        assert len(upload.read_sizes) == 6  # 5 чанков + пустое чтение (EOF)
+
+    async def test_store_upload_aborts_when_too_large(self, storage):
+        """Превышение лимита прерывает загрузку без чтения остатка."""
+        upload = FakeUpload(b"y" * (50 * 1024))
+
+        with pytest.raises(UploadTooLargeError):
+            await storage.store_upload(upload, ".epub")
+
+        # Прочитано не больше лимита + один чанк
+        assert len(upload.read_sizes) <= storage.max_upload_size // storage.chunk_size + 1
+        # Частичный файл удалён
+        assert list(Path(storage.storage_directory).iterdir()) == []
+
+    async def test_duplicate_upload_reuses_file(self, storage):
+        """Повторная загрузка того же файла не создаёт вторую копию."""
+        data = b"same book" * 100
+
+        first = await storage.store_upload(FakeUpload(data), ".epub")
+        second = await storage.store_upload(FakeUpload(data), ".epub")
+
+        assert first.path == second.path
+        assert second.created is False
+        assert len(list(Path(storage.storage_directory).iterdir())) == 1
+
+    async def test_store_upload_takes_shared_lock(self, storage):
+        """Загрузка блокирует путь файла до проверки его существования."""
+        db = FakeSession()
+
+        stored = await storage.store_upload(FakeUpload(b"locked" * 100), ".epub", db=db)
+
+        assert len(db.statements) == 1
+        assert "pg_advisory_xact_lock_shared(hashtext(" in db.statements[0]
+        assert stored.created is True
+
+
+class TestDiscard:
+    """Удаление файла неудачной загрузки."""
+
+    async def test_discard_keeps_referenced_file(self, storage):
+        """discard не удаляет созданный загрузкой файл, если на него уже ссылается книга."""
+        stored = await storage.store_upload(FakeUpload(b"shared" * 100), ".epub")
+        db = FakeSession(references=1)
+
+        assert await storage.discard(db, stored) is False
+
+        assert stored.path.exists()
+        assert "pg_advisory_xact_lock(hashtext(" in db.statements[0]
+        assert "count" in db.statements[1].lower()
+        # Транзакция загрузки откатана до блокировки, блокировка снята после
+        assert db.rollbacks == 2
+
+    async def test_discard_removes_unreferenced_file(self, storage):
+        """Файл без ссылок удаляется, даже если загрузка его не создавала."""
+        data = b"orphan" * 100
+        await storage.store_upload(FakeUpload(data), ".epub")
+        second = await storage.store_upload(FakeUpload(data), ".epub")
+
+        assert await storage.discard(FakeSession(references=0), second) is True
+
+        assert not second.path.exists()
+
+    async def test_delete_book_file_counts_references_under_lock(self, storage):
+        """delete_book_file пересчитывает ссылки после эксклюзивной блокировки."""
+        stored = await storage.store_upload(FakeUpload(b"book" * 100), ".fb2")
+        db = FakeSession(references=0)
+
+        assert await storage.delete_book_file(db, str(stored.path)) is True
+
+        assert "pg_advisory_xact_lock(hashtext(" in db.statements[0]
+        assert "count" in db.statements[1].lower()
+        assert not stored.path.exists()
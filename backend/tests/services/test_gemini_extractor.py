@@ -787,3 +787,74 @@ class TestEdgeCases:
         # In to_dict, it should be validated
         result = desc.to_dict()
         assert 0 <= result["confidence_score"] <= 1.5  # May exceed if not validated
+
+
+# =============================================================================
+# Batched Segments Tests
+# =============================================================================
+
+
+class TestBatchExtraction:
+    """Tests for extract_batch (several segments in one request)."""
+
+    @pytest.fixture
+    def extractor(self):
+        extractor = GeminiDirectExtractor(GeminiConfig(api_key=None, use_cache=False))
+        extractor._available = True
+        return extractor
+
+    @staticmethod
+    def _description(segment: str, text: str) -> Dict[str, Any]:
+        return {"segment": segment, "content": text * 5, "type": "location", "confidence": 0.9}
+
+    @pytest.mark.asyncio
+    async def test_response_split_by_segment_id(self, extractor):
+        """One request, descriptions routed back to their segments."""
+        import json
+
+        response = {
+            "descriptions": [
+                self._description("s1", "Высокая башня из серого камня. "),
+                self._description("s0", "Тёмный лес шумел над рекой. "),
+                self._description("s7", "Неизвестный фрагмент без пары. "),
+            ]
+        }
+        extractor._call_gemini_with_retry = AsyncMock(return_value=json.dumps(response))
+        segments = [
+            {"text": "Первый фрагмент", "start": 0},
+            {"text": "Второй фрагмент", "start": 4000},
+            {"text": "Третий фрагмент", "start": 0},
+        ]
+
+        results = await extractor.extract_batch(segments)
+
+        extractor._call_gemini_with_retry.assert_awaited_once()
+        prompt = extractor._call_gemini_with_retry.await_args.args[0]
+        assert "<<<s0>>>" in prompt and "<<<s2>>>" in prompt
+        assert [len(r) for r in results] == [1, 1, 0]
+        assert results[0][0].content.startswith("Тёмный лес")
+        assert results[1][0].position == 4000
+        assert extractor.stats["batch_calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unparseable_response_falls_back_to_single_requests(self, extractor):
+        """Segments are not lost when the batch response is broken."""
+        extractor._call_gemini_with_retry = AsyncMock(return_value="не JSON")
+        extractor._extract_from_chunk = AsyncMock(return_value=[])
+        segments = [{"text": "a", "start": 0}, {"text": "b", "start": 0}]
+
+        results = await extractor.extract_batch(segments)
+
+        assert results == [[], []]
+        assert extractor._extract_from_chunk.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_single_segment_uses_regular_prompt(self, extractor):
+        """A batch of one is a regular chunk request."""
+        extractor._extract_from_chunk = AsyncMock(return_value=[])
+        extractor._call_batch = AsyncMock()
+
+        await extractor.extract_batch([{"text": "a", "start": 10}])
+
+        extractor._extract_from_chunk.assert_awaited_once_with("a", 10)
+        extractor._call_batch.assert_not_called()
@@ -0,0 +1,137 @@
+"""
+Tests for GeneratedImageStore - content-addressed хранилище изображений.
+
+Tests cover:
+1. Файл сохраняется под SHA-256 именем в двухуровневом шарде
+2. Одинаковые изображения хранятся одним файлом
+3. resolve_filename: шарды, варианты, старые плоские имена, path traversal
+4. GC удаляет только старые файлы без ссылок и пустые шарды
+"""
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.services.generated_image_store import GeneratedImageStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Хранилище во временной директории."""
+    return GeneratedImageStore(root_directory=str(tmp_path / "images"), gc_grace_seconds=60)
+
+
+def _age(path, seconds: int) -> None:
+    """Сдвигает mtime файла в прошлое."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestSave:
+    """Сохранение изображений."""
+
+    async def test_save_content_addressed_sharded(self, store):
+        """Файл сохраняется в <root>/ab/cd/<sha256>.png."""
+        data = b"\x89PNG" + b"pixels" * 100
+
+        stored = await store.save(data)
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        assert stored.sha256 == sha256
+        assert stored.created is True
+        assert stored.path == store.root_directory / sha256[:2] / sha256[2:4] / f"{sha256}.png"
+        assert stored.path.read_bytes() == data
+        assert stored.url == f"/api/v1/images/file/{sha256}.png"
+
+    async def test_duplicate_image_reuses_file(self, store):
+        """Повторное сохранение того же изображения не создаёт копию."""
+        data = b"same image" * 50
+
+        first = await store.save(data)
+        second = await store.save(data)
+
+        assert first.path == second.path
+        assert second.created is False
+        assert len(list(first.path.parent.iterdir())) == 1
+
+    async def test_duplicate_refreshes_mtime(self, store):
+        """Переиспользованный файл получает свежий mtime (защита от GC)."""
+        stored = await store.save(b"reused" * 10)
+        _age(stored.path, 7200)
+
+        await store.save(b"reused" * 10)
+
+        assert time.time() - stored.path.stat().st_mtime < 60
+
+
+class TestResolveFilename:
+    """Разрешение имени файла из URL."""
+
+    def test_hash_name_resolves_to_shard(self, store):
+        """SHA-256 имя ищется в шарде."""
+        sha256 = "ab" * 32
+        assert store.resolve_filename(f"{sha256}.png") == store.path_for_hash(sha256)
+        assert store.hash_from_path(f"/x/{sha256}.png") == sha256
+
+    def test_variant_name_resolves_to_source_shard(self, store):
+        """Вариант ищется в шарде оригинала и относится к его хэшу."""
+        sha256 = "cd" * 32
+        name = f"{sha256}.w640.webp"
+        assert store.resolve_filename(name) == store.shard_directory(sha256) / name
+        assert store.hash_from_path(name) == sha256
+
+    def test_legacy_name_resolves_to_flat_directory(self, store):
+        """Старое имя ищется в плоской директории."""
+        name = "imagen_20251213_120000_deadbeef.png"
+        assert store.resolve_filename(name) == store.root_directory / name
+        assert store.hash_from_path(name) is None
+
+    @pytest.mark.parametrize("name", ["../etc/passwd", "a/b.png", "a\\b.png", ""])
+    def test_path_traversal_rejected(self, store, name):
+        """Имена с разделителями пути отклоняются."""
+        assert store.resolve_filename(name) is None
+
+
+class TestSweep:
+    """Сборка мусора по шардам."""
+
+    async def test_sweep_deletes_only_old_unreferenced(self, store):
+        """Удаляются старые файлы без ссылок, остальные остаются."""
+        referenced = await store.save(b"referenced")
+        orphan = await store.save(b"orphan")
+        fresh_orphan = await store.save(b"fresh orphan")
+        _age(referenced.path, 3600)
+        _age(orphan.path, 3600)
+
+        stats = store.sweep({referenced.sha256}, grace_seconds=60)
+
+        assert stats["scanned_files"] == 3
+        assert stats["deleted_files"] == 1
+        assert stats["freed_bytes"] == orphan.size
+        assert referenced.path.exists()
+        assert fresh_orphan.path.exists()
+        assert not orphan.path.exists()
+
+    async def test_sweep_removes_empty_shards(self, store):
+        """После удаления последнего файла пустые шарды удаляются."""
+        orphan = await store.save(b"lonely")
+        _age(orphan.path, 3600)
+
+        store.sweep(set(), grace_seconds=60)
+
+        assert not orphan.path.parent.exists()
+        assert not orphan.path.parent.parent.exists()
+
+    async def test_sweep_ignores_legacy_flat_files(self, store):
+        """Файлы плоской директории GC не трогает."""
+        store.root_directory.mkdir(parents=True)
+        legacy = store.root_directory / "imagen_20251213_120000_deadbeef.png"
+        legacy.write_bytes(b"legacy")
+        _age(legacy, 3600)
+
+        stats = store.sweep(set(), grace_seconds=60)
+
+        assert stats["scanned_files"] == 0
+        assert legacy.exists()
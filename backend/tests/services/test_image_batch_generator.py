@@ -0,0 +1,185 @@
+"""
+Tests for ImageBatchGenerator - параллельная генерация изображений главы.
+
+Tests cover:
+1. Параллельная генерация в пределах окна, результаты в исходном порядке
+2. AIMD окно: сужение после 429, рост после успехов
+3. on_result по мере готовности и без параллельных вызовов
+4. ImageGeneratorService.batch_generate_for_chapter через движок и пакетный перевод
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.image_batch_generator import (
+    AdaptiveConcurrencyWindow,
+    ImageBatchGenerator,
+    is_rate_limited_result,
+)
+from app.services.image_generator import ImageGenerationResult, ImageGeneratorService
+from app.services.llm_rate_limiter import TokenBucketRateLimiter
+
+
+def _limiter() -> TokenBucketRateLimiter:
+    return TokenBucketRateLimiter(requests_per_minute=10_000, tokens_per_minute=10**9)
+
+
+class FakeImagen:
+    """Генерация с задержкой и учётом одновременных вызовов."""
+
+    def __init__(self, delay: float = 0.02, limiter=None, rate_limited=()):
+        self.delay = delay
+        self.limiter = limiter
+        self.rate_limited = set(rate_limited)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, item: str) -> ImageGenerationResult:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if item in self.rate_limited:
+                self.limiter.penalize(0.001)
+                return ImageGenerationResult(success=False, error_message="429 RESOURCE_EXHAUSTED")
+            return ImageGenerationResult(success=True, local_path=f"/tmp/{item}.png")
+        finally:
+            self.in_flight -= 1
+
+
+class TestImageBatchGenerator:
+    """Движок пакетной генерации."""
+
+    async def test_runs_concurrently_within_window(self):
+        items = [f"d{i}" for i in range(10)]
+        imagen = FakeImagen(delay=0.05)
+        engine = ImageBatchGenerator(max_concurrency=4, rate_limiter=_limiter())
+
+        started = time.perf_counter()
+        results = await engine.run(items, imagen)
+        elapsed = time.perf_counter() - started
+
+        assert imagen.peak == 4
+        assert [r.local_path for r in results] == [f"/tmp/{i}.png" for i in items]
+        # Последовательно - 10 * 0.05s, с окном 4 - три "волны"
+        assert elapsed < 0.3
+        assert engine.stats["successful"] == 10
+
+    async def test_rate_limit_shrinks_window(self):
+        limiter = _limiter()
+        imagen = FakeImagen(delay=0.01, limiter=limiter, rate_limited={"d0"})
+        engine = ImageBatchGenerator(max_concurrency=4, rate_limiter=limiter)
+
+        results = await engine.run([f"d{i}" for i in range(4)], imagen)
+
+        assert not results[0].success
+        assert engine.stats["rate_limited"] == 1
+        assert engine.stats["final_window"] < 4
+
+    async def test_generation_exception_becomes_failed_result(self):
+        async def generate(item):
+            if item == "bad":
+                raise ValueError("boom")
+            return ImageGenerationResult(success=True)
+
+        engine = ImageBatchGenerator(max_concurrency=2, rate_limiter=_limiter())
+        results = await engine.run(["ok", "bad"], generate)
+
+        assert results[0].success
+        assert not results[1].success
+        assert "boom" in results[1].error_message
+
+    async def test_results_handled_incrementally_and_serially(self):
+        imagen = FakeImagen(delay=0.01)
+        engine = ImageBatchGenerator(max_concurrency=3, rate_limiter=_limiter())
+        handled = []
+        handler_in_flight = 0
+        handler_peak = 0
+
+        async def on_result(index, item, result):
+            nonlocal handler_in_flight, handler_peak
+            handler_in_flight += 1
+            handler_peak = max(handler_peak, handler_in_flight)
+            await asyncio.sleep(0.005)  # Как commit в БД
+            handled.append((index, imagen.in_flight))
+            handler_in_flight -= 1
+
+        await engine.run([f"d{i}" for i in range(6)], imagen, on_result=on_result)
+
+        assert sorted(index for index, _ in handled) == list(range(6))
+        assert handler_peak == 1
+        # Первые результаты сохранены, пока остальные ещё генерировались
+        assert handled[0][1] > 0
+
+
+class TestAdaptiveConcurrencyWindow:
+    """AIMD регулировка окна."""
+
+    async def test_halves_on_rate_limit_and_grows_back(self):
+        window = AdaptiveConcurrencyWindow(max_size=4)
+
+        await window.acquire()
+        await window.release(rate_limited=True)
+        assert window.size == 2
+
+        for _ in range(2):
+            await window.acquire()
+            await window.release()
+        assert window.size == 3
+
+    async def test_never_below_min_size(self):
+        window = AdaptiveConcurrencyWindow(max_size=2)
+
+        for _ in range(3):
+            await window.acquire()
+            await window.release(rate_limited=True)
+
+        assert window.size == 1
+
+    def test_rate_limited_result_detection(self):
+        assert is_rate_limited_result(
+            ImageGenerationResult(success=False, error_message="Imagen generation failed: Quota exceeded")
+        )
+        assert not is_rate_limited_result(
+            ImageGenerationResult(success=False, error_message="Safety filter")
+        )
+        assert not is_rate_limited_result(ImageGenerationResult(success=True))
+
+
+class TestBatchGenerateForChapter:
+    """ImageGeneratorService поверх движка."""
+
+    async def test_generates_by_priority_and_reports_each_result(self):
+        service = ImageGeneratorService.__new__(ImageGeneratorService)
+        service.imagen_service = MagicMock()
+        service.imagen_service.translate_descriptions = AsyncMock(
+            side_effect=lambda texts: {text: f"en {text}" for text in texts}
+        )
+        service.generate_image_for_description = AsyncMock(
+            side_effect=lambda desc, user_id, genre, english_description: ImageGenerationResult(
+                success=True, local_path=f"/tmp/{desc.id}.png", prompt_used=english_description
+            )
+        )
+        descriptions = [
+            MagicMock(id=i, priority_score=score, content=f"описание {i}")
+            for i, score in enumerate([0.1, 0.9, 0.5])
+        ]
+        saved = []
+
+        async def on_result(desc, result):
+            saved.append(desc.id)
+
+        results = await service.batch_generate_for_chapter(
+            descriptions, user_id="u1", max_images=2, on_result=on_result
+        )
+
+        assert [r.local_path for r in results] == ["/tmp/1.png", "/tmp/2.png"]
+        assert sorted(saved) == [1, 2]
+        # Один пакетный перевод выбранных описаний до генерации
+        service.imagen_service.translate_descriptions.assert_awaited_once_with(
+            ["описание 1", "описание 2"]
+        )
+        assert [r.prompt_used for r in results] == ["en описание 1", "en описание 2"]
@@ -0,0 +1,118 @@
+"""
+Tests for image_variants - WebP/AVIF варианты сгенерированных изображений.
+
+Tests cover:
+1. Разбор Accept: только явно перечисленные форматы, q=0 исключает формат
+2. select_variant: выбор формата и наименьшей достаточной ширины
+3. build_image_variants: ширины не больше исходной, повторный запуск
+   не перекодирует существующие файлы
+"""
+
+import hashlib
+
+import pytest
+
+from app.services.image_variants import (
+    accepted_formats,
+    build_image_variants,
+    select_variant,
+    variant_filename,
+)
+
+
+SHA = "ab" * 32
+
+VARIANTS = [
+    {"format": "webp", "width": 320, "height": 240, "size": 1, "filename": f"{SHA}.w320.webp"},
+    {"format": "webp", "width": 640, "height": 480, "size": 2, "filename": f"{SHA}.w640.webp"},
+    {"format": "webp", "width": 1408, "height": 1056, "size": 3, "filename": f"{SHA}.w1408.webp"},
+    {"format": "avif", "width": 640, "height": 480, "size": 1, "filename": f"{SHA}.w640.avif"},
+]
+
+
+class TestAcceptedFormats:
+    """Согласование формата по заголовку Accept."""
+
+    def test_browser_accept_header(self):
+        """Chrome перечисляет AVIF и WebP явно - AVIF предпочтительнее."""
+        accept = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+        assert accepted_formats(accept) == ["avif", "webp"]
+
+    def test_wildcards_are_not_consent(self):
+        """*/* и image/* не означают поддержку WebP."""
+        assert accepted_formats("*/*") == []
+        assert accepted_formats("image/*") == []
+        assert accepted_formats(None) == []
+
+    def test_zero_quality_excludes_format(self):
+        """q=0 явно запрещает формат."""
+        assert accepted_formats("image/avif;q=0, image/webp") == ["webp"]
+
+
+class TestSelectVariant:
+    """Выбор варианта для клиента."""
+
+    def test_no_variants_serves_original(self):
+        """Без вариантов отдаётся оригинал."""
+        assert select_variant(None, "image/webp", 640) is None
+        assert select_variant(VARIANTS, "*/*", 640) is None
+
+    def test_prefers_avif_when_accepted(self):
+        """AVIF выбирается, если клиент его принимает."""
+        variant = select_variant(VARIANTS, "image/avif,image/webp", 500)
+        assert variant["format"] == "avif"
+
+    def test_smallest_sufficient_width(self):
+        """Выбирается наименьшая ширина не меньше запрошенной."""
+        assert select_variant(VARIANTS, "image/webp", 500)["width"] == 640
+        assert select_variant(VARIANTS, "image/webp", 320)["width"] == 320
+
+    def test_width_larger_than_all_variants(self):
+        """Слишком большой w - наибольший вариант."""
+        assert select_variant(VARIANTS, "image/webp", 4000)["width"] == 1408
+
+    def test_no_width_serves_full_size(self):
+        """Без w - вариант исходной ширины."""
+        assert select_variant(VARIANTS, "image/webp")["width"] == 1408
+
+
+class TestBuildImageVariants:
+    """Построение вариантов (Pillow)."""
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        """PNG 800x600 в директории шарда."""
+        Image = pytest.importorskip("PIL.Image")
+
+        path = tmp_path / "source.png"
+        Image.new("RGB", (800, 600), (120, 80, 40)).save(path, format="PNG")
+        sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+        final_path = tmp_path / f"{sha256}.png"
+        path.rename(final_path)
+        return final_path, sha256
+
+    def test_builds_webp_widths_up_to_source(self, source):
+        """Ширины больше исходной пропускаются, исходная строится всегда."""
+        path, sha256 = source
+
+        built = build_image_variants(str(path), sha256, [320, 640, 1024], ["webp"])
+
+        assert (built["width"], built["height"]) == (800, 600)
+        assert [v["width"] for v in built["variants"]] == [320, 640, 800]
+        assert built["variants"][0]["height"] == 240
+        for variant in built["variants"]:
+            variant_path = path.parent / variant["filename"]
+            assert variant["filename"] == variant_filename(sha256, variant["width"], "webp")
+            assert variant_path.read_bytes()[8:12] == b"WEBP"
+            assert variant["size"] == variant_path.stat().st_size
+
+    def test_existing_variants_are_reused(self, source):
+        """Повторный запуск не перекодирует существующие варианты."""
+        path, sha256 = source
+        build_image_variants(str(path), sha256, [320], ["webp"])
+        existing = path.parent / variant_filename(sha256, 320, "webp")
+        mtime = existing.stat().st_mtime_ns
+
+        build_image_variants(str(path), sha256, [320], ["webp"])
+
+        assert existing.stat().st_mtime_ns == mtime
@@ -33,6 +33,7 @@ from app.services.imagen_generator import (
     DescriptionType,
     get_imagen_service,
 )
+from app.services.generated_image_store import GeneratedImageStore
 
 
 # =============================================================================
@@ -40,6 +41,14 @@ from app.services.imagen_generator import (
 # =============================================================================
 
 
+@pytest.fixture(autouse=True)
+def image_store(tmp_path):
+    """Content-addressed image store in a temp directory."""
+    store = GeneratedImageStore(root_directory=str(tmp_path / "generated_images"))
+    with patch('app.services.imagen_generator.generated_image_store', store):
+        yield store
+
+
 @pytest.fixture
 def mock_genai():
     """Mock google.genai module."""
@@ -480,7 +489,6 @@ class TestImagenPromptEngineer:
         mock_genai.Client.return_value = mock_client
 
         translator = PromptTranslator("test_api_key")
-        translator._cache["test_key"] = sample_english_translation  # Pre-populate cache
 
         engineer = ImagenPromptEngineer(translator)
 
@@ -823,21 +831,20 @@ class TestEdgeCases:
     """Tests for edge cases and error handling."""
 
     @pytest.mark.asyncio
-    async def test_save_image_creates_directory(self, sample_imagen_config, sample_image_bytes, mock_genai):
-        """Test that _save_image creates directory if it doesn't exist."""
+    async def test_save_image_creates_directory(self, sample_imagen_config, sample_image_bytes, mock_genai, image_store):
+        """Test that _save_image stores the image under its SHA-256 in a shard."""
         # Arrange
         mock_client = MagicMock()
         mock_genai.Client.return_value = mock_client
 
         generator = GoogleImagenGenerator(sample_imagen_config)
 
-        with patch('pathlib.Path.mkdir') as mock_mkdir:
-            with patch('aiofiles.open', mock_open()):
-                # Act
-                await generator._save_image(sample_image_bytes, "test prompt")
+        # Act
+        stored = await generator._save_image(sample_image_bytes)
 
         # Assert
-        mock_mkdir.assert_called_once()
+        assert stored.path == image_store.path_for_hash(stored.sha256)
+        assert stored.path.read_bytes() == sample_image_bytes
 
     @pytest.mark.asyncio
     async def test_unexpected_data_type_from_imagen(self, sample_imagen_config, mock_genai):
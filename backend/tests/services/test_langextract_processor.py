@@ -860,3 +860,110 @@ class TestEdgeCases:
         # Assert
         assert descriptions == []
         assert tokens == 0
+
+
+# =============================================================================
+# Cross-Chapter Batching Tests
+# =============================================================================
+
+
+class TestCrossChapterBatching:
+    """Tests for extract_descriptions_batch (pre-parse of several chapters)."""
+
+    @pytest.fixture
+    def gemini(self):
+        """Mocked GeminiDirectExtractor."""
+        return MagicMock()
+
+    @pytest.fixture
+    def processor(self, sample_config, gemini):
+        processor = LangExtractProcessor(sample_config)
+        processor._gemini_extractor = gemini
+        processor._available = True
+        return processor
+
+    @staticmethod
+    def _chapter(word: str, paragraphs: int) -> str:
+        paragraph = f"{word} стоял на холме, и ветер качал старые сосны у дороги. " * 4
+        return "\n\n".join([paragraph] * paragraphs)
+
+    @staticmethod
+    def _gemini_description(text: str, position: int = 0):
+        from app.services.gemini_extractor import (
+            ExtractedDescription as GeminiDescription,
+            DescriptionType as GeminiType,
+        )
+
+        return GeminiDescription(
+            content=f"{text} " * 10,
+            description_type=GeminiType.LOCATION,
+            confidence=0.9,
+            position=position,
+        )
+
+    @pytest.mark.asyncio
+    async def test_short_chapters_packed_into_one_request(
+        self, processor, gemini
+    ):
+        """Short chapters share a request and results map back per chapter."""
+        texts = [self._chapter(word, 3) for word in ("Замок", "Мельница", "Маяк")]
+
+        async def extract_batch(segments):
+            return [[self._gemini_description(s["text"][:20])] for s in segments]
+
+        gemini.extract_batch = AsyncMock(side_effect=extract_batch)
+        gemini._extract_from_chunk = AsyncMock(return_value=[])
+
+        results = await processor.extract_descriptions_batch(texts)
+
+        gemini.extract_batch.assert_awaited_once()
+        gemini._extract_from_chunk.assert_not_called()
+        assert len(results) == 3
+        for word, result in zip(("Замок", "Мельница", "Маяк"), results):
+            assert len(result.descriptions) == 1
+            assert result.descriptions[0]["content"].startswith(word)
+        assert processor.stats["total_api_calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_full_chunks_sent_alone_and_tails_packed(
+        self, processor, gemini
+    ):
+        """Full-size chunks keep their own request, chunk tails are batched."""
+        long_text = self._chapter("Особняк", 30)  # несколько полных чанков + хвост
+        short_text = self._chapter("Мост", 3)
+        chunks = processor.chunker.chunk(long_text)
+        full_chunks = [
+            c for c in chunks if len(c["text"]) >= processor.config.batch_small_chunk_chars
+        ]
+
+        gemini._extract_from_chunk = AsyncMock(return_value=[])
+        gemini.extract_batch = AsyncMock(
+            side_effect=lambda segments: [[] for _ in segments]
+        )
+
+        await processor.extract_descriptions_batch([long_text, short_text])
+
+        assert gemini._extract_from_chunk.await_count == len(full_chunks)
+        batched = gemini.extract_batch.await_args.args[0]
+        assert len(batched) == len(chunks) - len(full_chunks) + 1
+
+    def test_pack_requests_respects_budget(self, processor, gemini):
+        """Packed text never exceeds batch_max_chars."""
+        processor.config.batch_max_chars = 5000
+        work = [(i, {"text": "а" * 2000, "start": 0}) for i in range(5)]
+
+        requests = processor._pack_requests(work)
+
+        assert requests == [[0, 1], [2, 3], [4]]
+
+    @pytest.mark.asyncio
+    async def test_too_short_chapter_skipped(self, processor, gemini):
+        """Chapters below min_chunk_chars are skipped like extract_descriptions."""
+        gemini.extract_batch = AsyncMock()
+        gemini._extract_from_chunk = AsyncMock(return_value=[])
+
+        results = await processor.extract_descriptions_batch(["Коротко."])
+
+        assert results[0].descriptions == []
+        assert results[0].quality_metrics["reason"] == "text_too_short"
+        gemini.extract_batch.assert_not_called()
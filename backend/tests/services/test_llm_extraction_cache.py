@@ -0,0 +1,184 @@
+"""
+Tests for LLMExtractionCache - кэш ответов Gemini по SHA-256 чанка.
+
+Tests cover:
+1. Попадание в Redis не обращается к PostgreSQL
+2. Попадание в PostgreSQL прогревает Redis
+3. Ошибка БД = промах и пауза перед следующим обращением
+4. Версия промпта меняется вместе с шаблоном
+5. GeminiDirectExtractor не вызывает API при попадании и сохраняет ответ при промахе
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import llm_extraction_cache as cache_module
+from app.services.gemini_extractor import GeminiConfig, GeminiDirectExtractor
+from app.services.llm_extraction_cache import (
+    LLMExtractionCache,
+    compute_chunk_hash,
+    compute_prompt_version,
+)
+
+
+RESPONSE = {
+    "descriptions": [
+        {
+            "content": "Старый дом стоял на холме, окружённый высокими соснами. " * 3,
+            "type": "location",
+            "confidence": 0.9,
+        }
+    ]
+}
+
+
+@pytest.fixture
+def redis():
+    """Мок cache_manager (Redis L1)."""
+    with patch.object(cache_module, "cache_manager") as manager:
+        manager.get = AsyncMock(return_value=None)
+        manager.set = AsyncMock(return_value=True)
+        yield manager
+
+
+def _session_factory(db):
+    @asynccontextmanager
+    async def factory():
+        yield db
+
+    return factory
+
+
+@pytest.fixture
+def db():
+    """Мок AsyncSessionLocal (PostgreSQL L2)."""
+    session = MagicMock()
+    session.scalar = AsyncMock(return_value=None)
+    session.execute = AsyncMock()
+    session.commit = AsyncMock()
+    with patch.object(cache_module, "AsyncSessionLocal", _session_factory(session)):
+        yield session
+
+
+class TestLLMExtractionCache:
+    """Двухуровневый lookup."""
+
+    async def test_disabled_cache_is_noop(self, redis, db):
+        cache = LLMExtractionCache(enabled=False)
+
+        assert await cache.get("текст", "model", "v1") is None
+        await cache.set("текст", "model", "v1", RESPONSE)
+
+        redis.get.assert_not_called()
+        db.execute.assert_not_called()
+
+    async def test_redis_hit_skips_database(self, redis, db):
+        redis.get.return_value = RESPONSE
+        cache = LLMExtractionCache(enabled=True)
+
+        assert await cache.get("текст", "model", "v1") == RESPONSE
+
+        db.scalar.assert_not_called()
+        assert cache.get_stats()["redis_hits"] == 1
+
+    async def test_database_hit_warms_redis(self, redis, db):
+        db.scalar.return_value = RESPONSE
+        cache = LLMExtractionCache(enabled=True)
+
+        assert await cache.get("текст", "model", "v1") == RESPONSE
+
+        # hit_count / last_accessed_at обновлены
+        db.execute.assert_awaited_once()
+        redis_key = redis.set.await_args.args[0]
+        assert redis_key.endswith(compute_chunk_hash("текст"))
+        assert cache.get_stats()["db_hits"] == 1
+
+    async def test_miss_and_hit_rate(self, redis, db):
+        cache = LLMExtractionCache(enabled=True)
+
+        assert await cache.get("текст", "model", "v1") is None
+        redis.get.return_value = RESPONSE
+        await cache.get("текст", "model", "v1")
+
+        stats = cache.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    async def test_database_error_is_miss_with_cooldown(self, redis, db):
+        db.scalar.side_effect = ConnectionError("database is down")
+        cache = LLMExtractionCache(enabled=True)
+
+        assert await cache.get("текст", "model", "v1") is None
+        assert await cache.get("текст", "model", "v1") is None
+
+        # Второй lookup не обращается к недоступной БД
+        assert db.scalar.await_count == 1
+        assert cache.get_stats()["errors"] == 1
+
+    async def test_set_writes_both_tiers(self, redis, db):
+        cache = LLMExtractionCache(enabled=True)
+
+        await cache.set("текст", "model", "v1", RESPONSE)
+
+        redis.set.assert_awaited_once()
+        db.execute.assert_awaited_once()
+        db.commit.assert_awaited_once()
+
+    def test_prompt_version_tracks_template(self):
+        template = GeminiDirectExtractor.EXTRACTION_PROMPT
+
+        assert compute_prompt_version(template) == compute_prompt_version(template)
+        assert compute_prompt_version(template) != compute_prompt_version(template + " ")
+
+
+class TestGeminiExtractorCache:
+    """Интеграция кэша в _extract_from_chunk."""
+
+    @pytest.fixture
+    def cache(self):
+        cache = MagicMock(spec=LLMExtractionCache)
+        cache.get = AsyncMock(return_value=None)
+        cache.set = AsyncMock()
+        return cache
+
+    @pytest.fixture
+    def extractor(self, cache):
+        extractor = GeminiDirectExtractor(GeminiConfig(api_key=None), cache=cache)
+        extractor._available = True
+        return extractor
+
+    async def test_cache_hit_skips_api(self, extractor, cache):
+        cache.get.return_value = RESPONSE
+        extractor._call_gemini_with_retry = AsyncMock()
+
+        descriptions = await extractor._extract_from_chunk("текст чанка", offset=500)
+
+        extractor._call_gemini_with_retry.assert_not_called()
+        assert len(descriptions) == 1
+        # Позиция берётся из текущего чанка, а не из закэшированного ответа
+        assert descriptions[0].position == 500
+        assert extractor.stats["cache_hits"] == 1
+        assert extractor.stats["total_calls"] == 0
+
+    async def test_cache_miss_stores_parsed_response(self, extractor, cache):
+        import json
+
+        extractor._call_gemini_with_retry = AsyncMock(return_value=json.dumps(RESPONSE))
+
+        descriptions = await extractor._extract_from_chunk("текст чанка", offset=0)
+
+        assert len(descriptions) == 1
+        chunk_text, model, prompt_version, stored = cache.set.await_args.args
+        assert chunk_text == "текст чанка"
+        assert model == extractor.config.model_id
+        assert prompt_version == extractor.prompt_version
+        assert stored == RESPONSE
+
+    async def test_unparseable_response_not_cached(self, extractor, cache):
+        extractor._call_gemini_with_retry = AsyncMock(return_value="не JSON")
+
+        assert await extractor._extract_from_chunk("текст чанка", offset=0) == []
+
+        cache.set.assert_not_called()
@@ -0,0 +1,156 @@
+"""
+Tests for LLM rate limiter и параллельной обработки чанков.
+
+Tests cover:
+1. Token bucket: RPM/TPM квоты превращаются в ожидание
+2. penalize() после 429 приостанавливает все запросы
+3. map_bounded сохраняет порядок и ограничивает параллелизм
+4. GeminiDirectExtractor обрабатывает чанки параллельно, сохраняя их порядок
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.gemini_extractor import (
+    DescriptionType,
+    ExtractedDescription,
+    GeminiConfig,
+    GeminiDirectExtractor,
+)
+from app.services.llm_rate_limiter import TokenBucketRateLimiter, map_bounded
+
+
+class FakeClock:
+    """Управляемое монотонное время."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucketRateLimiter:
+    """Квоты RPM/TPM."""
+
+    def test_requests_within_quota_do_not_wait(self):
+        limiter = TokenBucketRateLimiter(60, 1_000_000, clock=FakeClock())
+
+        waits = [limiter.reserve() for _ in range(60)]
+
+        assert all(wait == 0 for wait in waits)
+
+    def test_rpm_exhausted_queues_requests(self):
+        limiter = TokenBucketRateLimiter(60, 1_000_000, clock=FakeClock())
+        for _ in range(60):
+            limiter.reserve()
+
+        # 1 запрос/сек восполнения: следующие ждут 1с, 2с, ...
+        assert limiter.reserve() == pytest.approx(1.0)
+        assert limiter.reserve() == pytest.approx(2.0)
+
+    def test_bucket_refills_over_time(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(60, 1_000_000, clock=clock)
+        for _ in range(60):
+            limiter.reserve()
+
+        clock.now += 5
+        assert limiter.reserve() == 0
+
+    def test_tpm_quota(self):
+        limiter = TokenBucketRateLimiter(1000, 6000, clock=FakeClock())
+
+        assert limiter.reserve(tokens=6000) == 0
+        # 100 токенов/сек: 3000 токенов - 30 секунд
+        assert limiter.reserve(tokens=3000) == pytest.approx(30.0)
+
+    def test_penalize_pauses_all_requests(self):
+        clock = FakeClock()
+        limiter = TokenBucketRateLimiter(600, 1_000_000, clock=clock)
+
+        limiter.penalize(retry_after=7)
+
+        assert limiter.reserve() == pytest.approx(7.0)
+        clock.now += 7
+        assert limiter.get_stats()["rate_limited"] == 1
+
+
+class TestMapBounded:
+    """Параллельная обработка с ограничением."""
+
+    async def test_preserves_order_and_limits_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def work(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Обратный порядок завершения
+            await asyncio.sleep(0.01 * (10 - item))
+            in_flight -= 1
+            return item * 2
+
+        results = await map_bounded(work, list(range(10)), limit=3)
+
+        assert [result for result, _ in results] == [i * 2 for i in range(10)]
+        assert peak == 3
+
+    async def test_errors_returned_per_item(self):
+        async def work(item):
+            if item == 1:
+                raise ValueError("boom")
+            return item
+
+        results = await map_bounded(work, [0, 1, 2], limit=2)
+
+        assert results[0] == (0, None)
+        assert isinstance(results[1][1], ValueError)
+        assert results[2] == (2, None)
+
+
+class TestGeminiConcurrentExtraction:
+    """GeminiDirectExtractor.extract с параллельными чанками."""
+
+    async def test_chunks_run_concurrently_and_merge_in_chunk_order(self):
+        config = GeminiConfig(
+            api_key=None, max_chunk_chars=300, min_chunk_chars=10, max_concurrent_chunks=4
+        )
+        extractor = GeminiDirectExtractor(config)
+        extractor._available = True
+
+        text = "\n\n".join(f"Абзац номер {i}. " + "слово " * 40 for i in range(6))
+        chunks = extractor.chunker.chunk(text)
+        assert len(chunks) > 2
+
+        index_by_text = {chunk["text"]: i for i, chunk in enumerate(chunks)}
+        in_flight = 0
+        peak = 0
+
+        async def fake_extract(chunk_text, offset):
+            nonlocal in_flight, peak
+            index = index_by_text[chunk_text]
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Поздние чанки завершаются раньше
+            await asyncio.sleep(0.01 * (len(chunks) - index))
+            in_flight -= 1
+            return [
+                ExtractedDescription(
+                    content=" ".join(f"слово{index}_{i}" for i in range(30)),
+                    description_type=DescriptionType.LOCATION,
+                    confidence=0.9,
+                    position=index,
+                )
+            ]
+
+        extractor._extract_from_chunk = MagicMock(side_effect=fake_extract)
+
+        result = await extractor.extract(text)
+
+        assert peak == 4
+        # Результаты объединяются в порядке чанков, а не завершения
+        assert [d.position for d in result] == list(range(len(chunks)))
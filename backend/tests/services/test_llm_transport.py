@@ -0,0 +1,181 @@
+"""
+Tests for LLMTransport - общий async транспорт к Google GenAI.
+
+Вместо Google API используется локальный stand-in (httpx.MockTransport),
+запросы проходят через настоящий google-genai SDK.
+
+Tests cover:
+1. generate_content / generate_images через async API и base_url
+2. Один пул соединений на event loop, новый loop - новый клиент
+3. Лимит одновременных запросов на модель
+4. GeminiDirectExtractor и PromptTranslator работают через транспорт
+"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from app.services.gemini_extractor import GeminiConfig, GeminiDirectExtractor
+from app.services.imagen_generator import PromptTranslator
+from app.services.llm_transport import LLMTransport
+
+
+BASE_URL = "http://gemini-stand-in.local"
+
+
+def _text_response(text: str) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]},
+    )
+
+
+class FakeGeminiServer:
+    """Локальная замена Gemini/Imagen REST API."""
+
+    def __init__(self, text: str = "ok", delay: float = 0.0):
+        self.text = text
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if request.url.path.endswith(":predict"):
+                image = base64.b64encode(b"\x89PNG fake").decode()
+                return httpx.Response(
+                    200,
+                    json={"predictions": [{"bytesBase64Encoded": image, "mimeType": "image/png"}]},
+                )
+            return _text_response(self.text)
+        finally:
+            self.in_flight -= 1
+
+    def transport(self, **kwargs) -> LLMTransport:
+        return LLMTransport(
+            "test-key",
+            base_url=BASE_URL,
+            http_transport=httpx.MockTransport(self),
+            **kwargs,
+        )
+
+
+class TestLLMTransport:
+    """Async вызовы через SDK."""
+
+    async def test_generate_content_uses_base_url(self):
+        server = FakeGeminiServer(text="привет")
+        transport = server.transport()
+
+        response = await transport.generate_content("gemini-test", "Текст")
+
+        assert response.text == "привет"
+        assert str(server.requests[0].url).startswith(f"{BASE_URL}/")
+        assert "gemini-test:generateContent" in server.requests[0].url.path
+        await transport.aclose()
+
+    async def test_generate_images(self):
+        server = FakeGeminiServer()
+        transport = server.transport()
+
+        response = await transport.generate_images("imagen-test", "A castle")
+
+        assert response.generated_images[0].image.image_bytes.startswith(b"\x89PNG")
+        await transport.aclose()
+
+    async def test_client_reused_within_loop(self):
+        server = FakeGeminiServer()
+        transport = server.transport()
+
+        for _ in range(3):
+            await transport.generate_content("gemini-test", "Текст")
+
+        stats = transport.get_stats()
+        assert stats["requests"] == 3
+        assert stats["clients_created"] == 1
+        await transport.aclose()
+
+    def test_new_event_loop_gets_own_client(self):
+        server = FakeGeminiServer()
+        transport = server.transport()
+
+        # Как Celery: каждая задача - свой event loop
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(transport.generate_content("gemini-test", "Текст"))
+            finally:
+                loop.close()
+
+        assert transport.get_stats()["clients_created"] == 2
+
+    async def test_per_model_concurrency_limit(self):
+        server = FakeGeminiServer(delay=0.02)
+        transport = server.transport(model_concurrency=2)
+
+        await asyncio.gather(
+            *(transport.generate_content("gemini-test", "Текст") for _ in range(6))
+        )
+
+        assert server.peak == 2
+        assert transport.get_stats()["peak_in_flight"] == 2
+        await transport.aclose()
+
+    async def test_api_error_propagates(self):
+        transport = LLMTransport(
+            "test-key",
+            base_url=BASE_URL,
+            http_transport=httpx.MockTransport(
+                lambda request: httpx.Response(
+                    429,
+                    json={"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                )
+            ),
+        )
+
+        with pytest.raises(Exception, match="429"):
+            await transport.generate_content("gemini-test", "Текст")
+
+        assert transport.get_stats()["errors"] == 1
+        await transport.aclose()
+
+
+class TestServicesUseTransport:
+    """Сервисы вызывают API через общий транспорт."""
+
+    async def test_gemini_extractor(self):
+        content = "Старый дом стоял на холме, окружённый высокими соснами и туманом. " * 3
+        server = FakeGeminiServer(
+            text=json.dumps(
+                {"descriptions": [{"content": content, "type": "location", "confidence": 0.9}]},
+                ensure_ascii=False,
+            )
+        )
+        extractor = GeminiDirectExtractor(
+            GeminiConfig(api_key="test-key", use_cache=False, model_id="gemini-test")
+        )
+        extractor._transport = server.transport()
+
+        descriptions = await extractor._extract_from_chunk("Текст главы", offset=0)
+
+        assert len(descriptions) == 1
+        assert descriptions[0].content == content
+        assert len(server.requests) == 1
+        await extractor._transport.aclose()
+
+    async def test_prompt_translator(self):
+        server = FakeGeminiServer(text="An old house on a hill")
+        translator = PromptTranslator("test-key")
+        translator._transport = server.transport()
+
+        assert await translator.translate("Старый дом на холме") == "An old house on a hill"
+        await translator._transport.aclose()
@@ -0,0 +1,331 @@
+"""
+Tests for ReadingProgressBuffer - write-behind буфер прогресса чтения.
+
+Tests cover:
+1. Сериализация BufferedProgress (UUID, datetime) без потерь
+2. Last-writer-wins: буфер хранит последнее состояние пары (user, book)
+3. Повторные обновления идут в буфер без запросов к БД,
+   защита от регрессии прогресса сохраняется
+4. Сброс не удаляет запись, обновлённую во время сброса
+5. Библиотека и страница книги видят прогресс до сброса
+6. Повреждённые/отвергнутые БД записи не останавливают сброс
+7. Блокировка сброса снимается только владельцем, Redis переподключается
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.services.book.book_progress_service import BookProgressService
+from app.services.book import progress_buffer as progress_buffer_module
+from app.services.book.progress_buffer import (
+    FLUSH_LOCK_KEY,
+    BufferedProgress,
+    ReadingProgressBuffer,
+)
+
+
+NOW = datetime(2026, 1, 22, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def buffer():
+    """Буфер в памяти процесса."""
+    return ReadingProgressBuffer(use_redis=False, batch_size=2, flush_interval=1.0)
+
+
+@pytest.fixture
+def service(buffer):
+    """Сервис прогресса в режиме буфера."""
+    return BookProgressService(book_service=AsyncMock(), progress_buffer=buffer)
+
+
+def _entry(**overrides) -> BufferedProgress:
+    entry = BufferedProgress.new(uuid4(), uuid4(), total_chapters=10, now=NOW)
+    for name, value in overrides.items():
+        setattr(entry, name, value)
+    return entry
+
+
+class TestBufferedProgress:
+    """Сериализация записи буфера."""
+
+    def test_json_round_trip(self):
+        """UUID и datetime восстанавливаются из JSON."""
+        entry = _entry(current_chapter=3, reading_location_cfi="epubcfi(/6/4)")
+
+        restored = BufferedProgress.from_json(entry.to_json())
+
+        assert restored == entry
+
+    def test_to_row_has_no_buffer_only_fields(self):
+        """total_chapters и статистика не попадают в upsert."""
+        row = _entry().to_row()
+
+        assert "total_chapters" not in row
+        assert "reading_time_minutes" not in row
+        assert row["progress_percent"] == 0.0
+
+
+class TestMemoryBuffer:
+    """Буфер в памяти процесса."""
+
+    async def test_last_writer_wins(self, buffer):
+        """Повторная запись той же пары заменяет предыдущую."""
+        entry = _entry(current_chapter=2)
+        await buffer.put(entry)
+        entry.current_chapter = 5
+        await buffer.put(entry)
+
+        stored = await buffer.get(entry.user_id, entry.book_id)
+
+        assert stored.current_chapter == 5
+        assert len(buffer._memory) == 1
+
+    async def test_missing_entry(self, buffer):
+        """Нет записи - None (читать из БД)."""
+        assert await buffer.get(uuid4(), uuid4()) is None
+
+    async def test_release_keeps_entry_updated_during_flush(self, buffer):
+        """Запись, изменённая после чтения пачки, остаётся до следующего сброса."""
+        changed = _entry(current_chapter=2)
+        unchanged = _entry(current_chapter=4)
+        await buffer.put(changed)
+        await buffer.put(unchanged)
+
+        batch = await buffer._next_batch(None)
+        changed.current_chapter = 3
+        await buffer.put(changed)
+        await buffer._release(None, batch)
+
+        assert await buffer.get(unchanged.user_id, unchanged.book_id) is None
+        assert (await buffer.get(changed.user_id, changed.book_id)).current_chapter == 3
+
+    async def test_batch_size(self, buffer):
+        """Пачка не больше batch_size."""
+        for _ in range(3):
+            await buffer.put(_entry())
+
+        assert len(await buffer._next_batch(None)) == 2
+
+
+class TestBufferedUpdate:
+    """BookProgressService в режиме write-behind буфера."""
+
+    async def test_hot_update_skips_database(self, service, buffer):
+        """Книга уже в буфере - обновление без запросов к БД."""
+        entry = _entry()
+        await buffer.put(entry)
+        db = AsyncMock()
+
+        progress = await service.update_reading_progress(
+            db, entry.user_id, entry.book_id, chapter_number=3, position_percent=50.0
+        )
+
+        db.execute.assert_not_called()
+        db.commit.assert_not_called()
+        assert progress.current_chapter == 3
+        assert progress.current_position == 50
+        # 10 глав: 2 завершённые (20%) + половина третьей (5%)
+        assert progress.progress_percent == pytest.approx(25.0)
+        stored = await buffer.get(entry.user_id, entry.book_id)
+        assert stored.current_chapter == 3
+
+    async def test_chapter_clamped_to_total(self, service, buffer):
+        """Номер главы ограничен total_chapters из записи буфера."""
+        entry = _entry()
+        await buffer.put(entry)
+
+        progress = await service.update_reading_progress(
+            AsyncMock(), entry.user_id, entry.book_id, chapter_number=99
+        )
+
+        assert progress.current_chapter == 10
+
+    async def test_regression_protection(self, service, buffer):
+        """Сброс к ~0% с заметного прогресса блокируется, CFI обновляется."""
+        entry = _entry(current_chapter=4, current_position=40, reading_location_cfi="a")
+        await buffer.put(entry)
+
+        with patch("app.services.book.book_progress_service.logger") as logger:
+            progress = await service.update_reading_progress(
+                AsyncMock(),
+                entry.user_id,
+                entry.book_id,
+                chapter_number=1,
+                position_percent=0.5,
+                reading_location_cfi="b",
+                scroll_offset_percent=12.0,
+            )
+
+        logger.warning.assert_called_once()
+        assert logger.warning.call_args.kwargs == {
+            "book_id": str(entry.book_id),
+            "user_id": str(entry.user_id),
+            "existing_position": 40.0,
+            "new_position": 0.5,
+        }
+        assert progress.current_chapter == 4
+        assert progress.current_position == 40
+        assert progress.reading_location_cfi == "b"
+        assert progress.scroll_offset_percent == 12.0
+        assert progress.last_read_at > NOW
+
+    async def test_backward_navigation_allowed(self, service, buffer):
+        """Обычная навигация назад не блокируется."""
+        entry = _entry(current_chapter=4, current_position=40)
+        await buffer.put(entry)
+
+        progress = await service.update_reading_progress(
+            AsyncMock(), entry.user_id, entry.book_id, chapter_number=2, position_percent=10.0
+        )
+
+        assert progress.current_chapter == 2
+        assert progress.current_position == 10
+
+
+class TestBufferedReads:
+    """Чтения библиотеки и страницы книги до сброса буфера."""
+
+    async def test_library_and_book_detail_see_pending_progress(self, service, buffer):
+        """Несброшенный прогресс перекрывает значения из БД / кэша."""
+        entry = _entry(current_chapter=6, current_position=50, progress_percent=55.04)
+        await buffer.put(entry)
+        other_book = str(uuid4())
+        books = [
+            {"id": str(entry.book_id), "reading_progress_percent": 10.0},
+            {"id": other_book, "reading_progress_percent": 30.0},
+        ]
+        detail = {
+            "id": str(entry.book_id),
+            "reading_progress": {"current_chapter": 2, "progress_percent": 10.0},
+        }
+
+        await service.merge_buffered_library_progress(entry.user_id, books)
+        await service.merge_buffered_book_progress(entry.user_id, detail)
+
+        assert books[0]["reading_progress_percent"] == 55.0
+        assert books[1]["reading_progress_percent"] == 30.0
+        assert detail["reading_progress"]["current_chapter"] == 6
+        assert detail["reading_progress"]["current_position"] == 50
+        assert detail["reading_progress"]["progress_percent"] == 55.0
+
+    async def test_merge_without_buffer_is_noop(self):
+        """Без буфера ответ не меняется."""
+        service = BookProgressService(book_service=AsyncMock(), progress_buffer=None)
+        books = [{"id": str(uuid4()), "reading_progress_percent": 10.0}]
+
+        await service.merge_buffered_library_progress(uuid4(), books)
+
+        assert books[0]["reading_progress_percent"] == 10.0
+
+
+@asynccontextmanager
+async def _fake_session():
+    """AsyncSessionLocal() без БД - записи перехватывает патч write_progress_rows."""
+    yield AsyncMock()
+
+
+class TestFlush:
+    """Сброс буфера: изоляция плохих записей и блокировка."""
+
+    async def _flush(self, buffer, write):
+        with patch.object(progress_buffer_module, "write_progress_rows", write), patch(
+            "app.core.database.AsyncSessionLocal", _fake_session
+        ), patch.object(progress_buffer_module, "invalidate_progress_caches", AsyncMock()):
+            return await buffer.flush()
+
+    async def test_malformed_entry_dropped(self, buffer):
+        """Повреждённая запись удаляется, остальные сбрасываются."""
+        good = _entry()
+        await buffer.put(good)
+        buffer._memory["broken"] = "{not json"
+        written = []
+
+        async def write(db, entries):
+            written.extend(entries)
+            return len(entries)
+
+        assert await self._flush(buffer, write) == 1
+
+        assert written == [good]
+        assert buffer._memory == {}
+
+    async def test_rejected_entry_dropped_after_per_entry_retry(self, buffer):
+        """Запись, которую БД отвергает, удаляется; пачка дописывается по одной."""
+        good, poison = _entry(), _entry()
+        await buffer.put(good)
+        await buffer.put(poison)
+        written = []
+
+        async def write(db, entries):
+            if poison in entries:
+                raise ValueError("value out of range")
+            written.extend(entries)
+            return len(entries)
+
+        assert await self._flush(buffer, write) == 1
+
+        assert written == [good]
+        assert buffer._memory == {}
+        assert buffer.get_stats()["flush_errors"] == 1
+
+    async def test_database_down_keeps_entries(self, buffer):
+        """Если не записалась ни одна запись, пачка остаётся в буфере."""
+        await buffer.put(_entry())
+        await buffer.put(_entry())
+
+        async def write(db, entries):
+            raise ConnectionError("database unavailable")
+
+        assert await self._flush(buffer, write) == 0
+
+        assert len(buffer._memory) == 2
+
+    async def test_lock_released_with_owner_token(self, buffer):
+        """Блокировка снимается compare-and-delete скриптом с токеном владельца."""
+        client = MagicMock()
+        client.set = AsyncMock(return_value=True)
+        client.srandmember = AsyncMock(return_value=[])
+        client.eval = AsyncMock(return_value=1)
+        buffer._redis = client
+
+        await self._flush(buffer, AsyncMock())
+
+        token = client.set.call_args.args[1]
+        script, numkeys, key, released_token = client.eval.call_args.args
+        assert "GET" in script and "DEL" in script
+        assert (numkeys, key, released_token) == (1, FLUSH_LOCK_KEY, token)
+
+
+class TestRedisReconnect:
+    """Переподключение к Redis после недоступности."""
+
+    async def test_reconnects_after_backoff(self):
+        """Неудачное подключение повторяется после задержки, а не никогда."""
+        buffer = ReadingProgressBuffer(use_redis=True)
+        client = MagicMock()
+        client.ping = AsyncMock(side_effect=[ConnectionError("down"), True])
+
+        with patch.object(progress_buffer_module.redis, "from_url", return_value=client), patch.object(
+            progress_buffer_module.time, "monotonic", side_effect=[100.0, 100.0, 100.5, 102.0]
+        ):
+            assert await buffer._client() is None
+            # Задержка ещё не прошла - без попытки подключения
+            assert await buffer._client() is None
+            assert client.ping.await_count == 1
+            assert await buffer._client() is client
+
+        assert buffer._redis is client
+
+
+@pytest.mark.parametrize(
+    "existing,new,blocked",
+    [(50.0, 0.5, True), (50.0, 5.0, False), (4.0, 0.0, False), (10.0, 30.0, False)],
+)
+def test_is_suspicious_regression(existing, new, blocked):
+    """Блокируется только падение к ~0% с прогресса больше 5%."""
+    assert BookProgressService.is_suspicious_regression(existing, new) is blocked
@@ -0,0 +1,134 @@
+"""
+Tests for PromptTranslator.translate_many - пакетный перевод описаний.
+
+Tests cover:
+1. Один структурированный запрос на пакет, ответ разбирается по ID
+2. Пакеты по TRANSLATION_BATCH_SIZE, закэшированные описания не отправляются
+3. Пропущенные в ответе описания и ошибки пакета - одиночный перевод
+4. ImagenService.generate_image не переводит повторно готовый перевод
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services.imagen_generator import (
+    DescriptionType,
+    ImagenPromptEngineer,
+    PromptTranslator,
+)
+
+
+class FakeCache:
+    """TranslationCache в памяти без Redis / PostgreSQL."""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    async def get(self, text, model, prompt_version):
+        return self.entries.get(text)
+
+    async def get_many(self, texts, model, prompt_version):
+        return {text: self.entries[text] for text in texts if text in self.entries}
+
+    async def set(self, text, model, prompt_version, translation):
+        self.entries[text] = translation
+
+
+def _batch_response(contents: str, skip_ids=()) -> MagicMock:
+    """Ответ Gemini: перевод = "en " + текст для каждого ID из промпта."""
+    items = json.loads(contents.split("(JSON array of {\"id\", \"text\"}):\n", 1)[1].split("\n\nRespond", 1)[0])
+    translations = [
+        {"id": item["id"], "translation": f"en {item['text']}"}
+        for item in items
+        if item["id"] not in skip_ids
+    ]
+    return MagicMock(text=json.dumps({"translations": translations}))
+
+
+def _translator(cache=None, batch_size=10, skip_ids=()) -> PromptTranslator:
+    translator = PromptTranslator("test_api_key", cache=cache or FakeCache(), batch_size=batch_size)
+    translator._types = None
+
+    async def generate_content(model, contents, config):
+        if "JSON array" in contents:
+            return _batch_response(contents, skip_ids)
+        text = contents.split("Russian text:\n", 1)[1].split("\n\nEnglish", 1)[0]
+        return MagicMock(text=f"single {text}")
+
+    translator._transport = MagicMock()
+    translator._transport.generate_content = AsyncMock(side_effect=generate_content)
+    return translator
+
+
+class TestTranslateMany:
+    """Пакетный перевод."""
+
+    async def test_one_call_for_whole_batch(self):
+        translator = _translator()
+        texts = [f"описание {i}" for i in range(5)]
+
+        result = await translator.translate_many(texts + texts[:2])
+
+        assert result == {text: f"en {text}" for text in texts}
+        translator._transport.generate_content.assert_awaited_once()
+
+    async def test_chunks_by_batch_size_and_skips_cached(self):
+        cache = FakeCache({"описание 0": "cached"})
+        translator = _translator(cache=cache, batch_size=2)
+
+        result = await translator.translate_many([f"описание {i}" for i in range(5)])
+
+        assert result["описание 0"] == "cached"
+        # 4 промаха по 2 в запросе
+        assert translator._transport.generate_content.await_count == 2
+        # Пакетные переводы сохранены в кэш
+        assert cache.entries["описание 4"] == "en описание 4"
+
+    async def test_missing_ids_fall_back_to_single_translation(self):
+        translator = _translator(skip_ids={"2"})
+
+        result = await translator.translate_many(["дом", "лес", "река"])
+
+        assert result == {"дом": "en дом", "лес": "single лес", "река": "en река"}
+        assert translator._transport.generate_content.await_count == 2
+
+    async def test_failed_batch_falls_back_to_single_translation(self):
+        translator = _translator()
+        translator._transport.generate_content.side_effect = [
+            MagicMock(text="not json"),
+            MagicMock(text="house"),
+            MagicMock(text="forest"),
+        ]
+
+        result = await translator.translate_many(["дом", "лес"])
+
+        assert sorted(result.values()) == ["forest", "house"]
+        assert translator._transport.generate_content.await_count == 3
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            '{"translations": [{"id": "1", "translation": " castle "}]}',
+            '```json\n{"translations": [{"id": 1, "translation": "castle"}]}\n```',
+            '[{"id": "1", "translation": "castle"}, {"id": "2", "translation": ""}]',
+        ],
+    )
+    def test_parse_batch_response(self, raw):
+        assert PromptTranslator._parse_batch_response(raw) == {"1": "castle"}
+
+
+class TestPreparedTranslation:
+    """Готовый перевод пакета используется без повторного запроса."""
+
+    async def test_create_prompt_uses_prepared_translation(self):
+        translator = _translator()
+        engineer = ImagenPromptEngineer(translator)
+
+        prompt = await engineer.create_prompt(
+            "замок", DescriptionType.LOCATION, english_description="a castle"
+        )
+
+        assert "a castle" in prompt
+        translator._transport.generate_content.assert_not_called()
@@ -0,0 +1,174 @@
+"""
+Tests for TranslationCache - кэш переводов PromptTranslator.
+
+Tests cover:
+1. LRU в памяти ограничен и не обращается к Redis / PostgreSQL
+2. Пакетный lookup: один MGET, один SELECT только для промахов
+3. Попадание в PostgreSQL прогревает память и Redis
+4. Ошибка БД = промах и пауза перед следующим обращением
+5. PromptTranslator не вызывает Gemini при попадании, ключ включает версию промпта
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services import translation_cache as cache_module
+from app.services.imagen_generator import PromptTranslator
+from app.services.translation_cache import TranslationCache, compute_text_hash
+
+
+MODEL = "gemini-3-flash-preview"
+
+
+@pytest.fixture
+def redis():
+    """Мок cache_manager (Redis L1)."""
+    with patch.object(cache_module, "cache_manager") as manager:
+        manager.get_many = AsyncMock(return_value={})
+        manager.set = AsyncMock(return_value=True)
+        yield manager
+
+
+def _session_factory(db):
+    @asynccontextmanager
+    async def factory():
+        yield db
+
+    return factory
+
+
+@pytest.fixture
+def db():
+    """Мок AsyncSessionLocal (PostgreSQL L2)."""
+    session = MagicMock()
+    rows = MagicMock()
+    rows.all.return_value = []
+    session.execute = AsyncMock(return_value=rows)
+    session.commit = AsyncMock()
+    session.rows = rows
+    with patch.object(cache_module, "AsyncSessionLocal", _session_factory(session)):
+        yield session
+
+
+class TestTranslationCache:
+    """Поиск по уровням."""
+
+    async def test_disabled_cache_is_noop(self, redis, db):
+        cache = TranslationCache(enabled=False)
+
+        await cache.set("замок", MODEL, "v1", "castle")
+        assert await cache.get("замок", MODEL, "v1") is None
+
+        redis.get_many.assert_not_called()
+        db.execute.assert_not_called()
+
+    async def test_memory_hit_skips_shared_tiers(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        await cache.set("замок", MODEL, "v1", "castle")
+        db.execute.reset_mock()
+
+        assert await cache.get("замок", MODEL, "v1") == "castle"
+
+        redis.get_many.assert_not_called()
+        db.execute.assert_not_called()
+        assert cache.get_stats()["memory_hits"] == 1
+
+    async def test_memory_tier_is_bounded_lru(self, redis, db):
+        cache = TranslationCache(enabled=True, memory_entries=2)
+        await cache.set("a", MODEL, "v1", "A")
+        await cache.set("b", MODEL, "v1", "B")
+        await cache.get("a", MODEL, "v1")  # "a" свежее "b"
+        await cache.set("c", MODEL, "v1", "C")
+
+        stats = cache.get_stats()
+        assert stats["memory_size"] == 2
+        assert stats["evictions"] == 1
+        assert await cache.get_many(["a", "c"], MODEL, "v1") == {"a": "A", "c": "C"}
+        redis.get_many.assert_not_called()
+
+    async def test_batch_lookup_queries_each_tier_once(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        await cache.set("в памяти", MODEL, "v1", "in memory")
+        db.execute.reset_mock()
+
+        redis_key = cache._redis_key((compute_text_hash("в redis"), "v1", MODEL))
+        redis.get_many.return_value = {redis_key: "in redis"}
+        db.rows.all.return_value = [(compute_text_hash("в базе"), "v1", MODEL, "in db")]
+
+        found = await cache.get_many(
+            ["в памяти", "в redis", "в базе", "нигде", "в памяти"], MODEL, "v1"
+        )
+
+        assert found == {"в памяти": "in memory", "в redis": "in redis", "в базе": "in db"}
+        assert len(redis.get_many.await_args.args[0]) == 3
+        # SELECT + UPDATE hit_count, без запроса на каждый текст
+        assert db.execute.await_count == 2
+        stats = cache.get_stats()
+        assert (stats["memory_hits"], stats["redis_hits"], stats["db_hits"], stats["misses"]) == (1, 1, 1, 1)
+        assert stats["hit_rate"] == pytest.approx(0.75)
+
+    async def test_db_hit_warms_memory_and_redis(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        db.rows.all.return_value = [(compute_text_hash("замок"), "v1", MODEL, "castle")]
+
+        assert await cache.get("замок", MODEL, "v1") == "castle"
+        redis.set.assert_awaited_once()
+
+        db.execute.reset_mock()
+        assert await cache.get("замок", MODEL, "v1") == "castle"
+        db.execute.assert_not_called()
+
+    async def test_prompt_version_is_part_of_key(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        await cache.set("замок", MODEL, "v1", "castle")
+
+        assert await cache.get("замок", MODEL, "v2") is None
+
+    async def test_db_error_is_miss_with_cooldown(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        db.execute.side_effect = RuntimeError("connection refused")
+
+        assert await cache.get("замок", MODEL, "v1") is None
+        assert await cache.get("дом", MODEL, "v1") is None
+
+        assert db.execute.await_count == 1
+        assert cache.get_stats()["errors"] == 1
+
+
+class TestPromptTranslatorCache:
+    """PromptTranslator поверх TranslationCache."""
+
+    def _translator(self, cache, text="castle on a hill"):
+        translator = PromptTranslator("test_api_key", cache=cache)
+        translator._transport = MagicMock()
+        translator._transport.generate_content = AsyncMock(return_value=MagicMock(text=text))
+        translator._types = None
+        return translator
+
+    async def test_translates_once_and_reuses_cache(self, redis, db):
+        translator = self._translator(TranslationCache(enabled=True))
+
+        first = await translator.translate("замок на холме")
+        second = await translator.translate("замок на холме")
+
+        assert first == second == "castle on a hill"
+        translator._transport.generate_content.assert_awaited_once()
+
+    async def test_shared_tier_hit_skips_gemini(self, redis, db):
+        translator = self._translator(TranslationCache(enabled=True))
+        db.rows.all.return_value = [
+            (compute_text_hash("замок"), translator._prompt_version, translator._model, "castle")
+        ]
+
+        assert await translator.translate("замок") == "castle"
+        translator._transport.generate_content.assert_not_called()
+
+    async def test_failed_translation_not_cached(self, redis, db):
+        cache = TranslationCache(enabled=True)
+        translator = self._translator(cache)
+        translator._transport.generate_content.side_effect = RuntimeError("503")
+
+        assert await translator.translate("замок") == "замок"
+        assert cache.get_stats()["memory_size"] == 0
@@ -0,0 +1,154 @@
+"""
+Tests for WorkerAsyncRuntime - event loop и пул БД процесса Celery воркера.
+
+Движок БД подменяется моком: тестируется жизненный цикл runtime,
+а не соединения PostgreSQL.
+
+Tests cover:
+1. Все задачи процесса выполняются в одном event loop
+2. Объекты, привязанные к loop, переживают задачу
+3. Исключения и прерывания ожидания
+4. Перепривязка AsyncSessionLocal и закрытие пула на shutdown
+5. run_async вне воркера - asyncio.run()
+"""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.async_runtime import WorkerAsyncRuntime, run_async, worker_runtime
+from app.core.database import AsyncSessionLocal
+
+
+@pytest.fixture
+def fake_engine():
+    engine = MagicMock()
+    engine.dispose = AsyncMock()
+    return engine
+
+
+@pytest.fixture
+def runtime(fake_engine):
+    with patch(
+        "app.core.async_runtime.create_database_engine", return_value=fake_engine
+    ) as factory:
+        runtime = WorkerAsyncRuntime(pool_size=3, max_overflow=1)
+        runtime.start()
+        runtime.factory = factory
+        try:
+            yield runtime
+        finally:
+            runtime.shutdown()
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+class TestWorkerAsyncRuntime:
+    """Жизненный цикл runtime."""
+
+    def test_tasks_share_one_loop(self, runtime):
+        loops = {runtime.run(_current_loop()) for _ in range(5)}
+
+        assert loops == {runtime.loop}
+        assert runtime.get_stats()["tasks"] == 5
+
+    def test_loop_bound_objects_survive_tasks(self, runtime):
+        # Как пул asyncpg / httpx клиент: создаётся в одной задаче,
+        # используется в следующих
+        state = {}
+
+        async def first_task():
+            state["lock"] = asyncio.Lock()
+            async with state["lock"]:
+                return "first"
+
+        async def second_task():
+            async with state["lock"]:
+                return "second"
+
+        assert runtime.run(first_task()) == "first"
+        assert runtime.run(second_task()) == "second"
+
+    def test_exception_propagates(self, runtime):
+        async def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            runtime.run(failing())
+
+        assert runtime.get_stats()["failed"] == 1
+        # Loop продолжает работать после ошибки задачи
+        assert runtime.run(_current_loop()) is runtime.loop
+
+    def test_interrupted_wait_cancels_coroutine(self, runtime):
+        started = threading.Event()
+        cancelled = threading.Event()
+
+        async def long_task():
+            started.set()
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        # SoftTimeLimitExceeded прерывает ожидание результата в потоке задачи
+        def interrupt_wait(self, timeout=None):
+            started.wait(5)
+            raise KeyboardInterrupt
+
+        with patch("concurrent.futures.Future.result", interrupt_wait):
+            with pytest.raises(KeyboardInterrupt):
+                runtime.run(long_task())
+
+        assert cancelled.wait(5)
+
+    def test_session_factory_bound_to_runtime_engine(self, fake_engine):
+        original_bind = AsyncSessionLocal.kw.get("bind")
+
+        with patch(
+            "app.core.async_runtime.create_database_engine", return_value=fake_engine
+        ) as factory:
+            runtime = WorkerAsyncRuntime(pool_size=3, max_overflow=1)
+            runtime.start()
+            assert AsyncSessionLocal.kw["bind"] is fake_engine
+            runtime.shutdown()
+
+        factory.assert_called_once_with(
+            pool_size=3, max_overflow=1, application_name="bookreader_celery"
+        )
+        fake_engine.dispose.assert_awaited_once()
+        assert AsyncSessionLocal.kw["bind"] is original_bind
+        assert not runtime.is_running
+
+    def test_start_is_idempotent(self, runtime):
+        loop = runtime.loop
+        runtime.start()
+
+        assert runtime.loop is loop
+        assert runtime.factory.call_count == 1
+
+    def test_run_requires_started_runtime(self):
+        runtime = WorkerAsyncRuntime()
+        coro = _current_loop()
+
+        with pytest.raises(RuntimeError):
+            runtime.run(coro)
+        coro.close()
+
+
+class TestRunAsync:
+    """run_async вне процесса воркера."""
+
+    def test_falls_back_to_asyncio_run(self):
+        assert not worker_runtime.is_running
+
+        first = run_async(_current_loop())
+        second = run_async(_current_loop())
+
+        assert first is not second
+        assert first.is_closed()
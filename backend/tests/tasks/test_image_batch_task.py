@@ -0,0 +1,186 @@
+"""
+Unit tests for generate_image_batch_task (_generate_batch_async).
+
+Сессия БД и Imagen подменяются моками.
+
+Test coverage:
+- Каждое изображение сохраняется сразу после генерации
+- Прогресс по элементам через on_progress (PROGRESS state задачи)
+- PROGRESS пишется под id задачи, хотя пакет идёт в потоке loop воркера
+- Ошибки отдельных описаний не прерывают пакет
+- Описания пакета переводятся заранее одним вызовом
+- Retry не генерирует повторно уже сохранённые изображения
+"""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from app.core.async_runtime import WorkerAsyncRuntime
+from app.core.tasks import _generate_batch_async, generate_image_batch_task
+from app.services.imagen_generator import ImageGenerationResult
+
+
+def _session(existing_images=()):
+    """Мок сессии: execute возвращает уже сохранённые GeneratedImage."""
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    rows = MagicMock()
+    rows.scalars.return_value.all.return_value = list(existing_images)
+    session.execute = AsyncMock(return_value=rows)
+    return session
+
+
+def _imagen():
+    imagen = MagicMock()
+    imagen.is_available.return_value = True
+    imagen.generate_image = AsyncMock(side_effect=_generate)
+    imagen.translate_descriptions = AsyncMock(
+        side_effect=lambda texts: {text: f"en {text}" for text in texts}
+    )
+    return imagen
+
+
+def _session_factory(session):
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=session)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=context)
+
+
+async def _generate(description, description_type, genre, english_description=None):
+    await asyncio.sleep(0.01)
+    if description == "fail":
+        return ImageGenerationResult(success=False, error_message="Safety filter")
+    return ImageGenerationResult(
+        success=True,
+        local_path=f"/app/storage/generated_images/{description}.png",
+        generation_time_seconds=1.0,
+        prompt_used=english_description,
+    )
+
+
+async def test_batch_saves_each_image_and_reports_progress():
+    session = _session()
+    imagen = _imagen()
+
+    descriptions = [
+        {"id": str(uuid4()), "content": content, "type": "location"}
+        for content in ("castle", "fail", "forest")
+    ]
+    progress = []
+
+    async def on_progress(meta):
+        progress.append(meta)
+
+    with patch("app.core.tasks.AsyncSessionLocal", _session_factory(session)), patch(
+        "app.services.imagen_generator.get_imagen_service", return_value=imagen
+    ):
+        result = await _generate_batch_async(
+            task_id="task-1",
+            chapter_id_str=str(uuid4()),
+            user_id_str=str(uuid4()),
+            descriptions=descriptions,
+            on_progress=on_progress,
+        )
+
+    assert result["successful"] == 2
+    assert result["failed"] == 1
+    assert [r["success"] for r in result["results"]] == [True, False, True]
+    assert result["results"][0]["image_url"] == "/api/v1/images/file/castle.png"
+
+    # Commit на каждое изображение, а не один в конце пакета
+    assert session.add.call_count == 2
+    assert session.commit.await_count == 2
+
+    # Переводы всего пакета одним вызовом, до генерации
+    imagen.translate_descriptions.assert_awaited_once_with(["castle", "fail", "forest"])
+    assert session.add.call_args_list[0].args[0].prompt_used == "en castle"
+
+    assert [p["completed"] for p in progress] == [1, 2, 3]
+    assert progress[-1]["total"] == 3
+    assert len(progress[-1]["results"]) == 3
+
+
+async def test_retry_skips_descriptions_with_saved_images():
+    """Повторная попытка после частичного успеха генерирует только недостающие."""
+    descriptions = [
+        {"id": str(uuid4()), "content": content, "type": "location"}
+        for content in ("castle", "forest")
+    ]
+    saved = MagicMock(
+        id=uuid4(),
+        description_id=descriptions[0]["id"],
+        image_url="/api/v1/images/file/castle.png",
+        generation_time_seconds=1.0,
+    )
+    session = _session(existing_images=[saved])
+    imagen = _imagen()
+
+    with patch("app.core.tasks.AsyncSessionLocal", _session_factory(session)), patch(
+        "app.services.imagen_generator.get_imagen_service", return_value=imagen
+    ):
+        result = await _generate_batch_async(
+            task_id="task-1",
+            chapter_id_str=str(uuid4()),
+            user_id_str=str(uuid4()),
+            descriptions=descriptions,
+        )
+
+    assert result["successful"] == 2
+    assert result["results"][0]["image_id"] == str(saved.id)
+    assert result["results"][0]["reused"] is True
+    assert result["results"][1]["image_url"] == "/api/v1/images/file/forest.png"
+
+    # Генерация, перевод и вставка - только для описания без изображения
+    assert imagen.generate_image.await_count == 1
+    imagen.translate_descriptions.assert_awaited_once_with(["forest"])
+    assert session.add.call_count == 1
+
+
+def test_progress_state_uses_task_id_from_runtime_thread():
+    """
+    report_progress выполняется в потоке loop воркера (WorkerAsyncRuntime),
+    где Celery request пуст: PROGRESS должен уйти под настоящий id задачи,
+    а запись в backend - не в потоке loop.
+    """
+    stored = []
+
+    def store_result(task_id, meta, state, **kwargs):
+        stored.append((task_id, state, meta, threading.get_ident()))
+
+    async def fake_batch(task_id, on_progress, **kwargs):
+        await on_progress({"task_id": task_id, "completed": 1, "total": 1})
+        return {"task_id": task_id, "successful": 1, "total": 1}
+
+    engine = MagicMock()
+    engine.dispose = AsyncMock()
+    with patch("app.core.async_runtime.create_database_engine", return_value=engine):
+        runtime = WorkerAsyncRuntime(pool_size=1, max_overflow=0)
+        runtime.start()
+    loop_thread = runtime._thread.ident
+    try:
+        with patch("app.core.tasks._run_async_task", runtime.run), patch(
+            "app.core.tasks._generate_batch_async", fake_batch
+        ), patch.object(
+            # Celery backend кэшируется по потокам - патчим класс
+            type(generate_image_batch_task.backend),
+            "store_result",
+            side_effect=store_result,
+        ):
+            result = generate_image_batch_task.apply(
+                args=[str(uuid4()), str(uuid4()), [{"id": "d", "content": "castle"}]],
+                task_id="batch-task-1",
+            ).get()
+    finally:
+        runtime.shutdown()
+
+    assert result["successful"] == 1
+    progress_writes = [entry for entry in stored if entry[1] == "PROGRESS"]
+    assert len(progress_writes) == 1
+    task_id, _, meta, thread_id = progress_writes[0]
+    assert task_id == "batch-task-1"
+    assert meta["completed"] == 1
+    assert thread_id != loop_thread
@@ -0,0 +1,190 @@
+"""
+Tests for resource monitoring - мониторинг ресурсов Celery воркера.
+
+Tests cover:
+1. ResourceSampler - фоновые замеры, сглаживание, snapshot() без ожидания
+2. GCPolicy - полная сборка только после тяжёлых задач / роста RSS
+3. ResourceAwareTask - отложенный запуск тяжёлых задач при перегрузке
+4. Лёгкие задачи не ждут замеров CPU
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from celery.exceptions import Ignore
+
+from app.core.celery_config import RESOURCE_LIMITS
+from app.core.resource_monitor import GCPolicy, ResourceSampler, ResourceSnapshot
+from app.core.tasks import health_check_task, parse_uploaded_book_task
+
+
+def _snapshot(cpu=10.0, memory=50.0, available=4096.0) -> ResourceSnapshot:
+    return ResourceSnapshot(
+        cpu_percent=cpu,
+        memory_percent=memory,
+        available_mb=available,
+        process_rss_mb=200.0,
+        sampled_at=time.monotonic(),
+    )
+
+
+class TestResourceSnapshot:
+    """Проверка лимитов RESOURCE_LIMITS."""
+
+    def test_within_limits(self):
+        assert _snapshot().exceeded_limits(RESOURCE_LIMITS) == []
+
+    def test_exceeded_limits(self):
+        exceeded = _snapshot(cpu=97, memory=91, available=100).exceeded_limits(
+            RESOURCE_LIMITS
+        )
+        assert len(exceeded) == 3
+
+    def test_unknown_cpu_is_not_overload(self):
+        assert _snapshot(cpu=None).exceeded_limits(RESOURCE_LIMITS) == []
+
+
+class TestResourceSampler:
+    """Фоновый сэмплер."""
+
+    def test_snapshot_does_not_block(self):
+        sampler = ResourceSampler(interval=0.05)
+        try:
+            started = time.perf_counter()
+            snapshot = sampler.snapshot()  # Ленивый старт (пул solo / threads)
+            elapsed = time.perf_counter() - started
+
+            assert elapsed < 0.5
+            assert sampler.is_running
+            assert snapshot.memory_percent > 0
+            assert snapshot.process_rss_mb > 0
+        finally:
+            sampler.stop()
+
+        assert not sampler.is_running
+
+    def test_background_samples_are_smoothed(self):
+        sampler = ResourceSampler(interval=0.01, smoothing=0.5)
+        memory = MagicMock(percent=40.0, available=2048 * 1024 * 1024)
+
+        with patch("app.core.resource_monitor.psutil.virtual_memory", return_value=memory), \
+                patch("app.core.resource_monitor.psutil.cpu_percent", return_value=100.0):
+            sampler.start()
+            memory.percent = 80.0
+            deadline = time.monotonic() + 2
+            while sampler.stats["samples"] < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            sampler.stop()
+
+        stats = sampler.get_stats()
+        assert stats["samples"] >= 3
+        # Первый замер без CPU, дальше - сглаженные значения
+        assert stats["cpu_percent"] == pytest.approx(100.0)
+        assert 40.0 < stats["memory_percent"] < 80.0
+
+
+class TestGCPolicy:
+    """Политика полной сборки мусора."""
+
+    def test_light_task_skips_collection(self):
+        policy = GCPolicy(heavy_tasks={"parse_uploaded_book"}, rss_growth_mb=256)
+
+        assert policy.should_collect("health_check", rss_mb=300, now=0.0) is None
+        assert policy.should_collect("health_check", rss_mb=400, now=10.0) is None
+
+    def test_heavy_task_collects(self):
+        policy = GCPolicy(heavy_tasks={"parse_uploaded_book"})
+
+        assert policy.should_collect("parse_uploaded_book", rss_mb=300, now=0.0) == "heavy_task"
+
+    def test_rss_growth_collects(self):
+        policy = GCPolicy(rss_growth_mb=256)
+
+        policy.should_collect("health_check", rss_mb=300, now=0.0)
+        assert policy.should_collect("health_check", rss_mb=600, now=1.0) == "rss_growth"
+
+    def test_min_interval_between_collections(self):
+        policy = GCPolicy(heavy_tasks={"parse_uploaded_book"}, min_interval_seconds=60)
+
+        with patch("app.core.resource_monitor.gc.collect", return_value=0) as collect:
+            assert policy.after_task("parse_uploaded_book") == "heavy_task"
+            assert policy.after_task("parse_uploaded_book") is None
+
+        collect.assert_called_once()
+        assert policy.stats["collections"] == 1
+
+
+class TestResourceAwareTask:
+    """Отложенный запуск тяжёлых задач."""
+
+    def _before_start(self, task, snapshot, **request):
+        task.push_request(id="task-1", **request)
+        try:
+            with patch(
+                "app.core.celery_config.resource_sampler.snapshot", return_value=snapshot
+            ), patch.object(task, "apply_async") as apply_async:
+                try:
+                    task.before_start("task-1", ("book-id", "epub"), {})
+                    return apply_async, False
+                except Ignore:
+                    return apply_async, True
+        finally:
+            task.pop_request()
+
+    def test_heavy_task_deferred_when_overloaded(self):
+        apply_async, ignored = self._before_start(
+            parse_uploaded_book_task, _snapshot(memory=95)
+        )
+
+        assert ignored
+        apply_async.assert_called_once_with(
+            args=("book-id", "epub"),
+            kwargs={},
+            task_id="task-1",
+            countdown=RESOURCE_LIMITS["defer_countdown_seconds"],
+            headers={"resource_deferrals": 1},
+        )
+
+    def test_heavy_task_runs_within_limits(self):
+        apply_async, ignored = self._before_start(parse_uploaded_book_task, _snapshot())
+
+        assert not ignored
+        apply_async.assert_not_called()
+
+    def test_heavy_task_runs_after_max_deferrals(self):
+        apply_async, ignored = self._before_start(
+            parse_uploaded_book_task,
+            _snapshot(memory=95),
+            resource_deferrals=RESOURCE_LIMITS["max_deferrals"],
+        )
+
+        assert not ignored
+        apply_async.assert_not_called()
+
+    def test_light_task_never_deferred(self):
+        apply_async, ignored = self._before_start(health_check_task, _snapshot(memory=95))
+
+        assert not ignored
+        apply_async.assert_not_called()
+
+    def test_light_tasks_do_not_wait_for_cpu_sampling(self):
+        # Раньше task_prerun спал секунду в psutil.cpu_percent(interval=1)
+        started = time.perf_counter()
+        for _ in range(20):
+            assert health_check_task.apply().get() == "Celery is working!"
+
+        assert time.perf_counter() - started < 1.0
+
+    def test_tasks_registered_on_single_app(self):
+        """celery_config не создаёт своё приложение - задачи живут в celery_app."""
+        from celery import current_app
+
+        from app.core import celery_config
+        from app.core.celery_app import celery_app
+        from app.core.celery_config import ResourceAwareTask
+
+        assert not hasattr(celery_config, "celery_app")
+        assert parse_uploaded_book_task.app is celery_app
+        assert isinstance(parse_uploaded_book_task, ResourceAwareTask)
+        assert current_app.main == celery_app.main
@@ -1126,3 +1126,202 @@ class TestIntegration:
         # Парсинг должен выбросить исключение
         with pytest.raises(Exception):
             book_parser.parse_book(corrupted_epub_file)
+
+
+# ============================================================================
+# TESTS: EPUB HTML backends (lxml vs BeautifulSoup)
+# ============================================================================
+
+
+def _build_epub_with_markup(path: str) -> None:
+    """EPUB с разметкой, скриптами, комментариями и якорями в TOC."""
+    filler = " ".join(["Тёмный лес &amp; старая мельница у реки."] * 20)
+    chapter_xhtml = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>Книга</title><style>p {{ color: red; }}</style></head>
+<body>
+  <!-- комментарий -->
+  <h2 id="s1">Глава {num}</h2>
+  <script>var x = "не текст";</script>
+  <p>{filler}</p>
+  <p id="s2">Вторая <em>часть</em>&#160;главы&nbsp;{num}.<br/>Строка</p>
+</body>
+</html>"""
+    files = {
+        "mimetype": b"application/epub+zip",
+        "META-INF/container.xml": b"""<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>""",
+        "OEBPS/content.opf": b"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="bookid" version="2.0">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:title>Markup Book</dc:title><dc:language>ru</dc:language>
+    <dc:identifier id="bookid">markup-1</dc:identifier>
+  </metadata>
+  <manifest>
+    <item id="c1" href="text/c1.xhtml" media-type="application/xhtml+xml"/>
+    <item id="c2" href="text/c2.xhtml" media-type="application/xhtml+xml"/>
+    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+  </manifest>
+  <spine toc="ncx"><itemref idref="c1"/><itemref idref="c2"/></spine>
+</package>""",
+        "OEBPS/toc.ncx": """<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1"><navMap>
+  <navPoint id="n1"><navLabel><text>Глава 1</text></navLabel><content src="text/c1.xhtml#s1"/></navPoint>
+  <navPoint id="n2"><navLabel><text>Глава 1 (часть 2)</text></navLabel><content src="text/c1.xhtml#s2"/></navPoint>
+  <navPoint id="n3"><navLabel><text>Глава 2</text></navLabel><content src="text/c2.xhtml"/></navPoint>
+</navMap></ncx>""".encode("utf-8"),
+        "OEBPS/text/c1.xhtml": chapter_xhtml.format(num=1, filler=filler).encode("utf-8"),
+        "OEBPS/text/c2.xhtml": chapter_xhtml.format(num=2, filler=filler).encode("utf-8"),
+    }
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as epub_zip:
+        for name, content in files.items():
+            epub_zip.writestr(name, content)
+
+
+class TestEPUBHtmlBackends:
+    """lxml backend должен давать тот же результат, что и BeautifulSoup."""
+
+    @pytest.fixture
+    def markup_epub(self, tmp_path):
+        path = str(tmp_path / "markup.epub")
+        _build_epub_with_markup(path)
+        return path
+
+    @staticmethod
+    def _chapters(path: str, backend: str, prefer_toc: bool):
+        config = ParserConfig(epub_html_backend=backend, prefer_toc=prefer_toc)
+        return EPUBParser(config).parse(path).chapters
+
+    @pytest.mark.parametrize("prefer_toc", [True, False])
+    def test_backends_produce_same_chapters(self, markup_epub, prefer_toc):
+        lxml_chapters = self._chapters(markup_epub, "lxml", prefer_toc)
+        bs4_chapters = self._chapters(markup_epub, "bs4", prefer_toc)
+
+        assert lxml_chapters
+        assert lxml_chapters == bs4_chapters
+
+    def test_lxml_strips_scripts_and_styles(self, markup_epub):
+        chapters = self._chapters(markup_epub, "lxml", prefer_toc=False)
+
+        assert chapters[0].title == "Глава 1"
+        assert "не текст" not in chapters[0].content
+        assert "color" not in chapters[0].content
+        assert "комментарий" not in chapters[0].content
+        assert "&" in chapters[0].content
+
+    def test_toc_document_parsed_once(self, markup_epub):
+        """Несколько записей TOC на один файл не парсят его повторно."""
+        parser = EPUBParser(ParserConfig(epub_html_backend="lxml"))
+
+        with patch.object(
+            parser, "_extract_document_lxml", wraps=parser._extract_document_lxml
+        ) as extract:
+            parser.parse(markup_epub)
+
+        assert extract.call_count == 2
+
+
+# ============================================================================
+# TESTS: FB2 streaming (iterparse) vs tree
+# ============================================================================
+
+
+_COVER_BYTES = b"\x89PNG\r\n\x1a\n-cover-"
+
+
+def _build_fb2_with_binaries() -> bytes:
+    """FB2 со вложенными секциями, аннотацией, обложкой и лишней картинкой."""
+    import base64
+
+    long_text = "Тёмный лес шумел над рекой, а старая мельница скрипела на ветру. " * 3
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<FictionBook xmlns="http://www.gribuser.ru/xml/fictionbook/2.0"
+             xmlns:l="http://www.w3.org/1999/xlink">
+  <description>
+    <title-info>
+      <genre>sf_fantasy</genre>
+      <author><first-name>Анна</first-name><last-name>Петрова</last-name></author>
+      <book-title>Потоковая книга</book-title>
+      <annotation><p>Аннотация книги.</p><p>Вторая строка.</p></annotation>
+      <coverpage><image l:href="#cover.png"/></coverpage>
+      <lang>ru</lang>
+    </title-info>
+  </description>
+  <body>
+    <title><p>Название книги</p></title>
+    <section>
+      <title><p>Часть первая</p></title>
+      <p>{long_text}</p>
+      <section>
+        <title><p>Глава 1</p><p>  </p></title>
+        <p>{long_text}</p>
+        <p>Короткий <emphasis>абзац</emphasis> хвост.</p>
+      </section>
+      <section>
+        <p>{long_text}</p>
+      </section>
+    </section>
+    <section>
+      <title><p>Коротко</p></title>
+      <p>Мало текста.</p>
+    </section>
+    <section>
+      <title><p>Глава 3</p></title>
+      <p>{long_text}</p>
+    </section>
+  </body>
+  <binary id="illustration.jpg" content-type="image/jpeg">{base64.b64encode(b"x" * 4096).decode()}</binary>
+  <binary id="cover.png" content-type="image/png">{base64.b64encode(_COVER_BYTES).decode()}</binary>
+</FictionBook>""".encode("utf-8")
+
+
+class TestFB2StreamingParser:
+    """iterparse режим даёт те же главы, что и полное дерево."""
+
+    @staticmethod
+    def _parse(content: bytes, backend: str) -> ParsedBook:
+        return FB2Parser(ParserConfig(fb2_backend=backend)).parse_content(content)
+
+    def test_streaming_matches_tree_chapters(self):
+        content = _build_fb2_with_binaries()
+
+        streamed = self._parse(content, "iterparse")
+        tree = self._parse(content, "tree")
+
+        assert [ch.number for ch in streamed.chapters] == [1, 2, 3, 4]
+        assert streamed.chapters == tree.chapters
+
+    def test_streaming_matches_tree_metadata(self):
+        content = _build_fb2_with_binaries()
+
+        streamed = self._parse(content, "iterparse").metadata
+        tree = self._parse(content, "tree").metadata
+
+        for field_name in ("title", "author", "genre", "language", "description"):
+            assert getattr(streamed, field_name) == getattr(tree, field_name)
+
+    def test_streaming_decodes_only_cover(self):
+        result = self._parse(_build_fb2_with_binaries(), "iterparse")
+
+        assert result.metadata.cover_image_data == _COVER_BYTES
+        assert result.metadata.cover_image_type == "image/png"
+
+    def test_stream_yields_chapters_incrementally(self, tmp_path):
+        path = tmp_path / "book.fb2"
+        path.write_bytes(_build_fb2_with_binaries())
+
+        reader = FB2Parser(ParserConfig()).stream(str(path))
+        iterator = iter(reader)
+        first = next(iterator)
+
+        assert first.title == "Часть первая"
+        # Метаданные доступны до конца файла, обложка - после
+        assert reader.metadata.title == "Потоковая книга"
+        assert reader.metadata.cover_image_data is None
+
+        rest = list(iterator)
+        assert len(rest) == 3
+        assert reader.metadata.cover_image_data == _COVER_BYTES
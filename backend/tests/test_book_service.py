@@ -13,6 +13,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.services.book import BookService, BookProgressService, BookStatisticsService
+from app.services.book.book_progress_service import (
+    InvalidCursorError,
+    decode_library_cursor,
+    encode_library_cursor,
+)
 from app.models.book import Book, ReadingProgress, BookGenre
 from app.models.chapter import Chapter
 from app.models.user import User
@@ -147,6 +152,41 @@ class TestBookCreation:
             Path(temp_file.name).unlink(missing_ok=True)
 
 
+class TestStreamedBookPopulation:
+    """Тесты потокового заполнения книги (FB2 iterparse)."""
+
+    class _Reader:
+        def __init__(self, chapters, metadata):
+            self._chapters = chapters
+            self.metadata = metadata
+
+        def __iter__(self):
+            return iter(self._chapters)
+
+    @pytest.mark.asyncio
+    async def test_populate_book_from_stream_inserts_in_batches(self, book_service: BookService):
+        """Главы вставляются пачками, метаданные применяются после чтения."""
+        chapters = [
+            BookChapter(number=i, title=f"Глава {i}", content="слово " * 400)
+            for i in range(1, 6)
+        ]
+        reader = self._Reader(chapters, BookMetadata(title="Поток", author="Автор"))
+        book = Book(id=uuid4(), user_id=uuid4(), title="book.fb2")
+        db = MagicMock()
+        db.execute = AsyncMock()
+        db.commit = AsyncMock()
+
+        count = await book_service.populate_book_from_stream(db, book, reader, batch_size=2)
+
+        assert count == 5
+        batches = [call.args[1] for call in db.execute.await_args_list]
+        assert [len(rows) for rows in batches] == [2, 2, 1]
+        assert [row["chapter_number"] for rows in batches for row in rows] == [1, 2, 3, 4, 5]
+        assert book.title == "Поток"
+        assert book.total_pages == max(1, 2000 // 250)
+        db.commit.assert_awaited_once()
+
+
 class TestBookRetrieval:
     """Тесты получения книг."""
 
@@ -177,6 +217,49 @@ class TestBookRetrieval:
 
         assert book is None
 
+    @pytest.mark.asyncio
+    async def test_get_chapter_index(
+        self,
+        book_service: BookService,
+        db_session: AsyncSession,
+        test_user: User,
+        test_book: Book
+    ):
+        """Индекс глав - только номера и метаданные, без тел."""
+        index = await book_service.get_chapter_index(
+            db_session, test_book.id, user_id=test_user.id
+        )
+
+        assert [row.chapter_number for row in index] == [1, 2, 3]
+        assert set(index[0]._fields) == {
+            "id", "chapter_number", "title", "word_count", "is_service_page"
+        }
+
+        other_user_index = await book_service.get_chapter_index(
+            db_session, test_book.id, user_id=uuid4()
+        )
+        assert other_user_index == []
+
+    @pytest.mark.asyncio
+    async def test_get_book_by_id_defers_chapter_body(
+        self,
+        book_service: BookService,
+        db_session: AsyncSession,
+        test_book: Book
+    ):
+        """Главы книги загружаются без content/html_content."""
+        db_session.expunge_all()
+
+        book = await book_service.get_book_by_id(db_session, test_book.id)
+        chapter = book.chapters[0]
+
+        assert chapter.chapter_number is not None
+        with pytest.raises(Exception):
+            _ = chapter.content
+
+        await db_session.refresh(chapter, attribute_names=["content"])
+        assert chapter.content.startswith("Content of chapter")
+
     @pytest.mark.asyncio
     async def test_get_user_books(
         self,
@@ -458,6 +541,98 @@ class TestReadingProgress:
         assert progress.current_chapter == 1
         assert progress.current_position == 50.0
 
+    @pytest.mark.asyncio
+    async def test_update_reading_progress_stores_book_percent(
+        self,
+        progress_service: BookProgressService,
+        db_session: AsyncSession,
+        test_user: User,
+        test_book: Book
+    ):
+        """Общий прогресс по книге сохраняется для списка библиотеки."""
+        progress = await progress_service.update_reading_progress(
+            db=db_session,
+            user_id=test_user.id,
+            book_id=test_book.id,
+            chapter_number=2,
+            position_percent=50.0,
+        )
+
+        # 3 главы: 1 завершённая (33.3%) + половина второй (16.7%)
+        assert progress.progress_percent == pytest.approx(50.0)
+
+    def test_compute_progress_percent(self):
+        """CFI - процент по книге, legacy - главы + процент в главе."""
+        compute = BookProgressService.compute_progress_percent
+
+        assert compute(5, 42.0, "epubcfi(/6/4)", 10) == 42.0
+        assert compute(3, 50.0, None, 4) == pytest.approx(62.5)
+        assert compute(1, 50.0, None, 0) == 0.0
+        assert compute(99, 100.0, None, 4) == 100.0
+
+
+class TestLibraryPage:
+    """Тесты страницы библиотеки (keyset пагинация)."""
+
+    def test_cursor_roundtrip(self):
+        """Курсор сохраняет значение сортировки и ID книги."""
+        from datetime import datetime, timezone
+
+        book_id = uuid4()
+        created_at = datetime(2026, 1, 17, 12, 30, tzinfo=timezone.utc)
+
+        cursor = encode_library_cursor("created_desc", created_at, book_id)
+
+        assert decode_library_cursor(cursor, "created_desc") == (created_at, book_id)
+        assert decode_library_cursor(
+            encode_library_cursor("title_asc", "Война и мир", book_id), "title_asc"
+        ) == ("Война и мир", book_id)
+
+    def test_invalid_cursor(self):
+        """Повреждённый курсор или курсор другой сортировки отклоняются."""
+        cursor = encode_library_cursor("title_asc", "Анна Каренина", uuid4())
+
+        with pytest.raises(InvalidCursorError):
+            decode_library_cursor(cursor, "created_desc")
+        with pytest.raises(InvalidCursorError):
+            decode_library_cursor("not-a-cursor", "title_asc")
+
+    @pytest.mark.asyncio
+    async def test_keyset_pages(
+        self,
+        progress_service: BookProgressService,
+        db_session: AsyncSession,
+        test_user: User
+    ):
+        """Страницы по курсору покрывают библиотеку без пропусков и повторов."""
+        for i in range(5):
+            db_session.add(
+                Book(
+                    user_id=test_user.id,
+                    title=f"Книга {i}",
+                    genre=BookGenre.OTHER.value,
+                    file_path=f"/tmp/library{i}.epub",
+                    file_format="epub",
+                    file_size=1024,
+                    total_chapters=i + 1,
+                )
+            )
+        await db_session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = await progress_service.get_library_page(
+                db_session, test_user.id, limit=2, sort_by="title_asc", cursor=cursor
+            )
+            seen.extend(rows)
+            if cursor is None:
+                break
+
+        assert [row.title for row in seen] == [f"Книга {i}" for i in range(5)]
+        assert [row.total_chapters for row in seen] == [1, 2, 3, 4, 5]
+        assert all(row.reading_progress_percent == 0.0 for row in seen)
+
 
 class TestChapterManagement:
     """Тесты управления главами."""
@@ -61,6 +61,25 @@ class TestBooks:
         assert data["title"] == sample_book_data["title"]
         assert data["is_processing"] is True
 
+    @pytest.mark.asyncio
+    async def test_upload_book_parse_failure_removes_pending_book(
+        self, client: AsyncClient, authenticated_headers
+    ):
+        """Книга-заглушка, закоммиченная до парсинга, удаляется при ошибке парсинга."""
+        headers = await authenticated_headers()
+
+        with patch(
+            'app.services.book_parser.book_parser.parse_book',
+            side_effect=ValueError("broken book"),
+        ):
+            files = {"file": ("broken.epub", b"broken epub content", "application/epub+zip")}
+            response = await client.post("/api/v1/books/upload", files=files, headers=headers)
+
+        assert response.status_code == 500
+
+        books = await client.get("/api/v1/books/", headers=headers)
+        assert books.json()["total"] == 0
+
     @pytest.mark.asyncio
     async def test_upload_book_invalid_format(self, client: AsyncClient, authenticated_headers):
         """Test uploading book with invalid format."""
@@ -0,0 +1,60 @@
+"""
+Tests for SSE потока статуса задачи генерации (/images/task/{task_id}/events).
+
+Генератор событий проверяется напрямую, без HTTP и БД.
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.routers import images
+
+
+def _service(statuses):
+    service = MagicMock()
+    service.get_task_status.side_effect = statuses
+    return service
+
+
+def _http_request():
+    request = MagicMock()
+    request.is_disconnected = AsyncMock(return_value=False)
+    return request
+
+
+async def _collect(service, request):
+    with patch.object(images, "TASK_EVENTS_POLL_SECONDS", 0):
+        return [event async for event in images._task_status_events("t1", service, request)]
+
+
+async def test_streams_progress_changes_until_done():
+    progress = {"total": 2, "completed": 1, "successful": 1, "failed": 0}
+    service = _service([
+        {"task_id": "t1", "status": "PENDING", "ready": False},
+        {"task_id": "t1", "status": "PROGRESS", "ready": False, "progress": progress},
+        {"task_id": "t1", "status": "PROGRESS", "ready": False, "progress": progress},
+        {"task_id": "t1", "status": "SUCCESS", "ready": True, "result": {"successful": 2}},
+    ])
+
+    events = await _collect(service, _http_request())
+
+    # Повторный одинаковый статус не отправляется
+    assert [event.split("\n")[0] for event in events] == [
+        "event: progress",
+        "event: progress",
+        "event: done",
+    ]
+    second = json.loads(events[1].split("data: ", 1)[1])
+    assert second["progress"]["completed"] == 1
+    assert second["message"] == "Task is generating images"
+
+
+async def test_stops_when_client_disconnects():
+    service = _service([{"task_id": "t1", "status": "PENDING", "ready": False}] * 5)
+    request = _http_request()
+    request.is_disconnected.side_effect = [False, True]
+
+    events = await _collect(service, request)
+
+    assert len(events) == 1
+    assert service.get_task_status.call_count == 1
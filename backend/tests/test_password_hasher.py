@@ -0,0 +1,137 @@
+"""
+Tests for PasswordHasher - bcrypt в ограниченном пуле потоков.
+
+Tests cover:
+- Хеш из пула совместим с синхронной проверкой (и наоборот)
+- bcrypt выполняется не в потоке event loop
+- Переполнение очереди (PasswordHasherBusyError)
+- Отменённая операция освобождает слот
+- AuthService использует пул в authenticate_user
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.auth_service import AuthService
+from app.services.password_hasher import (
+    PasswordHasher,
+    PasswordHasherBusyError,
+    hash_password,
+    verify_password,
+)
+
+
+PASSWORD = "Correct-Horse-Battery-42"
+
+
+@pytest.fixture
+def hasher():
+    """Пул на один поток."""
+    pool = PasswordHasher(pool_size=1, max_queue=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+class TestHashing:
+    """Хеширование и проверка в пуле."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, hasher):
+        """Хеш из пула проверяется синхронно и наоборот."""
+        hashed = await hasher.hash(PASSWORD)
+
+        assert verify_password(PASSWORD, hashed)
+        assert await hasher.verify(PASSWORD, hash_password(PASSWORD))
+        assert not await hasher.verify("wrong-password", hashed)
+
+        stats = hasher.get_stats()
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_runs_outside_event_loop_thread(self, hasher):
+        """bcrypt вызывается в потоке пула, а не в потоке event loop."""
+        loop_thread = threading.get_ident()
+        calls = []
+
+        def fake_hash(password):
+            calls.append(threading.get_ident())
+            return "hashed"
+
+        assert await hasher._run("hash", fake_hash, PASSWORD) == "hashed"
+
+        assert calls and calls[0] != loop_thread
+
+    def test_long_password_truncated_to_72_bytes(self):
+        """Пароль длиннее 72 байт обрезается, как и раньше."""
+        hashed = hash_password("x" * 100)
+
+        assert verify_password("x" * 72, hashed)
+
+
+class TestBackpressure:
+    """Ограничение очереди."""
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejects_operation(self):
+        """При заполненной очереди операция отклоняется без bcrypt."""
+        hasher = PasswordHasher(pool_size=1, max_queue=0)
+        hasher._in_flight = hasher.capacity
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher.verify(PASSWORD, "$2b$12$invalid")
+
+        assert hasher.get_stats()["rejected"] == 1
+        assert hasher._executor is None
+
+    @pytest.mark.asyncio
+    async def test_cancelled_operation_releases_slot(self):
+        """Отмена запроса, ожидающего в очереди, освобождает слот."""
+        pending: Future = Future()
+        executor = MagicMock()
+        executor.submit.return_value = pending
+
+        hasher = PasswordHasher(pool_size=1, max_queue=0)
+        hasher._executor = executor
+
+        task = asyncio.create_task(hasher.hash(PASSWORD))
+        await asyncio.sleep(0)
+        assert hasher._in_flight == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert pending.cancelled()
+        assert hasher._in_flight == 0
+
+
+class TestAuthServiceIntegration:
+    """AuthService хеширует через пул."""
+
+    @pytest.mark.asyncio
+    async def test_authenticate_user_uses_pool(self):
+        """authenticate_user проверяет пароль через пул, а не синхронно."""
+        service = AuthService()
+        user = MagicMock(password_hash=hash_password(PASSWORD), is_active=False)
+
+        async def get_user_by_email(db, email):
+            return user
+
+        service.get_user_by_email = get_user_by_email
+
+        with patch(
+            "app.services.auth_service.password_hasher.verify",
+            wraps=lambda plain, hashed: asyncio.sleep(0, result=True),
+        ) as pool_verify, patch(
+            "app.services.auth_service.verify_password"
+        ) as sync_verify:
+            # Неактивный пользователь - выходим до записи в БД
+            assert await service.authenticate_user(MagicMock(), "a@b.c", PASSWORD) is None
+
+        pool_verify.assert_called_once_with(PASSWORD, user.password_hash)
+        sync_verify.assert_not_called()
@@ -0,0 +1,278 @@
+"""
+Tests for PrincipalCache - кэш аутентифицированного пользователя по jti.
+
+Tests cover:
+- Снимок пользователя без password_hash и восстановление detached User
+- Попадание в памяти процесса не обращается к Redis
+- Попадание в Redis прогревает память процесса
+- TTL записи не превышает срок жизни токена
+- Инвалидация токена и всех токенов пользователя (в т.ч. при входе)
+- Колонки вне снимка не подменяются None, смена пароля перечитывает БД
+- jti в access токенах
+"""
+
+import time
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.models.user import User
+from app.services.auth_service import auth_service
+from app.services.principal_cache import (
+    PrincipalCache,
+    principal_snapshot,
+    user_from_snapshot,
+)
+
+
+@pytest.fixture
+def mock_cache_manager():
+    """Mock Redis кэша."""
+    with patch("app.services.principal_cache.cache_manager") as mock:
+        mock.get = AsyncMock(return_value=None)
+        mock.set = AsyncMock(return_value=True)
+        mock.delete = AsyncMock(return_value=True)
+        mock.delete_pattern = AsyncMock(return_value=1)
+        yield mock
+
+
+@pytest.fixture
+def cache():
+    """Кэш с L0 в памяти процесса."""
+    return PrincipalCache(
+        enabled=True, ttl_seconds=300, memory_ttl_seconds=15, memory_entries=100
+    )
+
+
+def _user(**overrides) -> User:
+    values = dict(
+        id=uuid.uuid4(),
+        email="reader@example.com",
+        password_hash="$2b$12$secret",
+        full_name="Reader",
+        is_active=True,
+        is_verified=True,
+        is_admin=False,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        updated_at=datetime(2026, 1, 2, tzinfo=timezone.utc),
+        last_login=None,
+        longest_streak_days=3,
+        timezone="Europe/Moscow",
+    )
+    values.update(overrides)
+    return User(**values)
+
+
+class TestSnapshot:
+    """Снимок пользователя."""
+
+    def test_snapshot_excludes_password_hash(self):
+        """Хэш пароля не попадает в кэш."""
+        snapshot = principal_snapshot(_user())
+
+        assert "password_hash" not in snapshot
+        assert snapshot["created_at"] == "2026-01-01T00:00:00+00:00"
+
+    def test_user_from_snapshot_is_detached(self):
+        """Из снимка собирается detached User с теми же полями."""
+        user = _user(is_admin=True)
+
+        restored = user_from_snapshot(principal_snapshot(user))
+
+        assert inspect(restored).detached
+        assert restored.id == user.id
+        assert restored.is_admin is True
+        assert restored.created_at == user.created_at
+        assert restored.timezone == "Europe/Moscow"
+
+    def test_fields_outside_snapshot_are_not_none(self):
+        """password_hash и связи не подменяются None - обращение падает."""
+        restored = user_from_snapshot(principal_snapshot(_user()))
+
+        with pytest.raises(DetachedInstanceError):
+            restored.password_hash
+        with pytest.raises(DetachedInstanceError):
+            restored.longest_streak_days
+        # Как и у пользователя из БД: связи lazy="raise"
+        with pytest.raises(InvalidRequestError):
+            restored.subscription
+
+
+class TestLookup:
+    """Поиск по уровням."""
+
+    @pytest.mark.asyncio
+    async def test_memory_hit_skips_redis(self, cache, mock_cache_manager):
+        """Повторный запрос того же токена обслуживается из памяти."""
+        user = _user()
+        await cache.put(user, "jti-1")
+
+        cached = await cache.get(user.id, "jti-1")
+
+        assert cached.email == user.email
+        mock_cache_manager.get.assert_not_called()
+        assert cache.stats["memory_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_warms_memory(self, cache, mock_cache_manager):
+        """Попадание в Redis кладёт снимок в память процесса."""
+        user = _user()
+        mock_cache_manager.get.return_value = principal_snapshot(user)
+
+        first = await cache.get(user.id, "jti-1")
+        second = await cache.get(user.id, "jti-1")
+
+        assert first.id == second.id == user.id
+        mock_cache_manager.get.assert_called_once_with(f"auth_principal:{user.id}:jti-1")
+        assert cache.stats["redis_hits"] == 1
+        assert cache.stats["memory_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_memory_entry_is_miss(self, mock_cache_manager):
+        """Запись L0 старше memory TTL не используется."""
+        cache = PrincipalCache(enabled=True, memory_ttl_seconds=15, memory_entries=100)
+        user = _user()
+        await cache.put(user, "jti-1")
+
+        with patch("app.services.principal_cache.time.monotonic", return_value=time.monotonic() + 60):
+            assert await cache.get(user.id, "jti-1") is None
+
+        assert cache.stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache(self, mock_cache_manager):
+        """Выключенный кэш всегда промах и ничего не пишет."""
+        cache = PrincipalCache(enabled=False)
+        user = _user()
+
+        await cache.put(user, "jti-1")
+
+        assert await cache.get(user.id, "jti-1") is None
+        mock_cache_manager.set.assert_not_called()
+
+
+class TestPut:
+    """Запись в кэш."""
+
+    @pytest.mark.asyncio
+    async def test_ttl_capped_by_token_expiration(self, cache, mock_cache_manager):
+        """Запись не переживает токен."""
+        await cache.put(_user(), "jti-1", token_expires_at=time.time() + 60)
+
+        ttl = mock_cache_manager.set.call_args.kwargs["ttl"]
+        assert 55 <= ttl <= 60
+
+    @pytest.mark.asyncio
+    async def test_inactive_user_not_cached(self, cache, mock_cache_manager):
+        """Неактивный пользователь не кэшируется."""
+        await cache.put(_user(is_active=False), "jti-1")
+
+        mock_cache_manager.set.assert_not_called()
+
+
+class TestInvalidation:
+    """Инвалидация записей."""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_token(self, cache, mock_cache_manager):
+        """Logout удаляет запись только этого токена."""
+        user = _user()
+        await cache.put(user, "jti-1")
+        await cache.put(user, "jti-2")
+
+        await cache.invalidate_token(user.id, "jti-1")
+
+        mock_cache_manager.delete.assert_called_once_with(f"auth_principal:{user.id}:jti-1")
+        assert await cache.get(user.id, "jti-2") is not None
+        assert await cache.get(user.id, "jti-1") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user(self, cache, mock_cache_manager):
+        """Смена профиля удаляет все токены пользователя, чужие записи остаются."""
+        user, other = _user(), _user()
+        await cache.put(user, "jti-1")
+        await cache.put(user, "jti-2")
+        await cache.put(other, "jti-3")
+
+        await cache.invalidate_user(user.id)
+
+        mock_cache_manager.delete_pattern.assert_called_once_with(f"auth_principal:{user.id}:*")
+        assert cache.get_stats()["memory_size"] == 1
+        assert await cache.get(other.id, "jti-3") is not None
+
+    @pytest.mark.asyncio
+    async def test_login_invalidates_user(self):
+        """Вход обновляет last_login - записи кэша пользователя удаляются."""
+        user = _user()
+        with patch.object(
+            auth_service, "get_user_by_email", AsyncMock(return_value=user)
+        ), patch.object(
+            auth_service, "verify_password_async", AsyncMock(return_value=True)
+        ), patch(
+            "app.services.auth_service.principal_cache"
+        ) as cache:
+            cache.invalidate_user = AsyncMock()
+
+            assert await auth_service.authenticate_user(AsyncMock(), user.email, "pw") is user
+
+        assert user.last_login is not None
+        cache.invalidate_user.assert_awaited_once_with(user.id)
+
+
+class TestPasswordChange:
+    """Смена пароля при попадании в кэш."""
+
+    @pytest.mark.asyncio
+    async def test_password_change_reloads_user(self):
+        """Пароль проверяется по хэшу пользователя из БД, а не из снимка."""
+        stored = _user()
+        principal = user_from_snapshot(principal_snapshot(stored))
+        verify = AsyncMock(return_value=True)
+
+        with patch.object(
+            auth_service, "get_user_by_id", AsyncMock(return_value=stored)
+        ) as get_user, patch.object(
+            auth_service, "verify_password_async", verify
+        ), patch.object(
+            auth_service, "get_password_hash_async", AsyncMock(return_value="$2b$12$new")
+        ), patch(
+            "app.services.auth_service.principal_cache"
+        ) as cache:
+            cache.invalidate_user = AsyncMock()
+
+            assert await auth_service.update_user_profile(
+                AsyncMock(),
+                principal.id,
+                current_password="old-password",
+                new_password="new-password",
+            )
+
+        get_user.assert_awaited_once()
+        verify.assert_awaited_once_with("old-password", "$2b$12$secret")
+        assert stored.password_hash == "$2b$12$new"
+        cache.invalidate_user.assert_awaited_once_with(principal.id)
+
+
+class TestTokenKey:
+    """Ключ токена."""
+
+    def test_access_tokens_have_unique_jti(self):
+        """Каждый access токен получает свой jti."""
+        data = {"sub": str(uuid.uuid4())}
+        first = auth_service.verify_token(auth_service.create_access_token(data))
+        second = auth_service.verify_token(auth_service.create_access_token(data))
+
+        assert first["jti"] != second["jti"]
+        assert PrincipalCache.token_key("token", first) == first["jti"]
+
+    def test_legacy_token_without_jti(self):
+        """Токен без jti кэшируется по SHA-256 токена."""
+        key = PrincipalCache.token_key("legacy.jwt.token", {"sub": "x"})
+
+        assert len(key) == 64
+        assert key == PrincipalCache.token_key("legacy.jwt.token", {"sub": "x"})
@@ -6,14 +6,20 @@ Tests cover:
 - Rejection of blacklisted tokens
 - Token expiration handling
 - Blacklist service operations
+- Hashed revocation ids and the in-memory Bloom filter index
+- Filter rebuild and pub/sub listener against an in-memory fake Redis
 """
 
+import asyncio
+import time
+
 import pytest
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, patch, MagicMock
 from httpx import AsyncClient
 
-from app.services.token_blacklist import TokenBlacklist, token_blacklist
+from app.services.bloom_filter import BloomFilter
+from app.services.token_blacklist import TokenBlacklist, revocation_id, token_blacklist
 from app.services.auth_service import auth_service
 
 
@@ -43,7 +49,7 @@ class TestTokenBlacklistService:
         assert result is True
         mock_cache_manager.set.assert_called_once()
         call_args = mock_cache_manager.set.call_args
-        assert call_args[0][0] == f"token_blacklist:{token}"
+        assert call_args[0][0] == f"token_blacklist:{revocation_id(token)}"
         assert call_args[0][1] == "1"
         # TTL should be approximately 3600 seconds (1 hour)
         assert 3500 < call_args[1]['ttl'] < 3700
@@ -70,7 +76,7 @@ class TestTokenBlacklistService:
         result = await blacklist.is_blacklisted(token)
 
         assert result is True
-        mock_cache_manager.get.assert_called_once_with(f"token_blacklist:{token}")
+        mock_cache_manager.get.assert_called_once_with(f"token_blacklist:{revocation_id(token)}")
 
     @pytest.mark.asyncio
     async def test_is_blacklisted_returns_false_for_valid_token(self, mock_cache_manager):
@@ -82,7 +88,7 @@ class TestTokenBlacklistService:
         result = await blacklist.is_blacklisted(token)
 
         assert result is False
-        mock_cache_manager.get.assert_called_once_with(f"token_blacklist:{token}")
+        mock_cache_manager.get.assert_called_once_with(f"token_blacklist:{revocation_id(token)}")
 
     @pytest.mark.asyncio
     async def test_remove_token_from_blacklist(self, mock_cache_manager):
@@ -93,7 +99,7 @@ class TestTokenBlacklistService:
         result = await blacklist.remove(token)
 
         assert result is True
-        mock_cache_manager.delete.assert_called_once_with(f"token_blacklist:{token}")
+        mock_cache_manager.delete.assert_called_once_with(f"token_blacklist:{revocation_id(token)}")
 
     @pytest.mark.asyncio
     async def test_add_token_handles_naive_datetime(self, mock_cache_manager):
@@ -109,6 +115,273 @@ class TestTokenBlacklistService:
         mock_cache_manager.set.assert_called_once()
 
 
+class TestRevocationIndex:
+    """Hashed revocation ids and the Bloom filter index."""
+
+    @pytest.fixture
+    def mock_cache_manager(self):
+        """Create mock cache manager."""
+        with patch('app.services.token_blacklist.cache_manager') as mock:
+            mock.set = AsyncMock(return_value=True)
+            mock.get = AsyncMock(return_value=None)
+            yield mock
+
+    @pytest.fixture
+    def blacklist(self):
+        """Blacklist with a ready (empty) filter."""
+        blacklist = TokenBlacklist(capacity=1000, error_rate=0.001)
+        blacklist._filter = BloomFilter(1000, 0.001)
+        return blacklist
+
+    def test_revocation_id_uses_jti(self):
+        """Tokens are identified by a SHA-256 of their jti, not the raw JWT."""
+        token = auth_service.create_access_token({"sub": "user-1"})
+        payload = auth_service.verify_token(token)
+
+        token_id = revocation_id(token, payload)
+
+        assert token_id == revocation_id(token)
+        assert len(token_id) == 64
+        assert token not in token_id
+        assert payload["jti"] not in token_id
+
+    @pytest.mark.asyncio
+    async def test_filter_negative_skips_redis(self, blacklist, mock_cache_manager):
+        """A token missing from the filter is accepted without a Redis call."""
+        result = await blacklist.is_blacklisted("never_revoked")
+
+        assert result is False
+        mock_cache_manager.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_confirmed_in_redis(self, blacklist, mock_cache_manager):
+        """A filter hit is confirmed with Redis."""
+        token = "revoked_token"
+        await blacklist.add(token, datetime.now(timezone.utc) + timedelta(hours=1))
+        mock_cache_manager.get = AsyncMock(return_value="1")
+
+        result = await blacklist.is_blacklisted(token)
+
+        assert result is True
+        mock_cache_manager.get.assert_called_once_with(f"token_blacklist:{revocation_id(token)}")
+
+    @pytest.mark.asyncio
+    async def test_false_positive_passes(self, blacklist, mock_cache_manager):
+        """A filter hit without a Redis key (removed/expired) is not revoked."""
+        token = "removed_token"
+        blacklist._filter.add(revocation_id(token))
+
+        result = await blacklist.is_blacklisted(token)
+
+        assert result is False
+        assert blacklist._stats["false_positives"] == 1
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Every added id is reported as present; the false positive rate stays low."""
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        added = [revocation_id(f"token-{i}") for i in range(2000)]
+        for token_id in added:
+            bloom.add(token_id)
+
+        assert all(token_id in bloom for token_id in added)
+        false_positives = sum(
+            revocation_id(f"other-{i}") in bloom for i in range(10000)
+        )
+        assert false_positives < 300
+
+
+class FakePubSub:
+    """Pub/sub subscription of FakeRedis."""
+
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self.server.subscribers.setdefault(channel, []).append(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        if self.server.listener_error is not None:
+            raise self.server.listener_error
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        for subscribers in self.server.subscribers.values():
+            if self in subscribers:
+                subscribers.remove(self)
+
+
+class FakeRedis:
+    """In-memory Redis with the commands used by TokenBlacklist (decode_responses=True)."""
+
+    def __init__(self):
+        self.values = {}
+        self.expires_at = {}
+        self.subscribers = {}
+        self.listener_error = None
+        self.publish_error = None
+        # Called after the first key of every SCAN (concurrent writes)
+        self.on_scan = None
+
+    async def set(self, key: str, value: str, ex: int = None) -> bool:
+        self.values[key] = value
+        if ex:
+            self.expires_at[key] = time.monotonic() + ex
+        return True
+
+    async def get(self, key: str):
+        return self.values.get(key)
+
+    async def ttl(self, key: str) -> int:
+        if key not in self.values:
+            return -2
+        if key not in self.expires_at:
+            return -1
+        return int(round(self.expires_at[key] - time.monotonic()))
+
+    async def delete(self, key: str) -> int:
+        self.expires_at.pop(key, None)
+        return 1 if self.values.pop(key, None) is not None else 0
+
+    async def incr(self, key: str) -> int:
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+        return int(self.values[key])
+
+    async def publish(self, channel: str, message: str) -> int:
+        if self.publish_error is not None:
+            raise self.publish_error
+        subscribers = self.subscribers.get(channel, [])
+        for pubsub in subscribers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def scan_iter(self, match: str = "*", count: int = None):
+        prefix = match.rstrip("*")
+        for n, key in enumerate([key for key in self.values if key.startswith(prefix)]):
+            yield key
+            if n == 0 and self.on_scan is not None:
+                await self.on_scan()
+
+    async def close(self) -> None:
+        pass
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+class TestRevocationListener:
+    """rebuild() and _listen() against FakeRedis."""
+
+    @pytest.fixture
+    def redis_server(self):
+        return FakeRedis()
+
+    @pytest.fixture
+    def blacklist(self, redis_server):
+        """Blacklist connected to the fake Redis, listener not started."""
+        blacklist = TokenBlacklist(capacity=1000, error_rate=0.001, rebuild_interval=3600)
+        blacklist._redis = redis_server
+        yield blacklist
+        blacklist._redis = None
+
+    @pytest.mark.asyncio
+    async def test_revocation_during_rebuild_kept(self, blacklist, redis_server):
+        """A revocation published while rebuild() scans ends up in the new filter."""
+        old_id = revocation_id("old_token")
+        new_id = revocation_id("revoked_during_scan")
+        await redis_server.set(f"token_blacklist:{old_id}", "1", ex=3600)
+
+        async def revoke_on_other_worker():
+            redis_server.on_scan = None
+            await redis_server.set(f"token_blacklist:{new_id}", "1", ex=3600)
+            await redis_server.publish(TokenBlacklist.CHANNEL, new_id)
+
+        redis_server.on_scan = revoke_on_other_worker
+
+        await blacklist.start()
+        try:
+            await _wait_for(lambda: blacklist.filter_ready and new_id in blacklist._filter)
+        finally:
+            await blacklist.stop()
+
+        assert blacklist._stats["rebuilds"] == 1
+
+    @pytest.mark.asyncio
+    async def test_legacy_key_migrated_with_ttl(self, blacklist, redis_server):
+        """A raw-token key is moved to its hashed id and keeps its remaining TTL."""
+        token = "legacy.raw.jwt"
+        await redis_server.set(f"token_blacklist:{token}", "1", ex=120)
+
+        assert await blacklist.rebuild() == 1
+
+        hashed_key = f"token_blacklist:{revocation_id(token)}"
+        assert f"token_blacklist:{token}" not in redis_server.values
+        assert await redis_server.get(hashed_key) == "1"
+        assert 118 <= await redis_server.ttl(hashed_key) <= 120
+        assert revocation_id(token) in blacklist._filter
+
+    @pytest.mark.asyncio
+    async def test_lost_publish_invalidates_other_filters(self, blacklist, redis_server):
+        """A revocation whose publish is lost still reaches other workers' filters."""
+        revoker = TokenBlacklist(capacity=1000, error_rate=0.001)
+        revoker._redis = redis_server
+        revoker.PUBLISH_RETRY_DELAY = 0
+        redis_server.publish_error = ConnectionError("connection reset")
+        token_id = revocation_id("revoked_without_publish")
+
+        async def cache_set(key, value, ttl):
+            return await redis_server.set(key, value, ex=ttl)
+
+        await blacklist.start()
+        try:
+            await _wait_for(lambda: blacklist.filter_ready)
+
+            with patch('app.services.token_blacklist.cache_manager') as cache:
+                cache.set = AsyncMock(side_effect=cache_set)
+                assert await revoker.add(
+                    "revoked_without_publish", datetime.now(timezone.utc) + timedelta(hours=1)
+                )
+
+            assert await redis_server.get(TokenBlacklist.GENERATION_KEY) == "1"
+            await _wait_for(
+                lambda: blacklist.filter_ready and token_id in blacklist._filter, timeout=3.0
+            )
+        finally:
+            await blacklist.stop()
+
+        assert blacklist._stats["rebuilds"] == 2
+
+    @pytest.mark.asyncio
+    async def test_listener_error_falls_back_to_redis(self, blacklist, redis_server):
+        """After a listener error the filter is dropped and checks go to Redis."""
+        redis_server.listener_error = ConnectionError("connection lost")
+
+        with patch('app.services.token_blacklist.cache_manager') as cache:
+            cache.get = AsyncMock(return_value=None)
+
+            await blacklist.start()
+            try:
+                await _wait_for(
+                    lambda: blacklist._stats["rebuilds"] == 1 and not blacklist.filter_ready
+                )
+                assert await blacklist.is_blacklisted("unknown_token") is False
+            finally:
+                await blacklist.stop()
+
+        cache.get.assert_called_once_with(f"token_blacklist:{revocation_id('unknown_token')}")
+        assert blacklist._stats["redis_checks"] == 1
+
+
 class TestTokenBlacklistIntegration:
     """Integration tests for token blacklist with auth endpoints."""
 
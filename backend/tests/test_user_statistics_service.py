@@ -6,6 +6,7 @@ Unit тесты для UserStatisticsService.
 - get_reading_streak
 - get_books_count_by_status
 - get_favorite_genres
+- _compute_all_statistics (совпадает с расчётом по отдельным методам)
 """
 
 import pytest
@@ -479,3 +480,144 @@ async def test_reading_streak_long_consecutive_days(db_session):
 
     # Streak должен быть 30
     assert streak == 30, f"Expected streak=30 (читал 30 дней подряд до вчера), got {streak}"
+
+
+async def _create_reading_library(db_session) -> User:
+    """Пользователь с EPUB (CFI) и legacy книгами, прогрессом и сессиями."""
+    from app.models.chapter import Chapter
+
+    user = User(
+        email=f"test_{uuid4()}@example.com",
+        password_hash="hashed",
+        full_name="Test User",
+        longest_streak_days=2,
+    )
+    db_session.add(user)
+    await db_session.commit()
+    await db_session.refresh(user)
+
+    books = []
+    # (жанр, страниц, глав, прогресс: (глава, позиция, cfi) или None)
+    specs = [
+        ("fantasy", 300, 0, (1, 97, "epubcfi(/6/4!/4/2)")),
+        ("fantasy", 250, 0, (1, 40, "epubcfi(/6/8!/4/2)")),
+        ("fantasy", 120, 10, (10, 80, None)),
+        ("sci-fi", 400, 10, (4, 50, None)),
+        ("sci-fi", 0, 0, (3, 0, None)),
+        ("detective", 200, 5, None),
+    ]
+    for genre, pages, chapters, progress in specs:
+        book = Book(
+            user_id=user.id,
+            title=f"Book {len(books)}",
+            author="Test Author",
+            genre=genre,
+            file_format="epub",
+            file_path=f"/test/{uuid4()}.epub",
+            file_size=1024000,
+            total_pages=pages,
+            total_chapters=chapters,
+        )
+        db_session.add(book)
+        await db_session.flush()
+        for number in range(1, chapters + 1):
+            db_session.add(
+                Chapter(book_id=book.id, chapter_number=number, content="Текст главы")
+            )
+        if progress:
+            chapter, position, cfi = progress
+            db_session.add(
+                ReadingProgress(
+                    user_id=user.id,
+                    book_id=book.id,
+                    current_chapter=chapter,
+                    current_position=position,
+                    reading_location_cfi=cfi,
+                    reading_speed_wpm=180.0 + len(books) * 10,
+                )
+            )
+        books.append(book)
+
+    # Сессии: серия из 4 дней до сегодня, пропуск, старые дни, аномальная
+    # длительность, активная сессия и сессия с нулевой длительностью
+    # Полдень, чтобы сдвиг сессий на минуты не переносил их на другой день
+    noon = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+    sessions = [
+        (0, 25, 0, 5, False),
+        (1, 40, 5, 15, False),
+        (1, 10, 15, 17, False),
+        (2, 30, 17, 25, False),
+        (3, 600, 25, 30, False),
+        (5, 45, 30, 40, False),
+        (9, 0, 40, 40, False),
+        (40, 20, 0, 10, False),
+        (0, 15, 40, 42, True),
+    ]
+    for index, (days_ago, minutes, start, end, is_active) in enumerate(sessions):
+        started_at = noon - timedelta(days=days_ago, minutes=index)
+        db_session.add(
+            ReadingSession(
+                user_id=user.id,
+                book_id=books[index % 3].id,
+                started_at=started_at,
+                ended_at=None if is_active else started_at + timedelta(minutes=minutes),
+                start_position=start,
+                end_position=end,
+                duration_minutes=minutes,
+                is_active=is_active,
+            )
+        )
+
+    await db_session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_compute_all_statistics_matches_sequential(db_session):
+    """Двухзапросный расчёт совпадает с расчётом по отдельным get_* методам."""
+    user = await _create_reading_library(db_session)
+
+    stats = await UserStatisticsService._compute_all_statistics(db_session, user.id)
+    reference = await UserStatisticsService._compute_all_statistics_sequential(
+        db_session, user.id
+    )
+
+    assert stats == reference
+    assert stats["total_books"] == 6
+    assert stats["books_completed"] == 2
+    assert stats["books_in_progress"] == 3
+    assert stats["reading_streak_days"] == 4
+    assert stats["longest_streak_days"] == 4
+
+
+@pytest.mark.asyncio
+async def test_statistics_read_does_not_write_streak_record(db_session):
+    """Расчёт статистики не пишет в БД; рекорд сохраняет record_longest_streak."""
+    user = await _create_reading_library(db_session)
+
+    stats = await UserStatisticsService._compute_all_statistics(db_session, user.id)
+    assert stats["longest_streak_days"] == 4
+    assert not db_session.dirty
+
+    await db_session.refresh(user)
+    assert user.longest_streak_days == 2
+
+    assert await UserStatisticsService.record_longest_streak(db_session, user.id) == 4
+    await db_session.commit()
+    await db_session.refresh(user)
+    assert user.longest_streak_days == 4
+
+
+@pytest.mark.asyncio
+async def test_compute_all_statistics_empty_user(db_session):
+    """Пользователь без книг и сессий получает нули и пустую неделю."""
+    user_id = uuid4()
+
+    stats = await UserStatisticsService._compute_all_statistics(db_session, user_id)
+
+    assert stats == await UserStatisticsService._compute_all_statistics_sequential(
+        db_session, user_id
+    )
+    assert stats["total_books"] == 0
+    assert stats["reading_streak_days"] == 0
+    assert len(stats["weekly_activity"]) == 7
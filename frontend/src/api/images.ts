@@ -29,7 +29,8 @@ export interface AsyncGenerationResponse {
  */
 export interface TaskStatusResponse {
   task_id: string;
-  status: 'PENDING' | 'STARTED' | 'SUCCESS' | 'FAILURE' | 'RETRY' | 'REVOKED';
+  status: 'PENDING' | 'STARTED' | 'PROGRESS' | 'SUCCESS' | 'FAILURE' | 'RETRY' | 'REVOKED';
+  ready?: boolean;
   result?: {
     success: boolean;
     image_id?: string;
@@ -38,9 +39,52 @@ export interface TaskStatusResponse {
     generation_time_seconds?: number;
     error_message?: string;
   };
+  /** Batch task progress (status PROGRESS) */
+  progress?: BatchTaskProgress;
+  /** Batch task result (same object as result, typed for batch jobs) */
+  batch_result?: BatchTaskProgress;
+  error?: string;
   message: string;
 }
 
+/**
+ * Progress / result of a chapter batch generation task.
+ */
+export interface BatchTaskProgress {
+  total: number;
+  completed?: number;
+  successful: number;
+  failed: number;
+  results: Array<{
+    description_id: string;
+    description_type?: string;
+    image_url?: string;
+    generation_time?: number;
+    success: boolean;
+    error?: string;
+  }>;
+}
+
+/**
+ * Result of chapter batch generation.
+ */
+export interface ChapterBatchResult {
+  chapter_id: string;
+  total_descriptions: number;
+  processed: number;
+  successful: number;
+  failed: number;
+  images: Array<{
+    description_id: string;
+    description_type: DescriptionType;
+    image_url: string;
+    generation_time: number;
+  }>;
+  message: string;
+}
+
+const BATCH_POLL_INTERVAL_MS = 2000;
+
 /**
  * Normalizes image URL to absolute URL.
  * Converts relative API paths (e.g., /api/v1/images/file/xxx.png) to full URLs.
@@ -147,45 +191,67 @@ export const imagesAPI = {
     }
   },
 
+  /**
+   * Generate images for a chapter.
+   * The backend queues a batch job and returns its task ID at once;
+   * this waits for the job by polling the task status.
+   * @param chapterId - Chapter to generate images for
+   * @param request - Batch generation parameters
+   * @param signal - Optional AbortSignal to stop waiting
+   */
   async generateImagesForChapter(
     chapterId: string,
-    request: BatchGenerationRequest
-  ): Promise<{
-    chapter_id: string;
-    total_descriptions: number;
-    processed: number;
-    successful: number;
-    failed: number;
-    images: Array<{
-      description_id: string;
-      description_type: DescriptionType;
-      image_url: string;
-      generation_time: number;
-    }>;
-    message: string;
-  }> {
-    const response = await apiClient.post(`/images/generate/chapter/${chapterId}`, request) as {
-      chapter_id: string;
-      total_descriptions: number;
-      processed: number;
-      successful: number;
-      failed: number;
-      images: Array<{
-        description_id: string;
-        description_type: DescriptionType;
-        image_url: string;
-        generation_time: number;
-      }>;
+    request: BatchGenerationRequest,
+    signal?: AbortSignal
+  ): Promise<ChapterBatchResult> {
+    const job = await apiClient.post(`/images/generate/chapter/${chapterId}`, request, { signal }) as {
+      task_id?: string;
+      total_descriptions?: number;
+      queued_for_processing?: number;
       message: string;
     };
-    // Normalize image URLs
-    if (response.images) {
-      response.images = response.images.map(img => ({
-        ...img,
-        image_url: normalizeImageUrl(img.image_url),
-      }));
+
+    // Nothing to generate (all descriptions already have images)
+    if (!job.task_id) {
+      return {
+        chapter_id: chapterId,
+        total_descriptions: job.total_descriptions ?? 0,
+        processed: 0,
+        successful: 0,
+        failed: 0,
+        images: [],
+        message: job.message,
+      };
     }
-    return response;
+
+    let status: TaskStatusResponse;
+    for (;;) {
+      status = await imagesAPI.getTaskStatus(job.task_id, signal);
+      if (status.ready) break;
+      await new Promise(resolve => setTimeout(resolve, BATCH_POLL_INTERVAL_MS));
+    }
+
+    if (status.status !== 'SUCCESS' || !status.batch_result) {
+      throw new Error(status.error || status.message);
+    }
+
+    const result = status.batch_result;
+    return {
+      chapter_id: chapterId,
+      total_descriptions: job.total_descriptions ?? result.total,
+      processed: result.total,
+      successful: result.successful,
+      failed: result.failed,
+      images: result.results
+        .filter(item => item.success)
+        .map(item => ({
+          description_id: item.description_id,
+          description_type: item.description_type as DescriptionType,
+          image_url: normalizeImageUrl(item.image_url),
+          generation_time: item.generation_time ?? 0,
+        })),
+      message: `Generated ${result.successful} images for chapter`,
+    };
   },
 
   // Image management
@@ -303,6 +369,10 @@ export const imagesAPI = {
    */
   async getTaskStatus(taskId: string, signal?: AbortSignal): Promise<TaskStatusResponse> {
     const response = await apiClient.get(`/images/task/${taskId}`, { signal }) as TaskStatusResponse;
+    // Batch tasks return a batch summary instead of a single image
+    if (response.result && 'results' in response.result) {
+      response.batch_result = response.result as unknown as BatchTaskProgress;
+    }
     // Normalize image URL in result if present
     if (response.result?.image_url) {
       response.result.image_url = normalizeImageUrl(response.result.image_url);
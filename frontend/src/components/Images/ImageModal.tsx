@@ -6,6 +6,7 @@ import { useUIStore } from '@/stores/ui';
 import { useTranslation } from '@/hooks/useTranslation';
 import LoadingSpinner from '@/components/UI/LoadingSpinner';
 import { STORAGE_KEYS } from '@/types/state';
+import { imageDisplayHeaders, responsiveImageUrl } from '@/utils/imageVariants';
 import { useFocusTrap } from '@/hooks/useFocusTrap';
 import { Z_INDEX } from '@/lib/zIndex';
 import type { Description } from '@/types/api';
@@ -23,8 +24,8 @@ const fetchImageAsBlob = async (url: string): Promise<string | null> => {
     }
 
     const token = localStorage.getItem(STORAGE_KEYS.AUTH_TOKEN);
-    const response = await fetch(url, {
-      headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+    const response = await fetch(responsiveImageUrl(url), {
+      headers: imageDisplayHeaders(token),
     });
 
     if (!response.ok) {
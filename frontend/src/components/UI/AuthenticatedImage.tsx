@@ -9,6 +9,7 @@
 
 import { useState, useEffect, memo } from 'react';
 import { STORAGE_KEYS } from '@/types/state';
+import { imageDisplayHeaders, responsiveImageUrl } from '@/utils/imageVariants';
 
 interface AuthenticatedImageProps {
   src: string | null;
@@ -55,8 +56,8 @@ export const AuthenticatedImage = memo(function AuthenticatedImage({
 
       try {
         const token = localStorage.getItem(STORAGE_KEYS.AUTH_TOKEN);
-        const response = await fetch(src, {
-          headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+        const response = await fetch(responsiveImageUrl(src), {
+          headers: imageDisplayHeaders(token),
         });
 
         if (!response.ok) {
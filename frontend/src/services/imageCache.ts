@@ -16,6 +16,7 @@
 
 import { db, createImageId, IMAGE_CACHE_TTL, type CachedImage } from './db'
 import { STORAGE_KEYS } from '@/types/state'
+import { imageDisplayHeaders, responsiveImageUrl } from '@/utils/imageVariants'
 
 /** Enable debug logging only in development */
 const DEBUG = import.meta.env.DEV
@@ -191,8 +192,8 @@ class ImageCacheService {
       // Download image as blob with Authorization header
       if (DEBUG) console.log('[ImageCache] Downloading image for caching:', descriptionId)
       const token = localStorage.getItem(STORAGE_KEYS.AUTH_TOKEN)
-      const response = await fetch(imageUrl, {
-        headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+      const response = await fetch(responsiveImageUrl(imageUrl), {
+        headers: imageDisplayHeaders(token),
       })
 
       if (!response.ok) {
@@ -0,0 +1,42 @@
+/**
+ * Helpers for requesting generated image variants
+ *
+ * The image file endpoint serves a WebP variant when the request's Accept
+ * header lists image/webp, and the smallest variant at least `w` pixels
+ * wide. fetch() sends `Accept: *\/*` by default, so display requests must
+ * set the header explicitly. Downloads keep requesting the original PNG.
+ */
+
+const IMAGE_FILE_PATH = '/api/v1/images/file/';
+
+/** Accept header for displaying generated images */
+export const IMAGE_ACCEPT_HEADER = 'image/webp,image/png;q=0.9,*/*;q=0.5';
+
+/**
+ * Build fetch headers for displaying a generated image
+ *
+ * @param token - Auth token (omitted when null)
+ */
+export const imageDisplayHeaders = (token: string | null): Record<string, string> => ({
+  Accept: IMAGE_ACCEPT_HEADER,
+  ...(token ? { Authorization: `Bearer ${token}` } : {}),
+});
+
+/**
+ * Add a `w=` width hint (screen width in device pixels) to an image file URL
+ *
+ * Non-API URLs (blob:, data:, external) are returned unchanged.
+ *
+ * @example
+ * responsiveImageUrl('/api/v1/images/file/abc.png') // "/api/v1/images/file/abc.png?w=1170"
+ */
+export const responsiveImageUrl = (url: string): string => {
+  if (!url.includes(IMAGE_FILE_PATH) || typeof window === 'undefined') {
+    return url;
+  }
+
+  const screenWidth = Math.min(window.screen?.width || window.innerWidth, 4096);
+  const width = Math.ceil(screenWidth * (window.devicePixelRatio || 1));
+  const separator = url.includes('?') ? '&' : '?';
+  return `${url}${separator}w=${Math.min(width, 4096)}`;
+};